@@ -2,7 +2,9 @@ from flask import Flask
 import os
 from flask_cors import CORS
 from app.shared.config import config
-from app.shared.extensions import db, migrate, jwt, swagger, cache, limiter
+from app.shared.extensions import db, migrate, jwt, swagger, cache, limiter, task_queue
+from app.shared.redis_client import resolve_redis_url
+from app.shared.concurrency import gevent_active, make_psycopg_green, engine_options
 from app.shared.utils.logger import setup_logger
 
 def create_app(config_name='default'):
@@ -37,27 +39,13 @@ def create_app(config_name='default'):
     
     
     # Initialize Rate Limiter with fallback to in-memory storage
-    redis_url = os.environ.get('REDIS_URL')
-    redis_host = os.environ.get('REDIS_HOST')
+    redis_uri = resolve_redis_url()
     
-    if redis_url:
-        # Use REDIS_URL if provided (Railway format)
-        app.config['RATELIMIT_STORAGE_URI'] = redis_url
-        app.config['RATELIMIT_STRATEGY'] = "fixed-window"
-        app.logger.info(f"Using Redis from REDIS_URL")
-    elif redis_host:
-        # Fallback to building URL from REDIS_HOST, REDIS_PORT, REDIS_PASSWORD
-        redis_port = os.environ.get('REDIS_PORT', 6379)
-        redis_password = os.environ.get('REDIS_PASSWORD')
-        
-        if redis_password:
-            redis_uri = f"redis://:{redis_password}@{redis_host}:{redis_port}"
-        else:
-            redis_uri = f"redis://{redis_host}:{redis_port}"
-            
+    if redis_uri:
+        # REDIS_URL (Railway format) or built from REDIS_HOST, REDIS_PORT, REDIS_PASSWORD
         app.config['RATELIMIT_STORAGE_URI'] = redis_uri
         app.config['RATELIMIT_STRATEGY'] = "fixed-window"
-        app.logger.info(f"Using Redis from REDIS_HOST: {redis_host}")
+        app.logger.info("Using Redis for rate limiting")
     else:
         # Fallback to in-memory storage (for deployments without Redis)
         app.config['RATELIMIT_STORAGE_URI'] = "memory://"
@@ -69,20 +57,21 @@ def create_app(config_name='default'):
     app.limiter = limiter
     
     
-    db.init_app(app)
+    # gevent workers: psycopg2 must yield while waiting on Postgres
+    if gevent_active():
+        make_psycopg_green()
     
-    # PostgreSQL connection pool settings for Supabase
-    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-        'pool_pre_ping': True,
-        'pool_recycle': 300,
-        'pool_size': 10,
-        'max_overflow': 20
-    }
+    # PostgreSQL connection pool settings for Supabase, sized to the worker
+    # concurrency (must be set before db.init_app, which creates the engine)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
+    
+    db.init_app(app)
     
     migrate.init_app(app, db)
     jwt.init_app(app)
     swagger.init_app(app)
     cache.init_app(app)
+    task_queue.init_app(app)
     
     # Setup logging
     setup_logger(app)
@@ -90,11 +79,18 @@ def create_app(config_name='default'):
     # Import models to ensure they are registered with SQLAlchemy
     # Import model registry to ensure all models are known to SQLAlchemy
     from app.shared import model_registry
+
+    # Domain event subscribers: publishers (web) and workers need the same list
+    from app.modules.nutrition.application import nutrition_alerts
+    from app.modules.gamification.application import service as gamification_service
     
     # Register commands
-    from app.commands import seed_command, promote_user_command
+    from app.commands import seed_command, rebuild_daily_totals_command, rebuild_leaderboards_command, promote_user_command, task_worker_command
     app.cli.add_command(seed_command)
+    app.cli.add_command(rebuild_daily_totals_command)
+    app.cli.add_command(rebuild_leaderboards_command)
     app.cli.add_command(promote_user_command)
+    app.cli.add_command(task_worker_command)
 
     from app.modules.identity.interface.routes.auth import auth_bp
     from app.modules.identity.interface.routes.onboarding import onboarding_bp
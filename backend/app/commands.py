@@ -41,8 +41,34 @@ def seed_command():
             print(f"Achievement exists: {data['name']}")
             
     db.session.commit()
+    
+    from app.modules.gamification.application.achievement_catalog import AchievementCatalog
+    AchievementCatalog.invalidate()
     print("Seeding complete.")
 
+@click.command('rebuild-daily-totals')
+@click.option('--user-id', default=None, help='Rebuild only this user (default: all users)')
+@with_appcontext
+def rebuild_daily_totals_command(user_id):
+    """Backfill/rebuild daily nutrition and hydration totals from meals and logs"""
+    from app.modules.nutrition.application.daily_totals_service import DailyTotalsService
+    
+    scope = f'user {user_id}' if user_id else 'all users'
+    click.echo(f'Rebuilding daily totals for {scope}...')
+    rows = DailyTotalsService.rebuild(user_id)
+    click.echo(f'✅ {rows} daily rows written')
+
+@click.command('rebuild-leaderboards')
+@with_appcontext
+def rebuild_leaderboards_command():
+    """Rebuild the all-time leaderboards (XP, streaks) from Postgres"""
+    from app.modules.gamification.application.leaderboard import LeaderboardService
+    
+    click.echo('Rebuilding leaderboards...')
+    counts = LeaderboardService.rebuild()
+    for metric, members in counts.items():
+        click.echo(f'✅ {metric}: {members} users')
+
 @click.command('promote-user')
 @click.argument('email')
 @with_appcontext
@@ -63,3 +89,13 @@ def promote_user_command(email):
     click.echo(f'   Email: {user.email}')
     click.echo(f'   Name: {user.name}')
     click.echo(f'   Role: {user.role}')
+
+@click.command('task-worker')
+@click.option('--concurrency', default=4, show_default=True, help='Number of worker threads')
+@with_appcontext
+def task_worker_command(concurrency):
+    """Run a dedicated background task queue worker"""
+    from app.shared.extensions import task_queue
+    
+    click.echo(f'🚀 Task worker started with {concurrency} threads')
+    task_queue.run_forever(concurrency)
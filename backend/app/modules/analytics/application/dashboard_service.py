@@ -0,0 +1,221 @@
+"""
+Materialized dashboard document
+
+The landing-page summary is kept in the cache (Redis) as one document per
+user and day. Reads are a single cache get; on a miss the document is built
+from the database and stored. Write paths call `DashboardService.refresh()`
+with the sections they touched, and a 'dashboard.refresh' job recomputes
+only those sections and merges them into the cached document.
+
+Metrics: dashboard.cache.{hit,miss}, dashboard.staleness_ms (age of the
+document served), dashboard.build_ms, dashboard.refresh_ms and
+dashboard.refresh_lag_ms (write -> document updated).
+"""
+import time
+import logging
+from datetime import timedelta
+from sqlalchemy import func, case
+from sqlalchemy.orm import joinedload
+
+from app.shared.extensions import db, cache, task_queue
+from app.shared.utils.metrics import metrics
+from app.shared.utils.timezone import get_today_cuiaba, day_range
+from app.modules.identity.domain.models import UserProfile
+from app.modules.training.domain.models import WorkoutSession, ExerciseLog
+from app.modules.gamification.domain.achievements import UserAchievement
+from app.modules.gamification.domain.user_streak import UserStreak
+from app.modules.nutrition.domain.diet import DietPreference
+from app.modules.nutrition.domain.hydration import HydrationGoal
+from app.modules.nutrition.application.daily_totals_service import DailyTotalsService
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = ('profile', 'consistency', 'achievements', 'nutrition', 'hydration', 'workout_volume')
+DASHBOARD_CACHE_TIMEOUT = 24 * 3600
+
+
+class DashboardService:
+
+    @staticmethod
+    def get(user_id):
+        """Documento do dashboard (cache, com fallback para o banco)"""
+        key = DashboardService._cache_key(user_id)
+        try:
+            entry = cache.get(key)
+        except Exception as e:
+            logger.warning(f"Dashboard cache read failed: {e}")
+            entry = None
+
+        if entry is not None:
+            metrics.incr('dashboard.cache.hit')
+            metrics.observe('dashboard.staleness_ms', (time.time() - entry['updated_at']) * 1000)
+            return entry['doc']
+
+        metrics.incr('dashboard.cache.miss')
+        with metrics.timer('dashboard.build_ms'):
+            doc = DashboardService.build(user_id)
+        DashboardService._store(key, doc)
+        return doc
+
+    @staticmethod
+    def refresh(user_id, *sections):
+        """
+        Agenda a atualização das seções afetadas por uma escrita
+
+        Args:
+            sections: nomes em SECTIONS (todas se vazio)
+        """
+        try:
+            task_queue.enqueue('dashboard.refresh', {
+                "user_id": str(user_id),
+                "sections": list(sections or SECTIONS),
+                "requested_at": time.time()
+            }, key=f"dashboard:{user_id}")
+        except Exception as e:
+            # Sem fila, descarta o documento: a próxima leitura reconstrói
+            logger.warning(f"Dashboard refresh enqueue failed, invalidating: {e}")
+            try:
+                cache.delete(DashboardService._cache_key(user_id))
+            except Exception:
+                pass
+
+    @staticmethod
+    def build(user_id):
+        """Monta o documento completo a partir do banco"""
+        doc = {}
+        for section in SECTIONS:
+            doc.update(DashboardService._build_section(user_id, section))
+        return doc
+
+    @staticmethod
+    def apply_refresh(user_id, sections, requested_at=None):
+        """Recalcula as seções e grava no documento em cache (se existir)"""
+        key = DashboardService._cache_key(user_id)
+        entry = cache.get(key)
+        if entry is None:
+            # Nada materializado ainda; a próxima leitura monta tudo
+            return
+
+        with metrics.timer('dashboard.refresh_ms'):
+            doc = entry['doc']
+            for section in sections:
+                doc.update(DashboardService._build_section(user_id, section))
+        DashboardService._store(key, doc)
+
+        if requested_at:
+            metrics.observe('dashboard.refresh_lag_ms', (time.time() - requested_at) * 1000)
+
+    # ---------- Sections ----------
+
+    @staticmethod
+    def _build_section(user_id, section):
+        today = get_today_cuiaba()
+
+        if section == 'profile':
+            from app.modules.gamification.application.service import GamificationService
+            profile = UserProfile.query.filter_by(user_id=user_id).first()
+            current_xp = profile.xp if profile and profile.xp else 0
+            return {
+                "weight": {
+                    "current": profile.current_weight_kg if profile else 0,
+                    "target": profile.target_weight_kg if profile else 0,
+                },
+                "level": GamificationService.calculate_level(current_xp),
+                "xp": current_xp
+            }
+
+        if section == 'consistency':
+            workouts_last_week = WorkoutSession.query.filter(
+                WorkoutSession.user_id == user_id,
+                WorkoutSession.started_at >= today - timedelta(days=7),
+                WorkoutSession.status == 'completed'
+            ).count()
+            streak_record = UserStreak.query.filter_by(user_id=user_id).first()
+            return {
+                "consistency": {
+                    "workouts_last_7_days": workouts_last_week,
+                    "current_streak": streak_record.current_workout_streak if streak_record else 0
+                }
+            }
+
+        if section == 'achievements':
+            recent = UserAchievement.query.options(
+                joinedload(UserAchievement.achievement)
+            ).filter_by(user_id=user_id).order_by(UserAchievement.unlocked_at.desc()).limit(3).all()
+            return {
+                "achievements": [{
+                    "name": ua.achievement.name,
+                    "date": ua.unlocked_at.strftime("%Y-%m-%d")
+                } for ua in recent]
+            }
+
+        if section == 'nutrition':
+            diet_pref = DietPreference.query.filter_by(user_id=user_id).first()
+            return {
+                "nutrition": {
+                    "calories": int(DailyTotalsService.get_day(user_id, today)['calories']),
+                    "goal": diet_pref.calorie_goal if diet_pref and diet_pref.calorie_goal else 2000
+                }
+            }
+
+        if section == 'hydration':
+            goal = HydrationGoal.query.filter_by(user_id=user_id).first()
+            return {
+                "hydration": {
+                    "consumed_ml": int(DailyTotalsService.get_day(user_id, today)['water_ml']),
+                    "goal_ml": goal.daily_goal_ml if goal else 2500
+                }
+            }
+
+        if section == 'workout_volume':
+            # Esta semana e a anterior em uma única query
+            this_week_start = today - timedelta(days=today.weekday())
+            this_week_from, this_week_to = day_range(this_week_start, today)
+            last_week_from, _ = day_range(this_week_start - timedelta(days=7))
+            volume = ExerciseLog.weight_used_kg * ExerciseLog.reps_done
+
+            this_week, last_week = db.session.query(
+                func.coalesce(func.sum(case((WorkoutSession.started_at >= this_week_from, volume))), 0),
+                func.coalesce(func.sum(case((WorkoutSession.started_at < this_week_from, volume))), 0)
+            ).join(
+                WorkoutSession,
+                ExerciseLog.workout_session_id == WorkoutSession.id
+            ).filter(
+                ExerciseLog.user_id == user_id,
+                WorkoutSession.status == 'completed',
+                WorkoutSession.started_at >= last_week_from,
+                WorkoutSession.started_at < this_week_to
+            ).one()
+
+            change = 0
+            if last_week > 0:
+                change = ((this_week - last_week) / last_week) * 100
+            elif this_week > 0:
+                change = 100  # First week, show 100% increase
+
+            return {
+                "workout_volume": {
+                    "volume_kg": round(this_week, 1),
+                    "change_percentage": round(change, 1)
+                }
+            }
+
+        raise ValueError(f"Unknown dashboard section: {section}")
+
+    @staticmethod
+    def _cache_key(user_id):
+        # Seções de "hoje"/"semana" mudam na virada do dia
+        return f"dashboard:{user_id}:{get_today_cuiaba().isoformat()}"
+
+    @staticmethod
+    def _store(key, doc):
+        try:
+            cache.set(key, {"doc": doc, "updated_at": time.time()}, timeout=DASHBOARD_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Dashboard cache write failed: {e}")
+
+
+@task_queue.task('dashboard.refresh')
+def refresh_dashboard_task(payload):
+    """Job da fila: atualiza seções do dashboard após uma escrita"""
+    DashboardService.apply_refresh(payload['user_id'], payload['sections'], payload.get('requested_at'))
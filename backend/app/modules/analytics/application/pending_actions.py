@@ -3,149 +3,238 @@ Pending Actions Store - Enhanced version
 
 Manages temporary storage for actions awaiting user confirmation via WhatsApp.
 Now includes user_id-based lookups for text confirmation flow.
+
+The store delegates to a backend:
+
+- Redis (when configured): each action is a key with a native TTL and every
+  user has a sorted set of action ids scored by creation time, so all
+  gunicorn workers see the same pending actions;
+- in-memory (fallback): a dict plus a time-ordered expiry heap, so expired
+  actions are dropped from the top of the heap instead of scanning the
+  whole store on every insert.
+
+Create, lookup and expiry are O(log n) in both backends.
 """
 
+import json
+import time
+import heapq
 import uuid
-from datetime import datetime, timedelta
-from typing import Dict, Optional, Any, List
 import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Any
 
+from app.shared.redis_client import get_redis
 
-class PendingActionsStore:
-    """Thread-safe store for pending user actions"""
-    
-    def __init__(self, expiry_minutes: int = 10):
-        self._store: Dict[str, Dict[str, Any]] = {}  # {action_id: {user_id, type, params, created_at}}
-        self._user_index: Dict[str, List[str]] = {}  # {user_id: [action_ids]}
+
+class InMemoryPendingActionsBackend:
+    """Process-local backend (development / deployments without Redis)"""
+
+    def __init__(self):
+        self._store: Dict[str, Dict[str, Any]] = {}  # {action_id: {user_id, action_type, params, created_at, expires_at}}
+        self._user_index: Dict[str, OrderedDict] = {}  # {user_id: OrderedDict(action_id -> None)} oldest first
+        self._expiry = []  # heap [(expires_at, action_id)]
         self._lock = threading.Lock()
+
+    def put(self, action_id, action, ttl):
+        with self._lock:
+            self._purge_expired()
+            expires_at = time.time() + ttl
+            self._store[action_id] = {**action, 'expires_at': expires_at}
+            self._user_index.setdefault(action['user_id'], OrderedDict())[action_id] = None
+            heapq.heappush(self._expiry, (expires_at, action_id))
+
+    def get(self, action_id):
+        with self._lock:
+            self._purge_expired()
+            action = self._store.get(action_id)
+            return self._public(action)
+
+    def latest_for_user(self, user_id):
+        with self._lock:
+            self._purge_expired()
+            action_ids = self._user_index.get(user_id)
+            if not action_ids:
+                return None
+            action_id = next(reversed(action_ids))
+            return {**self._public(self._store[action_id]), 'action_id': action_id}
+
+    def remove(self, action_id):
+        with self._lock:
+            return self._remove(action_id)
+
+    def _remove(self, action_id):
+        """Drop an action (lock held); its heap entry is skipped when popped"""
+        action = self._store.pop(action_id, None)
+        if action is None:
+            return False
+        user_actions = self._user_index.get(action['user_id'])
+        if user_actions is not None:
+            user_actions.pop(action_id, None)
+            if not user_actions:
+                del self._user_index[action['user_id']]
+        return True
+
+    def _purge_expired(self):
+        now = time.time()
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, action_id = heapq.heappop(self._expiry)
+            action = self._store.get(action_id)
+            # Ignore stale heap entries (removed or re-created ids)
+            if action is not None and action['expires_at'] == expires_at:
+                self._remove(action_id)
+
+    @staticmethod
+    def _public(action):
+        if action is None:
+            return None
+        return {key: value for key, value in action.items() if key != 'expires_at'}
+
+
+class RedisPendingActionsBackend:
+    """
+    Shared Redis backend
+
+    Keys:
+        {prefix}:a:{action_id}  action JSON, expires with the action
+        {prefix}:u:{user_id}    sorted set {action_id: created_at}
+    """
+
+    def __init__(self, client, prefix):
+        self.client = client
+        self.prefix = prefix
+
+    def _action_key(self, action_id):
+        return f"{self.prefix}:a:{action_id}"
+
+    def _user_key(self, user_id):
+        return f"{self.prefix}:u:{user_id}"
+
+    def put(self, action_id, action, ttl):
+        now = time.time()
+        user_key = self._user_key(action['user_id'])
+        pipe = self.client.pipeline()
+        pipe.set(self._action_key(action_id), json.dumps(self._dump(action)), ex=ttl)
+        pipe.zadd(user_key, {action_id: now})
+        pipe.zremrangebyscore(user_key, '-inf', now - ttl)
+        pipe.expire(user_key, ttl)
+        pipe.execute()
+
+    def get(self, action_id):
+        return self._load(self.client.get(self._action_key(action_id)))
+
+    def latest_for_user(self, user_id):
+        user_key = self._user_key(user_id)
+        # Newest first; ids whose action key is gone (removed/expired) are pruned
+        for raw_id in self.client.zrevrange(user_key, 0, 4):
+            action_id = raw_id.decode() if isinstance(raw_id, bytes) else raw_id
+            action = self.get(action_id)
+            if action is not None:
+                return {**action, 'action_id': action_id}
+            self.client.zrem(user_key, action_id)
+        return None
+
+    def remove(self, action_id):
+        """Atomic: only one worker gets True for a given action"""
+        action = self.get(action_id)
+        if not self.client.delete(self._action_key(action_id)):
+            return False
+        if action is not None:
+            self.client.zrem(self._user_key(action['user_id']), action_id)
+        return True
+
+    @staticmethod
+    def _dump(action):
+        return {**action, 'created_at': action['created_at'].isoformat()}
+
+    @staticmethod
+    def _load(raw):
+        if raw is None:
+            return None
+        action = json.loads(raw)
+        action['created_at'] = datetime.fromisoformat(action['created_at'])
+        return action
+
+
+class PendingActionsStore:
+    """Store for pending user actions, shared across workers when Redis is available"""
+
+    def __init__(self, expiry_minutes: int = 10, backend=None):
         self.expiry_minutes = expiry_minutes
-    
+        self._backend = backend
+        self._backend_lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._backend_lock:
+                if self._backend is None:
+                    client = get_redis()
+                    if client is not None:
+                        self._backend = RedisPendingActionsBackend(client, prefix='fitgen:pending_actions')
+                    else:
+                        self._backend = InMemoryPendingActionsBackend()
+        return self._backend
+
     def create_action(self, user_id: str, action_type: str, params: dict) -> str:
         """
         Create a new pending action
-        
+
         Args:
             user_id: User ID
             action_type: Type of action (e.g., 'log_water', 'log_meal')
             params: Parameters for the action
-            
+
         Returns:
             action_id: Unique identifier for this action
         """
         action_id = str(uuid.uuid4())[:8]  # Short ID
-        
-        with self._lock:
-            self._store[action_id] = {
-                'user_id': user_id,
-                'action_type': action_type,
-                'params': params,
-                'created_at': datetime.utcnow()
-            }
-            
-            # Add to user index
-            if user_id not in self._user_index:
-                self._user_index[user_id] = []
-            self._user_index[user_id].append(action_id)
-        
-        # Clean up expired actions
-        self._cleanup_expired()
-        
+
+        self.backend.put(action_id, {
+            'user_id': str(user_id),
+            'action_type': action_type,
+            'params': params,
+            'created_at': datetime.utcnow()
+        }, ttl=int(self.expiry_minutes * 60))
+
         return action_id
-    
+
     def get_latest_action_for_user(self, user_id: str) -> Optional[Dict[str, Any]]:
         """
         Get the most recent pending action for a user
-        
+
         Args:
             user_id: User ID
-            
+
         Returns:
             Action data with action_id, or None if no pending actions
         """
-        with self._lock:
-            action_ids = self._user_index.get(user_id, [])
-            
-            if not action_ids:
-                return None
-            
-            # Get the most recent non-expired action
-            cutoff = datetime.utcnow() - timedelta(minutes=self.expiry_minutes)
-            
-            for action_id in reversed(action_ids):  # Most recent first
-                action = self._store.get(action_id)
-                if action and action['created_at'] >= cutoff:
-                    return {**action, 'action_id': action_id}
-            
-            return None
-    
+        return self.backend.latest_for_user(str(user_id))
+
     def get_action(self, action_id: str) -> Optional[Dict[str, Any]]:
         """
         Retrieve a pending action by ID
-        
+
         Args:
             action_id: Action identifier
-            
+
         Returns:
             Action data or None if not found/expired
         """
-        with self._lock:
-            action = self._store.get(action_id)
-            
-            if not action:
-                return None
-            
-            # Check if expired
-            if datetime.utcnow() - action['created_at'] > timedelta(minutes=self.expiry_minutes):
-                self._remove_action_internal(action_id)
-                return None
-            
-            return action
-    
+        return self.backend.get(action_id)
+
     def remove_action(self, action_id: str) -> bool:
         """
         Remove a pending action after execution
-        
+
         Args:
             action_id: Action identifier
-            
+
         Returns:
-            True if removed, False if not found
+            True if removed, False if not found (or already taken by another worker)
         """
-        with self._lock:
-            return self._remove_action_internal(action_id)
-    
-    def _remove_action_internal(self, action_id: str) -> bool:
-        """Internal remove without lock (must be called with lock held)"""
-        if action_id in self._store:
-            action = self._store[action_id]
-            user_id = action['user_id']
-            
-            # Remove from store
-            del self._store[action_id]
-            
-            # Remove from user index
-            if user_id in self._user_index:
-                self._user_index[user_id] = [
-                    aid for aid in self._user_index[user_id] if aid != action_id
-                ]
-                if not self._user_index[user_id]:
-                    del self._user_index[user_id]
-            
-            return True
-        return False
-    
-    def _cleanup_expired(self):
-        """Remove expired actions (called automatically)"""
-        cutoff = datetime.utcnow() - timedelta(minutes=self.expiry_minutes)
-        
-        with self._lock:
-            expired = [
-                aid for aid, action in self._store.items()
-                if action['created_at'] < cutoff
-            ]
-            
-            for aid in expired:
-                self._remove_action_internal(aid)
+        return self.backend.remove(action_id)
 
 
 # Global instance
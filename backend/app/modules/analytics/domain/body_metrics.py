@@ -5,6 +5,9 @@ from app.shared.extensions import db
 
 class BodyMetric(db.Model):
     __tablename__ = 'body_metrics'
+    __table_args__ = (
+        db.Index('ix_body_metrics_user_recorded', 'user_id', 'recorded_at'),
+    )
 
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=False)
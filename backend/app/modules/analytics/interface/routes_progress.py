@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.modules.analytics.domain.progress_snapshot import ProgressSnapshot
+from app.shared.utils.pagination import paginate, page_args, page_meta, InvalidCursor
 
 progress_bp = Blueprint('progress', __name__)
 
@@ -17,26 +18,42 @@ def get_progress_snapshots():
         name: type
         type: string
         enum: [weekly, monthly]
+      - in: query
+        name: limit
+        type: integer
+        default: 20
+      - in: query
+        name: cursor
+        type: string
+        description: next_cursor from the previous page
     responses:
       200:
-        description: List of progress snapshots
+        description: Progress snapshots page (newest first)
+      400:
+        description: Invalid cursor
     """
     current_user_id = get_jwt_identity()
     snapshot_type = request.args.get('type') # 'weekly', 'monthly', etc.
+    cursor, limit, total = page_args()
     
     query = ProgressSnapshot.query.filter_by(user_id=current_user_id)
     
     if snapshot_type:
         query = query.filter_by(snapshot_type=snapshot_type)
         
-    snapshots = query.order_by(ProgressSnapshot.snapshot_date.desc()).all()
+    try:
+        page = paginate(query, (ProgressSnapshot.snapshot_date, ProgressSnapshot.id),
+                        cursor=cursor, limit=limit, total=total)
+    except InvalidCursor:
+        return jsonify({"msg": "Invalid cursor"}), 400
     
-    return jsonify([
-        {
+    return jsonify({
+        "snapshots": [{
             "id": snapshot.id,
             "snapshot_date": snapshot.snapshot_date.isoformat(),
             "snapshot_type": snapshot.snapshot_type,
             "total_workouts": snapshot.total_workouts,
             "weight_change_kg": snapshot.weight_change_kg
-        } for snapshot in snapshots
-    ])
+        } for snapshot in page['items']],
+        **page_meta(page)
+    })
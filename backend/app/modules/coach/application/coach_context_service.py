@@ -1,175 +1,252 @@
 from app.modules.identity.domain.models import User, UserProfile
 from app.modules.analytics.domain.body_metrics import BodyMetric
-from app.modules.training.domain.models import WorkoutPlan, WorkoutDay
-from app.modules.nutrition.domain.models import Meal
-from app.modules.nutrition.domain.hydration import HydrationLog
-from datetime import datetime, timedelta
-from sqlalchemy import func
+from app.modules.training.domain.models import WorkoutPlan, WorkoutDay, WorkoutSession
+from app.modules.nutrition.domain.daily_totals import DailyNutritionTotal
+from app.shared.extensions import db, cache
+from app.shared.utils.timezone import get_today_cuiaba, day_range
+from datetime import timedelta
+from sqlalchemy import func, select
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seções do contexto; cada uma é cacheada separadamente para que uma escrita
+# invalide só o que mudou (ex: log de refeição não derruba perfil/treinos)
+SECTIONS = ('profile', 'metrics', 'workouts', 'nutrition')
+CONTEXT_CACHE_TIMEOUT = 600
+
 
 class CoachContextService:
-    
+
     @staticmethod
     def get_user_context(user_id):
         """
         Coleta todos os dados relevantes do usuário para o coach
-        
+
+        Lê as seções do cache em uma única chamada; as seções ausentes são
+        carregadas juntas em uma única query agregada.
+
         Returns:
             dict com user_info, metrics, workouts, nutrition, goals
         """
-        user = User.query.get(user_id)
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
-        
-        if not user or not profile:
-            return {"error": "User not found"}
-        
+        user_id = str(user_id)
+        today = get_today_cuiaba()
+        keys = {section: CoachContextService._cache_key(user_id, section, today) for section in SECTIONS}
+
+        sections = {}
+        try:
+            cached = cache.get_many(*keys.values())
+            sections = {section: value for section, value in zip(keys, cached) if value is not None}
+        except Exception as e:
+            logger.warning(f"Coach context cache read failed: {e}")
+
+        missing = [section for section in SECTIONS if section not in sections]
+        if missing:
+            loaded = CoachContextService._load_sections(user_id, missing, today)
+            if loaded is None:
+                return {"error": "User not found"}
+            sections.update(loaded)
+
+            try:
+                cache.set_many({keys[section]: loaded[section] for section in missing}, timeout=CONTEXT_CACHE_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Coach context cache write failed: {e}")
+
+        return CoachContextService._assemble(user_id, sections)
+
+    @staticmethod
+    def invalidate(user_id, *sections):
+        """
+        Invalida seções do contexto após uma escrita
+
+        Args:
+            user_id: ID do usuário
+            sections: 'profile', 'metrics', 'workouts', 'nutrition' (todas se vazio)
+        """
+        today = get_today_cuiaba()
+        keys = [CoachContextService._cache_key(str(user_id), section, today) for section in (sections or SECTIONS)]
+        try:
+            cache.delete_many(*keys)
+        except Exception as e:
+            logger.warning(f"Coach context cache invalidation failed: {e}")
+
+    @staticmethod
+    def _cache_key(user_id, section, today):
+        # Seções dependentes da data ("hoje", "últimos 7 dias") expiram na virada do dia
+        if section == 'profile':
+            return f"coach_context:{user_id}:profile"
+        return f"coach_context:{user_id}:{section}:{today.isoformat()}"
+
+    @staticmethod
+    def _load_sections(user_id, sections, today):
+        """
+        Carrega as seções pedidas em um único SELECT
+
+        O perfil vem do join users/user_profiles; métricas, treinos e nutrição
+        (lida da tabela de totais diários) são subqueries escalares na mesma
+        instrução.
+
+        Returns:
+            dict {section: data} ou None se o usuário não existir
+        """
+        week_ago = today - timedelta(days=7)
+        columns = []
+
+        if 'metrics' in sections:
+            latest = select(BodyMetric).where(
+                BodyMetric.user_id == user_id
+            ).order_by(BodyMetric.recorded_at.desc()).limit(1).subquery()
+
+            columns += [
+                select(latest.c.weight_kg).scalar_subquery().label('current_weight'),
+                select(latest.c.body_fat_percentage).scalar_subquery().label('body_fat'),
+                select(latest.c.muscle_mass_kg).scalar_subquery().label('muscle_mass'),
+                select(BodyMetric.weight_kg).where(
+                    BodyMetric.user_id == user_id,
+                    BodyMetric.recorded_at < day_range(week_ago)[1]
+                ).order_by(BodyMetric.recorded_at.desc()).limit(1).scalar_subquery().label('weight_7d_ago')
+            ]
+
+        if 'workouts' in sections:
+            active_plan_id = select(WorkoutPlan.id).where(
+                WorkoutPlan.user_id == user_id,
+                WorkoutPlan.is_active == True
+            ).order_by(WorkoutPlan.created_at.desc()).limit(1).scalar_subquery()
+
+            columns += [
+                active_plan_id.label('active_plan_id'),
+                select(func.count(WorkoutDay.id)).where(
+                    WorkoutDay.workout_plan_id == active_plan_id
+                ).scalar_subquery().label('planned_days'),
+                # Primeiro dia como sugestão de próximo treino
+                select(WorkoutDay.name).where(
+                    WorkoutDay.workout_plan_id == active_plan_id
+                ).order_by(WorkoutDay.order).limit(1).scalar_subquery().label('next_workout'),
+                select(func.count(WorkoutSession.id)).where(
+                    WorkoutSession.user_id == user_id,
+                    WorkoutSession.status == 'completed',
+                    WorkoutSession.completed_at >= day_range(week_ago)[0]
+                ).scalar_subquery().label('completed_sessions')
+            ]
+
+        if 'nutrition' in sections:
+            # Linha do dia na tabela de totais (busca por chave primária)
+            def today_total(column):
+                return func.coalesce(select(column).where(
+                    DailyNutritionTotal.user_id == user_id,
+                    DailyNutritionTotal.day == today
+                ).scalar_subquery(), 0)
+
+            columns += [
+                today_total(DailyNutritionTotal.calories).label('today_calories'),
+                today_total(DailyNutritionTotal.protein_g).label('today_protein'),
+                today_total(DailyNutritionTotal.carbs_g).label('today_carbs'),
+                today_total(DailyNutritionTotal.fat_g).label('today_fats'),
+                today_total(DailyNutritionTotal.water_ml).label('today_water')
+            ]
+
+        if 'profile' in sections:
+            stmt = select(
+                User.name, User.email,
+                UserProfile.age, UserProfile.gender, UserProfile.height_cm,
+                UserProfile.experience_level, UserProfile.fitness_goal,
+                UserProfile.target_weight_kg,
+                *columns
+            ).join(UserProfile, UserProfile.user_id == User.id).where(User.id == user_id)
+        else:
+            stmt = select(*columns)
+
+        row = db.session.execute(stmt).mappings().first()
+        if row is None:
+            return None
+
+        loaded = {}
+
+        if 'profile' in sections:
+            loaded['profile'] = {
+                "name": row['name'],
+                "email": row['email'],
+                "age": row['age'],
+                "gender": row['gender'],
+                "height": row['height_cm'],
+                "fitness_level": row['experience_level'],
+                "fitness_goal": row['fitness_goal'],
+                "target_weight": row['target_weight_kg']
+            }
+
+        if 'metrics' in sections:
+            loaded['metrics'] = {
+                "current_weight": row['current_weight'],
+                "body_fat": row['body_fat'],
+                "muscle_mass": row['muscle_mass'],
+                "weight_7d_ago": row['weight_7d_ago']
+            } if row['current_weight'] is not None else {}
+
+        if 'workouts' in sections:
+            if row['active_plan_id'] is None:
+                loaded['workouts'] = {"planned": 0, "completed": 0}
+            else:
+                loaded['workouts'] = {
+                    "planned": row['planned_days'],
+                    "completed": row['completed_sessions'],
+                    "next_workout": row['next_workout']
+                }
+
+        if 'nutrition' in sections:
+            loaded['nutrition'] = {
+                "today_calories": int(row['today_calories']),
+                "today_protein": int(row['today_protein']),
+                "today_carbs": int(row['today_carbs']),
+                "today_fats": int(row['today_fats']),
+                "today_water": int(row['today_water']),
+                "target_calories": 2000  # Default, pode calcular TDEE depois
+            }
+
+        return loaded
+
+    @staticmethod
+    def _assemble(user_id, sections):
+        """Monta o contexto no formato consumido pelo CoachGeminiService"""
+        profile = sections['profile']
+        raw_metrics = sections['metrics']
+
         # 1. Dados básicos
         user_info = {
-            "name": user.name,
-            "email": user.email,
-            "age": profile.age,
-            "gender": profile.gender,
-            "height": profile.height_cm,
-            "fitness_level": profile.experience_level
+            "name": profile['name'],
+            "email": profile['email'],
+            "age": profile['age'],
+            "gender": profile['gender'],
+            "height": profile['height'],
+            "fitness_level": profile['fitness_level']
         }
 
-        
-        # 2. Métricas recentes
-        metrics = CoachContextService._get_recent_metrics(user_id)
-        
-        # 3. Treinos
-        workouts = CoachContextService._get_workout_status(user_id)
-        
-        # 4. Nutrição
-        nutrition = CoachContextService._get_nutrition_status(user_id)
-        
+        # 2. Métricas recentes (BMI depende da altura do perfil)
+        metrics = {}
+        if raw_metrics:
+            metrics = {
+                "current_weight": raw_metrics['current_weight'],
+                "body_fat": raw_metrics['body_fat'],
+                "muscle_mass": raw_metrics['muscle_mass']
+            }
+            if profile['height']:
+                height_m = profile['height'] / 100
+                metrics["bmi"] = round(raw_metrics['current_weight'] / (height_m ** 2), 1)
+            if raw_metrics['weight_7d_ago'] is not None:
+                metrics["weight_7d_ago"] = raw_metrics['weight_7d_ago']
+                metrics["weight_change"] = round(raw_metrics['current_weight'] - raw_metrics['weight_7d_ago'], 1)
+
         # 5. Objetivos
         goals = {
-            "fitness_goal": profile.fitness_goal,
-            "target_weight": profile.target_weight_kg,
+            "fitness_goal": profile['fitness_goal'],
+            "target_weight": profile['target_weight'],
             "hydration_goal": 2500  # Default goal in ml
         }
-        
+
         return {
-            "user_id": str(user_id),
+            "user_id": user_id,
             "user_info": user_info,
             "metrics": metrics,
-            "workouts": workouts,
-            "nutrition": nutrition,
+            "workouts": sections['workouts'],
+            "nutrition": sections['nutrition'],
             "goals": goals
         }
-    
-    @staticmethod
-    def _get_recent_metrics(user_id):
-        """Pega métricas dos últimos 7 dias"""
-        from app.shared.utils.timezone import get_today_cuiaba
-        
-        today = get_today_cuiaba()
-        week_ago = today - timedelta(days=7)
-        
-        # Última métrica
-        latest = BodyMetric.query.filter_by(
-            user_id=user_id
-        ).order_by(BodyMetric.recorded_at.desc()).first()
-        
-        # Métrica de 7 dias atrás
-        old = BodyMetric.query.filter(
-            BodyMetric.user_id == user_id,
-            func.date(BodyMetric.recorded_at) <= week_ago
-        ).order_by(BodyMetric.recorded_at.desc()).first()
-        
-        if not latest:
-            return {}
-        
-        metrics = {
-            "current_weight": latest.weight_kg,
-            "body_fat": latest.body_fat_percentage,
-            "muscle_mass": latest.muscle_mass_kg
-        }
-        
-        # Calculate BMI if height is available
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
-        if profile and profile.height_cm:
-            height_m = profile.height_cm / 100
-            metrics["bmi"] = round(latest.weight_kg / (height_m ** 2), 1)
-        
-        if old:
-            metrics["weight_7d_ago"] = old.weight_kg
-            metrics["weight_change"] = round(latest.weight_kg - old.weight_kg, 1)
-        
-        return metrics
-    
-    @staticmethod
-    def _get_workout_status(user_id):
-        """Status dos treinos da semana"""
-        from app.modules.training.domain.models import WorkoutSession
-        from app.shared.utils.timezone import get_today_cuiaba
-        
-        # Plano ativo
-        plan = WorkoutPlan.query.filter_by(
-            user_id=user_id,
-            is_active=True
-        ).first()
-        
-        if not plan:
-            return {"planned": 0, "completed": 0}
-        
-        # Dias da semana no plano
-        days = WorkoutDay.query.filter_by(workout_plan_id=plan.id).all()
-        
-        # Contar sessões completadas nos últimos 7 dias
-        today = get_today_cuiaba()
-        week_ago = today - timedelta(days=7)
-        
-        completed_sessions = WorkoutSession.query.filter(
-            WorkoutSession.user_id == user_id,
-            WorkoutSession.status == 'completed',
-            func.date(WorkoutSession.completed_at) >= week_ago
-        ).count()
-        
-        # Primeiro dia como sugestão de próximo treino
-        next_workout = days[0].name if days else None
-        
-        return {
-            "planned": len(days),
-            "completed": completed_sessions,
-            "next_workout": next_workout
-        }
-    
-    @staticmethod
-    def _get_nutrition_status(user_id):
-        """Status nutricional de hoje"""
-        from app.shared.utils.timezone import get_today_cuiaba
-        
-        today = get_today_cuiaba()
-        
-        # Refeições de hoje
-        meals = Meal.query.filter(
-            Meal.user_id == user_id,
-            func.date(Meal.consumed_at) == today
-        ).all()
-        
-        today_calories = sum(m.calories or 0 for m in meals)
-        today_protein = sum(m.protein_g or 0 for m in meals)
-        today_carbs = sum(m.carbs_g or 0 for m in meals)
-        today_fats = sum(m.fat_g or 0 for m in meals)
-        
-        # Hidratação de hoje
-        water_logs = HydrationLog.query.filter(
-            HydrationLog.user_id == user_id,
-            func.date(HydrationLog.logged_at) == today
-        ).all()
-        
-        today_water = sum(log.amount_ml for log in water_logs)
-        
-        # Meta (pode vir do perfil ou ser calculado)
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
-        target_calories = 2000  # Default, pode calcular TDEE depois
-        
-        return {
-            "today_calories": int(today_calories),
-            "today_protein": int(today_protein),
-            "today_carbs": int(today_carbs),
-            "today_fats": int(today_fats),
-            "today_water": today_water,
-            "target_calories": target_calories
-        }
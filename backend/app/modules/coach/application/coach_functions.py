@@ -7,10 +7,13 @@ like logging meals, water, workouts, and fetching user data.
 
 from app.modules.nutrition.domain.models import Meal
 from app.modules.nutrition.domain.hydration import HydrationLog
+from app.modules.nutrition.application.daily_totals_service import DailyTotalsService
 from app.modules.analytics.domain.body_metrics import BodyMetric
 from app.modules.training.domain.models import WorkoutSession, WorkoutPlan, WorkoutDay, Exercise, ExerciseLog
 from app.shared.extensions import db
-from app.shared.utils.timezone import now_cuiaba, get_today_cuiaba
+from app.shared.utils.timezone import now_cuiaba, get_today_cuiaba, day_range
+from app.modules.coach.application.coach_context_service import CoachContextService
+from app.modules.analytics.application.dashboard_service import DashboardService
 from datetime import timedelta
 from sqlalchemy import func
 import uuid
@@ -45,7 +48,10 @@ class CoachFunctions:
                 consumed_at=now_cuiaba()
             )
             db.session.add(meal)
+            DailyTotalsService.add_meal(meal)
             db.session.commit()
+            CoachContextService.invalidate(user_id, 'nutrition')
+            DashboardService.refresh(user_id, 'nutrition')
             
             return {
                 "success": True,
@@ -74,23 +80,20 @@ class CoachFunctions:
             today = get_today_cuiaba()
             start_date = today - timedelta(days=days-1)
             
-            meals = Meal.query.filter(
-                Meal.user_id == user_id,
-                func.date(Meal.consumed_at) >= start_date,
-                func.date(Meal.consumed_at) <= today
-            ).all()
+            daily = DailyTotalsService.get_range(user_id, start_date, today).values()
             
-            total_calories = sum(m.calories or 0 for m in meals)
-            total_protein = sum(m.protein_g or 0 for m in meals)
-            total_carbs = sum(m.carbs_g or 0 for m in meals)
-            total_fats = sum(m.fat_g or 0 for m in meals)
+            total_meals = sum(d['meal_count'] for d in daily)
+            total_calories = sum(d['calories'] for d in daily)
+            total_protein = sum(d['protein'] for d in daily)
+            total_carbs = sum(d['carbs'] for d in daily)
+            total_fats = sum(d['fats'] for d in daily)
             
             avg_calories = total_calories / days if days > 0 else 0
             
             return {
                 "success": True,
                 "period_days": days,
-                "total_meals": len(meals),
+                "total_meals": total_meals,
                 "totals": {
                     "calories": total_calories,
                     "protein": total_protein,
@@ -118,19 +121,12 @@ class CoachFunctions:
             today = get_today_cuiaba()
             start_date = today - timedelta(days=days-1)
             
-            meals = Meal.query.filter(
-                Meal.user_id == user_id,
-                func.date(Meal.consumed_at) >= start_date,
-                func.date(Meal.consumed_at) <= today
-            ).all()
-            
-            # Agrupar por dia
-            daily_calories = {}
-            for meal in meals:
-                day = meal.consumed_at.date().isoformat()
-                if day not in daily_calories:
-                    daily_calories[day] = 0
-                daily_calories[day] += meal.calories or 0
+            # Totais diários já agrupados por dia
+            daily_calories = {
+                day.isoformat(): totals['calories']
+                for day, totals in DailyTotalsService.get_range(user_id, start_date, today).items()
+                if totals['meal_count'] > 0
+            }
             
             total = sum(daily_calories.values())
             avg = total / days if days > 0 else 0
@@ -165,14 +161,13 @@ class CoachFunctions:
                 logged_at=now_cuiaba()
             )
             db.session.add(log)
+            DailyTotalsService.add_water(log)
             db.session.commit()
+            CoachContextService.invalidate(user_id, 'nutrition')
+            DashboardService.refresh(user_id, 'hydration')
             
-            # Calcular total do dia
-            today = get_today_cuiaba()
-            today_total = db.session.query(func.sum(HydrationLog.amount_ml)).filter(
-                HydrationLog.user_id == user_id,
-                func.date(HydrationLog.logged_at) == today
-            ).scalar() or 0
+            # Total do dia (já inclui este registro)
+            today_total = DailyTotalsService.get_day(user_id, get_today_cuiaba())['water_ml']
             
             return {
                 "success": True,
@@ -194,13 +189,9 @@ class CoachFunctions:
             user_id: ID do usuário
         """
         try:
-            today = get_today_cuiaba()
-            logs = HydrationLog.query.filter(
-                HydrationLog.user_id == user_id,
-                func.date(HydrationLog.logged_at) == today
-            ).all()
+            today_totals = DailyTotalsService.get_day(user_id, get_today_cuiaba())
             
-            total = sum(log.amount_ml for log in logs)
+            total = today_totals['water_ml']
             goal = 2500
             percentage = round((total / goal) * 100, 1) if goal > 0 else 0
             
@@ -210,7 +201,7 @@ class CoachFunctions:
                 "goal_ml": goal,
                 "remaining_ml": max(0, goal - total),
                 "percentage": percentage,
-                "logs_today": len(logs)
+                "logs_today": today_totals['hydration_log_count']
             }
         except Exception as e:
             return {"success": False, "error": str(e)}
@@ -348,7 +339,7 @@ class CoachFunctions:
             sessions = WorkoutSession.query.filter(
                 WorkoutSession.user_id == user_id,
                 WorkoutSession.status == 'completed',
-                func.date(WorkoutSession.completed_at) >= start_date
+                WorkoutSession.completed_at >= day_range(start_date)[0]
             ).all()
             
             total_sessions = len(sessions)
@@ -392,6 +383,8 @@ class CoachFunctions:
             )
             db.session.add(metric)
             db.session.commit()
+            CoachContextService.invalidate(user_id, 'metrics')
+            DashboardService.refresh(user_id, 'profile')
             
             # Buscar métrica anterior para comparação
             previous = BodyMetric.query.filter(
@@ -435,7 +428,7 @@ class CoachFunctions:
             
             oldest_metric = BodyMetric.query.filter(
                 BodyMetric.user_id == user_id,
-                func.date(BodyMetric.recorded_at) >= start_date
+                BodyMetric.recorded_at >= day_range(start_date)[0]
             ).order_by(BodyMetric.recorded_at.asc()).first()
             
             weight_change = None
@@ -446,16 +439,14 @@ class CoachFunctions:
             workouts = WorkoutSession.query.filter(
                 WorkoutSession.user_id == user_id,
                 WorkoutSession.status == 'completed',
-                func.date(WorkoutSession.completed_at) >= start_date
+                WorkoutSession.completed_at >= day_range(start_date)[0]
             ).count()
             
             # Nutrição
-            meals = Meal.query.filter(
-                Meal.user_id == user_id,
-                func.date(Meal.consumed_at) >= start_date
-            ).all()
+            daily = DailyTotalsService.get_range(user_id, start_date, today).values()
+            total_meals = sum(d['meal_count'] for d in daily)
             
-            avg_calories = sum(m.calories or 0 for m in meals) / days if days > 0 else 0
+            avg_calories = sum(d['calories'] for d in daily) / days if days > 0 else 0
             
             return {
                 "success": True,
@@ -471,7 +462,7 @@ class CoachFunctions:
                 },
                 "nutrition": {
                     "average_calories_per_day": round(avg_calories, 1),
-                    "total_meals_logged": len(meals)
+                    "total_meals_logged": total_meals
                 }
             }
         except Exception as e:
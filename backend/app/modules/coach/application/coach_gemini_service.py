@@ -87,6 +87,66 @@ IMPORTANTE: Nunca invente dados. Se não tiver informação, diga "não tenho es
 """
         return instruction
     
+    @staticmethod
+    def build_content(user_context, message_history, new_message, media_attachments=None):
+        """Monta o prompt (texto ou multimodal) com instrução do sistema e histórico"""
+        system_instruction = CoachGeminiService.build_system_instruction(user_context)
+        
+        # Monta prompt textual
+        if len(message_history) == 0:
+            text_prompt = f"""{system_instruction}
+
+USUÁRIO: {new_message}
+
+COACH:"""
+        else:
+            conversation = ""
+            for msg in message_history[-10:]:  # Últimas 10 mensagens
+                role_label = "USUÁRIO" if msg['role'] == 'user' else "COACH"
+                conversation += f"{role_label}: {msg['content']}\n\n"
+            
+            text_prompt = f"""{system_instruction}
+
+HISTÓRICO DA CONVERSA:
+{conversation}
+
+USUÁRIO: {new_message}
+
+COACH:"""
+
+        # Prepara conteúdo (Multimodal ou Texto)
+        if media_attachments:
+            content = [text_prompt]
+            for media in media_attachments:
+                content.append({
+                    "mime_type": media['mime_type'],
+                    "data": media['data']
+                })
+            return content
+        
+        return text_prompt
+    
+    @staticmethod
+    def build_function_executor(user_context):
+        """Cria o executor de funções do coach com o user_id injetado"""
+        from app.modules.coach.application.coach_functions import CoachFunctions
+        
+        user_id = user_context.get('user_info', {}).get('user_id') or user_context.get('user_id')
+        
+        def function_executor(function_name, args):
+            """Execute coach function with user_id injected"""
+            # Add user_id to args
+            args['user_id'] = user_id
+            
+            # Get the function from CoachFunctions class
+            if hasattr(CoachFunctions, function_name):
+                func = getattr(CoachFunctions, function_name)
+                return func(**args)
+            else:
+                return {"success": False, "error": f"Function {function_name} not found"}
+        
+        return function_executor
+    
     @staticmethod
     def chat(user_context, message_history, new_message, media_attachments=None):
         """
@@ -102,69 +162,20 @@ IMPORTANTE: Nunca invente dados. Se não tiver informação, diga "não tenho es
             dict com {response, tokens_used, response_time_ms}
         """
         try:
-            from app.modules.coach.application.coach_functions import CoachFunctions, COACH_FUNCTION_DECLARATIONS
+            from app.modules.coach.application.coach_functions import COACH_FUNCTION_DECLARATIONS
             
             gemini = GeminiService()
-            
-            # Monta instrução do sistema
-            system_instruction = CoachGeminiService.build_system_instruction(user_context)
-            
-            # Monta prompt textual
-            if len(message_history) == 0:
-                text_prompt = f"""{system_instruction}
-
-USUÁRIO: {new_message}
-
-COACH:"""
-            else:
-                conversation = ""
-                for msg in message_history[-10:]:  # Últimas 10 mensagens
-                    role_label = "USUÁRIO" if msg['role'] == 'user' else "COACH"
-                    conversation += f"{role_label}: {msg['content']}\n\n"
-                
-                text_prompt = f"""{system_instruction}
-
-HISTÓRICO DA CONVERSA:
-{conversation}
-
-USUÁRIO: {new_message}
-
-COACH:"""
-
-            # Prepara conteúdo (Multimodal ou Texto)
-            if media_attachments:
-                content = [text_prompt]
-                for media in media_attachments:
-                    content.append({
-                        "mime_type": media['mime_type'],
-                        "data": media['data']
-                    })
-            else:
-                content = text_prompt
-           
-            # Create function executor that includes user_id
-            user_id = user_context.get('user_info', {}).get('user_id') or user_context.get('user_id')
-            
-            def function_executor(function_name, args):
-                """Execute coach function with user_id injected"""
-                # Add user_id to args
-                args['user_id'] = user_id
-                
-                # Get the function from CoachFunctions class
-                if hasattr(CoachFunctions, function_name):
-                    func = getattr(CoachFunctions, function_name)
-                    return func(**args)
-                else:
-                    return {"success": False, "error": f"Function {function_name} not found"}
+            content = CoachGeminiService.build_content(user_context, message_history, new_message, media_attachments)
+            function_executor = CoachGeminiService.build_function_executor(user_context)
             
             # Envia mensagem com function calling
-            start_time = time.time()
+            start_time = time.perf_counter()
             response_text = gemini.generate_with_functions(
                 content, 
                 COACH_FUNCTION_DECLARATIONS,
                 function_executor
             )
-            response_time_ms = int((time.time() - start_time) * 1000)
+            response_time_ms = int((time.perf_counter() - start_time) * 1000)
             
             if not response_text:
                 return {
@@ -176,7 +187,7 @@ COACH:"""
             
             return {
                 "response": response_text,
-                "tokens_used": None,  # Gemini SDK não expõe contagem de tokens facilmente
+                "tokens_used": gemini.last_tokens_used,
                 "response_time_ms": response_time_ms
             }
             
@@ -190,4 +201,37 @@ COACH:"""
                 "response_time_ms": 0,
                 "error": str(e)
             }
-
+    
+    @staticmethod
+    def chat_stream(user_context, message_history, new_message, media_attachments=None):
+        """
+        Versão em streaming de chat()
+        
+        Repassa os eventos do GeminiService.stream_with_functions (token,
+        tool_call, tool_result) e termina com um evento 'done' contendo
+        {response, tokens_used, response_time_ms, first_token_ms}.
+        """
+        from app.modules.coach.application.coach_functions import COACH_FUNCTION_DECLARATIONS
+        
+        gemini = GeminiService()
+        content = CoachGeminiService.build_content(user_context, message_history, new_message, media_attachments)
+        function_executor = CoachGeminiService.build_function_executor(user_context)
+        
+        start_time = time.perf_counter()
+        first_token_ms = None
+        
+        for event in gemini.stream_with_functions(content, COACH_FUNCTION_DECLARATIONS, function_executor):
+            if event['type'] == 'done':
+                yield {
+                    "type": "done",
+                    "response": event['text'],
+                    "tokens_used": event.get('tokens_used'),
+                    "response_time_ms": int((time.perf_counter() - start_time) * 1000),
+                    "first_token_ms": first_token_ms
+                }
+                return
+            
+            if event['type'] == 'token' and first_token_ms is None:
+                first_token_ms = int((time.perf_counter() - start_time) * 1000)
+            
+            yield event
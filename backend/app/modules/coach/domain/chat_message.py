@@ -17,3 +17,7 @@ class ChatMessage(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     user = db.relationship('User', backref='chat_messages')
+
+
+# Histórico do chat: últimas N mensagens do usuário
+db.Index('idx_chat_messages_user_date', ChatMessage.user_id, ChatMessage.created_at.desc())
@@ -0,0 +1,193 @@
+"""
+Process-wide Gemini client registry
+
+`genai.configure` runs once per worker and every model / tool combination is
+built once and reused across requests. Calls go through `slot()`, which caps
+concurrent Gemini requests per process, and receive `request_options` with
+the configured timeout. Under gevent workers the SDK uses the REST
+transport so a slow call only parks its own greenlet.
+
+GEMINI_BACKEND=fake swaps the Google SDK for an in-memory model with
+configurable latency, so the whole pipeline can be exercised offline.
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from app.shared.concurrency import gevent_active
+from app.shared.utils.metrics import metrics
+
+DEFAULT_MODEL = 'gemini-2.5-pro'
+
+
+class GeminiBusyError(RuntimeError):
+    """Raised when no Gemini slot frees up within the acquire timeout"""
+
+
+# ---------- Fake backend ----------
+
+def _fake_response(text):
+    part = SimpleNamespace(text=text, function_call=None)
+    candidate = SimpleNamespace(content=SimpleNamespace(parts=[part]))
+    return SimpleNamespace(text=text, candidates=[candidate])
+
+
+class FakeGenerativeModel:
+    """
+    In-memory stand-in for genai.GenerativeModel
+
+    Sleeps for GEMINI_FAKE_LATENCY_MS and answers with `{}` when the prompt
+    asks for JSON, or a fixed sentence otherwise. Never issues function calls.
+    """
+
+    TEXT_RESPONSE = "Resposta simulada do coach para testes de carga."
+
+    def __init__(self, model_name, latency_ms=0, **kwargs):
+        self.model_name = model_name
+        self.latency_ms = latency_ms
+
+    def _answer(self, contents):
+        time.sleep(self.latency_ms / 1000)
+        prompt = contents if isinstance(contents, str) else ' '.join(
+            c for c in contents if isinstance(c, str)
+        )
+        return json.dumps({}) if 'JSON' in prompt else self.TEXT_RESPONSE
+
+    def generate_content(self, contents, stream=False, request_options=None):
+        text = self._answer(contents)
+        if stream:
+            return [_fake_response(word + ' ') for word in text.split(' ')]
+        return _fake_response(text)
+
+    def start_chat(self, history=None):
+        return FakeChatSession(self)
+
+
+class FakeChatSession:
+    def __init__(self, model):
+        self.model = model
+        self.history = []
+
+    def send_message(self, content, stream=False, request_options=None):
+        if not isinstance(content, (str, list)):
+            content = str(content)
+        return self.model.generate_content(content, stream=stream, request_options=request_options)
+
+
+# ---------- Registry ----------
+
+class GeminiClientRegistry:
+    """Caches configured models per worker process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._configured = False
+        self._models = {}
+        self._semaphore = None
+
+        self.backend = os.environ.get('GEMINI_BACKEND', 'google')
+        self.timeout = float(os.environ.get('GEMINI_TIMEOUT_SECONDS', 60))
+        self.max_concurrency = int(os.environ.get('GEMINI_MAX_CONCURRENCY', 8))
+        self.acquire_timeout = float(os.environ.get('GEMINI_ACQUIRE_TIMEOUT_SECONDS', 30))
+        self.fake_latency_ms = int(os.environ.get('GEMINI_FAKE_LATENCY_MS', 0))
+        self.transport = os.environ.get('GEMINI_TRANSPORT')  # 'rest' | 'grpc'; default: rest under gevent
+
+    @property
+    def is_fake(self):
+        return self.backend == 'fake'
+
+    @property
+    def request_options(self):
+        """Per-call options for generate_content / send_message"""
+        if self.is_fake:
+            return None
+        return {"timeout": self.timeout}
+
+    def _configure(self):
+        if self._configured:
+            return
+        if not self.is_fake:
+            import google.generativeai as genai
+            api_key = os.environ.get("GEMINI_API_KEY")
+            if not api_key:
+                raise ValueError("GEMINI_API_KEY environment variable not set")
+            # The default gRPC transport blocks gevent's event loop; REST goes
+            # through requests, which yields while waiting on the network
+            transport = self.transport or ('rest' if gevent_active() else None)
+            if transport:
+                genai.configure(api_key=api_key, transport=transport)
+            else:
+                genai.configure(api_key=api_key)
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self._configured = True
+
+    def get_model(self, model_name=DEFAULT_MODEL, tools=None, tools_key=None):
+        """
+        Return the cached model for (model_name, tools)
+
+        Args:
+            model_name: Gemini model id
+            tools: Function declarations (module-level constants)
+            tools_key: Cache key for the tool set; defaults to id(tools)
+        """
+        key = (model_name, tools_key or (id(tools) if tools else None))
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                return model
+
+            self._configure()
+
+            if self.is_fake:
+                model = FakeGenerativeModel(model_name, latency_ms=self.fake_latency_ms)
+            elif tools:
+                import google.generativeai as genai
+                tool_config = genai.protos.ToolConfig(
+                    function_calling_config=genai.protos.FunctionCallingConfig(
+                        mode=genai.protos.FunctionCallingConfig.Mode.AUTO
+                    )
+                )
+                model = genai.GenerativeModel(model_name, tools=tools, tool_config=tool_config)
+            else:
+                import google.generativeai as genai
+                model = genai.GenerativeModel(model_name)
+
+            self._models[key] = model
+            return model
+
+    @contextmanager
+    def slot(self, operation):
+        """
+        Hold one of the per-process Gemini slots for the wrapped call
+
+        Records wait time and call latency as `gemini.<operation>` metrics.
+        """
+        if not self._configured:
+            with self._lock:
+                self._configure()
+
+        wait_start = time.perf_counter()
+        if not self._semaphore.acquire(timeout=self.acquire_timeout):
+            metrics.incr('gemini.busy')
+            raise GeminiBusyError(f"No Gemini slot available after {self.acquire_timeout}s")
+
+        metrics.observe('gemini.slot_wait_ms', (time.perf_counter() - wait_start) * 1000)
+        try:
+            with metrics.timer(f'gemini.{operation}_ms'):
+                yield
+        except Exception:
+            metrics.incr(f'gemini.{operation}.errors')
+            raise
+        finally:
+            self._semaphore.release()
+
+
+# Global instance
+gemini_registry = GeminiClientRegistry()
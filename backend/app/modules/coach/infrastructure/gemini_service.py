@@ -1,15 +1,24 @@
-import os
 import google.generativeai as genai
 import json
+import logging
+from app.modules.coach.infrastructure.gemini_client import gemini_registry, DEFAULT_MODEL
+
+logger = logging.getLogger(__name__)
 
 class GeminiService:
     def __init__(self):
-        api_key = os.environ.get("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
-        
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-pro')
+        # Models are built once per worker by the registry; instantiating the
+        # service per request is cheap
+        self.registry = gemini_registry
+        self.model = gemini_registry.get_model(DEFAULT_MODEL)
+        self.request_options = gemini_registry.request_options
+        # Tokens (prompt + resposta, todas as rodadas) da última chamada com funções
+        self.last_tokens_used = None
+
+    @staticmethod
+    def _token_count(response):
+        usage = getattr(response, 'usage_metadata', None)
+        return getattr(usage, 'total_token_count', None) or 0
 
     def generate_json(self, prompt):
         """
@@ -23,7 +32,8 @@ class GeminiService:
         """
         
         try:
-            response = self.model.generate_content(full_prompt)
+            with self.registry.slot('generate_json'):
+                response = self.model.generate_content(full_prompt, request_options=self.request_options)
             text = response.text.strip()
             
             # Clean up potential markdown formatting if the model disregards instructions
@@ -36,7 +46,7 @@ class GeminiService:
                 
             return json.loads(text.strip())
         except Exception as e:
-            print(f"Error generating content: {e}")
+            logger.error(f"Error generating content: {e}")
             return None
     
     def generate_text(self, prompt):
@@ -44,10 +54,11 @@ class GeminiService:
         Generates text response from Gemini without JSON parsing.
         """
         try:
-            response = self.model.generate_content(prompt)
+            with self.registry.slot('generate_text'):
+                response = self.model.generate_content(prompt, request_options=self.request_options)
             return response.text.strip()
         except Exception as e:
-            print(f"Error generating text: {e}")
+            logger.error(f"Error generating text: {e}")
             return None
 
     def analyze_image(self, prompt, images_data=None):
@@ -70,7 +81,8 @@ class GeminiService:
         parts.append(full_prompt)
         
         try:
-            response = self.model.generate_content(parts)
+            with self.registry.slot('analyze_image'):
+                response = self.model.generate_content(parts, request_options=self.request_options)
             text = response.text.strip()
             
             if text.startswith("```json"):
@@ -82,11 +94,7 @@ class GeminiService:
                 
             return json.loads(text.strip())
         except Exception as e:
-            print(f"Error analyzing image: {e}")
-            try:
-                print(f"Raw response was: {response.text}")
-            except:
-                pass
+            logger.error(f"Error analyzing image: {e}")
             return None
     
     def transcribe_audio(self, audio_data, mime_type="audio/ogg"):
@@ -101,8 +109,6 @@ class GeminiService:
             Transcribed text string or None if failed
         """
         try:
-            model = genai.GenerativeModel('gemini-2.5-pro')
-            
             # Create audio part for Gemini
             audio_part = {
                 "mime_type": mime_type,
@@ -111,20 +117,19 @@ class GeminiService:
             
             prompt = "Transcreva o áudio em português. Retorne apenas o texto transcrito, sem comentários adicionais."
             
-            response = model.generate_content([prompt, audio_part])
+            with self.registry.slot('transcribe_audio'):
+                response = self.model.generate_content([prompt, audio_part], request_options=self.request_options)
             
             if response and response.text:
                 transcription = response.text.strip()
-                print(f"🎤 Audio transcribed: {transcription}")
+                logger.debug(f"Audio transcribed ({len(transcription)} chars)")
                 return transcription
             else:
-                print("⚠️ No transcription returned from Gemini")
+                logger.warning("No transcription returned from Gemini")
                 return None
                 
         except Exception as e:
-            print(f"❌ Error transcribing audio: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"Error transcribing audio: {e}")
             return None
     
     def generate_with_functions(self, content, function_declarations, function_executor, max_iterations=5):
@@ -140,60 +145,46 @@ class GeminiService:
         Returns:
             Final text response after all function calls are resolved
         """
+        self.last_tokens_used = None
         try:
-            print(f"🔧 DEBUG: Starting function calling with {len(function_declarations)} declarations")
-            # print(f"🔧 DEBUG: Declarations: {function_declarations}")
+            logger.debug(f"Starting function calling with {len(function_declarations)} declarations")
             
-            # Create model with tools and tool config to encourage function calling
-            tool_config = genai.protos.ToolConfig(
-                function_calling_config=genai.protos.FunctionCallingConfig(
-                    mode=genai.protos.FunctionCallingConfig.Mode.AUTO
-                )
-            )
-            
-            model_with_tools = genai.GenerativeModel(
-                'gemini-2.5-pro',
-                tools=function_declarations,
-                tool_config=tool_config
-            )
+            # Tool-equipped model (with AUTO function calling) is cached per declaration set
+            model_with_tools = self.registry.get_model(DEFAULT_MODEL, tools=function_declarations)
             
             chat = model_with_tools.start_chat()
             
-            prompt_preview = str(content)[:100] if isinstance(content, str) else "Multimodal Content"
-            print(f"🔧 DEBUG: Sending prompt: {prompt_preview}...")
-            
-            response = chat.send_message(content)
+            with self.registry.slot('chat'):
+                response = chat.send_message(content, request_options=self.request_options)
+            tokens_used = self._token_count(response)
             
-            print(f"🔧 DEBUG: Got response, candidates: {len(response.candidates) if response.candidates else 0}")
+            logger.debug(f"Got response, candidates: {len(response.candidates) if response.candidates else 0}")
             
             iteration = 0
             
             while iteration < max_iterations:
                 # Check if response contains function calls
                 if not response.candidates:
-                    print("🔧 DEBUG: No candidates in response")
+                    logger.debug("No candidates in response")
                     break
                     
                 candidate = response.candidates[0]
                 
                 # Check if there are function calls in the response
                 if not candidate.content.parts:
-                    print("🔧 DEBUG: No parts in candidate content")
+                    logger.debug("No parts in candidate content")
                     break
                 
-                print(f"🔧 DEBUG: Candidate has {len(candidate.content.parts)} parts")
-                
                 function_calls = [
                     part.function_call 
                     for part in candidate.content.parts 
                     if hasattr(part, 'function_call') and part.function_call
                 ]
                 
-                print(f"🔧 DEBUG: Found {len(function_calls)} function calls")
+                logger.debug(f"Found {len(function_calls)} function calls")
                 
                 if not function_calls:
                     # No more function calls, return final text
-                    print("🔧 DEBUG: No function calls, extracting text response")
                     break
                 
                 # Execute all function calls and collect responses
@@ -202,13 +193,12 @@ class GeminiService:
                     function_name = fc.name
                     function_args = dict(fc.args)
                     
-                    print(f"🔧 Executing function: {function_name} with args: {function_args}")
+                    # Argumentos e resultado são dados do usuário: só o nome vai para o log
+                    logger.debug(f"Executing function: {function_name}")
                     
                     # Execute the function
                     result = function_executor(function_name, function_args)
                     
-                    print(f"🔧 Function result: {result}")
-                    
                     # Create function response
                     function_responses.append(
                         genai.protos.Part(
@@ -220,10 +210,13 @@ class GeminiService:
                     )
                 
                 # Send function responses back to model
-                print(f"🔧 DEBUG: Sending {len(function_responses)} function responses back to model")
-                response = chat.send_message(function_responses)
+                with self.registry.slot('chat'):
+                    response = chat.send_message(function_responses, request_options=self.request_options)
+                tokens_used += self._token_count(response)
                 iteration += 1
             
+            self.last_tokens_used = tokens_used or None
+            
             # Return final text response
             if response.candidates and response.candidates[0].content.parts:
                 text_parts = [
@@ -232,15 +225,86 @@ class GeminiService:
                     if hasattr(part, 'text') and part.text
                 ]
                 final_text = '\n'.join(text_parts).strip()
-                print(f"🔧 DEBUG: Final text response: {final_text[:100]}...")
                 return final_text
             
-            print("🔧 DEBUG: No text in final response")
+            logger.warning("No text in final function-calling response")
             return "Desculpe, não consegui processar sua solicitação."
             
         except Exception as e:
-            print(f"Error in function calling: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"Error in function calling: {e}")
             return None
 
+
+    def stream_with_functions(self, content, function_declarations, function_executor, max_iterations=5):
+        """
+        Streaming version of generate_with_functions.
+        
+        Yields events as they happen instead of waiting for the final text:
+            {"type": "token", "text": str}                 partial model text
+            {"type": "tool_call", "name": str, "args": dict}
+            {"type": "tool_result", "name": str, "success": bool}
+            {"type": "done", "text": str, "tokens_used": int|None}
+                                                           text of the final round
+        
+        Errors are raised to the caller (the SSE route turns them into an error event).
+        """
+        model_with_tools = self.registry.get_model(DEFAULT_MODEL, tools=function_declarations)
+        
+        chat = model_with_tools.start_chat()
+        message = content
+        tokens_used = 0
+        
+        for iteration in range(max_iterations + 1):
+            function_calls = []
+            # Text of earlier rounds ("vou registrar...") was streamed but is
+            # not part of the answer: only the last round's text is kept
+            text_parts = []
+            
+            with self.registry.slot('chat_stream'):
+                response = chat.send_message(message, stream=True, request_options=self.request_options)
+                
+                round_tokens = 0
+                for chunk in response:
+                    # Usage arrives on the last chunk(s) and is cumulative for the round
+                    round_tokens = self._token_count(chunk) or round_tokens
+                    if not chunk.candidates or not chunk.candidates[0].content.parts:
+                        continue
+                    for part in chunk.candidates[0].content.parts:
+                        if hasattr(part, 'function_call') and part.function_call:
+                            function_calls.append(part.function_call)
+                        elif hasattr(part, 'text') and part.text:
+                            text_parts.append(part.text)
+                            yield {"type": "token", "text": part.text}
+                tokens_used += round_tokens
+            
+            if not function_calls or iteration == max_iterations:
+                break
+            
+            # Execute function calls and send the results back (next round streams too)
+            function_responses = []
+            for fc in function_calls:
+                function_name = fc.name
+                function_args = dict(fc.args)
+                
+                yield {"type": "tool_call", "name": function_name, "args": dict(function_args)}
+                result = function_executor(function_name, function_args)
+                success = not (isinstance(result, dict) and result.get('success') is False)
+                yield {"type": "tool_result", "name": function_name, "success": success}
+                
+                function_responses.append(
+                    genai.protos.Part(
+                        function_response=genai.protos.FunctionResponse(
+                            name=function_name,
+                            response={"result": result}
+                        )
+                    )
+                )
+            
+            message = function_responses
+        
+        final_text = ''.join(text_parts).strip()
+        yield {
+            "type": "done",
+            "text": final_text or "Desculpe, não consegui processar sua solicitação.",
+            "tokens_used": tokens_used or None
+        }
@@ -1,10 +1,17 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.modules.coach.domain.chat_message import ChatMessage
 from app.modules.coach.application.coach_gemini_service import CoachGeminiService
 from app.modules.coach.application.coach_context_service import CoachContextService
 from app.shared.extensions import db
 from app.shared.utils.timezone import now_cuiaba
+from app.shared.utils.metrics import metrics
+from app.shared.utils.pagination import paginate, page_args, page_meta, InvalidCursor
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 chat_bp = Blueprint('chat', __name__)
 
@@ -41,6 +48,10 @@ def send_message():
             for msg in reversed(history)  # Ordem cronológica
         ]
         
+        # Devolve a conexão ao pool durante a chamada ao Gemini (segundos);
+        # a sessão abre outra ao salvar as mensagens
+        db.session.close()
+        
         # 3. Envia para Gemini
         result = CoachGeminiService.chat(context, history_list, message)
         
@@ -78,26 +89,146 @@ def send_message():
         db.session.rollback()
         return jsonify({"msg": "Error processing message", "error": str(e)}), 500
 
-@chat_bp.route('/history', methods=['GET'])
+def _sse(event, data):
+    """Formata um evento Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str, ensure_ascii=False)}\n\n"
+
+@chat_bp.route('/stream', methods=['POST'])
 @jwt_required()
-def get_history():
-    """Retorna histórico de chat do usuário"""
+def stream_message():
+    """
+    Envia mensagem para o coach com resposta em streaming (SSE)
+    
+    Body: { message: string }
+    Eventos:
+        token       { text }                       trecho da resposta
+        tool_call   { name, args }                 coach executando uma função
+        tool_result { name, success }
+        done        { answer, tokens_used, response_time_ms, first_token_ms }
+        error       { msg }
+    """
     user_id = get_jwt_identity()
-    limit = request.args.get('limit', 50, type=int)
+    data = request.get_json() or {}
+    
+    message = data.get('message', '').strip()
+    if not message:
+        return jsonify({"msg": "Message is required"}), 400
+    
+    # Contexto e histórico são carregados antes de abrir o stream
+    # para que erros ainda retornem status HTTP normal
+    context = CoachContextService.get_user_context(user_id)
+    if "error" in context:
+        return jsonify({"msg": context["error"]}), 404
     
-    messages = ChatMessage.query.filter_by(
+    history = ChatMessage.query.filter_by(
         user_id=user_id
-    ).order_by(ChatMessage.created_at.desc()).limit(limit).all()
-    
-    return jsonify([
-        {
-            "id": msg.id,
-            "role": msg.role,
-            "content": msg.content,
-            "created_at": msg.created_at.isoformat()
+    ).order_by(ChatMessage.created_at.desc()).limit(10).all()
+    
+    history_list = [
+        {"role": msg.role, "content": msg.content}
+        for msg in reversed(history)  # Ordem cronológica
+    ]
+    
+    # Conexão volta ao pool enquanto o stream aguarda o Gemini
+    db.session.close()
+    
+    def generate():
+        start = time.perf_counter()
+        first_token_recorded = False
+        
+        try:
+            for event in CoachGeminiService.chat_stream(context, history_list, message):
+                if event['type'] == 'token' and not first_token_recorded:
+                    first_token_recorded = True
+                    metrics.observe('coach.stream.first_token_ms', (time.perf_counter() - start) * 1000)
+                
+                if event['type'] != 'done':
+                    yield _sse(event['type'], {k: v for k, v in event.items() if k != 'type'})
+                    continue
+                
+                # Persiste a conversa só quando a resposta está completa
+                user_msg = ChatMessage(
+                    user_id=user_id,
+                    role='user',
+                    content=message,
+                    created_at=now_cuiaba()
+                )
+                db.session.add(user_msg)
+                
+                coach_msg = ChatMessage(
+                    user_id=user_id,
+                    role='model',
+                    content=event['response'],
+                    tokens_used=event.get('tokens_used'),
+                    response_time_ms=event.get('response_time_ms'),
+                    created_at=now_cuiaba()
+                )
+                db.session.add(coach_msg)
+                db.session.commit()
+                
+                metrics.observe('coach.stream.total_ms', (time.perf_counter() - start) * 1000)
+                metrics.incr('coach.stream.completed')
+                
+                yield _sse('done', {
+                    "answer": event['response'],
+                    "tokens_used": event.get('tokens_used'),
+                    "response_time_ms": event.get('response_time_ms'),
+                    "first_token_ms": event.get('first_token_ms')
+                })
+        
+        except GeneratorExit:
+            # Cliente desconectou no meio do stream
+            metrics.incr('coach.stream.disconnected')
+            db.session.rollback()
+            raise
+        except Exception:
+            logger.exception("Chat stream error")
+            db.session.rollback()
+            metrics.incr('coach.stream.failed')
+            yield _sse('error', {"msg": "Error processing message"})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Nginx: não bufferizar o stream
         }
-        for msg in reversed(messages)  # Ordem cronológica
-    ]), 200
+    )
+
+@chat_bp.route('/history', methods=['GET'])
+@jwt_required()
+def get_history():
+    """
+    Retorna histórico de chat do usuário
+    
+    Páginas das mais recentes para as mais antigas (`next_cursor` traz as
+    mensagens anteriores); dentro da página a ordem é cronológica.
+    """
+    user_id = get_jwt_identity()
+    cursor, limit, total = page_args(default_limit=50)
+    
+    try:
+        page = paginate(
+            ChatMessage.query.filter_by(user_id=user_id),
+            (ChatMessage.created_at, ChatMessage.id),
+            cursor=cursor, limit=limit, total=total
+        )
+    except InvalidCursor:
+        return jsonify({"msg": "Invalid cursor"}), 400
+    
+    return jsonify({
+        "messages": [
+            {
+                "id": msg.id,
+                "role": msg.role,
+                "content": msg.content,
+                "created_at": msg.created_at.isoformat()
+            }
+            for msg in reversed(page['items'])  # Ordem cronológica
+        ],
+        **page_meta(page)
+    }), 200
 
 @chat_bp.route('/clear', methods=['DELETE'])
 @jwt_required()
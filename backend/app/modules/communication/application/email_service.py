@@ -2,17 +2,50 @@ import sib_api_v3_sdk
 from sib_api_v3_sdk.rest import ApiException
 from flask import current_app
 import os
+import threading
+from app.shared.http_client import get_client, CircuitOpenError
+
+BREVO_TIMEOUT = (5, float(os.getenv('BREVO_TIMEOUT_SECONDS', 15)))
+
+# One ApiClient (and urllib3 connection pool) per process, shared by all EmailService instances
+_api_client = None
+_api_client_lock = threading.Lock()
+
+
+def _get_api_client():
+    global _api_client
+    if _api_client is None:
+        with _api_client_lock:
+            if _api_client is None:
+                configuration = sib_api_v3_sdk.Configuration()
+                configuration.api_key['api-key'] = os.getenv('BREVO_API_KEY')
+                configuration.connection_pool_maxsize = 4
+                _api_client = sib_api_v3_sdk.ApiClient(configuration)
+    return _api_client
+
+
+def _provider_failure(error):
+    """Brevo 4xx (invalid address, bad request) does not count against the circuit"""
+    return not (isinstance(error, ApiException) and error.status and error.status < 500)
+
 
 class EmailService:
     def __init__(self):
-        configuration = sib_api_v3_sdk.Configuration()
-        configuration.api_key['api-key'] = os.getenv('BREVO_API_KEY')
-        self.api_instance = sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(configuration))
+        self.api_instance = sib_api_v3_sdk.TransactionalEmailsApi(_get_api_client())
         self.sender = {
             "name": os.getenv('BREVO_SENDER_NAME', 'FitGen'),
             "email": os.getenv('BREVO_SENDER_EMAIL', 'no-reply@fitgen.com')
         }
 
+    def _send(self, send_smtp_email):
+        """send_transac_email with timeout, circuit breaker and latency metrics (http.brevo.*)"""
+        return get_client('brevo').call(
+            self.api_instance.send_transac_email,
+            send_smtp_email,
+            _request_timeout=BREVO_TIMEOUT,
+            is_failure=_provider_failure
+        )
+
     def send_password_reset_email(self, to_email, reset_link):
         """
         Send password reset email via Brevo
@@ -43,12 +76,14 @@ class EmailService:
         )
 
         try:
-            api_response = self.api_instance.send_transac_email(send_smtp_email)
+            api_response = self._send(send_smtp_email)
             current_app.logger.info(f"Email sent successfully to {to_email}. Message ID: {api_response.message_id}")
             return True
         except ApiException as e:
             current_app.logger.error(f"Exception when calling TransactionalEmailsApi->send_transac_email: {e}")
             return False
+        except CircuitOpenError as e:
+            current_app.logger.error(f"Brevo unavailable, email to {to_email} not sent: {e}")
             return False
 
     def send_welcome_email(self, to_email, name, password):
@@ -85,9 +120,12 @@ class EmailService:
         )
 
         try:
-            api_response = self.api_instance.send_transac_email(send_smtp_email)
+            api_response = self._send(send_smtp_email)
             current_app.logger.info(f"Welcome email sent successfully to {to_email}. Message ID: {api_response.message_id}")
             return True
         except ApiException as e:
             current_app.logger.error(f"Exception when calling TransactionalEmailsApi->send_transac_email: {e}")
             return False
+        except CircuitOpenError as e:
+            current_app.logger.error(f"Brevo unavailable, email to {to_email} not sent: {e}")
+            return False
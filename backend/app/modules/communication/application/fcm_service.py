@@ -1,6 +1,7 @@
 import firebase_admin
 from firebase_admin import credentials, messaging
 import os
+from app.shared.http_client import get_client
 
 class FCMService:
     _initialized = False
@@ -67,7 +68,10 @@ class FCMService:
                 )
             )
             
-            response = messaging.send(message)
+            response = get_client('fcm').call(
+                messaging.send, message,
+                is_failure=lambda e: not isinstance(e, messaging.UnregisteredError)
+            )
             print(f"✅ Push notification sent: {response}")
             return {"success": True, "message_id": response}
             
@@ -127,11 +131,19 @@ class FCMService:
         
         return results
     
+    # Limite de tokens por chamada da API multicast
+    MULTICAST_BATCH_SIZE = 500
+    
+    # Erros que indicam token morto (app desinstalado, token de outro projeto)
+    DEAD_TOKEN_ERRORS = (messaging.UnregisteredError, messaging.SenderIdMismatchError)
+    
     @staticmethod
     def send_multicast(tokens, title, body, data=None):
         """
         Send to multiple tokens at once (more efficient)
         
+        Uses send_each_for_multicast in batches of up to 500 tokens.
+        
         Args:
             tokens: List of FCM tokens
             title: Notification title
@@ -139,7 +151,8 @@ class FCMService:
             data: Optional dict with custom data
             
         Returns:
-            MulticastMessage response
+            dict with success_count, failure_count and invalid_tokens
+            (tokens that should be deactivated)
         """
         try:
             FCMService.initialize()
@@ -147,23 +160,59 @@ class FCMService:
             if not FCMService._initialized:
                 return {"success": False, "error": "Firebase not initialized"}
             
-            message = messaging.MulticastMessage(
-                notification=messaging.Notification(
-                    title=title,
-                    body=body
-                ),
-                data=data or {},
-                tokens=tokens
-            )
+            success_count = 0
+            failure_count = 0
+            invalid_tokens = []
+            
+            for start in range(0, len(tokens), FCMService.MULTICAST_BATCH_SIZE):
+                batch = tokens[start:start + FCMService.MULTICAST_BATCH_SIZE]
+                message = messaging.MulticastMessage(
+                    notification=messaging.Notification(
+                        title=title,
+                        body=body
+                    ),
+                    data=data or {},
+                    tokens=batch,
+                    android=messaging.AndroidConfig(
+                        priority='high',
+                        notification=messaging.AndroidNotification(
+                            sound='default',
+                            channel_id='default'
+                        )
+                    ),
+                    apns=messaging.APNSConfig(
+                        payload=messaging.APNSPayload(
+                            aps=messaging.Aps(
+                                sound='default',
+                                badge=1
+                            )
+                        )
+                    )
+                )
+                
+                try:
+                    response = get_client('fcm').call(messaging.send_each_for_multicast, message)
+                except Exception as e:
+                    # Falha do lote inteiro (rede/credenciais): segue com os próximos
+                    print(f"❌ Multicast batch error: {e}")
+                    failure_count += len(batch)
+                    continue
+                
+                success_count += response.success_count
+                failure_count += response.failure_count
+                
+                # Respostas vêm na mesma ordem dos tokens
+                for token, item in zip(batch, response.responses):
+                    if not item.success and isinstance(item.exception, FCMService.DEAD_TOKEN_ERRORS):
+                        invalid_tokens.append(token)
             
-            response = messaging.send_multicast(message)
-            print(f"✅ Multicast sent: {response.success_count}/{len(tokens)} successful")
+            print(f"✅ Multicast sent: {success_count}/{len(tokens)} successful")
             
             return {
                 "success": True,
-                "success_count": response.success_count,
-                "failure_count": response.failure_count,
-                "responses": response.responses
+                "success_count": success_count,
+                "failure_count": failure_count,
+                "invalid_tokens": invalid_tokens
             }
             
         except Exception as e:
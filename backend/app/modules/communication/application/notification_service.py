@@ -1,13 +1,20 @@
-from app.shared.extensions import db
+from app.shared.extensions import db, cache, task_queue
 from app.modules.communication.domain.notification import Notification
+from app.modules.communication.application.push_delivery import PushDeliveryService
 from datetime import datetime
+from sqlalchemy import func, select, insert
+import uuid
+
+# Usuários por lote no broadcast (um INSERT e um job de push por lote)
+BROADCAST_CHUNK_SIZE = 5000
+BROADCAST_PROGRESS_TTL = 24 * 3600
 
 class NotificationService:
     @staticmethod
     def trigger_notification(user_id, type, title, message, link_type=None, link_id=None):
         """
         Creates a new notification if a similar one hasn't been sent recently (today).
-        Also sends push notification via FCM (mobile) and Web Push (web/PWA).
+        Also queues push delivery via FCM (mobile) and Web Push (web/PWA).
         """
         from app.shared.utils.timezone import now_cuiaba, get_today_cuiaba
         
@@ -38,88 +45,127 @@ class NotificationService:
         db.session.add(notification)
         db.session.commit()
         
-        # Send push notification via FCM (mobile) AND Web Push (web/PWA)
+        # Push (FCM mobile + Web Push) is delivered by the task queue, off the request path
         try:
-            from app.modules.communication.application.fcm_service import FCMService
-            from app.modules.communication.application.web_push_service import WebPushService
-            from app.modules.communication.domain.device_token import DeviceToken
-            
             data = {
                 "notification_id": str(notification.id),
                 "type": type,
                 "link_type": link_type or "",
                 "link_id": str(link_id) if link_id else ""
             }
-            
-            # Get all active devices for this user
-            devices = DeviceToken.query.filter_by(
-                user_id=user_id,
-                is_active=True
-            ).all()
-            
-            results = []
-            for device in devices:
-                if device.platform in ['ios', 'android'] and device.token:
-                    # Mobile: FCM Push
-                    result = FCMService.send_notification(
-                        device.token,
-                        title,
-                        message,
-                        data
-                    )
-                    results.append({"platform": device.platform, **result})
-                    
-                elif device.platform == 'web' and device.subscription_endpoint:
-                    # Web/PWA: Web Push
-                    subscription = {
-                        "endpoint": device.subscription_endpoint,
-                        "keys": {
-                            "p256dh": device.subscription_p256dh,
-                            "auth": device.subscription_auth
-                        }
-                    }
-                    result = WebPushService.send_notification(
-                        subscription,
-                        title,
-                        message,
-                        data
-                    )
-                    results.append({"platform": "web", **result})
-                    
-                    # Deactivate invalid subscriptions
-                    if result.get("should_delete"):
-                        device.is_active = False
-            
-            if devices:
-                db.session.commit()
-                print(f"📱 Push sent to {len(devices)} devices: {len(results)} successful")
+            PushDeliveryService.enqueue([user_id], title, message, data)
             
         except Exception as e:
-            print(f"❌ Push notification error (notification still saved): {e}")
+            print(f"❌ Push enqueue error (notification still saved): {e}")
         
         return notification
 
     @staticmethod
-    def broadcast_notification(title, message, type='system'):
+    def start_broadcast(title, message, type='system'):
+        """
+        Queues a broadcast to ALL users and returns its id for progress polling.
+        """
+        broadcast_id = str(uuid.uuid4())
+        NotificationService._set_broadcast_progress(broadcast_id, {
+            "status": "queued",
+            "title": title,
+            "inserted": 0,
+            "push_jobs": 0
+        })
+        task_queue.enqueue('notifications.broadcast', {
+            "broadcast_id": broadcast_id,
+            "title": title,
+            "message": message,
+            "type": type
+        })
+        return broadcast_id
+
+    @staticmethod
+    def get_broadcast_progress(broadcast_id):
+        return cache.get(f"broadcast:{broadcast_id}")
+
+    @staticmethod
+    def broadcast_notification(title, message, type='system', broadcast_id=None, chunk_size=BROADCAST_CHUNK_SIZE):
         """
         Sends a notification to ALL users.
+        
+        User ids are streamed with a server-side cursor on a separate
+        connection; each chunk is inserted with one batched INSERT, committed,
+        and handed to the push engine as a single 'push.deliver' job. Memory
+        stays bounded by the chunk size regardless of the user base.
+        
+        The last committed user id is saved with the broadcast progress, so a
+        retried job resumes after it (WHERE id > :last_user_id) instead of
+        notifying the first chunks again.
         """
         from app.modules.identity.domain.models import User
         from app.shared.utils.timezone import now_cuiaba
         
-        users = User.query.all()
+        previous = NotificationService.get_broadcast_progress(broadcast_id) if broadcast_id else None
+        last_user_id = previous.get("last_user_id") if previous else None
+        if previous and previous.get("status") == "completed":
+            return previous.get("inserted", 0)
         
-        count = 0
-        for user in users:
-            n = Notification(
-                user_id=user.id,
-                type=type,
-                title=title,
-                message=message,
-                created_at=now_cuiaba()
-            )
-            db.session.add(n)
-            count += 1
-            
-        db.session.commit()
-        return count
+        if last_user_id:
+            progress = dict(previous, status="running")
+        else:
+            total = db.session.query(func.count(User.id)).scalar()
+            progress = {"status": "running", "title": title, "total": total, "inserted": 0, "push_jobs": 0}
+        if broadcast_id:
+            NotificationService._set_broadcast_progress(broadcast_id, progress)
+        
+        push_data = {"type": type, "link_type": "", "link_id": ""}
+        created_at = now_cuiaba()
+        
+        users = select(User.id).order_by(User.id)
+        if last_user_id:
+            users = users.where(User.id > uuid.UUID(last_user_id))
+        
+        with db.engine.connect() as stream:
+            result = stream.execution_options(yield_per=chunk_size).execute(users)
+            for chunk in result.scalars().partitions():
+                db.session.execute(insert(Notification), [
+                    {
+                        "id": uuid.uuid4(),
+                        "user_id": user_id,
+                        "type": type,
+                        "title": title,
+                        "message": message,
+                        "is_read": False,
+                        "created_at": created_at
+                    }
+                    for user_id in chunk
+                ])
+                db.session.commit()
+                
+                # Cursor saved right after the commit: a retry never re-inserts this chunk
+                progress["inserted"] += len(chunk)
+                progress["last_user_id"] = str(chunk[-1])
+                if broadcast_id:
+                    NotificationService._set_broadcast_progress(broadcast_id, progress)
+                
+                PushDeliveryService.enqueue(chunk, title, message, push_data)
+                progress["push_jobs"] += 1
+        
+        progress["status"] = "completed"
+        if broadcast_id:
+            NotificationService._set_broadcast_progress(broadcast_id, progress)
+        return progress["inserted"]
+
+    @staticmethod
+    def _set_broadcast_progress(broadcast_id, progress):
+        try:
+            cache.set(f"broadcast:{broadcast_id}", progress, timeout=BROADCAST_PROGRESS_TTL)
+        except Exception as e:
+            print(f"⚠️ Broadcast progress not saved: {e}")
+
+
+@task_queue.task('notifications.broadcast')
+def broadcast_task(payload):
+    """Job da fila: broadcast em lotes para todos os usuários"""
+    return NotificationService.broadcast_notification(
+        payload['title'],
+        payload['message'],
+        payload.get('type', 'system'),
+        broadcast_id=payload.get('broadcast_id')
+    )
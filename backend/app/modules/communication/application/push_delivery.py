@@ -0,0 +1,153 @@
+"""
+Push delivery engine
+
+Notifications are persisted in the request; the push fan-out runs as a
+'push.deliver' job on the task queue:
+
+- FCM (ios/android) tokens go out in multicast batches of up to 500;
+- Web Push subscriptions are sent concurrently on a bounded thread pool
+  (each send is an independent HTTPS request to the browser vendor);
+- dead tokens/subscriptions are deactivated with a single UPDATE.
+
+Per-platform counters and latency histograms are recorded under `push.*`
+and exposed by GET /api/admin/metrics.
+"""
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from app.shared.extensions import db, task_queue
+from app.shared.utils.metrics import metrics
+from app.modules.communication.domain.device_token import DeviceToken
+
+logger = logging.getLogger(__name__)
+
+WEB_PUSH_CONCURRENCY = int(os.environ.get('PUSH_WEB_CONCURRENCY', 8))
+
+_web_pool = ThreadPoolExecutor(max_workers=WEB_PUSH_CONCURRENCY, thread_name_prefix='web-push')
+
+
+class PushDeliveryService:
+
+    @staticmethod
+    def enqueue(user_ids, title, body, data=None):
+        """
+        Agenda o envio de push para os dispositivos ativos dos usuários
+
+        Returns:
+            job_id
+        """
+        user_ids = [str(user_id) for user_id in user_ids]
+        return task_queue.enqueue('push.deliver', {
+            "user_ids": user_ids,
+            "title": title,
+            "body": body,
+            "data": data or {}
+        }, key=user_ids[0] if len(user_ids) == 1 else None)
+
+    @staticmethod
+    def deliver(user_ids, title, body, data=None):
+        """
+        Envia push para todos os dispositivos ativos dos usuários
+
+        Falhas por dispositivo são contadas, não relançadas: um retry do job
+        reenviaria para os dispositivos que já receberam.
+
+        Returns:
+            dict {platform: {sent, failed, pruned}}
+        """
+        devices = db.session.query(
+            DeviceToken.id, DeviceToken.platform, DeviceToken.token,
+            DeviceToken.subscription_endpoint, DeviceToken.subscription_p256dh, DeviceToken.subscription_auth
+        ).filter(
+            DeviceToken.user_id.in_([str(user_id) for user_id in user_ids]),
+            DeviceToken.is_active == True
+        ).all()
+
+        mobile = {d.token: d.id for d in devices if d.platform in ('ios', 'android') and d.token}
+        web = [d for d in devices if d.platform == 'web' and d.subscription_endpoint]
+
+        summary = {}
+        dead_ids = []
+
+        if mobile:
+            summary['fcm'], dead = PushDeliveryService._send_fcm(list(mobile), title, body, data)
+            dead_ids += [mobile[token] for token in dead]
+
+        if web:
+            summary['web'], dead = PushDeliveryService._send_web(web, title, body, data)
+            dead_ids += dead
+
+        if dead_ids:
+            DeviceToken.query.filter(DeviceToken.id.in_(dead_ids)).update(
+                {"is_active": False}, synchronize_session=False
+            )
+            db.session.commit()
+            logger.info(f"Deactivated {len(dead_ids)} dead push tokens")
+
+        return summary
+
+    @staticmethod
+    def _send_fcm(tokens, title, body, data):
+        from app.modules.communication.application.fcm_service import FCMService
+
+        start = time.perf_counter()
+        result = FCMService.send_multicast(tokens, title, body, data)
+        metrics.observe('push.fcm.latency_ms', (time.perf_counter() - start) * 1000)
+
+        if not result.get('success'):
+            metrics.incr('push.fcm.failed', len(tokens))
+            return {"sent": 0, "failed": len(tokens), "pruned": 0}, []
+
+        dead = result['invalid_tokens']
+        metrics.incr('push.fcm.sent', result['success_count'])
+        metrics.incr('push.fcm.failed', result['failure_count'])
+        metrics.incr('push.fcm.pruned', len(dead))
+        return {
+            "sent": result['success_count'],
+            "failed": result['failure_count'],
+            "pruned": len(dead)
+        }, dead
+
+    @staticmethod
+    def _send_web(devices, title, body, data):
+        from app.modules.communication.application.web_push_service import WebPushService
+
+        def send(device):
+            subscription = {
+                "endpoint": device.subscription_endpoint,
+                "keys": {
+                    "p256dh": device.subscription_p256dh,
+                    "auth": device.subscription_auth
+                }
+            }
+            start = time.perf_counter()
+            result = WebPushService.send_notification(subscription, title, body, data)
+            metrics.observe('push.web.latency_ms', (time.perf_counter() - start) * 1000)
+            return device.id, result
+
+        sent, failed, dead = 0, 0, []
+        for device_id, result in _web_pool.map(send, devices):
+            if result.get('success'):
+                sent += 1
+                continue
+            failed += 1
+            if result.get('should_delete'):
+                dead.append(device_id)
+
+        metrics.incr('push.web.sent', sent)
+        metrics.incr('push.web.failed', failed)
+        metrics.incr('push.web.pruned', len(dead))
+        return {"sent": sent, "failed": failed, "pruned": len(dead)}, dead
+
+
+@task_queue.task('push.deliver')
+def deliver_push_task(payload):
+    """Job da fila: fan-out de push para os dispositivos dos usuários"""
+    return PushDeliveryService.deliver(
+        payload['user_ids'],
+        payload['title'],
+        payload['body'],
+        payload.get('data')
+    )
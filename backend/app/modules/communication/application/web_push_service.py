@@ -1,6 +1,14 @@
 from pywebpush import webpush, WebPushException
 import json
 import os
+from app.shared.http_client import get_client
+
+
+def _provider_failure(error):
+    """4xx from the push service (expired subscription, bad payload) is not an outage"""
+    response = getattr(error, 'response', None)
+    return response is None or response.status_code >= 500
+
 
 class WebPushService:
     
@@ -43,17 +51,23 @@ class WebPushService:
         })
         
         try:
-            response = webpush(
+            client = get_client('webpush', read_timeout=10)
+            response = client.call(
+                webpush,
                 subscription_info=subscription,
                 data=payload,
                 vapid_private_key=vapid_private_key,
-                vapid_claims=vapid_claims
+                vapid_claims=vapid_claims,
+                requests_session=client.session,
+                timeout=client.timeout,
+                is_failure=_provider_failure
             )
             print(f"✅ Web Push sent successfully")
             return {"success": True, "response": response}
             
         except WebPushException as e:
-            status_code = e.response.status_code if e.response else None
+            # requests.Response is falsy for 4xx/5xx: compare with None
+            status_code = e.response.status_code if e.response is not None else None
             print(f"❌ Web Push Error: {e} (status: {status_code})")
             
             # 404 or 410 means subscription is invalid/expired
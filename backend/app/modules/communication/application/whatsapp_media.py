@@ -0,0 +1,253 @@
+"""
+WhatsApp media pipeline (Evolution API)
+
+Image/audio messages are downloaded on a small thread pool while the webhook
+job loads the user, coach context and history, so a message costs its
+slowest step instead of the sum:
+
+- HTTP calls go through the shared 'evolution' client (app.shared.http_client):
+  pooled connections, timeouts, circuit breaker and retries for downloads;
+- the base64 payload is decoded straight from the response body (bytes),
+  without building the JSON document or an intermediate str;
+- audio transcriptions are cached by media SHA-256 (WhatsApp sends it as
+  `fileSha256`, so a repeated/forwarded audio skips download and Gemini).
+
+Metrics: whatsapp.media.fetch_ms, whatsapp.media.transcribe_ms,
+whatsapp.transcription.cache.{hit,miss}.
+"""
+import os
+import re
+import json
+import base64
+import hashlib
+import binascii
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from app.shared.extensions import cache
+from app.shared.http_client import get_client
+from app.shared.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+EVOLUTION_CONNECT_TIMEOUT = float(os.environ.get('EVOLUTION_CONNECT_TIMEOUT_SECONDS', 5))
+EVOLUTION_READ_TIMEOUT = float(os.environ.get('EVOLUTION_TIMEOUT_SECONDS', 30))
+MEDIA_WORKERS = int(os.environ.get('WHATSAPP_MEDIA_WORKERS', 4))
+TRANSCRIPTION_CACHE_TTL = int(os.environ.get('WHATSAPP_TRANSCRIPTION_CACHE_TTL', 7 * 24 * 3600))
+
+DEFAULT_MIME = {
+    'image': 'image/jpeg',
+    'audio': 'audio/ogg; codecs=opus',
+}
+
+MEDIA_TYPES = ["imageMessage", "audioMessage", "videoMessage", "documentMessage", "stickerMessage"]
+
+_pool = ThreadPoolExecutor(max_workers=MEDIA_WORKERS, thread_name_prefix='whatsapp-media')
+
+
+def evolution_config():
+    """
+    Returns:
+        (api_url, api_key, instance_name) ou None se não configurado
+    """
+    api_url = current_app.config.get('EVOLUTION_API_URL') or os.environ.get('EVOLUTION_API_URL')
+    api_key = current_app.config.get('EVOLUTION_API_KEY') or os.environ.get('EVOLUTION_API_KEY')
+    instance_name = current_app.config.get('EVOLUTION_INSTANCE_NAME') or os.environ.get('EVOLUTION_INSTANCE_NAME', 'FitGen')
+    if not api_url or not api_key:
+        return None
+    return api_url.rstrip('/'), api_key, instance_name
+
+
+def evolution_post(path, payload, retry=False):
+    """
+    POST na Evolution API pelo cliente compartilhado (lança em erro HTTP)
+
+    Args:
+        retry: só para chamadas sem efeito colateral (download de mídia)
+    """
+    api_url, api_key, instance_name = evolution_config()
+    client = get_client(
+        'evolution',
+        connect_timeout=EVOLUTION_CONNECT_TIMEOUT,
+        read_timeout=EVOLUTION_READ_TIMEOUT,
+        pool_maxsize=MEDIA_WORKERS + 4
+    )
+    response = client.post(
+        f"{api_url}/{path}/{instance_name}",
+        json=payload,
+        headers={"apikey": api_key, "Content-Type": "application/json"},
+        retry=retry
+    )
+    response.raise_for_status()
+    return response
+
+
+def decode_base64(data):
+    """Decodifica base64 (com ou sem prefixo data:...;base64,); str ASCII ou bytes"""
+    start = data.find(',' if isinstance(data, str) else b',') + 1  # 0 quando não há prefixo
+    return binascii.a2b_base64(data[start:] if start else data)
+
+
+def decode_base64_field(body, field='base64'):
+    """
+    Decodifica um campo base64 de um corpo JSON direto dos bytes
+
+    O valor é lido por uma memoryview do corpo, sem json.loads nem cópia
+    para str. Se o valor tiver escapes JSON (ex. "\\/"), usa o json.
+
+    Returns:
+        bytes ou None se o campo não existe / é vazio
+    """
+    match = re.search(rb'"' + re.escape(field.encode()) + rb'"\s*:\s*"', body)
+    if not match:
+        return None
+    start, end = match.end(), body.find(b'"', match.end())
+    if end <= start:
+        return None
+    if body.find(b'\\', start, end) != -1:
+        value = json.loads(body).get(field)
+        return decode_base64(value) if value else None
+    comma = body.find(b',', start, end)  # prefixo data:...;base64,
+    if comma != -1:
+        start = comma + 1
+    return binascii.a2b_base64(memoryview(body)[start:end])
+
+
+class WhatsAppMediaService:
+
+    @staticmethod
+    def start(body, kind):
+        """
+        Agenda download (e transcrição, para áudio) no pool
+
+        Args:
+            body: `data` do webhook messages.upsert
+            kind: 'image' ou 'audio'
+
+        Returns:
+            Future de dict {attachment} (imagem) ou {transcription} (áudio)
+        """
+        app = current_app._get_current_object()
+
+        def run():
+            with app.app_context():
+                return WhatsAppMediaService.load(body, kind)
+
+        return _pool.submit(run)
+
+    @staticmethod
+    def load(body, kind):
+        media = body.get('message', {}).get(f'{kind}Message', {})
+        mime_type = media.get('mimetype') or DEFAULT_MIME[kind]
+
+        cache_key = None
+        if kind == 'audio':
+            cache_key = WhatsAppMediaService._transcription_key(media.get('fileSha256'))
+            cached = WhatsAppMediaService._cache_get(cache_key)
+            if cached:
+                metrics.incr('whatsapp.transcription.cache.hit')
+                return {"transcription": cached}
+
+        with metrics.timer('whatsapp.media.fetch_ms'):
+            data = WhatsAppMediaService.fetch(body)
+        if data is None:
+            return {}
+
+        if kind == 'image':
+            return {"attachment": {"mime_type": mime_type, "data": data}}
+
+        metrics.incr('whatsapp.transcription.cache.miss')
+        cache_key = cache_key or f"whatsapp:transcription:{hashlib.sha256(data).hexdigest()}"
+
+        from app.modules.coach.infrastructure.gemini_service import GeminiService
+        with metrics.timer('whatsapp.media.transcribe_ms'):
+            transcription = GeminiService().transcribe_audio(data, mime_type)
+
+        if transcription:
+            try:
+                cache.set(cache_key, transcription, timeout=TRANSCRIPTION_CACHE_TTL)
+            except Exception as e:
+                logger.warning(f"Transcription cache write failed: {e}")
+        return {"transcription": transcription}
+
+    @staticmethod
+    def fetch(message_full_data):
+        """
+        Baixa o conteúdo de uma mensagem de mídia (Evolution API v2)
+
+        Returns:
+            bytes ou None
+        """
+        try:
+            # Construct a clean minimal WAMessage to avoid "ephemeralMessage" errors in Evolution
+            clean_message = {
+                "key": message_full_data.get("key"),
+                "pushName": message_full_data.get("pushName"),
+                "messageTimestamp": message_full_data.get("messageTimestamp"),
+                "messageContextInfo": message_full_data.get("messageContextInfo"),
+                "message": {}
+            }
+
+            # Copy only the media part to the new message object
+            original_msg_content = message_full_data.get("message", {})
+            media_type = next((mtype for mtype in MEDIA_TYPES if mtype in original_msg_content), None)
+            if media_type:
+                clean_message["message"][media_type] = original_msg_content[media_type]
+            else:  # Fallback
+                logger.debug("Unknown media type in fetch, sending the whole message")
+                clean_message["message"] = original_msg_content
+
+            # Apply cleaning only to the inner media message
+            for mtype in MEDIA_TYPES[:4]:
+                if mtype in clean_message["message"]:
+                    clean_message["message"][mtype] = WhatsAppMediaService._sanitize_for_api(clean_message["message"][mtype])
+
+            response = evolution_post("chat/getBase64FromMediaMessage", {
+                "message": clean_message,
+                "convertToMp4": False
+            }, retry=True)
+
+            return decode_base64_field(response.content)
+
+        except Exception as e:
+            logger.error(f"Error getting media base64: {e}")
+            return None
+
+    @staticmethod
+    def _sanitize_for_api(obj):
+        """String -> Int where Evolution API expects numbers; binary fields stay base64 strings"""
+        if isinstance(obj, dict):
+            new_obj = {}
+            for k, v in obj.items():
+                if k == 'fileLength' and isinstance(v, str) and v.isdigit():
+                    new_obj[k] = int(v)
+                elif k in ['mediaKey', 'fileSha256', 'fileEncSha256', 'jpegThumbnail', 'firstScanSidecar', 'scansSidecar', 'midQualityFileSha256'] and isinstance(v, str):
+                    new_obj[k] = v
+                else:
+                    new_obj[k] = WhatsAppMediaService._sanitize_for_api(v)
+            return new_obj
+        elif isinstance(obj, list):
+            return [WhatsAppMediaService._sanitize_for_api(i) for i in obj]
+        return obj
+
+    @staticmethod
+    def _transcription_key(file_sha256):
+        """Chave pelo SHA-256 do arquivo (mesmo formato do hash calculado após o download)"""
+        if not file_sha256 or not isinstance(file_sha256, str):
+            return None
+        try:
+            return f"whatsapp:transcription:{base64.b64decode(file_sha256).hex()}"
+        except (binascii.Error, ValueError):
+            return None
+
+    @staticmethod
+    def _cache_get(key):
+        if not key:
+            return None
+        try:
+            return cache.get(key)
+        except Exception as e:
+            logger.warning(f"Transcription cache read failed: {e}")
+            return None
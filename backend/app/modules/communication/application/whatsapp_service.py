@@ -1,13 +1,28 @@
 import requests
-from flask import current_app
-import os
 from app.modules.identity.domain.models import User
 from app.modules.coach.application.coach_gemini_service import CoachGeminiService
 from app.modules.coach.application.coach_context_service import CoachContextService
 from app.modules.coach.domain.chat_message import ChatMessage
-from app.shared.extensions import db
+from app.shared.extensions import db, task_queue, cache
 from app.shared.utils.timezone import now_cuiaba
+from app.modules.communication.application.whatsapp_media import WhatsAppMediaService, evolution_config, evolution_post
 import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Mensagens já processadas (id da mensagem no WhatsApp): a Evolution pode
+# reenviar o webhook e a fila refaz jobs que falharam
+PROCESSED_TTL = 24 * 3600
+
+
+class WhatsAppSendError(Exception):
+    """A Evolution API não aceitou a mensagem de resposta"""
+
+
+def _mask(phone):
+    """Telefone para logs (só os 4 últimos dígitos)"""
+    return f"***{str(phone)[-4:]}" if phone else None
 
 class WhatsAppService:
     @staticmethod
@@ -18,142 +33,121 @@ class WhatsAppService:
     @staticmethod
     def send_message(phone, text):
         """Envia mensagem de texto via Evolution API"""
-        api_url = current_app.config.get('EVOLUTION_API_URL') or os.environ.get('EVOLUTION_API_URL')
-        api_key = current_app.config.get('EVOLUTION_API_KEY') or os.environ.get('EVOLUTION_API_KEY')
-        instance_name = current_app.config.get('EVOLUTION_INSTANCE_NAME') or os.environ.get('EVOLUTION_INSTANCE_NAME', 'FitGen')
-        
-        if not api_url or not api_key:
-            print(f"❌ Evolution API configuration missing. URL: {api_url}, Key: {api_key}")
+        if not evolution_config():
+            logger.error("Evolution API configuration missing (EVOLUTION_API_URL / EVOLUTION_API_KEY)")
             return False
-            
-        # Ensure URL doesn't end with slash
-        api_url = api_url.rstrip('/')
-        
-        url = f"{api_url}/message/sendText/{instance_name}"
         
         payload = {
             "number": phone,
             "text": text
         }
         
-        headers = {
-            "apikey": api_key,
-            "Content-Type": "application/json"
-        }
-        
         try:
-            response = requests.post(url, json=payload, headers=headers)
-            response.raise_for_status()
+            evolution_post("message/sendText", payload)
             return True
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            logger.error(f"Error sending WhatsApp message to {_mask(phone)}: HTTP {status}")
+            return False
         except Exception as e:
-            print(f"❌ Error sending WhatsApp message: {e}")
-            if 'response' in locals() and response:
-                print(f"Response: {response.text}")
+            logger.error(f"Error sending WhatsApp message to {_mask(phone)}: {e}")
             return False
 
     @staticmethod
-    def get_media_base64(message_full_data, instance_name, api_url, api_key):
+    def partition_key(data):
         """
-        Retrieves base64 content of a media message from Evolution API v2
+        Retorna o telefone do remetente se o evento precisa ser processado
+
+        Usado como chave de partição da fila: mensagens do mesmo telefone
+        são processadas em ordem. Retorna None para eventos ignorados.
         """
-        try:
-            url = f"{api_url}/chat/getBase64FromMediaMessage/{instance_name}"
-            
-            # Construct a clean minimal WAMessage to avoid "ephemeralMessage" errors in Evolution
-            
-            clean_message = {
-                "key": message_full_data.get("key"),
-                "pushName": message_full_data.get("pushName"),
-                "messageTimestamp": message_full_data.get("messageTimestamp"),
-                "messageContextInfo": message_full_data.get("messageContextInfo"),
-                "message": {}
-            }
-            
-            # Copy only the media part to the new message object
-            original_msg_content = message_full_data.get("message", {})
-            
-            if "imageMessage" in original_msg_content:
-                clean_message["message"]["imageMessage"] = original_msg_content["imageMessage"]
-            elif "audioMessage" in original_msg_content:
-                clean_message["message"]["audioMessage"] = original_msg_content["audioMessage"]
-            elif "videoMessage" in original_msg_content:
-                clean_message["message"]["videoMessage"] = original_msg_content["videoMessage"]
-            elif "documentMessage" in original_msg_content:
-                clean_message["message"]["documentMessage"] = original_msg_content["documentMessage"]
-            elif "stickerMessage" in original_msg_content:
-                clean_message["message"]["stickerMessage"] = original_msg_content["stickerMessage"]
-            else: # Fallback
-                print(f"DEBUG: Unknown media type in get_media_base64")
-                clean_message["message"] = original_msg_content
-
-            # Sanitize types (String -> Int, Base64 -> Buffer format) because Evolution API might expect specific types
-            def sanitize_for_api(obj):
-                if isinstance(obj, dict):
-                    new_obj = {}
-                    for k, v in obj.items():
-                        if k == 'fileLength' and isinstance(v, str) and v.isdigit():
-                            new_obj[k] = int(v)
-                        elif k in ['mediaKey', 'fileSha256', 'fileEncSha256', 'jpegThumbnail', 'firstScanSidecar', 'scansSidecar', 'midQualityFileSha256'] and isinstance(v, str):
-                            new_obj[k] = v 
-                        else:
-                            new_obj[k] = sanitize_for_api(v)
-                    return new_obj
-                elif isinstance(obj, list):
-                    return [sanitize_for_api(i) for i in obj]
-                else:
-                    return obj
+        if data.get('event') != 'messages.upsert':
+            return None
 
-            # Apply cleaning only to the inner media message
-            for mtype in ["imageMessage", "audioMessage", "videoMessage", "documentMessage"]:
-                if mtype in clean_message["message"]:
-                    clean_message["message"][mtype] = sanitize_for_api(clean_message["message"][mtype])
+        key = data.get('data', {}).get('key', {})
+        if key.get('fromMe') or not key.get('remoteJid'):
+            return None
 
-            payload = {
-                "message": clean_message,
-                "convertToMp4": False
-            }
-            
-            headers = {
-                "apikey": api_key,
-                "Content-Type": "application/json"
-            }
-            
-            response = requests.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            
-            data = response.json()
-            return data.get('base64')
-            
+        return key['remoteJid'].split('@')[0]
+
+    @staticmethod
+    def _marker(name, message_id):
+        """Lê uma marca de processamento (None se ausente ou cache indisponível)"""
+        if not message_id:
+            return None
+        try:
+            return cache.get(f"whatsapp:{name}:{message_id}")
+        except Exception as e:
+            logger.warning(f"WhatsApp {name} marker lookup failed for {message_id}: {e}")
+            return None
+
+    @staticmethod
+    def _mark(name, message_id, value=1):
+        """Grava uma marca de processamento por PROCESSED_TTL"""
+        if not message_id:
+            return
+        try:
+            cache.set(f"whatsapp:{name}:{message_id}", value, timeout=PROCESSED_TTL)
         except Exception as e:
-            print(f"❌ Error getting media base64: {e}")
-            try:
-                if 'response' in locals():
-                    print(f"Response Body: {response.text}")
-            except:
-                pass
+            logger.warning(f"WhatsApp {name} marker failed for {message_id}: {e}")
+
+    @staticmethod
+    def resend_stored_reply(message_id, phone):
+        """
+        Reenvia a resposta já salva de uma mensagem processada antes
+
+        A marca ``stored`` é gravada logo após o commit das mensagens do
+        chat, quando as ferramentas do Gemini (refeições, água) já rodaram;
+        um retry que a encontra só reenvia a resposta, sem chamar o Gemini.
+
+        Returns:
+            None se não há resposta salva para a mensagem
+        """
+        coach_msg_id = WhatsAppService._marker('stored', message_id)
+        if not coach_msg_id:
             return None
 
+        coach_msg = ChatMessage.query.get(coach_msg_id)
+        if coach_msg is None:
+            return None
+
+        logger.info(f"WhatsApp message {message_id} already answered, resending stored reply")
+        WhatsAppService.deliver(message_id, phone, coach_msg.content)
+        return {"status": "success", "resent": True}
+
+    @staticmethod
+    def deliver(message_id, phone, text):
+        """
+        Envia a resposta e marca a mensagem como respondida
+
+        Raises:
+            WhatsAppSendError: se a Evolution API não aceitou a mensagem
+                (o job volta para a fila e é refeito com backoff)
+        """
+        if not WhatsAppService.send_message(phone, text):
+            raise WhatsAppSendError(f"Reply to WhatsApp message {message_id} not sent")
+        WhatsAppService._mark('replied', message_id)
+
     @staticmethod
     def process_webhook(data):
         """Processa webhook recebido da Evolution API"""
         try:
-            print(f"DEBUG: Processing webhook data...")
             event_type = data.get('event')
             
             if event_type != 'messages.upsert':
-                print(f"DEBUG: Ignored event type: {event_type}")
+                logger.debug(f"Ignored WhatsApp event type: {event_type}")
                 return {"status": "ignored", "reason": f"event_type: {event_type}"}
                 
             body = data.get('data', {})
             key = body.get('key', {})
             
             if key.get('fromMe'):
-                print("DEBUG: Ignored message fromMe")
+                logger.debug("Ignored WhatsApp message fromMe")
                 return {"status": "ignored", "reason": "fromMe"}
                 
             remote_jid = key.get('remoteJid')
             if not remote_jid:
-                print("DEBUG: No remoteJid found")
+                logger.debug("Ignored WhatsApp message without remoteJid")
                 return {"status": "ignored", "reason": "no_remoteJid"}
                 
             phone = remote_jid.split('@')[0]
@@ -163,6 +157,7 @@ class WhatsAppService:
             
             # Initialize variables
             text = None
+            media_kind = None
             media_attachments = []
             
             # --- MESSAGE TYPE HANDLING ---
@@ -176,75 +171,73 @@ class WhatsAppService:
             # 2. Image
             elif 'imageMessage' in message_content:
                 text = message_content['imageMessage'].get('caption', "Analise esta imagem.")
-                print(f"DEBUG: Detected Image Message. Caption: {text}")
-                
-                # Fetch Image Base64
-                api_url = current_app.config.get('EVOLUTION_API_URL') or os.environ.get('EVOLUTION_API_URL')
-                api_key = current_app.config.get('EVOLUTION_API_KEY') or os.environ.get('EVOLUTION_API_KEY')
-                instance_name = current_app.config.get('EVOLUTION_INSTANCE_NAME') or os.environ.get('EVOLUTION_INSTANCE_NAME', 'FitGen')
-                
-                if api_url and api_key:
-                    api_url = api_url.rstrip('/')
-                    base64_data = WhatsAppService.get_media_base64(body, instance_name, api_url, api_key)
-                    
-                    if base64_data:
-                        import base64
-                        if ',' in base64_data:
-                            base64_data = base64_data.split(',')[1]
-                            
-                        media_attachments.append({
-                            "mime_type": message_content['imageMessage'].get('mimetype', 'image/jpeg'),
-                            "data": base64.b64decode(base64_data)
-                        })
+                media_kind = 'image'
             
             # 3. Audio
             elif 'audioMessage' in message_content:
-                 print("DEBUG: Detected Audio Message")
-                 
-                 api_url = current_app.config.get('EVOLUTION_API_URL') or os.environ.get('EVOLUTION_API_URL')
-                 api_key = current_app.config.get('EVOLUTION_API_KEY') or os.environ.get('EVOLUTION_API_KEY')
-                 instance_name = current_app.config.get('EVOLUTION_INSTANCE_NAME') or os.environ.get('EVOLUTION_INSTANCE_NAME', 'FitGen')
-                 
-                 if api_url and api_key:
-                    api_url = api_url.rstrip('/')
-                    base64_data = WhatsAppService.get_media_base64(body, instance_name, api_url, api_key)
-                    
-                    if base64_data:
-                        import base64
-                        if ',' in base64_data:
-                            base64_data = base64_data.split(',')[1]
-                            
-                        audio_bytes = base64.b64decode(base64_data)
-                        mime_type = message_content['audioMessage'].get('mimetype', 'audio/ogg; codecs=opus')
-                        
-                        # Transcribe audio using Gemini
-                        from app.modules.coach.infrastructure.gemini_service import GeminiService
-                        gemini = GeminiService()
-                        transcription = gemini.transcribe_audio(audio_bytes, mime_type)
-                        
-                        if transcription:
-                            text = transcription
-                            print(f"DEBUG: Audio transcribed: {text}")
-                        else:
-                            text = "[Áudio não transcrito]"
-                            
-                 else:
-                     text = "[Erro de Configuração de Áudio]"
+                media_kind = 'audio'
+
+            if not text and not media_kind:
+                logger.debug("Ignored WhatsApp message without supported content")
+                return {"status": "ignored", "reason": "no_content"}
+
+            # Media download (and audio transcription) runs on the media pool
+            # while the user, context and history are loaded below
+            media_future = None
+            if media_kind:
+                if evolution_config():
+                    media_future = WhatsAppMediaService.start(body, media_kind)
+                elif media_kind == 'audio':
+                    text = "[Erro de Configuração de Áudio]"
+
+            user = User.query.filter_by(phone=phone).first()
+            
+            context = None
+            history_list = []
+            if user:
+                context = CoachContextService.get_user_context(str(user.id))
+                history = ChatMessage.query.filter_by(
+                    user_id=str(user.id)
+                ).order_by(ChatMessage.created_at.desc()).limit(10).all()
+                
+                history_list = [
+                    {"role": msg.role, "content": msg.content}
+                    for msg in reversed(history)
+                ]
+
+            if media_future:
+                media = media_future.result()
+                if media_kind == 'image' and media.get('attachment'):
+                    media_attachments.append(media['attachment'])
+                elif media_kind == 'audio':
+                    text = media.get('transcription') or "[Áudio não transcrito]"
 
             if not text and not media_attachments:
-                print("DEBUG: No supported content found")
+                logger.debug("Ignored WhatsApp message without supported content")
                 return {"status": "ignored", "reason": "no_content"}
 
-            print(f"📩 WhatsApp received from {phone}: {text} (Media: {len(media_attachments)})")
+            # Só metadados: o texto (e a transcrição) é conteúdo do usuário
+            logger.info(f"WhatsApp message {key.get('id')} from {_mask(phone)}: "
+                        f"{media_kind or 'text'}, {len(text or '')} chars, {len(media_attachments)} attachments")
+
+            # Daqui em diante há efeitos colaterais (commits e envio de mensagens).
+            # Webhook repetido ou retry da fila: não refaz o que já foi feito
+            message_id = key.get('id')
+            if WhatsAppService._marker('replied', message_id):
+                logger.info(f"WhatsApp message {message_id} already replied, skipping")
+                return {"status": "ignored", "reason": "duplicate"}
+
+            resent = WhatsAppService.resend_stored_reply(message_id, phone)
+            if resent:
+                return resent
 
             # --- DIRECT GEMINI PROCESSING (NO INTERCEPTORS) ---
             
-            # 1. Lookup User
-            user = User.query.filter_by(phone=phone).first()
+            # 1. User (loaded above, in parallel with the media)
             
             # --- ACTIVATION FLOW START ---
             if not user:
-                print(f"Unknown number {phone}. Starting activation flow.")
+                logger.info(f"Unknown number {_mask(phone)}, starting activation flow")
                 
                 # Check if message looks like an email using regex
                 import re
@@ -253,7 +246,6 @@ class WhatsAppService:
                 
                 if match:
                     email_candidate = match.group(0)
-                    print(f"Email detected: {email_candidate}")
                     
                     # Try to find user by email
                     user_candidate = User.query.filter_by(email=email_candidate).first()
@@ -270,6 +262,7 @@ class WhatsAppService:
                             f"O que vamos fazer agora?"
                         )
                         WhatsAppService.send_message(phone, welcome_msg)
+                        WhatsAppService._mark('replied', message_id)
                         return {"status": "activated", "user_id": str(user_candidate.id)}
                     else:
                         fail_msg = (
@@ -277,6 +270,7 @@ class WhatsAppService:
                             f"Por favor, verifique se digitou corretamente ou crie sua conta no nosso site."
                         )
                         WhatsAppService.send_message(phone, fail_msg)
+                        WhatsAppService._mark('replied', message_id)
                         return {"status": "activation_failed", "reason": "email_not_found"}
                 
                 else:
@@ -287,30 +281,24 @@ class WhatsAppService:
                         "(Aquele que você usou na compra/registro)"
                     )
                     WhatsAppService.send_message(phone, prompt_msg)
+                    WhatsAppService._mark('replied', message_id)
                     return {"status": "activation_prompted"}
 
             # --- ACTIVATION FLOW END ---
             
-            # 2. Get Context
+            # 2. Context and 3. History (loaded above)
             user_id = str(user.id)
-            context = CoachContextService.get_user_context(user_id)
             if "error" in context:
-                 print(f"Context error for user {user_id}: {context['error']}")
+                 logger.error(f"Context error for user {user_id}: {context['error']}")
                  return {"status": "error", "reason": "context_error"}
-
-            # 3. Get History
-            history = ChatMessage.query.filter_by(
-                user_id=user_id
-            ).order_by(ChatMessage.created_at.desc()).limit(10).all()
-            
-            history_list = [
-                {"role": msg.role, "content": msg.content}
-                for msg in reversed(history)
-            ]
             
             # 4. Process with Gemini 2.5 Pro
             result = CoachGeminiService.chat(context, history_list, text, media_attachments)
             
+            # Falha do Gemini: nada foi salvo ainda, a fila refaz o job
+            if result.get('error'):
+                raise RuntimeError(f"Coach Gemini error: {result['error']}")
+
             response_text = result.get('response')
             if not response_text:
                 response_text = "Desculpe, não consegui processar sua mensagem."
@@ -334,14 +322,23 @@ class WhatsAppService:
             )
             db.session.add(coach_msg)
             db.session.commit()
+            WhatsAppService._mark('stored', message_id, coach_msg.id)
             
             # 6. Send Response
-            WhatsAppService.send_message(phone, response_text)
+            WhatsAppService.deliver(message_id, phone, response_text)
             
             return {"status": "success"}
             
         except Exception as e:
-            print(f"❌ Webhook processing error: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"WhatsApp webhook processing error: {e}")
+            db.session.rollback()
             return {"success": False, "error": str(e)}
+
+
+@task_queue.task('whatsapp.process_webhook')
+def process_webhook_task(data):
+    """Job da fila: falhas são relançadas para que a fila faça retry com backoff"""
+    result = WhatsAppService.process_webhook(data)
+    if result.get('success') is False:
+        raise RuntimeError(result.get('error'))
+    return result
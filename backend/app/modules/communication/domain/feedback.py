@@ -15,7 +15,8 @@ class Feedback(db.Model):
         db.PrimaryKeyConstraint('id', name='feedback_pkey'),
         db.Index('ix_feedback_status', 'status'),
         db.Index('ix_feedback_type', 'type'),
-        db.Index('ix_feedback_user_status', 'user_id', 'status')
+        db.Index('ix_feedback_user_status', 'user_id', 'status'),
+        db.Index('ix_feedback_user_created', 'user_id', 'created_at')
     )
 
     id: Mapped[uuid.UUID] = mapped_column(Uuid, primary_key=True, default=uuid.uuid4)
@@ -15,7 +15,8 @@ class Notification(db.Model):
         db.Index('ix_notifications_is_read', 'is_read'),
         db.Index('ix_notifications_type', 'type'),
         db.Index('ix_notifications_user_created', 'user_id', 'created_at'),
-        db.Index('ix_notifications_user_unread', 'user_id', 'is_read')
+        db.Index('ix_notifications_user_unread', 'user_id', 'is_read'),
+        db.Index('ix_notifications_created_id', 'created_at', 'id')
     )
 
     id: Mapped[uuid.UUID] = mapped_column(Uuid, primary_key=True, default=uuid.uuid4)
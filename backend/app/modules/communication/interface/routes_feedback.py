@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.modules.communication.domain.feedback import Feedback
+from app.shared.utils.pagination import paginate, page_args, page_meta, InvalidCursor
 
 feedback_bp = Blueprint('feedback', __name__)
 
@@ -8,27 +9,48 @@ feedback_bp = Blueprint('feedback', __name__)
 @jwt_required()
 def get_user_feedback():
     """
-    Get all feedback submitted by the current user
+    Get feedback submitted by the current user (newest first, cursor paginated)
     ---
     tags:
       - Feedback
+    parameters:
+      - in: query
+        name: limit
+        type: integer
+        default: 20
+      - in: query
+        name: cursor
+        type: string
+        description: next_cursor from the previous page
     responses:
       200:
-        description: List of feedback items
+        description: Feedback items page
+      400:
+        description: Invalid cursor
     """
     current_user_id = get_jwt_identity()
-    feedback_items = Feedback.query.filter_by(user_id=current_user_id).order_by(Feedback.created_at.desc()).all()
+    cursor, limit, total = page_args()
+    
+    try:
+        page = paginate(
+            Feedback.query.filter_by(user_id=current_user_id),
+            (Feedback.created_at, Feedback.id),
+            cursor=cursor, limit=limit, total=total
+        )
+    except InvalidCursor:
+        return jsonify({"msg": "Invalid cursor"}), 400
     
-    return jsonify([
-        {
+    return jsonify({
+        "feedback": [{
             "id": item.id,
             "title": item.title,
             "type": item.type,
             "category": item.category,
             "status": item.status,
             "created_at": item.created_at.isoformat()
-        } for item in feedback_items
-    ])
+        } for item in page['items']],
+        **page_meta(page)
+    })
 
 @feedback_bp.route('/<uuid:feedback_id>', methods=['GET'])
 @jwt_required()
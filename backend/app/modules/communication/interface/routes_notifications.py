@@ -2,8 +2,10 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.modules.communication.domain.notification import Notification
 from app.modules.communication.domain.device_token import DeviceToken
+from app.modules.communication.application.notification_service import NotificationService  # registers queue tasks
 from app.shared.extensions import db
 from app.shared.utils.timezone import now_cuiaba
+from app.shared.utils.pagination import paginate, page_args, page_meta, InvalidCursor
 
 notifications_bp = Blueprint('notifications', __name__)
 
@@ -11,19 +13,39 @@ notifications_bp = Blueprint('notifications', __name__)
 @jwt_required()
 def get_user_notifications():
     """
-    Get all notifications for the current user
+    Get notifications for the current user (newest first, cursor paginated)
     ---
     tags:
       - Notifications
+    parameters:
+      - in: query
+        name: limit
+        type: integer
+        default: 50
+      - in: query
+        name: cursor
+        type: string
+        description: next_cursor from the previous page
     responses:
       200:
-        description: List of notifications
+        description: Notifications page; the first page also carries unread_count
+      400:
+        description: Invalid cursor
     """
     current_user_id = get_jwt_identity()
-    notifications = Notification.query.filter_by(user_id=current_user_id).order_by(Notification.created_at.desc()).all()
+    cursor, limit, total = page_args(default_limit=50)
     
-    return jsonify([
-        {
+    try:
+        page = paginate(
+            Notification.query.filter_by(user_id=current_user_id),
+            (Notification.created_at, Notification.id),
+            cursor=cursor, limit=limit, total=total
+        )
+    except InvalidCursor:
+        return jsonify({"msg": "Invalid cursor"}), 400
+    
+    response = {
+        "notifications": [{
             "id": notification.id,
             "title": notification.title,
             "message": notification.message,
@@ -32,8 +54,14 @@ def get_user_notifications():
             "created_at": notification.created_at.isoformat(),
             "link_type": notification.link_type,
             "link_id": str(notification.link_id) if notification.link_id else None
-        } for notification in notifications
-    ])
+        } for notification in page['items']],
+        **page_meta(page)
+    }
+    # Badge count (ix_notifications_user_unread) so polling can fetch limit=1
+    if not cursor:
+        response["unread_count"] = Notification.query.filter_by(user_id=current_user_id, is_read=False).count()
+    
+    return jsonify(response)
 
 @notifications_bp.route('/unread', methods=['GET'])
 @jwt_required()
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify, current_app
 from app.modules.communication.application.whatsapp_service import WhatsAppService
+from app.shared.extensions import task_queue
 
 whatsapp_bp = Blueprint('whatsapp', __name__)
 
@@ -20,10 +21,15 @@ def webhook():
         print(f"⚠️ Webhook unauthorized access attempt. Header: {api_key_header}. ALLOWING TEMPORARILY.")
         # return jsonify({"msg": "Unauthorized"}), 401
         
-    # Processa em background ou síncrono (síncrono por simplicidade agora)
-    result = WhatsAppService.process_webhook(data)
+    # Eventos ignorados respondem na hora; mensagens vão para a fila
+    # (ordenada por telefone) para não segurar o webhook durante a chamada ao Gemini
+    phone = WhatsAppService.partition_key(data)
+    if not phone:
+        return jsonify({"status": "ignored"}), 200
+
+    job_id = task_queue.enqueue('whatsapp.process_webhook', data, key=phone)
     
-    return jsonify(result), 200
+    return jsonify({"status": "queued", "job_id": job_id}), 200
 
 @whatsapp_bp.route('/test', methods=['GET'])
 def test():
@@ -0,0 +1,107 @@
+"""
+Catálogo de conquistas em memória
+
+A tabela `achievements` é carregada uma vez por processo em uma tabela de
+regras indexada por requirement_type, com os limiares ordenados. Avaliar um
+evento é um bisect nas regras daquele tipo, sem consulta ao banco.
+
+Edições do admin chamam `AchievementCatalog.invalidate()`, que descarta a
+cópia local e incrementa uma versão no cache compartilhado; os outros
+processos conferem essa versão no máximo a cada VERSION_CHECK_SECONDS.
+"""
+import time
+import bisect
+import logging
+import threading
+from collections import namedtuple
+
+from app.shared.extensions import db, cache
+from app.modules.gamification.domain.achievements import Achievement
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'achievements:catalog_version'
+VERSION_CHECK_SECONDS = 30
+
+Rule = namedtuple('Rule', 'id code name category requirement_type threshold')
+
+
+class AchievementCatalog:
+    _lock = threading.Lock()
+    # ({requirement_type: ([threshold], [Rule])} ordenados por threshold, {code: Rule})
+    _state = None
+    _version = None
+    _checked_at = 0.0
+
+    @classmethod
+    def has_rules(cls, requirement_type):
+        return requirement_type in cls._get_state()[0]
+
+    @classmethod
+    def reached(cls, requirement_type, value):
+        """Regras do tipo cujo limiar foi atingido por `value`"""
+        entry = cls._get_state()[0].get(requirement_type)
+        if not entry:
+            return []
+        thresholds, rules = entry
+        return rules[:bisect.bisect_right(thresholds, value)]
+
+    @classmethod
+    def get(cls, code):
+        return cls._get_state()[1].get(code)
+
+    @classmethod
+    def invalidate(cls):
+        """Chamar após criar/editar conquistas"""
+        with cls._lock:
+            cls._state = None
+        try:
+            cache.set(VERSION_KEY, time.time(), timeout=0)
+        except Exception as e:
+            logger.warning(f"Achievement catalog version bump failed: {e}")
+
+    # ---------- Loading ----------
+
+    @classmethod
+    def _get_state(cls):
+        state = cls._state
+        now = time.time()
+        if state is not None and now - cls._checked_at < VERSION_CHECK_SECONDS:
+            return state
+
+        with cls._lock:
+            version = cls._remote_version()
+            if cls._state is None or version != cls._version:
+                cls._state = cls._load()
+                cls._version = version
+            cls._checked_at = now
+            return cls._state
+
+    @classmethod
+    def _remote_version(cls):
+        try:
+            return cache.get(VERSION_KEY)
+        except Exception:
+            return cls._version
+
+    @classmethod
+    def _load(cls):
+        rows = db.session.query(
+            Achievement.id, Achievement.code, Achievement.name, Achievement.category,
+            Achievement.requirement_type, Achievement.requirement_value
+        ).all()
+
+        rules, by_code = {}, {}
+        for row in rows:
+            rule = Rule(row.id, row.code, row.name, row.category, row.requirement_type, row.requirement_value or 0)
+            by_code[rule.code] = rule
+            if rule.requirement_type:
+                rules.setdefault(rule.requirement_type, []).append(rule)
+
+        table = {}
+        for requirement_type, rule_list in rules.items():
+            rule_list.sort(key=lambda rule: rule.threshold)
+            table[requirement_type] = ([rule.threshold for rule in rule_list], rule_list)
+
+        logger.info(f"Achievement catalog loaded: {len(by_code)} achievements")
+        return table, by_code
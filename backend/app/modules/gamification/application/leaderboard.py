@@ -0,0 +1,418 @@
+"""
+Leaderboards em sorted sets
+
+Rankings mantidos incrementalmente pelo motor de gamificação:
+
+    xp               XP total (all) / XP ganho na semana (week)
+    workout_streak   streak atual (all) / maior streak atingido na semana (week)
+    nutrition_streak idem, para registros de refeição
+
+Top-N e "minha posição" são ZREVRANGE/ZREVRANK, O(log n). Sem Redis, um
+backend em memória com a mesma interface é usado (também serve de fake em
+testes). `LeaderboardService.rebuild()` (flask rebuild-leaderboards) refaz
+os rankings "all" a partir do Postgres; os semanais só existem no Redis.
+
+Os streaks "all" caem quando o usuário para: um índice `<metric>:last`
+guarda o dia (ordinal) do último registro e, antes de cada leitura, quem
+não registra desde anteontem sai do ranking. Usuários excluídos saem na
+exclusão; inativos que sobrarem são filtrados (e removidos) pelo `top()`
+antes de cortar a página, então o top-N vem sempre completo.
+"""
+import uuid
+import bisect
+import logging
+import threading
+from datetime import timedelta
+
+from app.shared.redis_client import get_redis
+from app.shared.utils.timezone import get_today_cuiaba
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('xp', 'workout_streak', 'nutrition_streak')
+STREAK_METRICS = ('workout_streak', 'nutrition_streak')
+PERIODS = ('all', 'week')
+
+# Rankings semanais expiram depois da semana seguinte
+WEEK_TTL_SECONDS = 14 * 24 * 3600
+
+
+class InMemoryLeaderboardBackend:
+    """Sorted sets por processo (desenvolvimento / testes)"""
+
+    def __init__(self):
+        self._scores = {}   # {board: {member: score}}
+        self._order = {}    # {board: [(-score, member)]} ordenado
+        self._lock = threading.Lock()
+
+    def _set(self, board, member, score):
+        scores = self._scores.setdefault(board, {})
+        order = self._order.setdefault(board, [])
+        if member in scores:
+            order.pop(bisect.bisect_left(order, (-scores[member], member)))
+        scores[member] = score
+        bisect.insort(order, (-score, member))
+
+    def incr(self, board, member, amount, ttl=None):
+        with self._lock:
+            self._set(board, member, self._scores.get(board, {}).get(member, 0) + amount)
+
+    def set(self, board, member, score, only_greater=False, ttl=None):
+        with self._lock:
+            current = self._scores.get(board, {}).get(member)
+            if only_greater and current is not None and current >= score:
+                return
+            self._set(board, member, score)
+
+    def _remove(self, board, member):
+        score = self._scores.get(board, {}).pop(member, None)
+        if score is not None:
+            order = self._order[board]
+            order.pop(bisect.bisect_left(order, (-score, member)))
+
+    def top(self, board, limit, start=0):
+        with self._lock:
+            return [(member, -score) for score, member in self._order.get(board, [])[start:start + limit]]
+
+    def remove(self, board, members):
+        with self._lock:
+            for member in members:
+                self._remove(board, member)
+
+    def expire(self, board, index, below):
+        """Remove de `board` e `index` os membros com score < below no índice"""
+        with self._lock:
+            expired = [member for member, score in self._scores.get(index, {}).items() if score < below]
+            for member in expired:
+                self._remove(board, member)
+                self._remove(index, member)
+            return len(expired)
+
+    def rank(self, board, member):
+        with self._lock:
+            score = self._scores.get(board, {}).get(member)
+            if score is None:
+                return None
+            return bisect.bisect_left(self._order[board], (-score, member)), score
+
+    def replace(self, board, scores):
+        with self._lock:
+            self._scores.pop(board, None)
+            self._order.pop(board, None)
+            for member, score in scores.items():
+                self._set(board, member, score)
+
+
+class RedisLeaderboardBackend:
+    # KEYS: board, index | ARGV: below. Atômico: um registro novo entre a
+    # leitura do índice e o ZREM não é apagado.
+    EXPIRE_SCRIPT = """
+local members = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', '(' .. ARGV[1])
+for i = 1, #members, 1000 do
+    local batch = {unpack(members, i, math.min(i + 999, #members))}
+    redis.call('ZREM', KEYS[1], unpack(batch))
+    redis.call('ZREM', KEYS[2], unpack(batch))
+end
+return #members
+"""
+
+    def __init__(self, client, prefix):
+        self.client = client
+        self.prefix = prefix
+        self._expire = client.register_script(self.EXPIRE_SCRIPT)
+
+    def _key(self, board):
+        return f"{self.prefix}:{board}"
+
+    def incr(self, board, member, amount, ttl=None):
+        pipe = self.client.pipeline()
+        pipe.zincrby(self._key(board), amount, member)
+        if ttl:
+            pipe.expire(self._key(board), ttl)
+        pipe.execute()
+
+    def set(self, board, member, score, only_greater=False, ttl=None):
+        pipe = self.client.pipeline()
+        pipe.zadd(self._key(board), {member: score}, gt=only_greater)
+        if ttl:
+            pipe.expire(self._key(board), ttl)
+        pipe.execute()
+
+    def top(self, board, limit, start=0):
+        rows = self.client.zrevrange(self._key(board), start, start + limit - 1, withscores=True)
+        return [(self._str(member), score) for member, score in rows]
+
+    def remove(self, board, members):
+        if members:
+            self.client.zrem(self._key(board), *members)
+
+    def expire(self, board, index, below):
+        return self._expire(keys=[self._key(board), self._key(index)], args=[below])
+
+    def rank(self, board, member):
+        pipe = self.client.pipeline()
+        pipe.zrevrank(self._key(board), member)
+        pipe.zscore(self._key(board), member)
+        rank, score = pipe.execute()
+        if rank is None:
+            return None
+        return rank, score
+
+    def replace(self, board, scores):
+        """Monta em uma chave temporária e troca com RENAME (leitores nunca veem vazio)"""
+        key = self._key(board)
+        tmp = f"{key}:rebuild"
+        pipe = self.client.pipeline()
+        pipe.delete(tmp)
+        items = list(scores.items())
+        for start in range(0, len(items), 1000):
+            pipe.zadd(tmp, dict(items[start:start + 1000]))
+        if items:
+            pipe.rename(tmp, key)
+        else:
+            pipe.delete(key)
+        pipe.execute()
+
+    @staticmethod
+    def _str(value):
+        return value.decode() if isinstance(value, bytes) else value
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                client = get_redis()
+                if client is not None:
+                    _backend = RedisLeaderboardBackend(client, prefix='fitgen:leaderboard')
+                else:
+                    _backend = InMemoryLeaderboardBackend()
+    return _backend
+
+
+def use_backend(backend):
+    """Troca o backend (testes usam InMemoryLeaderboardBackend)"""
+    global _backend
+    _backend = backend
+
+
+class LeaderboardService:
+
+    @staticmethod
+    def board(metric, period='all'):
+        if metric not in METRICS or period not in PERIODS:
+            raise ValueError(f"Unknown leaderboard: {metric}/{period}")
+        if period == 'week':
+            year, week, _ = get_today_cuiaba().isocalendar()
+            return f"{metric}:week:{year}-W{week:02d}"
+        return metric
+
+    @staticmethod
+    def last_index(metric):
+        """Índice do dia do último registro de um streak "all" """
+        return f"{metric}:last"
+
+    # ---------- Escrita (chamada pelo GamificationService) ----------
+
+    @staticmethod
+    def record(user_id, xp=0, streaks=None, day=None):
+        """
+        Aplica o resultado de uma atividade aos rankings
+
+        Falhas são logadas: o ranking é derivado e pode ser reconstruído.
+
+        Args:
+            xp: XP ganho
+            streaks: {metric: valor atual}, ex. {'workout_streak': 5}
+            day: dia da atividade que gerou o streak (padrão: hoje)
+        """
+        member = str(user_id)
+        try:
+            backend = get_backend()
+            if xp:
+                backend.incr(LeaderboardService.board('xp'), member, xp)
+                backend.incr(LeaderboardService.board('xp', 'week'), member, xp, ttl=WEEK_TTL_SECONDS)
+            last = (day or get_today_cuiaba()).toordinal()
+            for metric, value in (streaks or {}).items():
+                # Índice antes do valor: um expire no meio não derruba o streak novo
+                backend.set(LeaderboardService.last_index(metric), member, last, only_greater=True)
+                backend.set(LeaderboardService.board(metric), member, value)
+                backend.set(LeaderboardService.board(metric, 'week'), member, value,
+                            only_greater=True, ttl=WEEK_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"Leaderboard update failed for {member}: {e}")
+
+    # ---------- Leitura ----------
+
+    @staticmethod
+    def top(metric='xp', period='all', limit=10):
+        """
+        Top-N só com usuários ativos
+
+        Membros excluídos ou inativos encontrados no caminho são removidos do
+        ranking e a leitura continua até completar `limit`.
+
+        Returns:
+            list [{rank, user_id, score}]
+        """
+        board = LeaderboardService.board(metric, period)
+        backend = get_backend()
+        LeaderboardService.expire_streaks(metric, period)
+
+        entries, start = [], 0
+        batch = max(limit * 2, 20)
+        while len(entries) < limit:
+            rows = backend.top(board, batch, start)
+            if not rows:
+                break
+            active = LeaderboardService._active_members([member for member, _ in rows])
+            stale = [member for member, _ in rows if member not in active]
+            if stale:
+                backend.remove(board, stale)
+            entries += [(member, score) for member, score in rows if member in active]
+            # Os removidos liberam as posições que ocupavam
+            start += len(rows) - len(stale)
+            if len(rows) < batch:
+                break
+
+        return [
+            {"rank": idx, "user_id": member, "score": int(score)}
+            for idx, (member, score) in enumerate(entries[:limit], start=1)
+        ]
+
+    @staticmethod
+    def rank(user_id, metric='xp', period='all'):
+        """
+        Returns:
+            {rank, score} ou None se o usuário não está no ranking
+        """
+        board = LeaderboardService.board(metric, period)
+        LeaderboardService.expire_streaks(metric, period)
+        found = get_backend().rank(board, str(user_id))
+        if found is None:
+            return None
+        rank, score = found
+        return {"rank": rank + 1, "score": int(score)}
+
+    @staticmethod
+    def _active_members(members):
+        """Subconjunto de `members` que são usuários ativos e não excluídos"""
+        from app.shared.extensions import db
+        from app.modules.identity.domain.models import User
+
+        ids = []
+        for member in members:
+            try:
+                ids.append(uuid.UUID(member))
+            except ValueError:
+                continue
+        if not ids:
+            return set()
+        rows = db.session.query(User.id).filter(
+            User.id.in_(ids), User.is_active == True, User.deleted_at.is_(None)
+        ).all()
+        return {str(row.id) for row in rows}
+
+    # ---------- Manutenção ----------
+
+    @staticmethod
+    def expire_streaks(metric, period='all'):
+        """
+        Tira do ranking "all" os streaks que já caíram (sem registro ontem
+        nem hoje), com a mesma regra do rebuild
+
+        Returns:
+            membros removidos
+        """
+        if metric not in STREAK_METRICS or period != 'all':
+            return 0
+        yesterday = (get_today_cuiaba() - timedelta(days=1)).toordinal()
+        try:
+            return get_backend().expire(
+                LeaderboardService.board(metric), LeaderboardService.last_index(metric), yesterday
+            )
+        except Exception as e:
+            logger.warning(f"Leaderboard streak expiry failed for {metric}: {e}")
+            return 0
+
+    @staticmethod
+    def remove_user(user_id):
+        """Tira o usuário de todos os rankings (exclusão / desativação)"""
+        member = str(user_id)
+        try:
+            backend = get_backend()
+            for metric in METRICS:
+                for period in PERIODS:
+                    backend.remove(LeaderboardService.board(metric, period), [member])
+                if metric in STREAK_METRICS:
+                    backend.remove(LeaderboardService.last_index(metric), [member])
+        except Exception as e:
+            logger.warning(f"Leaderboard removal failed for {member}: {e}")
+
+    # ---------- Rebuild ----------
+
+    @staticmethod
+    def rebuild():
+        """
+        Refaz os rankings "all" a partir de user_profiles e user_streaks
+
+        Streaks cujo último registro é anterior a ontem contam como 0.
+
+        Returns:
+            dict {metric: membros gravados}
+        """
+        from datetime import timedelta
+        from app.shared.extensions import db
+        from app.modules.identity.domain.models import User, UserProfile
+        from app.modules.gamification.domain.user_streak import UserStreak
+
+        yesterday = get_today_cuiaba() - timedelta(days=1)
+        active = db.and_(User.is_active == True, User.deleted_at.is_(None))
+
+        xp_rows = db.session.query(UserProfile.user_id, UserProfile.xp).join(
+            User, User.id == UserProfile.user_id
+        ).filter(active, UserProfile.xp > 0).all()
+
+        streak_rows = db.session.query(
+            UserStreak.user_id,
+            UserStreak.current_workout_streak, UserStreak.last_workout_date,
+            UserStreak.current_nutrition_streak, UserStreak.last_nutrition_log_date
+        ).join(User, User.id == UserStreak.user_id).filter(active).all()
+
+        def live(streak, last_date):
+            return streak if streak and last_date and last_date >= yesterday else 0
+
+        def last_days(scores, column):
+            return {
+                str(row.user_id): getattr(row, column).toordinal()
+                for row in streak_rows if str(row.user_id) in scores
+            }
+
+        boards = {
+            'xp': {str(row.user_id): row.xp for row in xp_rows},
+            'workout_streak': {
+                str(row.user_id): value for row in streak_rows
+                if (value := live(row.current_workout_streak, row.last_workout_date))
+            },
+            'nutrition_streak': {
+                str(row.user_id): value for row in streak_rows
+                if (value := live(row.current_nutrition_streak, row.last_nutrition_log_date))
+            },
+        }
+
+        indexes = {
+            'workout_streak': last_days(boards['workout_streak'], 'last_workout_date'),
+            'nutrition_streak': last_days(boards['nutrition_streak'], 'last_nutrition_log_date'),
+        }
+
+        backend = get_backend()
+        for metric, scores in boards.items():
+            backend.replace(LeaderboardService.board(metric), scores)
+        for metric, days in indexes.items():
+            backend.replace(LeaderboardService.last_index(metric), days)
+        return {metric: len(scores) for metric, scores in boards.items()}
@@ -1,10 +1,49 @@
-from datetime import datetime, timedelta
-from app.shared.extensions import db
+import math
+import uuid
+from datetime import datetime, timedelta, date
+from sqlalchemy import func, update
+from sqlalchemy.dialects.postgresql import insert
+from app.shared.extensions import db, events
+from app.shared.utils.timezone import get_today_cuiaba, now_cuiaba
+from app.shared.events import MEAL_LOGGED, WATER_LOGGED, WORKOUT_FINISHED
 from app.modules.identity.domain.models import UserProfile
 from app.modules.gamification.domain.user_streak import UserStreak
-from app.modules.gamification.domain.achievements import Achievement, UserAchievement
+from app.modules.gamification.domain.achievements import UserAchievement
+from app.modules.gamification.application.achievement_catalog import AchievementCatalog
+from app.modules.gamification.application.leaderboard import LeaderboardService, METRICS
+from app.modules.training.domain.models import WorkoutSession
+from app.modules.nutrition.domain.models import Meal
+
+# Campos de streak por categoria: (último dia, streak atual, maior streak)
+STREAK_FIELDS = {
+    'workout': ('last_workout_date', 'current_workout_streak', 'longest_workout_streak'),
+    'nutrition': ('last_nutrition_log_date', 'current_nutrition_streak', 'longest_nutrition_streak'),
+    'hydration': ('last_hydration_date', 'current_hydration_streak', 'longest_hydration_streak'),
+}
+
+# requirement_type das conquistas avaliadas por streak de cada categoria
+STREAK_REQUIREMENTS = {
+    'workout': 'streak_days',
+    'nutrition': 'nutrition_streak',
+    'hydration': 'hydration_streak',
+}
+
+# requirement_type avaliado por contagem a cada atividade (= coluna contador em user_streaks)
+COUNT_REQUIREMENTS = {
+    'workout_finish': 'workout_count',
+    'meal_log': 'meal_count',
+}
+
 
 class GamificationService:
+    """
+    Motor de gamificação
+
+    Cada atividade é uma única transação: a linha de user_streaks é travada
+    (SELECT ... FOR UPDATE), streak/conquistas/XP são calculados em memória
+    e o XP é somado no banco com UPDATE ... RETURNING. Logs simultâneos do
+    app e do WhatsApp para o mesmo usuário são serializados pelo lock.
+    """
     # XP Constants
     XP_WORKOUT_COMPLETE = 100
     XP_MEAL_LOG = 10
@@ -15,109 +54,212 @@ class GamificationService:
         """
         Centralized method to handle gamification events.
         activity_type: 'workout_finish', 'meal_log', 'hydration_log'
-        kwargs: extra params like 'is_goal_met' for hydration
+        kwargs: extra params like 'is_goal_met' for hydration, 'day' (date of
+            the activity, defaults to today in Cuiabá)
+
+        Returns:
+            dict {xp, level, level_up, gained, streak, achievements} or None
         """
         if activity_type == 'workout_finish':
-            GamificationService.update_streak(user_id, 'workout')
-            GamificationService.award_xp(user_id, GamificationService.XP_WORKOUT_COMPLETE, "Workout Completed")
-            
+            category, xp = 'workout', GamificationService.XP_WORKOUT_COMPLETE
         elif activity_type == 'meal_log':
-            GamificationService.update_streak(user_id, 'nutrition')
-            GamificationService.award_xp(user_id, GamificationService.XP_MEAL_LOG, "Meal Logged")
-            
+            category, xp = 'nutrition', GamificationService.XP_MEAL_LOG
         elif activity_type == 'hydration_log':
-            # Always award XP for logging water
-            GamificationService.award_xp(user_id, GamificationService.XP_HYDRATION_LOG, "Hydration Log")
-            
-            # Only update streak if goal is met
-            if kwargs.get('is_goal_met', False):
-                GamificationService.update_streak(user_id, 'hydration')
+            # Always award XP for logging water; streak only if goal is met
+            category = 'hydration' if kwargs.get('is_goal_met', False) else None
+            xp = GamificationService.XP_HYDRATION_LOG
+        else:
+            return None
+
+        result = GamificationService.apply_activity(user_id, category, xp, activity_type, day=kwargs.get('day'))
+
+        # XP, streaks e conquistas aparecem no dashboard
+        from app.modules.analytics.application.dashboard_service import DashboardService
+        DashboardService.refresh(user_id, 'profile', 'consistency', 'achievements')
+
+        return result
 
     @staticmethod
-    def update_streak(user_id, category):
+    def apply_activity(user_id, category, xp, activity_type=None, day=None):
         """
-        Updates the user's streak for a given category (workout, nutrition, hydration).
-        category: 'workout', 'nutrition', or 'hydration'
+        Aplica streak (se category), conquistas e XP em uma transação
+
+        Conquistas vêm do AchievementCatalog: só as regras do requirement_type
+        do evento são avaliadas.
+
+        Args:
+            category: 'workout', 'nutrition', 'hydration' ou None (só XP)
+            xp: XP base da atividade
+            activity_type: habilita as regras de contagem (COUNT_REQUIREMENTS)
+            day: dia da atividade (padrão: hoje em Cuiabá). Jobs atrasados ou
+                refeitos depois da meia-noite creditam o dia do evento.
         """
-        streak_record = UserStreak.query.filter_by(user_id=user_id).first()
-        
-        if not streak_record:
-            streak_record = UserStreak(user_id=user_id)
-            db.session.add(streak_record)
-        
-        # Use BRT Timezone for consistency with other services
-        from app.shared.utils.timezone import get_today_cuiaba
-        today = get_today_cuiaba()
-        
-        # Map category to dynamic fields
-        if category == 'workout':
-            last_date_attr = 'last_workout_date'
-            current_streak_attr = 'current_workout_streak'
-            longest_streak_attr = 'longest_workout_streak'
-        elif category == 'nutrition':
-            last_date_attr = 'last_nutrition_log_date'
-            current_streak_attr = 'current_nutrition_streak'
-            longest_streak_attr = 'longest_nutrition_streak'
-        elif category == 'hydration':
-            last_date_attr = 'last_hydration_date'
-            current_streak_attr = 'current_hydration_streak'
-            longest_streak_attr = 'longest_hydration_streak'
-        else:
+        user_id = uuid.UUID(str(user_id))
+        day = day or get_today_cuiaba()
+        gained = xp
+        streak = None
+        unlocked = []
+
+        try:
+            count_requirement = COUNT_REQUIREMENTS.get(activity_type)
+            if count_requirement and not AchievementCatalog.has_rules(count_requirement):
+                count_requirement = None
+
+            if category or count_requirement:
+                streak_record = GamificationService._lock_streak(user_id)
+                candidates = []
+
+                if category:
+                    streak, advanced = GamificationService.advance_streak(streak_record, category, day)
+                    if advanced:
+                        candidates += AchievementCatalog.reached(STREAK_REQUIREMENTS[category], streak)
+
+                if count_requirement:
+                    count = GamificationService._advance_count(streak_record, count_requirement)
+                    candidates += AchievementCatalog.reached(count_requirement, count)
+
+                for rule in GamificationService._unlock(user_id, candidates):
+                    unlocked.append(rule.name)
+                    gained += GamificationService.achievement_xp(rule)
+
+            profile = GamificationService._add_xp(user_id, gained)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        streak_metric = f"{category}_streak" if category else None
+        LeaderboardService.record(
+            user_id,
+            xp=gained if profile is not None else 0,
+            streaks={streak_metric: streak} if streak_metric in METRICS and streak is not None else None,
+            day=day
+        )
+
+        if profile is None:
             return None
 
+        new_xp, new_level = profile
+        return {
+            "xp": new_xp,
+            "level": new_level,
+            "level_up": new_level > GamificationService.calculate_level(new_xp - gained),
+            "gained": gained,
+            "streak": streak,
+            "achievements": unlocked
+        }
+
+    @staticmethod
+    def advance_streak(streak_record, category, today):
+        """
+        Atualiza em memória o streak da categoria para uma atividade em `today`
+
+        Returns:
+            (streak atual, True se mudou hoje)
+        """
+        last_date_attr, current_attr, longest_attr = STREAK_FIELDS[category]
         last_date = getattr(streak_record, last_date_attr)
-        current_streak = getattr(streak_record, current_streak_attr)
-        
-        new_streak = current_streak
-
-        if last_date == today:
-            # Already active today, do nothing
-            pass
-        elif last_date == today - timedelta(days=1):
-            # Consecutive day, increment
-            new_streak += 1
-            setattr(streak_record, current_streak_attr, new_streak)
-            setattr(streak_record, last_date_attr, today)
+        current = getattr(streak_record, current_attr) or 0
+
+        if last_date and last_date >= today:
+            # Already active that day (or a later one was already credited)
+            return current, False
+
+        # Consecutive day increments; broken streak (or first time) restarts
+        current = current + 1 if last_date == today - timedelta(days=1) else 1
+        setattr(streak_record, current_attr, current)
+        setattr(streak_record, last_date_attr, today)
+        if current > (getattr(streak_record, longest_attr) or 0):
+            setattr(streak_record, longest_attr, current)
+        return current, True
+
+    @staticmethod
+    def _lock_streak(user_id):
+        """Garante a linha de user_streaks e a retorna travada até o commit"""
+        db.session.execute(
+            insert(UserStreak).values(id=uuid.uuid4(), user_id=user_id).on_conflict_do_nothing(
+                index_elements=[UserStreak.user_id]
+            )
+        )
+        return UserStreak.query.filter_by(user_id=user_id).with_for_update().one()
+
+    @staticmethod
+    def _unlock(user_id, rules):
+        """
+        Libera as conquistas ainda não desbloqueadas (chamar com o streak travado)
+
+        Returns:
+            regras desbloqueadas agora
+        """
+        if not rules:
+            return []
+
+        owned = {row.achievement_id for row in db.session.query(UserAchievement.achievement_id).filter(
+            UserAchievement.user_id == user_id,
+            UserAchievement.achievement_id.in_([rule.id for rule in rules])
+        )}
+        new = [rule for rule in rules if rule.id not in owned]
+
+        unlocked_at = now_cuiaba()
+        db.session.add_all([
+            UserAchievement(user_id=user_id, achievement_id=rule.id, unlocked_at=unlocked_at) for rule in new
+        ])
+        return new
+
+    @staticmethod
+    def _advance_count(streak_record, requirement_type):
+        """
+        Soma 1 ao contador da atividade na linha travada de user_streaks
+
+        O COUNT(*) só roda uma vez por usuário, para inicializar o contador
+        (o evento atual já está no banco e entra na contagem).
+        """
+        current = getattr(streak_record, requirement_type)
+        if current is None:
+            current = GamificationService._count(streak_record.user_id, requirement_type)
         else:
-            # Streak broken or first time
-            new_streak = 1
-            setattr(streak_record, current_streak_attr, 1)
-            setattr(streak_record, last_date_attr, today)
-            
-        # Check longest
-        longest = getattr(streak_record, longest_streak_attr) or 0
-        if new_streak > longest:
-            setattr(streak_record, longest_streak_attr, new_streak)
-            
-        db.session.commit()
-        
-        # Check for streak achievements (e.g. 3 days, 7 days, 30 days)
-        GamificationService.check_streak_achievements(user_id, category, new_streak)
-        
-        return new_streak
+            current += 1
+        setattr(streak_record, requirement_type, current)
+        return current
 
     @staticmethod
-    def check_streak_achievements(user_id, category, streak_count):
-        # Basic milestones
-        milestones = [3, 7, 14, 30, 90]
-        
-        if streak_count in milestones:
-            # Construct achievement codename, e.g., "workout_streak_7"
-            code = f"{category}_streak_{streak_count}"
-            
-            # Find or create mostly to ensure we don't crash, 
-            # in real app these should be seeded
-            ach = Achievement.query.filter_by(code=code).first()
-            if ach:
-                existing = UserAchievement.query.filter_by(user_id=user_id, achievement_id=ach.id).first()
-                if not existing:
-                    from app.shared.utils.timezone import now_cuiaba
-                    ua = UserAchievement(user_id=user_id, achievement_id=ach.id, unlocked_at=now_cuiaba())
-                    db.session.add(ua)
-                    db.session.commit()
-                    
-                    # Award XP for achievement
-                    GamificationService.award_xp(user_id, 50 * (streak_count // 3), f"Achievement: {ach.name}")
+    def _count(user_id, requirement_type):
+        if requirement_type == 'workout_count':
+            return WorkoutSession.query.filter_by(user_id=user_id, status='completed').count()
+        if requirement_type == 'meal_count':
+            return Meal.query.filter_by(user_id=user_id).count()
+        return 0
+
+    @staticmethod
+    def achievement_xp(rule):
+        """
+        Bônus por conquista
+
+        Streaks: proporcional ao limiar (7 dias = 100 XP, 30 dias = 500 XP).
+        Contagens: por ordem de grandeza (1 = 50 XP, 10 = 100, 100 = 150),
+        já que o limiar cresce muito mais rápido que o de um streak.
+        """
+        threshold = max(1, int(rule.threshold))
+        if rule.requirement_type in COUNT_REQUIREMENTS.values():
+            return 50 * (1 + int(math.log10(threshold)))
+        return 50 * max(1, threshold // 3)
+
+    @staticmethod
+    def _add_xp(user_id, amount):
+        """
+        Soma XP no banco (sem read-modify-write)
+
+        Returns:
+            (xp, level) após a soma, ou None sem perfil
+        """
+        new_xp = func.coalesce(UserProfile.xp, 0) + amount
+        return db.session.execute(
+            update(UserProfile)
+            .where(UserProfile.user_id == user_id)
+            # Mesma regra de calculate_level
+            .values(xp=new_xp, level=new_xp // 100 + 1)
+            .returning(UserProfile.xp, UserProfile.level)
+        ).first()
 
     @staticmethod
     def calculate_level(xp):
@@ -128,42 +270,39 @@ class GamificationService:
 
     @staticmethod
     def award_xp(user_id, amount, reason="Activity"):
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
-        if not profile:
+        result = GamificationService.apply_activity(user_id, None, amount)
+        if result is None:
             return None
         
-        if profile.xp is None:
-            profile.xp = 0
-            
-        old_level = GamificationService.calculate_level(profile.xp)
-        profile.xp += amount
-        new_level = GamificationService.calculate_level(profile.xp)
-        
-        # Check for level up
-        level_up = new_level > old_level
-        profile.level = new_level
-        
-        db.session.commit()
-        
         return {
-            "new_xp": profile.xp,
-            "level": new_level,
-            "level_up": level_up,
+            "new_xp": result['xp'],
+            "level": result['level'],
+            "level_up": result['level_up'],
             "gained": amount
         }
 
-    @staticmethod
-    def check_achievements(user_id, event_type):
-        # This would be more complex in real app, checking specific conditions
-        # For now, we just grant a 'First Step' achievement if not exists
-        if event_type == 'first_workout':
-            ach = Achievement.query.filter_by(name='Primeiro Passo').first()
-            if ach:
-                existing = UserAchievement.query.filter_by(user_id=user_id, achievement_id=ach.id).first()
-                if not existing:
-                    from app.shared.utils.timezone import now_cuiaba
-                    ua = UserAchievement(user_id=user_id, achievement_id=ach.id, unlocked_at=now_cuiaba())
-                    db.session.add(ua)
-                    db.session.commit()
-                    return ach.name
-        return None
+
+# ---------- Domain event subscribers ----------
+
+def _event_day(event):
+    """Dia da atividade no payload (eventos antigos sem 'day': hoje)"""
+    return date.fromisoformat(event['day']) if event.get('day') else get_today_cuiaba()
+
+
+@events.subscribe(MEAL_LOGGED, name='gamification')
+def on_meal_logged(event):
+    GamificationService.handle_activity(event['user_id'], 'meal_log', day=_event_day(event))
+
+
+@events.subscribe(WATER_LOGGED, name='gamification')
+def on_water_logged(event):
+    from app.modules.nutrition.application.nutrition_alerts import water_goal_status
+
+    day = _event_day(event)
+    total, target = water_goal_status(event['user_id'], day)
+    GamificationService.handle_activity(event['user_id'], 'hydration_log', is_goal_met=total >= target, day=day)
+
+
+@events.subscribe(WORKOUT_FINISHED, name='gamification')
+def on_workout_finished(event):
+    GamificationService.handle_activity(event['user_id'], 'workout_finish', day=_event_day(event))
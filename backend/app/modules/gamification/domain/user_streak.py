@@ -31,5 +31,8 @@ class UserStreak(db.Model):
     last_workout_date: Mapped[Optional[datetime.date]] = mapped_column(Date)
     last_nutrition_log_date: Mapped[Optional[datetime.date]] = mapped_column(Date)
     last_hydration_date: Mapped[Optional[datetime.date]] = mapped_column(Date)
+    # Contadores das conquistas por contagem (NULL até o primeiro evento)
+    workout_count: Mapped[Optional[int]] = mapped_column(Integer)
+    meal_count: Mapped[Optional[int]] = mapped_column(Integer)
 
     user: Mapped['User'] = relationship('User', back_populates='user_streaks')
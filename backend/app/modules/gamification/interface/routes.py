@@ -1,10 +1,13 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import func, desc
+import uuid
+from app.shared.extensions import db
 from app.modules.identity.domain.models import UserProfile, User
 from app.modules.gamification.domain.achievements import UserAchievement, Achievement
 from app.modules.gamification.domain.user_streak import UserStreak
 from app.modules.gamification.application.service import GamificationService
+from app.modules.gamification.application.leaderboard import LeaderboardService
 
 gamification_bp = Blueprint('gamification', __name__)
 
@@ -111,46 +114,109 @@ def get_leaderboard():
     ---
     tags:
       - Gamification
+    parameters:
+      - in: query
+        name: metric
+        type: string
+        enum: [xp, workout_streak, nutrition_streak]
+        default: xp
+      - in: query
+        name: period
+        type: string
+        enum: [all, week]
+        default: all
+      - in: query
+        name: limit
+        type: integer
+        default: 100
     responses:
       200:
         description: Leaderboard data
+      400:
+        description: Unknown metric or period
     """
-    # Query users with their profiles, ordered by level (DESC) and XP (DESC)
-    # Count achievements for each user
-    leaderboard_query = (
-        User.query
+    metric = request.args.get('metric', 'xp')
+    period = request.args.get('period', 'all')
+    limit = min(request.args.get('limit', 100, type=int), 100)
+    
+    try:
+        top = LeaderboardService.top(metric, period, limit)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    
+    # Profile data and medal counts only for the users on the board
+    user_ids = [uuid.UUID(entry['user_id']) for entry in top]
+    medals = (
+        db.session.query(UserAchievement.user_id, func.count(UserAchievement.id).label('medals_count'))
+        .filter(UserAchievement.user_id.in_(user_ids))
+        .group_by(UserAchievement.user_id)
+        .subquery()
+    )
+    rows = (
+        db.session.query(User.id, User.name, User.profile_picture, UserProfile.level, func.coalesce(medals.c.medals_count, 0).label('medals_count'))
         .join(UserProfile, User.id == UserProfile.user_id)
-        .outerjoin(UserAchievement, User.id == UserAchievement.user_id)
-        .filter(User.is_active == True)
-        .filter(User.deleted_at.is_(None))
-        .group_by(User.id, UserProfile.id)
-        .order_by(desc(UserProfile.level), desc(UserProfile.xp))
-        .limit(100)
-        .add_columns(
-            User.id,
-            User.name,
-            User.profile_picture,
-            UserProfile.level,
-            UserProfile.xp,
-            func.count(UserAchievement.id).label('medals_count')
-        )
+        .outerjoin(medals, medals.c.user_id == User.id)
+        .filter(User.id.in_(user_ids), User.is_active == True, User.deleted_at.is_(None))
+        .all()
     )
-    
-    results = leaderboard_query.all()
+    users = {str(row.id): row for row in rows}
     
     leaderboard = []
-    for idx, row in enumerate(results, start=1):
+    for entry in top:
+        row = users.get(entry['user_id'])
+        if row is None:
+            continue
         leaderboard.append({
-            "rank": idx,
-            "user_id": str(row.id),
+            "rank": entry['rank'],
+            "user_id": entry['user_id'],
             "name": row.name,
             "profile_picture": row.profile_picture,
             "level": row.level or 1,
+            "score": entry['score'],
             "medals_count": row.medals_count
         })
     
     return jsonify(leaderboard), 200
 
+@gamification_bp.route('/leaderboard/me', methods=['GET'])
+@jwt_required()
+def get_my_rank():
+    """
+    Get the current user's position on a leaderboard
+    ---
+    tags:
+      - Gamification
+    parameters:
+      - in: query
+        name: metric
+        type: string
+        default: xp
+      - in: query
+        name: period
+        type: string
+        default: all
+    responses:
+      200:
+        description: Rank and score (rank is null when not ranked)
+      400:
+        description: Unknown metric or period
+    """
+    user_id = get_jwt_identity()
+    metric = request.args.get('metric', 'xp')
+    period = request.args.get('period', 'all')
+    
+    try:
+        position = LeaderboardService.rank(user_id, metric, period)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    
+    return jsonify({
+        "metric": metric,
+        "period": period,
+        "rank": position['rank'] if position else None,
+        "score": position['score'] if position else 0
+    }), 200
+
 # Dev-only endpoint to test XP
 @gamification_bp.route('/debug/award-xp', methods=['POST'])
 @jwt_required()
@@ -3,7 +3,9 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.shared.extensions import db
 from app.modules.identity.domain.models import User
 from app.modules.training.domain.exercise_library import ExerciseLibrary
+from app.modules.training.application.exercise_catalog import ExerciseCatalog
 from app.modules.training.domain.models import Exercise
+from app.shared.utils.pagination import paginate, page_args, page_meta, InvalidCursor
 import uuid
 
 admin_bp = Blueprint('admin', __name__)
@@ -25,15 +27,18 @@ def check_admin():
 
 @admin_bp.route('/exercises', methods=['GET'])
 def get_exercises():
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)
+    cursor, limit, total = page_args(default_limit=50, default_total='exact')
     search = request.args.get('search', '')
     
     query = ExerciseLibrary.query.filter_by(is_active=True)
     if search:
         query = query.filter(ExerciseLibrary.name.ilike(f"%{search}%"))
         
-    pagination = query.order_by(ExerciseLibrary.name).paginate(page=page, per_page=per_page, error_out=False)
+    try:
+        page = paginate(query, (ExerciseLibrary.name, ExerciseLibrary.id), cursor=cursor, limit=limit,
+                        max_limit=200, descending=False, total=total)
+    except InvalidCursor:
+        return jsonify({"msg": "Invalid cursor"}), 400
     
     return jsonify({
         "items": [{
@@ -43,10 +48,8 @@ def get_exercises():
             "difficulty_level": ex.difficulty_level,
             "video_url": ex.video_url,
             "description": ex.description
-        } for ex in pagination.items],
-        "total": pagination.total,
-        "pages": pagination.pages,
-        "current_page": page
+        } for ex in page['items']],
+        **page_meta(page)
     })
 
 @admin_bp.route('/exercises', methods=['POST'])
@@ -73,6 +76,7 @@ def create_exercise():
     )
     db.session.add(new_ex)
     db.session.commit()
+    ExerciseCatalog.invalidate()
     return jsonify({"msg": "Exercise created", "id": new_ex.id}), 201
 
 @admin_bp.route('/exercises/<uuid:id>', methods=['PUT'])
@@ -88,6 +92,7 @@ def update_exercise(id):
     if 'instructions' in data: ex.instructions = data['instructions']
     
     db.session.commit()
+    ExerciseCatalog.invalidate()
     return jsonify({"msg": "Exercise updated"}), 200
 
 @admin_bp.route('/exercises/<uuid:id>', methods=['DELETE'])
@@ -102,6 +107,7 @@ def delete_exercise(id):
 
     db.session.delete(ex)
     db.session.commit()
+    ExerciseCatalog.invalidate()
     return jsonify({"msg": "Exercise deleted"}), 200
 
 @admin_bp.route('/stats', methods=['GET'])
@@ -174,11 +180,16 @@ def get_stats():
         }
     })
 
+@admin_bp.route('/metrics', methods=['GET'])
+def get_runtime_metrics():
+    """Runtime metrics of this worker process (queue depth, job latency, counters)"""
+    from app.shared.utils.metrics import metrics
+    return jsonify(metrics.snapshot()), 200
+
 @admin_bp.route('/users', methods=['GET'])
 def get_users():
     """Get users with advanced filtering and optional CSV export"""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
+    cursor, limit, total = page_args(default_limit=10, default_total='estimate')
     search = request.args.get('search', '')
     role = request.args.get('role', 'all')
     export_csv = request.args.get('export', 'false').lower() == 'true'
@@ -262,7 +273,10 @@ def get_users():
         output.headers["Content-type"] = "text/csv"
         return output
         
-    pagination = query.order_by(User.created_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
+    try:
+        page = paginate(query, (User.created_at, User.id), cursor=cursor, limit=limit, total=total)
+    except InvalidCursor:
+        return jsonify({"msg": "Invalid cursor"}), 400
     
     return jsonify({
         "users": [{
@@ -273,11 +287,8 @@ def get_users():
             "status": u.subscription_status or "active",
             "created_at": u.created_at.isoformat() if u.created_at else None,
             "last_login": u.last_login.isoformat() if u.last_login else None
-        } for u in pagination.items],
-        "total": pagination.total,
-        "pages": pagination.pages,
-        "current_page": page,
-        "per_page": per_page
+        } for u in page['items']],
+        **page_meta(page)
     })
 
 @admin_bp.route('/users/<uuid:id>', methods=['GET'])
@@ -310,6 +321,8 @@ def get_user_details(id):
 
 @admin_bp.route('/users/<uuid:id>', methods=['PUT'])
 def update_user(id):
+    from app.modules.coach.application.coach_context_service import CoachContextService
+
     user = User.query.get_or_404(id)
     data = request.get_json()
     
@@ -318,6 +331,7 @@ def update_user(id):
     if 'subscription_status' in data: user.subscription_status = data['subscription_status']
     
     db.session.commit()
+    CoachContextService.invalidate(str(id), 'profile')
     return jsonify({"msg": "User updated"}), 200
 
 @admin_bp.route('/users/<uuid:id>/suspend', methods=['PUT'])
@@ -355,8 +369,11 @@ def delete_user(id):
     if str(user.id) == current_user_id:
         return jsonify({"msg": "Cannot delete yourself"}), 400
         
+    from app.modules.gamification.application.leaderboard import LeaderboardService
+    
     db.session.delete(user)
     db.session.commit()
+    LeaderboardService.remove_user(id)
     return jsonify({"msg": "User deleted"}), 200
 
 # --- Notification Management ---
@@ -365,13 +382,18 @@ def delete_user(id):
 def list_system_notifications():
     from app.modules.communication.domain.notification import Notification
     
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    cursor, limit, total = page_args(default_total='estimate')
     
-    # List all notifications ordered by recent
-    pagination = Notification.query.order_by(Notification.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    # List all notifications ordered by recent, recipient email joined in
+    query = db.session.query(
+        Notification.id, Notification.title, Notification.message, Notification.type,
+        Notification.created_at, User.email.label('user_email')
+    ).outerjoin(User, Notification.user_id == User.id)
+    
+    try:
+        page = paginate(query, (Notification.created_at, Notification.id), cursor=cursor, limit=limit, total=total)
+    except InvalidCursor:
+        return jsonify({"msg": "Invalid cursor"}), 400
     
     return jsonify({
         "items": [{
@@ -379,12 +401,10 @@ def list_system_notifications():
             "title": n.title,
             "message": n.message,
             "type": n.type,
-            "user_email": n.user.email if n.user else "Unknown",
+            "user_email": n.user_email or "Unknown",
             "created_at": n.created_at.isoformat()
-        } for n in pagination.items],
-        "total": pagination.total,
-        "pages": pagination.pages,
-        "current_page": page
+        } for n in page['items']],
+        **page_meta(page)
     })
 
 @admin_bp.route('/notifications/broadcast', methods=['POST'])
@@ -399,67 +419,76 @@ def broadcast_notification():
     if not title or not message:
         return jsonify({"msg": "Title and message required"}), 400
         
-    count = NotificationService.broadcast_notification(title, message, type)
-    return jsonify({"msg": f"Notification sent to {count} users"}), 200
+    broadcast_id = NotificationService.start_broadcast(title, message, type)
+    return jsonify({"msg": "Broadcast queued", "broadcast_id": broadcast_id}), 202
+
+@admin_bp.route('/notifications/broadcast/<broadcast_id>', methods=['GET'])
+def get_broadcast_progress(broadcast_id):
+    from app.modules.communication.application.notification_service import NotificationService
+    
+    progress = NotificationService.get_broadcast_progress(broadcast_id)
+    if progress is None:
+        return jsonify({"msg": "Broadcast not found"}), 404
+    return jsonify(progress), 200
 
 # --- Workout Management ---
 
 @admin_bp.route('/workouts', methods=['GET'])
 def list_workouts():
     """
-    List all workout plans with pagination and filtering
+    List all workout plans with cursor pagination and filtering
+    
+    Plan, owner and day count come from a single query.
     """
+    from sqlalchemy import func
     from app.modules.training.domain.models import WorkoutPlan, WorkoutDay
     
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    cursor, limit, total = page_args(default_total='estimate')
     user_id = request.args.get('user_id', '')
     is_active = request.args.get('is_active', 'all')
     
-    query = WorkoutPlan.query
+    num_days = db.session.query(func.count(WorkoutDay.id))\
+        .filter(WorkoutDay.workout_plan_id == WorkoutPlan.id)\
+        .correlate(WorkoutPlan).scalar_subquery()
+    
+    query = db.session.query(
+        WorkoutPlan.id, WorkoutPlan.user_id, WorkoutPlan.name, WorkoutPlan.description,
+        WorkoutPlan.is_active, WorkoutPlan.generated_by_ai, WorkoutPlan.created_at,
+        User.name.label('user_name'), User.email.label('user_email'),
+        num_days.label('num_days')
+    ).join(User, WorkoutPlan.user_id == User.id)
     
     # Filter by user
     if user_id:
-        query = query.filter_by(user_id=user_id)
+        query = query.filter(WorkoutPlan.user_id == user_id)
     
     # Filter by active status
     if is_active != 'all':
-        query = query.filter_by(is_active=(is_active == 'true'))
-    
-    # Join with User for sorting/display
-    query = query.join(User, WorkoutPlan.user_id == User.id)
+        query = query.filter(WorkoutPlan.is_active == (is_active == 'true'))
     
-    pagination = query.order_by(WorkoutPlan.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    try:
+        page = paginate(query, (WorkoutPlan.created_at, WorkoutPlan.id), cursor=cursor, limit=limit, total=total)
+    except InvalidCursor:
+        return jsonify({"msg": "Invalid cursor"}), 400
     
     result = []
-    for plan in pagination.items:
-        # Count days
-        num_days = WorkoutDay.query.filter_by(workout_plan_id=plan.id).count()
-        
+    for plan in page['items']:
         result.append({
             "id": plan.id,
             "user": {
                 "id": plan.user_id,
-                "name": plan.user.name or plan.user.email.split('@')[0],
-                "email": plan.user.email
+                "name": plan.user_name or plan.user_email.split('@')[0],
+                "email": plan.user_email
             },
             "name": plan.name,
             "description": plan.description,
             "is_active": plan.is_active,
             "generated_by_ai": plan.generated_by_ai,
             "created_at": plan.created_at.isoformat() if plan.created_at else None,
-            "num_days": num_days
+            "num_days": plan.num_days
         })
     
-    return jsonify({
-        "workouts": result,
-        "total": pagination.total,
-        "pages": pagination.pages,
-        "current_page": page,
-        "per_page": per_page
-    })
+    return jsonify({"workouts": result, **page_meta(page)})
 
 @admin_bp.route('/workouts/<uuid:plan_id>', methods=['GET'])
 def get_workout_detail(plan_id):
@@ -516,15 +545,18 @@ def delete_workout(plan_id):
     Delete workout plan and all associated data (cascade)
     """
     from app.modules.training.domain.models import WorkoutPlan
+    from app.modules.coach.application.coach_context_service import CoachContextService
     
     plan = WorkoutPlan.query.get_or_404(plan_id)
     
     # Store user info for response
+    user_id = plan.user_id
     user_name = plan.user.name or plan.user.email
     
     # Delete will cascade to days and exercises
     db.session.delete(plan)
     db.session.commit()
+    CoachContextService.invalidate(user_id, 'workouts')
     
     return jsonify({"msg": f"Workout plan deleted successfully for user {user_name}"}), 200
 
@@ -534,7 +566,7 @@ def regenerate_workout(plan_id):
     Regenerate workout for a user (deactivate old, create new)
     """
     from app.modules.training.domain.models import WorkoutPlan
-    from app.modules.training.application.workout_generator import WorkoutGenerator
+    from app.modules.training.application.workout_generator import WorkoutGeneratorService
     
     plan = WorkoutPlan.query.get_or_404(plan_id)
     user = plan.user
@@ -542,15 +574,10 @@ def regenerate_workout(plan_id):
     if not user.profile:
         return jsonify({"msg": "User has no profile for workout generation"}), 400
     
-    # Deactivate current plan
-    plan.is_active = False
-    
-    # Generate new plan
+    # Generate new plan (the plan writer deactivates the current one)
     try:
-        generator = WorkoutGenerator(user.id)
-        new_plan = generator.generate()
-        
-        db.session.commit()
+        generator = WorkoutGeneratorService()
+        new_plan = generator.generate_workout_plan(user, user.profile)
         
         return jsonify({
             "msg": "Workout regenerated successfully",
@@ -569,8 +596,7 @@ def get_audit_logs():
     """Get audit logs with filtering and pagination"""
     from app.modules.identity.domain.audit_log import AuditLog
     
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    cursor, limit, total = page_args(default_total='estimate')
     
     # Filters
     user_id = request.args.get('user_id')
@@ -602,9 +628,10 @@ def get_audit_logs():
         except ValueError:
             pass
     
-    pagination = query.order_by(AuditLog.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    try:
+        page = paginate(query, (AuditLog.created_at, AuditLog.id), cursor=cursor, limit=limit, total=total)
+    except InvalidCursor:
+        return jsonify({"msg": "Invalid cursor"}), 400
     
     return jsonify({
         "logs": [{
@@ -617,10 +644,8 @@ def get_audit_logs():
             "description": log.description,
             "created_at": log.created_at.isoformat() if log.created_at else None,
             "ip_address": log.ip_address
-        } for log in pagination.items],
-        "total": pagination.total,
-        "pages": pagination.pages,
-        "current_page": page
+        } for log in page['items']],
+        **page_meta(page)
     })
 
 
@@ -708,21 +733,34 @@ def list_achievements_admin():
     from app.modules.gamification.domain.achievements import Achievement, UserAchievement
     from sqlalchemy import func
     
-    achievements = Achievement.query.filter_by(is_active=True).all()
+    # Unlock counts and active users in one grouped query
+    unlocks = db.session.query(
+        UserAchievement.achievement_id,
+        func.count(UserAchievement.id).label('unlock_count')
+    ).group_by(UserAchievement.achievement_id).subquery()
+    active_users = db.session.query(func.count(User.id)).filter(User.deleted_at.is_(None)).scalar_subquery()
+    
+    rows = db.session.query(
+        Achievement,
+        func.coalesce(unlocks.c.unlock_count, 0),
+        active_users
+    ).outerjoin(
+        unlocks, unlocks.c.achievement_id == Achievement.id
+    ).order_by(Achievement.category, Achievement.requirement_type, Achievement.requirement_value).all()
     
     result = []
-    for ach in achievements:
-        unlock_count = UserAchievement.query.filter_by(achievement_id=ach.id).count()
-        
+    for ach, unlock_count, total_users in rows:
         result.append({
             "id": ach.id,
+            "code": ach.code,
             "name": ach.name,
             "description": ach.description,
-            "tier": ach.tier,
             "icon": ach.icon,
-            "points": ach.points,
+            "category": ach.category,
+            "requirement_type": ach.requirement_type,
+            "requirement_value": ach.requirement_value,
             "unlock_count": unlock_count,
-            "unlock_rate": round((unlock_count / User.query.filter(User.deleted_at.is_(None)).count() * 100), 2) if User.query.count() > 0 else 0
+            "unlock_rate": round(unlock_count / total_users * 100, 2) if total_users else 0
         })
     
     return jsonify({"achievements": result})
@@ -732,23 +770,29 @@ def list_achievements_admin():
 def create_achievement_admin():
     """Create a new achievement"""
     from app.modules.gamification.domain.achievements import Achievement
+    from app.modules.gamification.application.achievement_catalog import AchievementCatalog
     
     data = request.get_json()
     
-    if not data.get('name') or not data.get('description'):
-        return jsonify({"msg": "Name and description required"}), 400
+    if not data.get('code') or not data.get('name') or not data.get('description'):
+        return jsonify({"msg": "Code, name and description required"}), 400
+    
+    if Achievement.query.filter_by(code=data['code']).first():
+        return jsonify({"msg": "Achievement code already exists"}), 409
     
     new_achievement = Achievement(
+        code=data['code'],
         name=data['name'],
         description=data['description'],
-        tier=data.get('tier', 'bronze'),
-        icon=data.get('icon', '🏆'),
-        points=data.get('points', 10),
-        criteria=data.get('criteria', {})
+        icon=data.get('icon', 'trophy'),
+        category=data.get('category'),
+        requirement_type=data.get('requirement_type'),
+        requirement_value=data.get('requirement_value')
     )
     
     db.session.add(new_achievement)
     db.session.commit()
+    AchievementCatalog.invalidate()
     
     return jsonify({
         "msg": "Achievement created",
@@ -760,24 +804,18 @@ def create_achievement_admin():
 def update_achievement_admin(achievement_id):
     """Update an achievement"""
     from app.modules.gamification.domain.achievements import Achievement
+    from app.modules.gamification.application.achievement_catalog import AchievementCatalog
     
     achievement = Achievement.query.get_or_404(achievement_id)
     data = request.get_json()
     
-    if 'name' in data:
-        achievement.name = data['name']
-    if 'description' in data:
-        achievement.description = data['description']
-    if 'tier' in data:
-        achievement.tier = data['tier']
-    if 'icon' in data:
-        achievement.icon = data['icon']
-    if 'points' in data:
-        achievement.points = data['points']
-    if 'criteria' in data:
-        achievement.criteria = data['criteria']
+    editable_fields = ['name', 'description', 'icon', 'category', 'requirement_type', 'requirement_value']
+    for field in editable_fields:
+        if field in data:
+            setattr(achievement, field, data[field])
     
     db.session.commit()
+    AchievementCatalog.invalidate()
     
     return jsonify({"msg": "Achievement updated"}), 200
 
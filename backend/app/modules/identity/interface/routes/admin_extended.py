@@ -8,8 +8,7 @@ def get_audit_logs():
     """Get audit logs with filtering and pagination"""
     from app.modules.identity.domain.audit_log import AuditLog
     
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    cursor, limit, total = page_args(default_total='estimate')
     
     # Filters
     user_id = request.args.get('user_id')
@@ -41,9 +40,10 @@ def get_audit_logs():
         except ValueError:
             pass
     
-    pagination = query.order_by(AuditLog.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    try:
+        page = paginate(query, (AuditLog.created_at, AuditLog.id), cursor=cursor, limit=limit, total=total)
+    except InvalidCursor:
+        return jsonify({"msg": "Invalid cursor"}), 400
     
     return jsonify({
         "logs": [{
@@ -56,10 +56,8 @@ def get_audit_logs():
             "description": log.description,
             "created_at": log.created_at.isoformat() if log.created_at else None,
             "ip_address": log.ip_address
-        } for log in pagination.items],
-        "total": pagination.total,
-        "pages": pagination.pages,
-        "current_page": page
+        } for log in page['items']],
+        **page_meta(page)
     })
 
 
@@ -147,21 +145,34 @@ def list_achievements_admin():
     from app.modules.gamification.domain.achievements import Achievement, UserAchievement
     from sqlalchemy import func
     
-    achievements = Achievement.query.filter_by(is_active=True).all()
+    # Unlock counts and active users in one grouped query
+    unlocks = db.session.query(
+        UserAchievement.achievement_id,
+        func.count(UserAchievement.id).label('unlock_count')
+    ).group_by(UserAchievement.achievement_id).subquery()
+    active_users = db.session.query(func.count(User.id)).filter(User.deleted_at.is_(None)).scalar_subquery()
+    
+    rows = db.session.query(
+        Achievement,
+        func.coalesce(unlocks.c.unlock_count, 0),
+        active_users
+    ).outerjoin(
+        unlocks, unlocks.c.achievement_id == Achievement.id
+    ).order_by(Achievement.category, Achievement.requirement_type, Achievement.requirement_value).all()
     
     result = []
-    for ach in achievements:
-        unlock_count = UserAchievement.query.filter_by(achievement_id=ach.id).count()
-        
+    for ach, unlock_count, total_users in rows:
         result.append({
             "id": ach.id,
+            "code": ach.code,
             "name": ach.name,
             "description": ach.description,
-            "tier": ach.tier,
             "icon": ach.icon,
-            "points": ach.points,
+            "category": ach.category,
+            "requirement_type": ach.requirement_type,
+            "requirement_value": ach.requirement_value,
             "unlock_count": unlock_count,
-            "unlock_rate": round((unlock_count / User.query.filter(User.deleted_at.is_(None)).count() * 100), 2) if User.query.count() > 0 else 0
+            "unlock_rate": round(unlock_count / total_users * 100, 2) if total_users else 0
         })
     
     return jsonify({"achievements": result})
@@ -171,23 +182,29 @@ def list_achievements_admin():
 def create_achievement_admin():
     """Create a new achievement"""
     from app.modules.gamification.domain.achievements import Achievement
+    from app.modules.gamification.application.achievement_catalog import AchievementCatalog
     
     data = request.get_json()
     
-    if not data.get('name') or not data.get('description'):
-        return jsonify({"msg": "Name and description required"}), 400
+    if not data.get('code') or not data.get('name') or not data.get('description'):
+        return jsonify({"msg": "Code, name and description required"}), 400
+    
+    if Achievement.query.filter_by(code=data['code']).first():
+        return jsonify({"msg": "Achievement code already exists"}), 409
     
     new_achievement = Achievement(
+        code=data['code'],
         name=data['name'],
         description=data['description'],
-        tier=data.get('tier', 'bronze'),
-        icon=data.get('icon', '🏆'),
-        points=data.get('points', 10),
-        criteria=data.get('criteria', {})
+        icon=data.get('icon', 'trophy'),
+        category=data.get('category'),
+        requirement_type=data.get('requirement_type'),
+        requirement_value=data.get('requirement_value')
     )
     
     db.session.add(new_achievement)
     db.session.commit()
+    AchievementCatalog.invalidate()
     
     return jsonify({
         "msg": "Achievement created",
@@ -199,24 +216,18 @@ def create_achievement_admin():
 def update_achievement_admin(achievement_id):
     """Update an achievement"""
     from app.modules.gamification.domain.achievements import Achievement
+    from app.modules.gamification.application.achievement_catalog import AchievementCatalog
     
     achievement = Achievement.query.get_or_404(achievement_id)
     data = request.get_json()
     
-    if 'name' in data:
-        achievement.name = data['name']
-    if 'description' in data:
-        achievement.description = data['description']
-    if 'tier' in data:
-        achievement.tier = data['tier']
-    if 'icon' in data:
-        achievement.icon = data['icon']
-    if 'points' in data:
-        achievement.points = data['points']
-    if 'criteria' in data:
-        achievement.criteria = data['criteria']
+    editable_fields = ['name', 'description', 'icon', 'category', 'requirement_type', 'requirement_value']
+    for field in editable_fields:
+        if field in data:
+            setattr(achievement, field, data[field])
     
     db.session.commit()
+    AchievementCatalog.invalidate()
     
     return jsonify({"msg": "Achievement updated"}), 200
 
@@ -5,6 +5,7 @@ from app.shared.extensions import db
 from app.modules.identity.domain.models import User, UserProfile
 from app.modules.analytics.domain.metrics_calculator import calculate_bmr, calculate_tdee
 from app.modules.training.application.workout_generator import WorkoutGeneratorService
+from app.modules.coach.application.coach_context_service import CoachContextService
 
 onboarding_bp = Blueprint('onboarding', __name__)
 
@@ -125,6 +126,7 @@ def save_onboarding_data():
         print(f"Error saving initial metric: {e}")
 
     db.session.commit()
+    CoachContextService.invalidate(user_id, 'profile', 'metrics')
     
     return jsonify({
         "msg": "Onboarding data saved",
@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.shared.extensions import db
 from app.modules.identity.domain.models import User, UserProfile
+from app.modules.coach.application.coach_context_service import CoachContextService
+from app.modules.analytics.application.dashboard_service import DashboardService
 
 profile_bp = Blueprint('profile', __name__)
 
@@ -123,6 +125,8 @@ def update_profile():
         user.name = data['name']
         
     db.session.commit()
+    CoachContextService.invalidate(user_id, 'profile')
+    DashboardService.refresh(user_id, 'profile')
     
     return jsonify({"msg": "Profile updated successfully"}), 200
 
@@ -0,0 +1,173 @@
+from app.shared.extensions import db
+from app.modules.nutrition.domain.daily_totals import DailyNutritionTotal
+from app.modules.nutrition.domain.models import Meal
+from app.modules.nutrition.domain.hydration import HydrationLog
+from app.shared.utils.timezone import now_cuiaba
+from datetime import datetime
+from sqlalchemy import func, select, literal, union_all, delete
+from sqlalchemy.dialects.postgresql import insert
+import uuid
+
+# Colunas acumuladas na tabela de totais
+TOTAL_COLUMNS = ('calories', 'protein_g', 'carbs_g', 'fat_g', 'meal_count', 'water_ml', 'hydration_log_count')
+
+
+class DailyTotalsService:
+    """
+    Totais diários de nutrição/hidratação (tabela daily_nutrition_totals)
+
+    As escritas aplicam deltas com INSERT ... ON CONFLICT DO UPDATE na mesma
+    sessão da refeição/log, então o total é gravado no mesmo commit. As
+    leituras de "quanto comi/bebi hoje" viram uma busca por chave primária.
+    """
+
+    # ---------- Escrita (chamar antes do commit) ----------
+
+    @staticmethod
+    def add_meal(meal, sign=1):
+        """Soma (ou subtrai com sign=-1) os valores de uma refeição ao dia dela"""
+        day = (meal.consumed_at or now_cuiaba()).date()
+        DailyTotalsService._apply(
+            meal.user_id, day,
+            calories=sign * (meal.calories or 0),
+            protein_g=sign * (meal.protein_g or 0),
+            carbs_g=sign * (meal.carbs_g or 0),
+            fat_g=sign * (meal.fat_g or 0),
+            meal_count=sign
+        )
+
+    @staticmethod
+    def remove_meal(meal):
+        """Desfaz a contribuição de uma refeição (delete ou antes de um update)"""
+        DailyTotalsService.add_meal(meal, sign=-1)
+
+    @staticmethod
+    def add_water(log):
+        day = (log.logged_at or now_cuiaba()).date()
+        DailyTotalsService._apply(
+            log.user_id, day,
+            water_ml=log.amount_ml or 0,
+            hydration_log_count=1
+        )
+
+    @staticmethod
+    def _apply(user_id, day, **deltas):
+        stmt = insert(DailyNutritionTotal).values(
+            user_id=uuid.UUID(str(user_id)),
+            day=day,
+            updated_at=datetime.utcnow(),
+            **{column: deltas.get(column, 0) for column in TOTAL_COLUMNS}
+        )
+        table = DailyNutritionTotal.__table__
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.day],
+            set_={
+                **{column: table.c[column] + stmt.excluded[column] for column in deltas},
+                'updated_at': stmt.excluded.updated_at
+            }
+        )
+        db.session.execute(stmt)
+
+    # ---------- Leitura ----------
+
+    @staticmethod
+    def get_day(user_id, day):
+        """
+        Totais de um dia
+
+        Returns:
+            dict {calories, protein, carbs, fats, meal_count, water_ml, hydration_log_count}
+        """
+        row = db.session.get(DailyNutritionTotal, (uuid.UUID(str(user_id)), day))
+        return DailyTotalsService._to_dict(row)
+
+    @staticmethod
+    def get_range(user_id, start_date, end_date):
+        """
+        Totais por dia no intervalo (datas inclusivas); dias sem registro ficam de fora
+
+        Returns:
+            dict {date: totais}
+        """
+        rows = DailyNutritionTotal.query.filter(
+            DailyNutritionTotal.user_id == uuid.UUID(str(user_id)),
+            DailyNutritionTotal.day >= start_date,
+            DailyNutritionTotal.day <= end_date
+        ).order_by(DailyNutritionTotal.day).all()
+        return {row.day: DailyTotalsService._to_dict(row) for row in rows}
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return {
+                "calories": 0, "protein": 0, "carbs": 0, "fats": 0,
+                "meal_count": 0, "water_ml": 0, "hydration_log_count": 0
+            }
+        return {
+            "calories": row.calories,
+            "protein": row.protein_g,
+            "carbs": row.carbs_g,
+            "fats": row.fat_g,
+            "meal_count": row.meal_count,
+            "water_ml": row.water_ml,
+            "hydration_log_count": row.hydration_log_count
+        }
+
+    # ---------- Backfill ----------
+
+    @staticmethod
+    def rebuild(user_id=None):
+        """
+        Recalcula a tabela a partir de meals e hydration_logs
+
+        Apaga os totais (de um usuário ou de todos) e reinsere tudo com um
+        único INSERT ... SELECT agrupado por usuário e dia.
+
+        Returns:
+            número de linhas (usuário, dia) gravadas
+        """
+        meal_day = func.date(Meal.consumed_at)
+        meals = select(
+            Meal.user_id.label('user_id'),
+            meal_day.label('day'),
+            func.coalesce(func.sum(Meal.calories), 0).label('calories'),
+            func.coalesce(func.sum(Meal.protein_g), 0).label('protein_g'),
+            func.coalesce(func.sum(Meal.carbs_g), 0).label('carbs_g'),
+            func.coalesce(func.sum(Meal.fat_g), 0).label('fat_g'),
+            func.count(Meal.id).label('meal_count'),
+            literal(0).label('water_ml'),
+            literal(0).label('hydration_log_count')
+        ).where(Meal.consumed_at.isnot(None)).group_by(Meal.user_id, meal_day)
+
+        log_day = func.date(HydrationLog.logged_at)
+        water = select(
+            HydrationLog.user_id.label('user_id'),
+            log_day.label('day'),
+            literal(0.0), literal(0.0), literal(0.0), literal(0.0), literal(0),
+            func.coalesce(func.sum(HydrationLog.amount_ml), 0),
+            func.count(HydrationLog.id)
+        ).where(HydrationLog.logged_at.isnot(None)).group_by(HydrationLog.user_id, log_day)
+
+        clear = delete(DailyNutritionTotal)
+        if user_id is not None:
+            user_uuid = uuid.UUID(str(user_id))
+            meals = meals.where(Meal.user_id == user_uuid)
+            water = water.where(HydrationLog.user_id == user_uuid)
+            clear = clear.where(DailyNutritionTotal.user_id == user_uuid)
+
+        combined = union_all(meals, water).subquery()
+        totals = select(
+            combined.c.user_id,
+            combined.c.day,
+            *[func.sum(combined.c[column]) for column in TOTAL_COLUMNS],
+            func.now()
+        ).group_by(combined.c.user_id, combined.c.day)
+
+        db.session.execute(clear)
+        result = db.session.execute(
+            insert(DailyNutritionTotal).from_select(
+                ['user_id', 'day', *TOTAL_COLUMNS, 'updated_at'], totals
+            )
+        )
+        db.session.commit()
+        return result.rowcount
@@ -0,0 +1,475 @@
+"""
+Geração de planos de dieta em background
+
+`/api/diet/generate` e `/api/diet/regenerate-day` criam um DietPlanJob e
+respondem na hora (202); o job 'diet.generate' chama o Gemini na fila e o
+cliente acompanha em `/api/diet/jobs/<id>`.
+
+- Pedidos repetidos do mesmo usuário (mesma semana / mesmo dia) enquanto um
+  job está pending/running devolvem esse job (índice único parcial).
+- Planos semanais ficam em cache pelo hash das preferências
+  (`preference_hash`): preferências iguais reaproveitam o plano sem chamar o
+  Gemini, a menos que o cliente peça `force` ou o usuário já tenha um plano
+  ativo (gerar de novo é pedir outro plano). Regenerar um dia nunca usa o
+  cache, já que o objetivo é uma variação.
+
+Metrics: diet.jobs.{created,coalesced,succeeded,failed,retried},
+diet.plan_cache.{hit,miss}, diet.jobs.run_ms.
+"""
+import os
+import json
+import uuid
+import hashlib
+import logging
+import unicodedata
+from datetime import datetime, timedelta
+from sqlalchemy.dialects.postgresql import insert
+
+from app.shared.extensions import db, cache, task_queue
+from app.shared.utils.metrics import metrics
+from app.modules.nutrition.domain.diet import DietPreference, DietPlan, DietPlanJob
+
+logger = logging.getLogger(__name__)
+
+PLAN_CACHE_TTL = int(os.environ.get('DIET_PLAN_CACHE_TTL', 24 * 3600))
+PLAN_TIMEOUT_SECONDS = float(os.environ.get('DIET_PLAN_TIMEOUT_SECONDS', 180))
+JOB_MAX_ATTEMPTS = int(os.environ.get('DIET_JOB_MAX_ATTEMPTS', 2))
+# Job pending/running há mais tempo que isso é considerado perdido (worker morreu)
+JOB_STALE_SECONDS = int(os.environ.get('DIET_JOB_STALE_SECONDS', 600))
+
+# Campos que entram no prompt (e portanto no hash)
+PREFERENCE_FIELDS = (
+    'goal', 'restrictions', 'allergies', 'budget', 'ingredient_access',
+    'meals_per_day', 'cooks_at_home', 'prep_time', 'dislikes', 'calorie_goal'
+)
+
+GOAL_MAP = {
+    'emagrecimento': 'perder peso de forma saudável',
+    'ganho_massa': 'ganhar massa muscular',
+    'manutencao': 'manter o peso atual',
+    'saude': 'melhorar a saúde geral'
+}
+
+BUDGET_MAP = {
+    'ate_300': 'até R$ 300/mês (muito econômico)',
+    '300_500': 'R$ 300-500/mês (econômico)',
+    '500_800': 'R$ 500-800/mês (moderado)',
+    'acima_800': 'acima de R$ 800/mês'
+}
+
+INGREDIENT_MAP = {
+    'basicos': 'APENAS ingredientes básicos e muito baratos: arroz, feijão, frango, ovos, batata, cenoura, tomate, banana, laranja',
+    'intermediarios': 'ingredientes intermediários incluindo carnes variadas e grãos especiais',
+    'sofisticados': 'ingredientes sofisticados como importados, orgânicos e especiarias raras'
+}
+
+PREP_TIME_MAP = {
+    'menos_15': 'menos de 15 minutos',
+    '15_30': '15-30 minutos',
+    '30_60': '30-60 minutos',
+    'mais_60': 'mais de 1 hora'
+}
+
+DAY_NORMALIZATION = {
+    'segunda': ['segunda', 'mon', 'monday', 'seg'],
+    'terca': ['terca', 'terça', 'tue', 'tuesday', 'ter'],
+    'quarta': ['quarta', 'wed', 'wednesday', 'qua'],
+    'quinta': ['quinta', 'thu', 'thursday', 'qui'],
+    'sexta': ['sexta', 'fri', 'friday', 'sex'],
+    'sabado': ['sabado', 'sábado', 'sat', 'saturday', 'sab'],
+    'domingo': ['domingo', 'sun', 'sunday', 'dom']
+}
+
+
+class DietPlanError(Exception):
+    """Falha definitiva (não adianta tentar de novo)"""
+
+
+class DietPlanService:
+
+    # ---------- Jobs ----------
+
+    @staticmethod
+    def preference_hash(pref):
+        """SHA-256 dos campos de DietPreference usados no prompt"""
+        data = {field: getattr(pref, field) for field in PREFERENCE_FIELDS}
+        if isinstance(data['restrictions'], list):
+            data['restrictions'] = sorted(data['restrictions'])
+        raw = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def request_job(user_id, pref, kind='week', day=None, force=False):
+        """
+        Cria (ou reaproveita) o job de geração
+
+        Plano semanal em cache para as mesmas preferências é aplicado na hora
+        e o job já nasce 'succeeded'.
+
+        Returns:
+            (DietPlanJob, created: bool)
+        """
+        request_key = 'week' if kind == 'week' else f"day:{day}"
+        pref_hash = DietPlanService.preference_hash(pref)
+
+        if kind == 'week' and not force:
+            # Quem já tem plano está pedindo outro, não o mesmo do cache
+            force = DietPlan.query.filter_by(user_id=user_id, is_active=True).first() is not None
+
+        if kind == 'week' and not force:
+            plan_data = DietPlanService._cached_plan(pref_hash)
+            if plan_data is not None:
+                plan = DietPlanService.save_week_plan(user_id, plan_data)
+                now = datetime.utcnow()
+                job = DietPlanJob(
+                    user_id=user_id, kind=kind, request_key=request_key, preference_hash=pref_hash,
+                    status='succeeded', plan_id=plan.id, result={"plan_id": str(plan.id), "plan": plan_data},
+                    created_at=now, started_at=now, finished_at=now
+                )
+                db.session.add(job)
+                db.session.commit()
+                metrics.incr('diet.jobs.created')
+                return job, True
+
+        for _ in range(2):
+            job_id = db.session.execute(
+                insert(DietPlanJob).values(
+                    id=uuid.uuid4(),
+                    user_id=user_id, kind=kind, day=day, request_key=request_key,
+                    preference_hash=pref_hash, status='pending', attempts=0,
+                    created_at=datetime.utcnow()
+                ).on_conflict_do_nothing(
+                    index_elements=[DietPlanJob.user_id, DietPlanJob.request_key],
+                    index_where=DietPlanJob.status.in_(DietPlanJob.ACTIVE_STATUSES)
+                ).returning(DietPlanJob.id)
+            ).scalar()
+
+            if job_id is not None:
+                db.session.commit()
+                try:
+                    task_queue.enqueue('diet.generate', {"job_id": str(job_id), "force": force}, key=f"diet:{user_id}")
+                except Exception as e:
+                    # Sem isso o job ficaria 'pending' e bloquearia novos pedidos até expirar
+                    job = db.session.get(DietPlanJob, job_id)
+                    DietPlanService._finish(job, 'failed', error=f'Could not queue job: {e}')
+                    db.session.commit()
+                    metrics.incr('diet.jobs.failed')
+                    raise
+                metrics.incr('diet.jobs.created')
+                return db.session.get(DietPlanJob, job_id), True
+
+            active = DietPlanJob.query.filter(
+                DietPlanJob.user_id == user_id,
+                DietPlanJob.request_key == request_key,
+                DietPlanJob.status.in_(DietPlanJob.ACTIVE_STATUSES)
+            ).with_for_update().first()
+
+            if active is None:
+                # Terminou entre o INSERT e o SELECT: tenta de novo
+                db.session.rollback()
+                continue
+
+            if active.created_at and datetime.utcnow() - active.created_at > timedelta(seconds=JOB_STALE_SECONDS):
+                DietPlanService._finish(active, 'failed', error='Job expired')
+                db.session.commit()
+                continue
+
+            db.session.commit()
+            metrics.incr('diet.jobs.coalesced')
+            return active, False
+
+        raise DietPlanError('Could not create diet plan job')
+
+    @staticmethod
+    def get_job(job_id, user_id):
+        """Job do usuário ou None (inclusive para id inválido)"""
+        try:
+            job_id = uuid.UUID(str(job_id))
+        except ValueError:
+            return None
+        return DietPlanJob.query.filter_by(id=job_id, user_id=user_id).first()
+
+    @staticmethod
+    def serialize_job(job):
+        return {
+            "job_id": str(job.id),
+            "kind": job.kind,
+            "day": job.day,
+            "status": job.status,
+            "result": job.result if job.status == 'succeeded' else None,
+            "error": job.error,
+            "plan_id": str(job.plan_id) if job.plan_id else None,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None
+        }
+
+    @staticmethod
+    def run_job(job_id, force=False):
+        """
+        Executa o job (handler da fila)
+
+        Args:
+            force: ignora o cache de planos semanais
+
+        Erros transitórios voltam o job para 'pending' e são relançados para a
+        fila tentar de novo, até JOB_MAX_ATTEMPTS; depois o job fica 'failed'.
+        """
+        job_id = uuid.UUID(str(job_id))
+        job = DietPlanJob.query.filter_by(id=job_id).with_for_update().first()
+        if job is None or job.status not in DietPlanJob.ACTIVE_STATUSES:
+            db.session.rollback()
+            return
+
+        job.status = 'running'
+        job.attempts += 1
+        job.started_at = datetime.utcnow()
+        db.session.commit()
+
+        try:
+            with metrics.timer('diet.jobs.run_ms'):
+                pref = DietPreference.query.filter_by(user_id=job.user_id).first()
+                if not pref:
+                    raise DietPlanError('Complete diet onboarding first')
+
+                if job.kind == 'week':
+                    plan_data = None if force else DietPlanService._cached_plan(job.preference_hash)
+                    if plan_data is None:
+                        plan_data = DietPlanService.generate_week(pref)
+                        DietPlanService._store_plan(job.preference_hash, plan_data)
+                    plan = DietPlanService.save_week_plan(job.user_id, plan_data)
+                    job.plan_id = plan.id
+                    result = {"plan_id": str(plan.id), "plan": plan_data}
+                else:
+                    day_plan = DietPlanService.generate_day(pref, job.day)
+                    plan = DietPlanService.apply_day(job.user_id, job.day, day_plan)
+                    job.plan_id = plan.id
+                    result = {"day": job.day, "day_plan": day_plan}
+
+            DietPlanService._finish(job, 'succeeded', result=result)
+            db.session.commit()
+            metrics.incr('diet.jobs.succeeded')
+
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(DietPlanJob, job_id)
+            if job is None:
+                return
+            retry = not isinstance(e, DietPlanError) and job.attempts < JOB_MAX_ATTEMPTS
+
+            if retry:
+                job.status = 'pending'
+                job.error = str(e)
+                db.session.commit()
+                metrics.incr('diet.jobs.retried')
+                raise
+
+            logger.error(f"Diet plan job {job_id} failed: {e}")
+            DietPlanService._finish(job, 'failed', error=str(e))
+            db.session.commit()
+            metrics.incr('diet.jobs.failed')
+
+    @staticmethod
+    def _finish(job, status, result=None, error=None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = datetime.utcnow()
+
+    # ---------- Cache de planos ----------
+
+    @staticmethod
+    def _cache_key(pref_hash):
+        return f"diet_plan:generated:{pref_hash}"
+
+    @staticmethod
+    def _cached_plan(pref_hash):
+        try:
+            plan_data = cache.get(DietPlanService._cache_key(pref_hash))
+        except Exception as e:
+            logger.warning(f"Diet plan cache read failed: {e}")
+            plan_data = None
+        metrics.incr('diet.plan_cache.hit' if plan_data is not None else 'diet.plan_cache.miss')
+        return plan_data
+
+    @staticmethod
+    def _store_plan(pref_hash, plan_data):
+        try:
+            cache.set(DietPlanService._cache_key(pref_hash), plan_data, timeout=PLAN_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Diet plan cache write failed: {e}")
+
+    # ---------- Persistência ----------
+
+    @staticmethod
+    def save_week_plan(user_id, plan_data):
+        """Desativa os planos anteriores e grava o novo como ativo (sem commit)"""
+        DietPlan.query.filter_by(user_id=user_id, is_active=True).update({'is_active': False})
+        cache.delete(f"diet_plan:{user_id}")
+
+        plan = DietPlan(
+            user_id=user_id,
+            weekly_plan=plan_data.get('weekly_plan'),
+            shopping_list=plan_data.get('shopping_list'),
+            macro_targets=plan_data.get('macro_targets'),
+            generated_by_ai=True,
+            is_active=True
+        )
+        db.session.add(plan)
+        db.session.flush()
+        return plan
+
+    @staticmethod
+    def apply_day(user_id, day, day_plan):
+        """Troca um dia do plano ativo (sem commit)"""
+        plan = DietPlan.query.filter_by(user_id=user_id, is_active=True).with_for_update().first()
+        if not plan:
+            raise DietPlanError('No active diet plan')
+
+        # SQLAlchemy requires assigning a new dictionary to JSON fields to track mutation
+        current_weekly = dict(plan.weekly_plan or {})
+        current_weekly[day] = day_plan
+        plan.weekly_plan = current_weekly
+        cache.delete(f"diet_plan:{user_id}")
+        return plan
+
+    # ---------- Gemini ----------
+
+    @staticmethod
+    def generate_week(pref):
+        """
+        Plano semanal com receitas e lista de compras
+
+        Raises:
+            DietPlanError se a resposta não for JSON
+        """
+        from app.modules.coach.infrastructure.gemini_service import GeminiService
+
+        prompt = f"""Você é um nutricionista especializado em dietas acessíveis para brasileiros.
+
+Crie um plano alimentar SEMANAL (7 dias) para uma pessoa com as seguintes características:
+
+**OBJETIVO:** {GOAL_MAP.get(pref.goal, pref.goal)}
+**ORÇAMENTO:** {BUDGET_MAP.get(pref.budget, pref.budget)}
+**INGREDIENTES DISPONÍVEIS:** {INGREDIENT_MAP.get(pref.ingredient_access, pref.ingredient_access)}
+**RESTRIÇÕES:** {', '.join(pref.restrictions) if pref.restrictions else 'Nenhuma'}
+**ALERGIAS:** {pref.allergies if pref.allergies else 'Nenhuma'}
+**ALIMENTOS QUE NÃO GOSTA:** {pref.dislikes if pref.dislikes else 'Nenhum'}
+**REFEIÇÕES POR DIA:** {pref.meals_per_day}
+**TEMPO DE PREPARO:** {PREP_TIME_MAP.get(pref.prep_time, pref.prep_time)}
+**META DE CALORIAS:** {pref.calorie_goal} kcal/dia
+
+REGRAS IMPORTANTES:
+1. Use APENAS ingredientes típicos brasileiros
+2. Se orçamento for baixo, priorize: arroz, feijão, frango, ovos, batata, banana
+3. Receitas devem ser MUITO SIMPLES de fazer
+4. Inclua preços aproximados (em R$)
+5. Seja realista com o orçamento
+
+Retorne APENAS um JSON válido com esta estrutura:
+{{
+  "weekly_plan": {{
+    "segunda": {{
+      "cafe": {{"nome": "...", "calorias": 0, "ingredientes": ["..."], "preparo":"..."}},
+      "almoco": {{"nome": "...", "calorias": 0, "ingredientes": ["..."], "preparo":"..."}},
+      "jantar": {{"nome": "...", "calorias": 0, "ingredientes": ["..."], "preparo":"..."}}
+    }},
+    ... (todos os 7 dias)
+  }},
+  "shopping_list": [
+    {{"item": "Arroz", "quantidade": "5kg", "preco_aprox": 25}}
+  ],
+  "macro_targets": {{
+    "protein": 150,
+    "carbs": 200,
+    "fats": 50
+  }},
+  "total_cost_week": 150
+}}"""
+
+        gemini = GeminiService()
+        # Plano semanal é a chamada mais longa do app: timeout próprio
+        request_options = {**gemini.request_options, "timeout": PLAN_TIMEOUT_SECONDS} if gemini.request_options else None
+        with gemini.registry.slot('diet_plan'):
+            response = gemini.model.generate_content(prompt, request_options=request_options)
+        response_text = response.text.strip()
+
+        # Robust JSON extraction: first '{' to last '}'
+        try:
+            start_idx = response_text.find('{')
+            end_idx = response_text.rfind('}')
+            if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
+                plan_data = json.loads(response_text[start_idx:end_idx + 1])
+            else:
+                plan_data = json.loads(response_text)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Diet plan JSON decode error: {e}; raw: {response_text[:500]}")
+            raise ValueError('Failed to parse AI response')
+
+        if 'weekly_plan' in plan_data:
+            plan_data['weekly_plan'] = DietPlanService.normalize_days(plan_data['weekly_plan'])
+        return plan_data
+
+    @staticmethod
+    def generate_day(pref, day):
+        """Recria as refeições de um dia respeitando as preferências"""
+        from app.modules.coach.infrastructure.gemini_service import GeminiService
+
+        prep_time = PREP_TIME_MAP.get(pref.prep_time, pref.prep_time)
+        prompt = f"""Você é um nutricionista especializado em dietas acessíveis para brasileiros.
+        Recrie o plano alimentar de UM DIA ({day}) respeitando RIGOROSAMENTE as preferências do usuário:
+
+        **OBJETIVO:** {GOAL_MAP.get(pref.goal, pref.goal)}
+        **ORÇAMENTO:** {BUDGET_MAP.get(pref.budget, pref.budget)}
+        **INGREDIENTES DISPONÍVEIS:** {INGREDIENT_MAP.get(pref.ingredient_access, pref.ingredient_access)}
+        **RESTRIÇÕES:** {', '.join(pref.restrictions) if pref.restrictions else 'Nenhuma'}
+        **ALERGIAS:** {pref.allergies if pref.allergies else 'Nenhuma'}
+        **ALIMENTOS QUE NÃO GOSTA:** {pref.dislikes if pref.dislikes else 'Nenhum'}
+        **TEMPO DE PREPARO:** {prep_time}
+        **META DE CALORIAS:** {pref.calorie_goal} kcal/dia
+
+        REGRAS IMPORTANTES:
+        1. Use APENAS ingredientes típicos brasileiros
+        2. Respeite o orçamento e ingredientes disponíveis
+        3. Receitas compatíveis com o tempo de preparo: {prep_time}
+
+        Retorne APENAS um JSON válido com esta estrutura:
+        {{
+          "cafe": {{"nome": "...", "calorias": 0, "ingredientes": ["..."], "preparo":"..."}},
+          "almoco": {{"nome": "...", "calorias": 0, "ingredientes": ["..."], "preparo":"..."}},
+          "jantar": {{"nome": "...", "calorias": 0, "ingredientes": ["..."], "preparo":"..."}}
+        }}"""
+
+        # Add 'lanche' if meals > 3
+        if pref.meals_per_day and pref.meals_per_day > 3:
+            prompt = prompt.replace('}}', ', "lanche": {"nome": "...", "calorias": 0, "ingredientes": ["..."], "preparo":"..."} }}')
+
+        day_plan = GeminiService().generate_json(prompt)
+        if not day_plan:
+            raise ValueError('Failed to generate content')
+        return day_plan
+
+    @staticmethod
+    def normalize_day(day):
+        """'Terça', 'tue', ... -> 'terca'; None se não for um dia da semana"""
+        k_norm = str(day).lower().strip()
+        k_no_accents = ''.join(c for c in unicodedata.normalize('NFD', k_norm) if unicodedata.category(c) != 'Mn')
+        for std_day, variants in DAY_NORMALIZATION.items():
+            if k_no_accents in variants:
+                return std_day
+        return None
+
+    @staticmethod
+    def normalize_days(weekly_plan):
+        """Normaliza as chaves dos dias (segunda..domingo, sem acento) para o frontend"""
+        normalized = {}
+        for key, value in weekly_plan.items():
+            k_norm = key.lower().strip()
+            k_no_accents = ''.join(c for c in unicodedata.normalize('NFD', k_norm) if unicodedata.category(c) != 'Mn')
+            normalized[DietPlanService.normalize_day(key) or k_no_accents] = value
+        return normalized
+
+
+@task_queue.task('diet.generate')
+def generate_diet_plan_task(payload):
+    """Job da fila: gera o plano (semana ou dia) de um DietPlanJob"""
+    DietPlanService.run_job(payload['job_id'], force=payload.get('force', False))
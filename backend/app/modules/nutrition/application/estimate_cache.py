@@ -0,0 +1,200 @@
+"""
+Content-addressed cache for AI nutrition estimates
+
+Text estimates are keyed by a normalized description (accents, punctuation
+and filler words removed, units canonicalised), so "200 gramas de Frango
+Grelhado!" and "200g frango grelhado" share an entry. Image analyses are
+keyed by the SHA-256 of the image bytes plus the normalized caption, so
+client retries of the same photo never reach Gemini again.
+
+Entries live in a per-process LRU with TTL. Optional fuzzy matching reuses an
+entry whose description has the same quantities and nearly the same words in
+the same order (order matters: "200g frango 100g arroz" is not
+"200g arroz 100g frango").
+"""
+import os
+import re
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from difflib import SequenceMatcher
+
+from app.shared.utils.metrics import metrics
+
+# Palavras que não mudam o alimento ("arroz e feijão" == "arroz com feijão")
+STOPWORDS = {'de', 'da', 'do', 'das', 'dos', 'com', 'e', 'a', 'o', 'as', 'os', 'um', 'uma', 'no', 'na', 'em'}
+
+UNIT_ALIASES = {
+    'gramas': 'g', 'grama': 'g', 'gr': 'g',
+    'quilo': 'kg', 'quilos': 'kg',
+    'mililitros': 'ml', 'mililitro': 'ml',
+    'litro': 'l', 'litros': 'l',
+}
+
+
+def normalize_description(text):
+    """
+    Canonical form of a food description
+
+    "200g de Frango Grelhado!" -> "200g frango grelhado"
+    """
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r'[^a-z0-9,.\s]', ' ', text)
+    text = re.sub(r'(\d),(\d)', r'\1.\2', text)  # 1,5 -> 1.5
+    text = re.sub(r'[,]', ' ', text)
+
+    tokens = []
+    for token in text.split():
+        token = token.strip('.')
+        if not token or token in STOPWORDS:
+            continue
+        token = UNIT_ALIASES.get(token, token)
+        # Glue units to the preceding number: "200 g" -> "200g"
+        if token in ('g', 'kg', 'ml', 'l') and tokens and re.fullmatch(r'\d+(\.\d+)?', tokens[-1]):
+            tokens[-1] += token
+            continue
+        tokens.append(token)
+
+    return ' '.join(tokens)
+
+
+def text_key(description):
+    return f"text:{normalize_description(description)}"
+
+
+def image_key(images_data, description=None):
+    """SHA-256 over every image (in order) plus the normalized caption"""
+    digest = hashlib.sha256()
+    for image in images_data:
+        digest.update(image['data'])
+        digest.update(b'\0')
+    digest.update(normalize_description(description).encode())
+    return f"image:{digest.hexdigest()}"
+
+
+class EstimateCache:
+    """Thread-safe LRU + TTL cache with optional fuzzy lookup on text keys"""
+
+    def __init__(self, max_entries=5000, ttl_seconds=7 * 24 * 3600, fuzzy=False, fuzzy_threshold=0.8):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.fuzzy = fuzzy
+        self.fuzzy_threshold = fuzzy_threshold
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        # Fuzzy index: quantity signature -> {key: words without quantities}
+        self._fuzzy_index = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _split_text_key(key):
+        tokens = key[len('text:'):].split()
+        quantities = tuple(t for t in tokens if t[0].isdigit())
+        words = ' '.join(t for t in tokens if not t[0].isdigit())
+        return quantities, words
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self._record_hit('exact')
+                    return entry[1]
+                self._remove(key)
+
+            if self.fuzzy and key.startswith('text:'):
+                match = self._fuzzy_lookup(key, now)
+                if match is not None:
+                    self._record_hit('fuzzy')
+                    return match
+
+            self.misses += 1
+            metrics.incr('nutrition.estimate_cache.misses')
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+
+            if key.startswith('text:'):
+                quantities, words = self._split_text_key(key)
+                self._fuzzy_index.setdefault(quantities, {})[key] = words
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                metrics.incr('nutrition.estimate_cache.evictions')
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._fuzzy_index.clear()
+
+    def _record_hit(self, kind):
+        self.hits += 1
+        metrics.incr(f'nutrition.estimate_cache.hits.{kind}')
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        if key.startswith('text:'):
+            quantities, _ = self._split_text_key(key)
+            bucket = self._fuzzy_index.get(quantities)
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del self._fuzzy_index[quantities]
+
+    def _fuzzy_lookup(self, key, now):
+        """Closest word sequence among entries with exactly the same quantities"""
+        quantities, words = self._split_text_key(key)
+        if not words:
+            return None
+
+        best_key, best_score = None, 0
+        for candidate, candidate_words in self._fuzzy_index.get(quantities, {}).items():
+            score = SequenceMatcher(None, words, candidate_words).ratio()
+            if score > best_score:
+                best_key, best_score = candidate, score
+
+        if best_key is None or best_score < self.fuzzy_threshold:
+            return None
+
+        expires_at, value = self._entries[best_key]
+        if expires_at <= now:
+            self._remove(best_key)
+            return None
+
+        self._entries.move_to_end(best_key)
+        return value
+
+
+# Global instance (per worker process)
+estimate_cache = EstimateCache(
+    max_entries=int(os.environ.get('NUTRITION_CACHE_MAX_ENTRIES', 5000)),
+    ttl_seconds=int(os.environ.get('NUTRITION_CACHE_TTL_SECONDS', 7 * 24 * 3600)),
+    fuzzy=os.environ.get('NUTRITION_CACHE_FUZZY', 'false').lower() == 'true',
+    fuzzy_threshold=float(os.environ.get('NUTRITION_CACHE_FUZZY_THRESHOLD', 0.8))
+)
+metrics.register_gauge('nutrition.estimate_cache.entries', lambda: len(estimate_cache._entries))
@@ -0,0 +1,120 @@
+import json
+from app.modules.analytics.domain.nutrition_analyzer import NutritionAnalyzerService
+from app.modules.coach.infrastructure.gemini_service import GeminiService
+from app.modules.nutrition.application.estimate_cache import estimate_cache, text_key, image_key
+from app.modules.nutrition.application.food_table import get_food_table
+from app.shared.utils.metrics import metrics
+
+
+class NutritionEstimateService:
+    """
+    Estimativas nutricionais por IA com cache na frente do Gemini
+
+    Descrições de alimentos comuns são resolvidas pela tabela local (TACO);
+    descrições repetidas e reenvios da mesma foto são respondidos pelo cache
+    do processo. O Gemini só é chamado quando nenhum dos dois resolve.
+    """
+
+    @staticmethod
+    def estimate_from_text(description):
+        """
+        Estima macros a partir de uma descrição textual
+
+        Returns:
+            dict {name, calories, protein, carbs, fats}
+
+        Raises:
+            ValueError: se o Gemini não retornar um JSON válido
+        """
+        local = get_food_table().estimate(description)
+        if local is not None:
+            metrics.incr('nutrition.estimate.local')
+            return local
+
+        key = text_key(description)
+        cached = estimate_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
+        metrics.incr('nutrition.estimate.gemini')
+        gemini = GeminiService()
+
+        prompt = f"""Analise a seguinte descrição de alimento e retorne APENAS um JSON válido com as estimativas nutricionais:
+
+Descrição: {description}
+
+Retorne no formato JSON:
+{{
+    "name": "nome do alimento",
+    "calories": número_inteiro,
+    "protein": número_inteiro,
+    "carbs": número_inteiro,
+    "fats": número_inteiro
+}}
+
+Exemplo para "200g de frango grelhado":
+{{
+    "name": "Frango Grelhado",
+    "calories": 330,
+    "protein": 62,
+    "carbs": 0,
+    "fats": 7
+}}
+
+IMPORTANTE: Retorne APENAS o JSON, sem explicações, sem markdown, sem código adicional."""
+
+        response_text = gemini.generate_text(prompt)
+        if not response_text:
+            raise ValueError("Empty response from Gemini")
+
+        # Remove markdown code blocks if present
+        if response_text.startswith('```'):
+            start = response_text.find('{')
+            end = response_text.rfind('}') + 1
+            if start != -1 and end > start:
+                response_text = response_text[start:end]
+
+        nutrition_data = json.loads(response_text)
+        estimate_cache.set(key, nutrition_data)
+
+        return dict(nutrition_data)
+
+    @staticmethod
+    def estimate_offline(description):
+        """
+        Estimativa sem IA para quando o Gemini falha
+
+        Aceita correspondências menos confiáveis da tabela local; sem nenhuma,
+        retorna um valor padrão.
+        """
+        local = get_food_table().estimate(description, min_confidence=0.5)
+        if local is not None:
+            return local
+
+        return {
+            "name": description,
+            "calories": 200,  # Default estimate
+            "protein": 15,
+            "carbs": 20,
+            "fats": 5
+        }
+
+    @staticmethod
+    def analyze_images(images_data, description=None):
+        """
+        Analisa fotos de refeição (lista de {'data': bytes, 'mime_type': str})
+
+        Resultados com erro ou vazios não são cacheados.
+        """
+        key = image_key(images_data, description)
+        cached = estimate_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
+        analyzer = NutritionAnalyzerService()
+        result = analyzer.analyze_meal(images_data, description)
+
+        if result and "error" not in result:
+            estimate_cache.set(key, result)
+
+        return dict(result) if result else result
@@ -0,0 +1,363 @@
+"""
+Local food composition table (TACO-style, values per 100 g / 100 ml)
+
+The table is loaded once per process into column arrays (array module, one
+float column per macro) with two indexes over food names and aliases:
+
+- a sorted name list for prefix lookups (autocomplete);
+- a trigram -> food ids map for fuzzy matching of free-text descriptions.
+
+`estimate()` splits a description into items ("200g de frango, arroz e
+feijão"), parses each quantity/unit, matches the food and scales the macro
+columns for all items in one pass. It returns None when any item has no
+confident match so the caller can fall back to Gemini.
+
+Names are compared word by word in the singular ("bananas" -> "banana"), and
+a multi-word item must share at least two words with the food name, so
+"frango frito" does not land on "Peito de frango grelhado". Measures whose
+size depends on the food ("lata") come from the `measures` column.
+"""
+import os
+import re
+import csv
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'taco_foods.csv')
+
+# Fração mínima dos trigramas do item que precisa existir no alimento
+MIN_CONFIDENCE = 0.75
+
+NUMBER_WORDS = {
+    'um': 1, 'uma': 1, 'dois': 2, 'duas': 2, 'tres': 3, 'quatro': 4, 'cinco': 5,
+    'seis': 6, 'meio': 0.5, 'meia': 0.5,
+}
+
+# Unidades de massa/volume (gramas ou ml por unidade)
+MASS_UNITS = {
+    'g': 1, 'gr': 1, 'grama': 1, 'gramas': 1,
+    'kg': 1000, 'quilo': 1000, 'quilos': 1000,
+    'ml': 1, 'l': 1000, 'litro': 1000, 'litros': 1000,
+}
+
+# Medidas caseiras aproximadas em gramas
+HOUSEHOLD_UNITS = {
+    'colher': 15, 'colheres': 15, 'colher de sopa': 15, 'colheres de sopa': 15,
+    'colher de cha': 5, 'colheres de cha': 5,
+    'xicara': 160, 'xicaras': 160,
+    'concha': 140, 'conchas': 140,
+    'copo': 200, 'copos': 200,
+    'escumadeira': 90, 'escumadeiras': 90,
+    'porcao': None, 'porcoes': None, 'prato': None,
+}
+UNIT_WORDS = {'unidade', 'unidades', 'un', 'fatia', 'fatias', 'pedaco', 'pedacos'}
+# Medidas que só existem por alimento (coluna `measures`, ex. "lata:120")
+FOOD_UNITS = {'lata'}
+
+SEGMENT_SPLIT = re.compile(r',|;|\+|\be\b|\bcom\b|\bmais\b')
+FILLER_WORDS = {'de', 'do', 'da', 'dos', 'das', 'a', 'o'}
+QUANTITY = re.compile(r'^(\d+(?:\.\d+)?)\s*([a-z]+)?$')
+
+
+def _fold(text):
+    """Lowercase without accents and punctuation (except decimal separators)"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r'(\d),(\d)', r'\1.\2', text)
+    return re.sub(r'[^a-z0-9.,;+\s]', ' ', text)
+
+
+def _singular(word):
+    """Plural regular do português -> singular ("bananas", "paes", "pasteis")"""
+    if len(word) <= 3 or not word.endswith('s'):
+        return word
+    if word.endswith(('oes', 'aes')):
+        return word[:-3] + 'ao'
+    if word.endswith('eis'):
+        return word[:-3] + 'el'
+    if word.endswith(('res', 'zes')):
+        return word[:-2]
+    if word.endswith('eses'):
+        # "franceses" -> "frances", e "frances" segue a regra geral como a chave
+        return _singular(word[:-2])
+    if word.endswith('ns'):
+        return word[:-2] + 'm'
+    return word[:-1]
+
+
+def _key(text):
+    """Texto comparável: sem acentos, sem artigos/preposições, no singular"""
+    return ' '.join(_singular(w) for w in _fold(text).split() if w not in FILLER_WORDS)
+
+
+def _is_unit(word):
+    return (word in MASS_UNITS or word in HOUSEHOLD_UNITS or word in UNIT_WORDS
+            or _singular(word) in FOOD_UNITS)
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FoodTable:
+    """Array-backed food table with prefix and trigram indexes"""
+
+    def __init__(self, rows):
+        self.names = []
+        self.kcal = array('f')
+        self.protein = array('f')
+        self.carbs = array('f')
+        self.fat = array('f')
+        self.portion_g = array('f')
+        self.unit_g = array('f')  # 0 = alimento sem unidade natural
+
+        # Medidas próprias do alimento: {food_id: {unidade: gramas}}
+        self._measures = {}
+
+        # Chaves pesquisáveis (nome + aliases) -> id do alimento
+        self._key_food = array('H')
+        self._key_len = array('H')
+        self._keys = []
+        self._key_words = []
+        self._trigram_index = {}
+        self._prefix = []  # sorted (key, food_id)
+
+        for row in rows:
+            food_id = len(self.names)
+            self.names.append(row['name'])
+            self.kcal.append(float(row['kcal']))
+            self.protein.append(float(row['protein_g']))
+            self.carbs.append(float(row['carbs_g']))
+            self.fat.append(float(row['fat_g']))
+            self.portion_g.append(float(row['portion_g'] or 100))
+            self.unit_g.append(float(row['unit_g'] or 0))
+
+            measures = {}
+            for measure in (row.get('measures') or '').split('|'):
+                if measure.strip():
+                    unit, grams = measure.split(':')
+                    measures[_singular(unit.strip())] = float(grams)
+            if measures:
+                self._measures[food_id] = measures
+
+            keys = {_key(row['name'])}
+            keys.update(_key(alias) for alias in (row.get('aliases') or '').split('|') if alias.strip())
+            for key in keys:
+                key_id = len(self._keys)
+                self._keys.append(key)
+                self._key_words.append(frozenset(key.split()))
+                self._key_food.append(food_id)
+                grams = _trigrams(key)
+                self._key_len.append(len(grams))
+                for gram in grams:
+                    self._trigram_index.setdefault(gram, array('H')).append(key_id)
+                self._prefix.append((key, food_id))
+
+        self._prefix.sort()
+
+    @classmethod
+    def load(cls, path=DATA_FILE):
+        with open(path, encoding='utf-8') as f:
+            return cls(csv.DictReader(f))
+
+    # ---------- Lookup ----------
+
+    def search_prefix(self, prefix, limit=10):
+        """Alimentos cujo nome/alias começa com `prefix` (autocomplete)"""
+        prefix = _key(prefix)
+        if not prefix:
+            return []
+
+        results, seen = [], set()
+        idx = bisect_left(self._prefix, (prefix, -1))
+        while idx < len(self._prefix) and len(results) < limit:
+            key, food_id = self._prefix[idx]
+            if not key.startswith(prefix):
+                break
+            if food_id not in seen:
+                seen.add(food_id)
+                results.append(self.describe(food_id))
+            idx += 1
+        return results
+
+    def match(self, text):
+        """
+        Melhor alimento para um item sem quantidade
+
+        Um item com duas ou mais palavras só casa com chaves que tenham pelo
+        menos duas delas: uma palavra em comum ("frango") não basta.
+
+        Returns:
+            (food_id, confidence) ou (None, 0)
+        """
+        text = _key(text)
+        query = _trigrams(text)
+        if not query:
+            return None, 0
+        words = set(text.split())
+        min_shared = min(len(words), 2)
+
+        # Contagem de trigramas em comum por chave
+        overlap = array('H', bytes(2 * len(self._keys)))
+        for gram in query:
+            for key_id in self._trigram_index.get(gram, ()):
+                overlap[key_id] += 1
+
+        best_key, best = None, (0, 0)
+        for key_id, common in enumerate(overlap):
+            if not common:
+                continue
+            if min_shared > 1 and len(words & self._key_words[key_id]) < min_shared:
+                continue
+            coverage = common / len(query)
+            jaccard = common / (len(query) + self._key_len[key_id] - common)
+            # Cobertura da consulta primeiro; Jaccard desempata (prefere o nome mais próximo)
+            if (coverage, jaccard) > best:
+                best_key, best = key_id, (coverage, jaccard)
+
+        if best_key is None:
+            return None, 0
+        return self._key_food[best_key], best[0]
+
+    def describe(self, food_id):
+        return {
+            "name": self.names[food_id],
+            "calories": round(self.kcal[food_id]),
+            "protein": round(self.protein[food_id], 1),
+            "carbs": round(self.carbs[food_id], 1),
+            "fats": round(self.fat[food_id], 1),
+            "per": "100g"
+        }
+
+    # ---------- Estimation ----------
+
+    def parse_items(self, description):
+        """
+        Divide a descrição em itens (quantidade, unidade, texto)
+
+        "2 ovos e 200g de arroz" -> [(2, None, 'ovos'), (200, 'g', 'arroz')]
+        "arroz 150" -> [(150, None, 'arroz')]
+        """
+        items = []
+        for segment in SEGMENT_SPLIT.split(_fold(description)):
+            words = segment.split()
+            if not words:
+                continue
+
+            amount, unit = None, None
+            first = words[0]
+            quantity = QUANTITY.match(first)
+            if quantity:
+                amount, unit = float(quantity.group(1)), quantity.group(2)
+                words = words[1:]
+            elif first in NUMBER_WORDS:
+                amount = NUMBER_WORDS[first]
+                words = words[1:]
+
+            # Unidade separada do número: "200 g", "2 colheres de sopa"
+            if unit is None and words:
+                for size in (3, 1):
+                    candidate = ' '.join(words[:size])
+                    if _is_unit(candidate):
+                        unit, words = candidate, words[size:]
+                        break
+
+            # Quantidade no fim: "arroz 150", "arroz 150g", "arroz 150 g"
+            if amount is None and len(words) > 1:
+                tail = QUANTITY.match(words[-1])
+                if tail:
+                    amount, unit, words = float(tail.group(1)), tail.group(2), words[:-1]
+                elif len(words) > 2 and words[-1] in MASS_UNITS:
+                    tail = QUANTITY.match(words[-2])
+                    if tail and tail.group(2) is None:
+                        amount, unit, words = float(tail.group(1)), words[-1], words[:-2]
+
+            text = ' '.join(w for w in words if w not in FILLER_WORDS)
+            if text:
+                items.append((amount, unit, text))
+        return items
+
+    def _grams(self, food_id, amount, unit):
+        """Gramas do item, ou None se a medida não existe para o alimento"""
+        if unit in MASS_UNITS:
+            return (amount or 1) * MASS_UNITS[unit]
+        measure = self._measures.get(food_id, {}).get(_singular(unit)) if unit else None
+        if measure:
+            return (amount or 1) * measure
+        if unit and _singular(unit) in FOOD_UNITS:
+            return None
+        if unit in HOUSEHOLD_UNITS:
+            per_unit = HOUSEHOLD_UNITS[unit] or self.portion_g[food_id]
+            return (amount or 1) * per_unit
+        if amount is None:
+            return self.portion_g[food_id]
+        # Número sem unidade: contagem se o alimento tem unidade natural ("2 ovos"),
+        # senão gramas para valores grandes ("arroz 150") e porções para pequenos
+        if unit in UNIT_WORDS or amount < 20:
+            return amount * (self.unit_g[food_id] or self.portion_g[food_id])
+        return amount
+
+    def estimate(self, description, min_confidence=MIN_CONFIDENCE):
+        """
+        Estima macros de uma descrição com um ou mais itens
+
+        Returns:
+            dict {name, calories, protein, carbs, fats, items, source} ou
+            None se algum item não tiver correspondência confiável
+        """
+        items = self.parse_items(description or '')
+        if not items:
+            return None
+
+        food_ids = array('H')
+        grams = array('f')
+        for amount, unit, text in items:
+            food_id, confidence = self.match(text)
+            if food_id is None or confidence < min_confidence:
+                return None
+            item_grams = self._grams(food_id, amount, unit)
+            if item_grams is None:
+                return None
+            food_ids.append(food_id)
+            grams.append(item_grams)
+
+        # Fatores de escala de todos os itens aplicados a cada coluna de uma vez
+        factors = [g / 100 for g in grams]
+        columns = {
+            "calories": self.kcal, "protein": self.protein,
+            "carbs": self.carbs, "fats": self.fat
+        }
+        totals = {
+            field: sum(column[i] * f for i, f in zip(food_ids, factors))
+            for field, column in columns.items()
+        }
+
+        return {
+            "name": description,
+            "calories": int(totals['calories']),
+            "protein": int(totals['protein']),
+            "carbs": int(totals['carbs']),
+            "fats": int(totals['fats']),
+            "items": [
+                {"food": self.names[i], "grams": round(g)}
+                for i, g in zip(food_ids, grams)
+            ],
+            "source": "local"
+        }
+
+
+_table = None
+_lock = threading.Lock()
+
+
+def get_food_table():
+    """Tabela carregada uma vez por processo"""
+    global _table
+    if _table is None:
+        with _lock:
+            if _table is None:
+                _table = FoodTable.load()
+    return _table
@@ -0,0 +1,60 @@
+from app.shared.extensions import db
+from app.modules.nutrition.domain.daily_totals import DailyNutritionTotal
+from sqlalchemy import func, select, cast, DateTime
+
+# Períodos da API -> unidade do date_trunc (semana começa na segunda, como no Postgres)
+PERIOD_UNITS = {
+    'dia': 'day',
+    'semana': 'week',
+    'mes': 'month',
+    'ano': 'year',
+}
+
+
+class NutritionHistoryService:
+    """Histórico nutricional agregado no banco (GROUP BY date_trunc sobre os totais diários)"""
+
+    @staticmethod
+    def aggregate(user_id, start_date, end_date, unit='day'):
+        """
+        Soma calorias, macros e número de refeições por período
+
+        Uma única query agrupada sobre daily_nutrition_totals: o custo depende
+        do número de dias no intervalo, não do número de refeições do usuário.
+        Dias só com hidratação (meal_count = 0) ficam de fora.
+
+        Args:
+            user_id: UUID do usuário
+            start_date, end_date: datas inclusivas
+            unit: 'day', 'week', 'month' ou 'year'
+
+        Returns:
+            lista ordenada de dicts {date, calories, protein, carbs, fats, meal_count}
+        """
+        bucket = func.date_trunc(unit, cast(DailyNutritionTotal.day, DateTime)).label('bucket')
+
+        stmt = select(
+            bucket,
+            func.coalesce(func.sum(DailyNutritionTotal.calories), 0).label('calories'),
+            func.coalesce(func.sum(DailyNutritionTotal.protein_g), 0).label('protein'),
+            func.coalesce(func.sum(DailyNutritionTotal.carbs_g), 0).label('carbs'),
+            func.coalesce(func.sum(DailyNutritionTotal.fat_g), 0).label('fats'),
+            func.coalesce(func.sum(DailyNutritionTotal.meal_count), 0).label('meal_count')
+        ).where(
+            DailyNutritionTotal.user_id == user_id,
+            DailyNutritionTotal.day >= start_date,
+            DailyNutritionTotal.day <= end_date,
+            DailyNutritionTotal.meal_count > 0
+        ).group_by(bucket).order_by(bucket)
+
+        return [
+            {
+                "date": row.bucket.date().isoformat(),
+                "calories": float(row.calories),
+                "protein": float(row.protein),
+                "carbs": float(row.carbs),
+                "fats": float(row.fats),
+                "meal_count": int(row.meal_count)
+            }
+            for row in db.session.execute(stmt)
+        ]
@@ -0,0 +1,73 @@
+"""
+Alertas de nutrição/hidratação (subscribers de MEAL_LOGGED e WATER_LOGGED)
+
+Rodam na fila, fora da requisição que registrou a refeição/água.
+"""
+from datetime import date
+
+from app.shared.extensions import events
+from app.shared.events import MEAL_LOGGED, WATER_LOGGED
+from app.modules.identity.domain.models import User
+from app.modules.nutrition.domain.hydration import HydrationGoal
+from app.modules.nutrition.application.daily_totals_service import DailyTotalsService
+
+
+def water_goal_status(user_id, day):
+    """
+    Returns:
+        (total_ml, goal_ml) do dia
+    """
+    total = DailyTotalsService.get_day(user_id, day)['water_ml']
+    goal = HydrationGoal.query.filter_by(user_id=user_id).first()
+    return total, goal.daily_goal_ml if goal else 2500
+
+
+@events.subscribe(MEAL_LOGGED, name='nutrition_alerts')
+def notify_meal_goals(event):
+    from app.modules.communication.application.notification_service import NotificationService
+
+    user_id = event['user_id']
+    user = User.query.get(user_id)
+    if not user or not user.profile:
+        return
+
+    tdee = user.profile.tdee or 2000
+    weight = user.profile.current_weight_kg or 70
+    protein_goal = weight * 2.0  # Simple estimation: 2g per kg
+
+    daily = DailyTotalsService.get_day(user_id, date.fromisoformat(event['day']))
+
+    # 1. Calorie Danger
+    if daily['calories'] > tdee:
+        NotificationService.trigger_notification(
+            user_id=user_id,
+            type='system',  # Warning/System
+            title='Cuidado com as Calorias! ⚠️',
+            message=f'Você ultrapassou sua estimativa diária de {int(tdee)} kcal.',
+            link_type='nutrition'
+        )
+
+    # 2. Protein Goal
+    if daily['protein'] >= protein_goal:
+        NotificationService.trigger_notification(
+            user_id=user_id,
+            type='goal',
+            title='Meta de Proteína Batida! 🥩',
+            message=f'Excelente! Você atingiu {int(daily["protein"])}g de proteína hoje.',
+            link_type='nutrition'
+        )
+
+
+@events.subscribe(WATER_LOGGED, name='nutrition_alerts')
+def notify_water_goal(event):
+    from app.modules.communication.application.notification_service import NotificationService
+
+    total, target = water_goal_status(event['user_id'], date.fromisoformat(event['day']))
+    if total >= target:
+        NotificationService.trigger_notification(
+            user_id=event['user_id'],
+            type='goal',
+            title='Meta de Hidratação Atingida! 💧',
+            message=f'Parabéns! Você atingiu sua meta de {target}ml de água hoje.',
+            link_type='hydration'
+        )
@@ -0,0 +1,27 @@
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import UUID
+from app.shared.extensions import db
+
+class DailyNutritionTotal(db.Model):
+    """
+    Totais diários por usuário (refeições + hidratação)
+
+    Mantido incrementalmente pelo DailyTotalsService na mesma transação das
+    escritas em meals/hydration_logs. O dia é a data local (Cuiabá) de
+    consumed_at/logged_at.
+    """
+    __tablename__ = 'daily_nutrition_totals'
+
+    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+
+    calories = db.Column(db.Float, nullable=False, default=0)
+    protein_g = db.Column(db.Float, nullable=False, default=0)
+    carbs_g = db.Column(db.Float, nullable=False, default=0)
+    fat_g = db.Column(db.Float, nullable=False, default=0)
+    meal_count = db.Column(db.Integer, nullable=False, default=0)
+
+    water_ml = db.Column(db.Integer, nullable=False, default=0)
+    hydration_log_count = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -39,3 +39,42 @@ class DietPlan(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class DietPlanJob(db.Model):
+    """
+    Geração assíncrona de plano (semana inteira ou um dia)
+
+    Estados: pending -> running -> succeeded | failed. O índice único parcial
+    garante no máximo um job em andamento por (usuário, request_key), que é
+    onde pedidos repetidos se juntam.
+    """
+    __tablename__ = 'diet_plan_jobs'
+
+    ACTIVE_STATUSES = ('pending', 'running')
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+
+    kind = db.Column(db.String(10), nullable=False)  # week, day
+    day = db.Column(db.String(20))  # só para kind='day'
+    request_key = db.Column(db.String(40), nullable=False)  # 'week' ou 'day:<dia>'
+    preference_hash = db.Column(db.String(64), nullable=False)
+
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    plan_id = db.Column(UUID(as_uuid=True), db.ForeignKey('diet_plans.id', ondelete='SET NULL'))
+    result = db.Column(JSON)
+    error = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index(
+            'ux_diet_plan_jobs_inflight', 'user_id', 'request_key', unique=True,
+            postgresql_where=db.text("status IN ('pending', 'running')")
+        ),
+        db.Index('ix_diet_plan_jobs_user_created', 'user_id', 'created_at'),
+    )
@@ -5,6 +5,9 @@ from app.shared.extensions import db
 
 class HydrationLog(db.Model):
     __tablename__ = 'hydration_logs'
+    __table_args__ = (
+        db.Index('ix_hydration_logs_user_logged', 'user_id', 'logged_at'),
+    )
 
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=False)
@@ -5,6 +5,9 @@ from app.shared.extensions import db
 
 class Meal(db.Model):
     __tablename__ = 'meals'
+    __table_args__ = (
+        db.Index('ix_meals_user_consumed', 'user_id', 'consumed_at'),
+    )
 
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=False)
@@ -1,11 +1,11 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.shared.extensions import db, cache
-from app.modules.nutrition.domain.diet import DietPreference, DietPlan
-from app.modules.coach.infrastructure.gemini_service import GeminiService
+from app.modules.nutrition.domain.diet import DietPreference, DietPlan, DietPlanJob
+from app.modules.nutrition.application.diet_plan_service import DietPlanService
+from app.modules.analytics.application.dashboard_service import DashboardService
 from datetime import datetime
 import uuid
-import json
 
 
 def make_cache_key(*args, **kwargs):
@@ -101,6 +101,8 @@ def save_diet_preferences():
         current_app.logger.error(f"Unexpected error saving diet preferences: {str(e)}")
         return jsonify({"msg": "An unexpected error occurred"}), 500
     
+    DashboardService.refresh(user_id, 'nutrition')
+    
     return jsonify({
         "msg": "Preferences saved",
         "id": str(pref.id)
@@ -111,182 +113,79 @@ def save_diet_preferences():
 @jwt_required()
 def generate_diet_plan():
     """
-    Generate personalized diet plan using Gemini AI
+    Start personalized diet plan generation (Gemini AI, background job)
     ---
     tags:
       - Diet
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: object
+          properties:
+            force:
+              type: boolean
+              description: Ignore plans cached for the same preferences
     responses:
-      201:
-        description: Diet plan generated successfully
+      200:
+        description: Plan applied from cache (job already succeeded)
+      202:
+        description: Job queued or already in progress; poll /api/diet/jobs/<job_id>
       400:
         description: Complete diet onboarding first
-      500:
-        description: Generation failed
     """
     user_id = uuid.UUID(get_jwt_identity())
+    data = request.get_json(silent=True) or {}
     
-    # Get user preferences
     pref = DietPreference.query.filter_by(user_id=user_id).first()
-    
     if not pref:
         return jsonify({"msg": "Complete diet onboarding first"}), 400
     
     try:
-        gemini = GeminiService()
-        
-        # Build context-aware prompt
-        goal_map = {
-            'emagrecimento': 'perder peso de forma saudável',
-            'ganho_massa': 'ganhar massa muscular',
-            'manutencao': 'manter o peso atual',
-            'saude': 'melhorar a saúde geral'
-        }
-        
-        budget_map = {
-            'ate_300': 'até R$ 300/mês (muito econômico)',
-            '300_500': 'R$ 300-500/mês (econômico)',
-            '500_800': 'R$ 500-800/mês (moderado)',
-            'acima_800': 'acima de R$ 800/mês'
-        }
-        
-        ingredient_map = {
-            'basicos': 'APENAS ingredientes básicos e muito baratos: arroz, feijão, frango, ovos, batata, cenoura, tomate, banana, laranja',
-            'intermediarios': 'ingredientes intermediários incluindo carnes variadas e grãos especiais',
-            'sofisticados': 'ingredientes sofisticados como importados, orgânicos e especiarias raras'
-        }
-        
-        prep_time_map = {
-            'menos_15': 'menos de 15 minutos',
-            '15_30': '15-30 minutos',
-            '30_60': '30-60 minutos',
-            'mais_60': 'mais de 1 hora'
-        }
-        
-        prompt = f"""Você é um nutricionista especializado em dietas acessíveis para brasileiros.
-
-Crie um plano alimentar SEMANAL (7 dias) para uma pessoa com as seguintes características:
-
-**OBJETIVO:** {goal_map.get(pref.goal, pref.goal)}
-**ORÇAMENTO:** {budget_map.get(pref.budget, pref.budget)}
-**INGREDIENTES DISPONÍVEIS:** {ingredient_map.get(pref.ingredient_access, pref.ingredient_access)}
-**RESTRIÇÕES:** {', '.join(pref.restrictions) if pref.restrictions else 'Nenhuma'}
-**ALERGIAS:** {pref.allergies if pref.allergies else 'Nenhuma'}
-**ALIMENTOS QUE NÃO GOSTA:** {pref.dislikes if pref.dislikes else 'Nenhum'}
-**REFEIÇÕES POR DIA:** {pref.meals_per_day}
-**TEMPO DE PREPARO:** {prep_time_map.get(pref.prep_time, pref.prep_time)}
-**META DE CALORIAS:** {pref.calorie_goal} kcal/dia
+        job, _ = DietPlanService.request_job(user_id, pref, kind='week', force=bool(data.get('force')))
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error queueing diet plan: {e}")
+        return jsonify({"msg": f"Error generating plan: {str(e)}"}), 500
+    
+    return _job_response(job)
 
-REGRAS IMPORTANTES:
-1. Use APENAS ingredientes típicos brasileiros
-2. Se orçamento for baixo, priorize: arroz, feijão, frango, ovos, batata, banana
-3. Receitas devem ser MUITO SIMPLES de fazer
-4. Inclua preços aproximados (em R$)
-5. Seja realista com o orçamento
 
-Retorne APENAS um JSON válido com esta estrutura:
-{{
-  "weekly_plan": {{
-    "segunda": {{
-      "cafe": {{"nome": "...", "calorias": 0, "ingredientes": ["..."], "preparo":"..."}},
-      "almoco": {{"nome": "...", "calorias": 0, "ingredientes": ["..."], "preparo":"..."}},
-      "jantar": {{"nome": "...", "calorias": 0, "ingredientes": ["..."], "preparo":"..."}}
-    }},
-    ... (todos os 7 dias)
-  }},
-  "shopping_list": [
-    {{"item": "Arroz", "quantidade": "5kg", "preco_aprox": 25}}
-  ],
-  "macro_targets": {{
-    "protein": 150,
-    "carbs": 200,
-    "fats": 50
-  }},
-  "total_cost_week": 150
-}}"""
+@diet_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_diet_job(job_id):
+    """
+    Diet generation job status
+    ---
+    tags:
+      - Diet
+    parameters:
+      - in: path
+        name: job_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: "Job: status pending | running | succeeded | failed; result when succeeded"
+      404:
+        description: Job not found
+    """
+    user_id = uuid.UUID(get_jwt_identity())
+    
+    job = DietPlanService.get_job(job_id, user_id)
+    if not job:
+        return jsonify({"msg": "Job not found"}), 404
+    
+    return jsonify(DietPlanService.serialize_job(job)), 200
 
-        response = gemini.model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        print(f"Diet plan response: {response_text[:500]}")  # Debug
-        
-        # Robust JSON extraction
-        try:
-            # Find the first '{' and the last '}'
-            start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}')
-            
-            if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-                json_str = response_text[start_idx:end_idx+1]
-                plan_data = json.loads(json_str)
-            else:
-                # Fallback if no braces found (unlikely but possible)
-                plan_data = json.loads(response_text)
-                
-        except json.JSONDecodeError as e:
-            print(f"JSON Decode Error: {e}")
-            print(f"Raw Text: {response_text}")
-            return jsonify({"msg": "Failed to parse AI response"}), 500
 
-        # Normalize keys in weekly_plan to ensure frontend compatibility
-        if 'weekly_plan' in plan_data:
-            normalized_weekly = {}
-            normalization_map = {
-                'segunda': ['segunda', 'mon', 'monday', 'seg'],
-                'terca': ['terca', 'terça', 'tue', 'tuesday', 'ter'],
-                'quarta': ['quarta', 'wed', 'wednesday', 'qua'],
-                'quinta': ['quinta', 'thu', 'thursday', 'qui'],
-                'sexta': ['sexta', 'fri', 'friday', 'sex'],
-                'sabado': ['sabado', 'sábado', 'sat', 'saturday', 'sab'],
-                'domingo': ['domingo', 'sun', 'sunday', 'dom']
-            }
-            
-            for key, value in plan_data['weekly_plan'].items():
-                k_norm = key.lower().strip()
-                # Remove accents from key if present
-                import unicodedata
-                k_no_accents = ''.join(c for c in unicodedata.normalize('NFD', k_norm) if unicodedata.category(c) != 'Mn')
-                
-                # Setup specific mapping
-                matched_day = k_no_accents # default to itself
-                
-                # Check explicit map
-                for std_day, variants in normalization_map.items():
-                    if k_no_accents in variants:
-                        matched_day = std_day
-                        break
-                
-                normalized_weekly[matched_day] = value
-            
-            plan_data['weekly_plan'] = normalized_weekly
-        
-        # Deactivate old plans
-        DietPlan.query.filter_by(user_id=user_id, is_active=True).update({'is_active': False})
-        
-        # Invalidate cache
-        cache.delete(f"diet_plan:{user_id}")
-        
-        # Save new plan
-        new_plan = DietPlan(
-            user_id=user_id,
-            weekly_plan=plan_data.get('weekly_plan'),
-            shopping_list=plan_data.get('shopping_list'),
-            macro_targets=plan_data.get('macro_targets'),
-            generated_by_ai=True,
-            is_active=True
-        )
-        
-        db.session.add(new_plan)
-        db.session.commit()
-        
-        return jsonify({
-            "msg": "Diet plan generated successfully",
-            "plan_id": str(new_plan.id),
-            "plan": plan_data
-        }), 201
-        
-    except Exception as e:
-        print(f"Error generating diet plan: {e}")
-        return jsonify({"msg": f"Error generating plan: {str(e)}"}), 500
+def _job_response(job):
+    """202 + Location enquanto o job está na fila; 200 se já terminou"""
+    body = DietPlanService.serialize_job(job)
+    if job.status in DietPlanJob.ACTIVE_STATUSES:
+        body["status_url"] = f"/api/diet/jobs/{job.id}"
+        return jsonify(body), 202, {"Location": body["status_url"]}
+    return jsonify(body), 200
 
 
 @diet_bp.route('/plan', methods=['GET'])
@@ -323,7 +222,7 @@ def get_current_diet_plan():
 @jwt_required()
 def regenerate_day_plan():
     """
-    Regenerate diet plan for a specific day
+    Start regeneration of the diet plan for a specific day (background job)
     ---
     tags:
       - Diet
@@ -339,19 +238,24 @@ def regenerate_day_plan():
               type: string
               example: "segunda"
     responses:
-      200:
-        description: Day regenerated
+      202:
+        description: Job queued or already in progress; result.day_plan in /api/diet/jobs/<job_id>
       400:
-        description: Day required or onboarding not complete
+        description: Day missing or not a weekday, or onboarding not complete
       404:
         description: No active diet plan
     """
     user_id = uuid.UUID(get_jwt_identity())
-    data = request.get_json()
+    data = request.get_json() or {}
     day = data.get('day')
     
     if not day:
         return jsonify({"msg": "Day is required"}), 400
+    
+    # Mesma chave do weekly_plan ('terça' -> 'terca'); o resto não cabe no job
+    day = DietPlanService.normalize_day(day) if isinstance(day, str) else None
+    if not day:
+        return jsonify({"msg": "Day must be a weekday (segunda..domingo)"}), 400
         
     # Get user preferences
     pref = DietPreference.query.filter_by(user_id=user_id).first()
@@ -362,92 +266,15 @@ def regenerate_day_plan():
     plan = DietPlan.query.filter_by(user_id=user_id, is_active=True).first()
     if not plan:
         return jsonify({"msg": "No active diet plan"}), 404
-        
+    
     try:
-        gemini = GeminiService()
-        
-        # Build context-aware prompt (Reuse maps for consistency)
-        goal_map = {
-            'emagrecimento': 'perder peso de forma saudável',
-            'ganho_massa': 'ganhar massa muscular',
-            'manutencao': 'manter o peso atual',
-            'saude': 'melhorar a saúde geral'
-        }
-        
-        budget_map = {
-            'ate_300': 'até R$ 300/mês (muito econômico)',
-            '300_500': 'R$ 300-500/mês (econômico)',
-            '500_800': 'R$ 500-800/mês (moderado)',
-            'acima_800': 'acima de R$ 800/mês'
-        }
-        
-        ingredient_map = {
-            'basicos': 'APENAS ingredientes básicos e muito baratos: arroz, feijão, frango, ovos, batata, cenoura, tomate, banana, laranja',
-            'intermediarios': 'ingredientes intermediários incluindo carnes variadas e grãos especiais',
-            'sofisticados': 'ingredientes sofisticados como importados, orgânicos e especiarias raras'
-        }
-        
-        prep_time_map = {
-            'menos_15': 'menos de 15 minutos',
-            '15_30': '15-30 minutos',
-            '30_60': '30-60 minutos',
-            'mais_60': 'mais de 1 hora'
-        }
-        
-        prompt = f"""Você é um nutricionista especializado em dietas acessíveis para brasileiros.
-        Recrie o plano alimentar de UM DIA ({day}) respeitando RIGOROSAMENTE as preferências do usuário:
-        
-        **OBJETIVO:** {goal_map.get(pref.goal, pref.goal)}
-        **ORÇAMENTO:** {budget_map.get(pref.budget, pref.budget)}
-        **INGREDIENTES DISPONÍVEIS:** {ingredient_map.get(pref.ingredient_access, pref.ingredient_access)}
-        **RESTRIÇÕES:** {', '.join(pref.restrictions) if pref.restrictions else 'Nenhuma'}
-        **ALERGIAS:** {pref.allergies if pref.allergies else 'Nenhuma'}
-        **ALIMENTOS QUE NÃO GOSTA:** {pref.dislikes if pref.dislikes else 'Nenhum'}
-        **TEMPO DE PREPARO:** {prep_time_map.get(pref.prep_time, pref.prep_time)}
-        **META DE CALORIAS:** {pref.calorie_goal} kcal/dia
-        
-        REGRAS IMPORTANTES:
-        1. Use APENAS ingredientes típicos brasileiros
-        2. Respeite o orçamento e ingredientes disponíveis
-        3. Receitas compatíveis com o tempo de preparo: {prep_time_map.get(pref.prep_time, pref.prep_time)}
-
-        Retorne APENAS um JSON válido com esta estrutura:
-        {{
-          "cafe": {{"nome": "...", "calorias": 0, "ingredientes": ["..."], "preparo":"..."}},
-          "almoco": {{"nome": "...", "calorias": 0, "ingredientes": ["..."], "preparo":"..."}},
-          "jantar": {{"nome": "...", "calorias": 0, "ingredientes": ["..."], "preparo":"..."}}
-        }}"""
-        
-        # Add 'lanche' if meals > 3
-        if pref.meals_per_day and pref.meals_per_day > 3:
-             prompt = prompt.replace('}}', ', "lanche": {"nome": "...", "calorias": 0, "ingredientes": ["..."], "preparo":"..."} }}')
-
-        new_day_plan = gemini.generate_json(prompt)
-        
-        if new_day_plan:
-            # Update plan
-            # Note: SQLAlchemy requires assigning a new dictionary to JSON fields to track mutation
-            current_weekly = dict(plan.weekly_plan)
-            current_weekly[day] = new_day_plan
-            plan.weekly_plan = current_weekly
-            
-            # Invalidate cache
-            cache.delete(f"diet_plan:{user_id}")
-            
-            # db.session.add(plan) # Not strictly needed if object is attached, but safe
-            db.session.commit()
-            
-            return jsonify({
-                "msg": "Day regenerated",
-                "day_plan": new_day_plan
-            }), 200
-        else:
-             return jsonify({"msg": "Failed to generate content"}), 500
-             
+        job, _ = DietPlanService.request_job(user_id, pref, kind='day', day=day)
     except Exception as e:
         db.session.rollback()
         print(f"Error regenerating day: {e}")
         return jsonify({"msg": f"Error: {str(e)}"}), 500
+    
+    return _job_response(job)
 
 
 @diet_bp.route('/shopping-list', methods=['PUT'])
@@ -1,7 +1,6 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.shared.extensions import db
-from app.modules.nutrition.domain.models import Meal
+from app.modules.nutrition.application.history_service import NutritionHistoryService, PERIOD_UNITS
 from datetime import datetime, timedelta
 import uuid
 
@@ -45,52 +44,20 @@ def get_nutrition_history():
         except ValueError:
             pass
     
-    # Query meals
-    start_datetime = datetime.combine(start_date, datetime.min.time())
-    end_datetime = datetime.combine(end_date, datetime.max.time())
-    
-    meals = Meal.query.filter(
-        Meal.user_id == user_id,
-        Meal.consumed_at >= start_datetime,
-        Meal.consumed_at <= end_datetime
-    ).order_by(Meal.consumed_at).all()
-    
-    # Aggregate by period
-    aggregated_data = {}
-    
-    for meal in meals:
-        meal_date = meal.consumed_at.date()
-        
-        # Determine grouping key
-        if period == 'dia':
-            key = meal_date.isoformat()
-        elif period == 'semana':
-            # Start of week (Monday)
-            week_start = meal_date - timedelta(days=meal_date.weekday())
-            key = week_start.isoformat()
-        elif period == 'mes':
-            key = f"{meal_date.year}-{meal_date.month:02d}-01"
-        else:  # ano
-            key = f"{meal_date.year}-01-01"
-        
-        if key not in aggregated_data:
-            aggregated_data[key] = {
-                'date': key,
-                'calories': 0,
-                'protein': 0,
-                'carbs': 0,
-                'fats': 0,
-                'meals_count': 0
-            }
-        
-        aggregated_data[key]['calories'] += meal.calories or 0
-        aggregated_data[key]['protein'] += meal.protein_g or 0
-        aggregated_data[key]['carbs'] += meal.carbs_g or 0
-        aggregated_data[key]['fats'] += meal.fat_g or 0
-        aggregated_data[key]['meals_count'] += 1
-    
-    # Convert to list and sort
-    data_list = sorted(aggregated_data.values(), key=lambda x: x['date'])
+    # Aggregate by period in the database
+    data_list = [
+        {
+            'date': row['date'],
+            'calories': row['calories'],
+            'protein': row['protein'],
+            'carbs': row['carbs'],
+            'fats': row['fats'],
+            'meals_count': row['meal_count']
+        }
+        for row in NutritionHistoryService.aggregate(
+            user_id, start_date, end_date, PERIOD_UNITS.get(period, 'year')
+        )
+    ]
     
     # Calculate summary
     total_calories = sum(d['calories'] for d in data_list)
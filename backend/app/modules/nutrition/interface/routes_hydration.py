@@ -1,11 +1,14 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.shared.extensions import db
+from app.shared.extensions import db, events
+from app.shared.events import WATER_LOGGED
 from app.modules.nutrition.domain.hydration import HydrationLog, HydrationGoal
 from datetime import datetime, timedelta
 from sqlalchemy import func
 from app.shared.utils.timezone import now_cuiaba, get_today_cuiaba, to_cuiaba
-from collections import defaultdict
+from app.modules.nutrition.application.daily_totals_service import DailyTotalsService
+from app.modules.coach.application.coach_context_service import CoachContextService
+from app.modules.analytics.application.dashboard_service import DashboardService
 
 hydration_bp = Blueprint('hydration', __name__)
 
@@ -49,6 +52,7 @@ def set_goal():
         goal.updated_at = now_cuiaba()
         
     db.session.commit()
+    DashboardService.refresh(user_id, 'hydration')
     return jsonify({"msg": "Hydration goal updated", "goal_ml": goal.daily_goal_ml}), 200
 
 @hydration_bp.route('/log', methods=['POST'])
@@ -89,69 +93,18 @@ def log_intake():
     )
     
     db.session.add(log)
+    DailyTotalsService.add_water(log)
     db.session.commit()
+    CoachContextService.invalidate(user_id, 'nutrition')
+    DashboardService.refresh(user_id, 'hydration')
     
-    # Check for Goal Achievement
-    try:
-        from app.modules.communication.application.notification_service import NotificationService
-        
-        today = get_today_cuiaba()
-        start_of_day = datetime.combine(today, datetime.min.time())
-        end_of_day = datetime.combine(today, datetime.max.time())
-        
-        # Recalculate total including new log
-        daily_logs = HydrationLog.query.filter(
-            HydrationLog.user_id == user_id,
-            HydrationLog.logged_at >= start_of_day,
-            HydrationLog.logged_at <= end_of_day
-        ).all()
-        
-        total = sum(l.amount_ml for l in daily_logs)
-        
-        # Get goal
-        goal_obj = HydrationGoal.query.filter_by(user_id=user_id).first()
-        target = goal_obj.daily_goal_ml if goal_obj else 2500
-        
-        if total >= target:
-            NotificationService.trigger_notification(
-                user_id=user_id,
-                type='goal',
-                title='Meta de Hidratação Atingida! 💧',
-                message=f'Parabéns! Você atingiu sua meta de {target}ml de água hoje.',
-                link_type='hydration'
-            )
-    except Exception as e:
-        print(f"Notification error: {e}")
-
-    # Gamification
-    try:
-        from app.modules.gamification.application.service import GamificationService
-        
-        # Calculate if goal is met (Simplified logic, reusing total from above)
-        is_goal_met = False
-        
-        # Re-calc total for today (robustness)
-        today = get_today_cuiaba()
-        start_of_day = datetime.combine(today, datetime.min.time())
-        end_of_day = datetime.combine(today, datetime.max.time())
-        
-        daily_logs = HydrationLog.query.filter(
-            HydrationLog.user_id == user_id,
-            HydrationLog.logged_at >= start_of_day,
-            HydrationLog.logged_at <= end_of_day
-        ).all()
-        total = sum(l.amount_ml for l in daily_logs)
-        
-        goal_obj = HydrationGoal.query.filter_by(user_id=user_id).first()
-        target = goal_obj.daily_goal_ml if goal_obj else 2500
-        
-        if total >= target:
-            is_goal_met = True
-            
-        GamificationService.handle_activity(user_id, 'hydration_log', is_goal_met=is_goal_met)
-            
-    except Exception as e:
-        print(f"Gamification error: {e}")
+    # Alertas e gamificação rodam na fila
+    events.publish(WATER_LOGGED, {
+        "user_id": str(user_id),
+        "log_id": str(log.id),
+        "amount_ml": amount,
+        "day": log.logged_at.date().isoformat()
+    }, key=user_id)
     
     return jsonify({"msg": "Intake logged", "amount_ml": amount}), 201
 
@@ -188,17 +141,8 @@ def get_daily_hydration():
     goal = HydrationGoal.query.filter_by(user_id=user_id).first()
     target = goal.daily_goal_ml if goal else 2500 # Default 2.5L
     
-    # Get Logs
-    start_of_day = datetime.combine(query_date, datetime.min.time())
-    end_of_day = datetime.combine(query_date, datetime.max.time())
-    
-    logs = HydrationLog.query.filter(
-        HydrationLog.user_id == user_id,
-        HydrationLog.logged_at >= start_of_day,
-        HydrationLog.logged_at <= end_of_day
-    ).all()
-    
-    total_intake = sum(l.amount_ml for l in logs)
+    # Daily total from the rollup
+    total_intake = DailyTotalsService.get_day(user_id, query_date)['water_ml']
     
     return jsonify({
         "date": date_str,
@@ -223,25 +167,13 @@ def get_hydration_history():
     today = get_today_cuiaba()
     thirty_days_ago = today - timedelta(days=30)
     
-    # Get all logs from last 30 days
-    logs = HydrationLog.query.filter(
-        HydrationLog.user_id == user_id,
-        HydrationLog.logged_at >= thirty_days_ago
-    ).order_by(HydrationLog.logged_at.asc()).all()
-    
-    # Group by date in Cuiabá timezone
-    daily_totals = defaultdict(int)
-    
-    for log in logs:
-        # Convert to Cuiabá timezone to get correct date
-        cuiaba_dt = to_cuiaba(log.logged_at) if log.logged_at.tzinfo else log.logged_at
-        date_key = cuiaba_dt.date().isoformat()
-        daily_totals[date_key] += log.amount_ml
+    # Daily totals from the rollup (days are already in Cuiabá time)
+    daily_totals = DailyTotalsService.get_range(user_id, thirty_days_ago, today)
     
-    # Convert to sorted list
     data = [
-        {"date": date, "value": int(total)}
-        for date, total in sorted(daily_totals.items())
+        {"date": day.isoformat(), "value": int(totals['water_ml'])}
+        for day, totals in daily_totals.items()
+        if totals['hydration_log_count'] > 0
     ]
     
     return jsonify(data), 200
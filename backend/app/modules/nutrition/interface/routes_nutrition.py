@@ -1,12 +1,17 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.shared.extensions import db
+from app.shared.extensions import db, events
+from app.shared.events import MEAL_LOGGED
 from app.modules.nutrition.domain.models import Meal
-from app.modules.analytics.domain.nutrition_analyzer import NutritionAnalyzerService
-from app.modules.coach.infrastructure.gemini_service import GeminiService
+from app.modules.nutrition.application.estimate_service import NutritionEstimateService
+from app.modules.nutrition.application.food_table import get_food_table
+from app.modules.nutrition.application.history_service import NutritionHistoryService
+from app.modules.nutrition.application.daily_totals_service import DailyTotalsService
 from datetime import datetime
 import uuid
 from app.shared.utils.timezone import now_cuiaba, get_today_cuiaba
+from app.modules.coach.application.coach_context_service import CoachContextService
+from app.modules.analytics.application.dashboard_service import DashboardService
 
 nutrition_bp = Blueprint('nutrition', __name__)
 
@@ -53,8 +58,6 @@ def estimate_nutrition():
     try:
         # If images are present, use Vision API
         if images:
-            analyzer = NutritionAnalyzerService()
-            
             # Prepare images data
             images_data = []
             for img in images:
@@ -68,59 +71,15 @@ def estimate_nutrition():
                  return jsonify({"msg": "Nenhuma imagem válida fornecida"}), 400
                  
             if images_data:
-                result = analyzer.analyze_meal(images_data, description)
+                result = NutritionEstimateService.analyze_images(images_data, description)
                 if not result:
                      return jsonify({"msg": "Falha ao analisar imagens"}), 500
                 if "error" in result:
                      return jsonify({"msg": result["error"]}), 400
                 return jsonify(result), 200
 
-        # Text only analysis (existing logic)
-        gemini = GeminiService()
-        
-        prompt = f"""Analise a seguinte descrição de alimento e retorne APENAS um JSON válido com as estimativas nutricionais:
-
-Descrição: {description}
-
-Retorne no formato JSON:
-{{
-    "name": "nome do alimento",
-    "calories": número_inteiro,
-    "protein": número_inteiro,
-    "carbs": número_inteiro,
-    "fats": número_inteiro
-}}
-
-Exemplo para "200g de frango grelhado":
-{{
-    "name": "Frango Grelhado",
-    "calories": 330,
-    "protein": 62,
-    "carbs": 0,
-    "fats": 7
-}}
-
-IMPORTANTE: Retorne APENAS o JSON, sem explicações, sem markdown, sem código adicional."""
-
-        # Generate content
-        response = gemini.model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        print(f"Gemini response: {response_text}")  # Debug log
-        
-        # Parse JSON response
-        import json
-        # Remove markdown code blocks if present
-        if response_text.startswith('```'):
-            # Find first { and last }
-            start = response_text.find('{')
-            end = response_text.rfind('}') + 1
-            if start != -1 and end > start:
-                response_text = response_text[start:end]
-        
-        nutrition_data = json.loads(response_text)
-        
-        print(f"Parsed nutrition data: {nutrition_data}")  # Debug log
+        # Text only analysis (cached by normalized description)
+        nutrition_data = NutritionEstimateService.estimate_from_text(description)
         
         return jsonify(nutrition_data), 200
         
@@ -130,52 +89,32 @@ IMPORTANTE: Retorne APENAS o JSON, sem explicações, sem markdown, sem código
         if not description:
              return jsonify({"msg": "Erro na análise e sem descrição para fallback"}), 500
              
-        import re
-        
-        description_lower = description.lower()
-        
-        # Try to extract quantity
-        quantity_match = re.search(r'(\d+)\s*g', description_lower)
-        quantity = int(quantity_match.group(1)) if quantity_match else 100
-        
-        # Simple food database (per 100g)
-        foods = {
-            'frango': {'calories': 165, 'protein': 31, 'carbs': 0, 'fats': 3.6},
-            'arroz': {'calories': 130, 'protein': 2.7, 'carbs': 28, 'fats': 0.3},
-            'feijão': {'calories': 127, 'protein': 9, 'carbs': 23, 'fats': 0.5},
-            'batata': {'calories': 77, 'protein': 2, 'carbs': 17, 'fats': 0.1},
-            'carne': {'calories': 250, 'protein': 26, 'carbs': 0, 'fats': 15},
-            'peixe': {'calories': 206, 'protein': 22, 'carbs': 0, 'fats': 12},
-            'ovo': {'calories': 155, 'protein': 13, 'carbs': 1.1, 'fats': 11},
-            'pão': {'calories': 265, 'protein': 9, 'carbs': 49, 'fats': 3.2},
-        }
-        
-        # Find matching food
-        matched_food = None
-        for food_name, values in foods.items():
-            if food_name in description_lower:
-                matched_food = values
-                break
-        
-        if matched_food:
-            # Calculate based on quantity
-            factor = quantity / 100
-            return jsonify({
-                "name": description,
-                "calories": int(matched_food['calories'] * factor),
-                "protein": int(matched_food['protein'] * factor),
-                "carbs": int(matched_food['carbs'] * factor),
-                "fats": int(matched_food['fats'] * factor)
-            }), 200
-        
-        # Default fallback
-        return jsonify({
-            "name": description,
-            "calories": 200,  # Default estimate
-            "protein": 15,
-            "carbs": 20,
-            "fats": 5
-        }), 200
+        return jsonify(NutritionEstimateService.estimate_offline(description)), 200
+
+@nutrition_bp.route('/foods/search', methods=['GET'])
+@jwt_required()
+def search_foods():
+    """
+    Search the local food table by name prefix (autocomplete)
+    ---
+    tags:
+      - Nutrition
+    parameters:
+      - in: query
+        name: q
+        type: string
+        required: true
+      - in: query
+        name: limit
+        type: integer
+    responses:
+      200:
+        description: Matching foods with macros per 100g
+    """
+    query = request.args.get('q', '')
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    
+    return jsonify(get_food_table().search_prefix(query, limit)), 200
 
 @nutrition_bp.route('/analyze', methods=['POST'])
 @jwt_required()
@@ -212,8 +151,7 @@ def analyze_food_image():
         image_data = file.read()
         mime_type = file.mimetype
         
-        analyzer = NutritionAnalyzerService()
-        analysis = analyzer.analyze_meal(image_data, mime_type)
+        analysis = NutritionEstimateService.analyze_images([{"data": image_data, "mime_type": mime_type}])
         
         if not analysis:
             return jsonify({"msg": "Failed to analyze image"}), 500
@@ -281,62 +219,17 @@ def log_meal():
     )
     
     db.session.add(new_meal)
+    DailyTotalsService.add_meal(new_meal)
     db.session.commit()
+    CoachContextService.invalidate(user_id, 'nutrition')
+    DashboardService.refresh(user_id, 'nutrition')
     
-    # Check Goals and Limits
-    try:
-        from app.modules.communication.application.notification_service import NotificationService
-        from app.modules.identity.domain.models import User
-        
-        # Get User Profile for goals
-        user = User.query.get(user_id)
-        if user and user.profile:
-            tdee = user.profile.tdee or 2000
-            weight = user.profile.current_weight_kg or 70
-            protein_goal = weight * 2.0 # Simple estimation: 2g per kg
-            
-            # Calculate daily totals
-            start_of_day = datetime.combine(now_cuiaba().date(), datetime.min.time())
-            end_of_day = datetime.combine(now_cuiaba().date(), datetime.max.time())
-            
-            daily_meals = Meal.query.filter(
-                Meal.user_id == user_id,
-                Meal.consumed_at >= start_of_day,
-                Meal.consumed_at <= end_of_day
-            ).all()
-            
-            total_cals = sum((m.calories or 0) for m in daily_meals)
-            total_protein = sum((m.protein_g or 0) for m in daily_meals)
-            
-            # 1. Calorie Danger
-            if total_cals > tdee:
-                NotificationService.trigger_notification(
-                    user_id=user_id,
-                    type='system', # Warning/System
-                    title='Cuidado com as Calorias! ⚠️',
-                    message=f'Você ultrapassou sua estimativa diária de {int(tdee)} kcal.',
-                    link_type='nutrition'
-                )
-                
-            # 2. Protein Goal
-            if total_protein >= protein_goal:
-                NotificationService.trigger_notification(
-                    user_id=user_id,
-                    type='goal',
-                    title='Meta de Proteína Batida! 🥩',
-                    message=f'Excelente! Você atingiu {int(total_protein)}g de proteína hoje.',
-                    link_type='nutrition'
-                )
-                
-    except Exception as e:
-        print(f"Notification error: {e}")
-        
-    # Gamification: Update Nutrition Streak
-    try:
-        from app.modules.gamification.application.service import GamificationService
-        GamificationService.handle_activity(user_id, 'meal_log')
-    except Exception as e:
-        print(f"Gamification error: {e}")
+    # Alertas e gamificação rodam na fila
+    events.publish(MEAL_LOGGED, {
+        "user_id": str(user_id),
+        "meal_id": str(new_meal.id),
+        "day": new_meal.consumed_at.date().isoformat()
+    }, key=user_id)
         
     return jsonify({"msg": "Meal logged", "id": str(new_meal.id)}), 201
 
@@ -389,6 +282,9 @@ def update_meal(meal_id):
     if not meal:
         return jsonify({"msg": "Meal not found"}), 404
         
+    # Retira os valores antigos do total do dia antes de alterar a refeição
+    DailyTotalsService.remove_meal(meal)
+    
     if 'name' in data:
         meal.name = data['name']
     if 'meal_type' in data:
@@ -402,7 +298,10 @@ def update_meal(meal_id):
     if 'fats' in data:
         meal.fat_g = data['fats']
         
+    DailyTotalsService.add_meal(meal)
     db.session.commit()
+    CoachContextService.invalidate(user_id, 'nutrition')
+    DashboardService.refresh(user_id, 'nutrition')
     
     return jsonify({"msg": "Meal updated"}), 200
 
@@ -437,8 +336,11 @@ def delete_meal(meal_id):
     if not meal:
         return jsonify({"msg": "Meal not found"}), 404
     
+    DailyTotalsService.remove_meal(meal)
     db.session.delete(meal)
     db.session.commit()
+    CoachContextService.invalidate(user_id, 'nutrition')
+    DashboardService.refresh(user_id, 'nutrition')
     
     return jsonify({"msg": "Meal deleted"}), 200
 
@@ -477,10 +379,7 @@ def get_daily_nutrition():
         Meal.consumed_at <= end_of_day
     ).all()
     
-    total_cals = sum((m.calories or 0) for m in meals)
-    total_protein = sum((m.protein_g or 0) for m in meals)
-    total_carbs = sum((m.carbs_g or 0) for m in meals)
-    total_fats = sum((m.fat_g or 0) for m in meals)
+    daily = DailyTotalsService.get_day(user_id, query_date)
     
     meal_list = [{
         "id": str(m.id),
@@ -502,10 +401,10 @@ def get_daily_nutrition():
     return jsonify({
         "date": date_str,
         "totals": {
-            "calories": total_cals,
-            "protein": total_protein,
-            "carbs": total_carbs,
-            "fats": total_fats
+            "calories": daily['calories'],
+            "protein": daily['protein'],
+            "carbs": daily['carbs'],
+            "fats": daily['fats']
         },
         "meals": meal_list
     }), 200
@@ -561,20 +460,8 @@ def get_nutrition_history():
     else:
         end_date = today
         
-    # Query meals in range
-    start_time = datetime.combine(start_date, datetime.min.time())
-    end_time = datetime.combine(end_date, datetime.max.time())
-    
-    meals = Meal.query.filter(
-        Meal.user_id == user_id,
-        Meal.consumed_at >= start_time,
-        Meal.consumed_at <= end_time
-    ).order_by(Meal.consumed_at).all()
-    
-    # Aggregation
-    history = {}
-    
     # Initialize all dates in range with 0
+    history = {}
     current = start_date
     while current <= end_date:
         d_str = current.isoformat()
@@ -587,31 +474,11 @@ def get_nutrition_history():
             "meal_count": 0
         }
         current += timedelta(days=1)
-        
-    for m in meals:
-        # Use local date
-        # Assuming consumed_at is stored in compatible tz or naive UTC representing local time?
-        # The utils say now_cuiaba() returns a tz-aware datetime.
-        # .date() on a tz-aware datetime returns the local date relative to that tz?
-        # If stored as naive in DB but representing Cuiaba, we just take date.
-        # If stored as UTC, we need conversion.
-        # Inspecting now_cuiaba implementation (not seen but inferred from previous sessions), usually apps store UTC.
-        # However, earlier view showed `from app.shared.utils.timezone import now_cuiaba`.
-        # For safety, let's assume `m.consumed_at` allows getting the date correctly.
-        # If the DB converts to UTC, we might have date shift issues.
-        # For now, simplistic approach:
-        
-        # We need to handle TZ if previous code established it.
-        # But here I'll just use .date() for simplicity, assuming consistent storage.
-        
-        m_date = m.consumed_at.date().isoformat()
-        
-        if m_date in history:
-            history[m_date]["calories"] += (m.calories or 0)
-            history[m_date]["protein"] += (m.protein_g or 0)
-            history[m_date]["carbs"] += (m.carbs_g or 0)
-            history[m_date]["fats"] += (m.fat_g or 0)
-            history[m_date]["meal_count"] += 1
+    
+    # Daily totals aggregated in the database
+    for row in NutritionHistoryService.aggregate(user_id, start_date, end_date, 'day'):
+        if row['date'] in history:
+            history[row['date']] = row
             
     # Convert dict to sorted list
     result = sorted(history.values(), key=lambda x: x['date'])
@@ -0,0 +1,227 @@
+"""
+Catálogo de exercícios em memória para os prompts de treino
+
+A tabela `exercise_library` (exercícios ativos) é carregada uma vez por
+processo e indexada por categoria, nível e equipamento. Cada exercício já
+guarda a sua linha do prompt pronta, e a lista de candidatos de cada perfil
+(níveis permitidos + equipamentos disponíveis) é montada uma vez e reusada.
+
+`candidates(profile)` devolve só o que o aluno pode fazer, limitado a
+MAX_CANDIDATES e intercalado por grupo muscular principal para manter a
+variedade, em vez do catálogo inteiro.
+
+As rotas de admin chamam `ExerciseCatalog.invalidate()`, que descarta a
+cópia local e incrementa uma versão no cache compartilhado; os outros
+processos conferem essa versão no máximo a cada VERSION_CHECK_SECONDS.
+"""
+import os
+import time
+import logging
+import threading
+from collections import namedtuple, OrderedDict
+
+from app.shared.extensions import db, cache
+from app.modules.training.domain.exercise_library import ExerciseLibrary
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'exercises:catalog_version'
+VERSION_CHECK_SECONDS = 30
+MAX_CANDIDATES = int(os.environ.get('WORKOUT_PROMPT_MAX_EXERCISES', 120))
+# Abaixo disso os filtros são relaxados (primeiro nível, depois equipamento)
+MIN_CANDIDATES = 15
+
+DIFFICULTY_ORDER = ('beginner', 'intermediate', 'advanced')
+
+# equipment_available do perfil (onboarding) -> equipamentos de exercise_library.
+# None = academia completa, sem filtro.
+EQUIPMENT_PROFILES = {
+    'gym': None,
+    'gym_basic': {'bodyweight', 'dumbbells', 'barbell', 'bench', 'ez_bar', 'weight_plate',
+                  'pull_up_bar', 'parallel_bars', 'machine', 'ab_wheel', 'ankle_weights'},
+    'home_dumbbells': {'bodyweight', 'dumbbells', 'barbell', 'bench', 'ez_bar', 'weight_plate',
+                       'pull_up_bar', 'ab_wheel', 'ankle_weights'},
+    'bodyweight': {'bodyweight'},
+    # Valores antigos (lista livre de equipamentos)
+    'dumbbells': {'bodyweight', 'dumbbells'},
+    'barbell': {'bodyweight', 'barbell', 'weight_plate'},
+    'machines': {'bodyweight', 'machine', 'cable_machine', 'smith_machine'},
+}
+
+Entry = namedtuple('Entry', 'id name description category difficulty_level equipment primary_muscle line')
+Candidates = namedtuple('Candidates', 'text exercise_map count')
+
+
+class ExerciseCatalog:
+    _lock = threading.Lock()
+    # {'entries': [Entry], 'by_category': {cat: [Entry]}, 'by_difficulty': {level: [Entry]},
+    #  'by_equipment': {item: {id}}, 'candidates': {(levels, equipment): Candidates}}
+    _state = None
+    _version = None
+    _checked_at = 0.0
+
+    @classmethod
+    def candidates(cls, profile):
+        """
+        Lista de exercícios do prompt para o perfil
+
+        Returns:
+            Candidates(text, exercise_map, count): `text` numerado a partir de
+            1 e `exercise_map` {número: {'id', 'name', 'description'}}
+        """
+        levels = cls.allowed_levels(getattr(profile, 'experience_level', None))
+        equipment = cls.allowed_equipment(getattr(profile, 'equipment_available', None))
+        key = (levels, equipment)
+
+        state = cls._get_state()
+        found = state['candidates'].get(key)
+        if found is None:
+            selected = cls._select(state, levels, equipment)
+            if len(selected) < MIN_CANDIDATES:
+                selected = cls._select(state, DIFFICULTY_ORDER, equipment)
+            if len(selected) < MIN_CANDIDATES:
+                selected = cls._select(state, DIFFICULTY_ORDER, None)
+            found = cls._render(selected)
+            with cls._lock:
+                # Estado pode ter sido trocado por invalidate() nesse meio tempo
+                state['candidates'][key] = found
+        return found
+
+    @classmethod
+    def by_category(cls, category):
+        return list(cls._get_state()['by_category'].get(category, []))
+
+    @classmethod
+    def invalidate(cls):
+        """Chamar após criar/editar/remover exercícios"""
+        with cls._lock:
+            cls._state = None
+        try:
+            cache.set(VERSION_KEY, time.time(), timeout=0)
+        except Exception as e:
+            logger.warning(f"Exercise catalog version bump failed: {e}")
+
+    # ---------- Filtros do perfil ----------
+
+    @staticmethod
+    def allowed_levels(experience_level):
+        """Iniciante vê só beginner; intermediário até intermediate; avançado tudo"""
+        level = (experience_level or '').lower()
+        for idx, name in enumerate(DIFFICULTY_ORDER):
+            if name in level:
+                return DIFFICULTY_ORDER[:idx + 1]
+        return DIFFICULTY_ORDER[:1]
+
+    @staticmethod
+    def allowed_equipment(equipment_available):
+        """frozenset de equipamentos permitidos, ou None para qualquer um"""
+        if isinstance(equipment_available, str):
+            equipment_available = [equipment_available]
+        if not equipment_available:
+            return None
+
+        allowed = set()
+        for value in equipment_available:
+            mapped = EQUIPMENT_PROFILES.get(str(value).lower(), set())
+            if mapped is None:
+                return None
+            allowed |= mapped
+        # Valor desconhecido: não filtra em vez de deixar a lista vazia
+        return frozenset(allowed) if allowed else None
+
+    # ---------- Seleção ----------
+
+    @classmethod
+    def _select(cls, state, levels, equipment):
+        pool = [entry for level in levels for entry in state['by_difficulty'].get(level, [])]
+
+        if equipment is not None:
+            blocked = set()
+            for item, ids in state['by_equipment'].items():
+                if item not in equipment:
+                    blocked |= ids
+            pool = [entry for entry in pool if entry.id not in blocked]
+
+        # Intercala por grupo muscular principal: o limite corta igualmente
+        groups = OrderedDict()
+        for entry in sorted(pool, key=lambda e: (e.primary_muscle, e.name)):
+            groups.setdefault(entry.primary_muscle, []).append(entry)
+
+        selected = []
+        queues = [iter(group) for group in groups.values()]
+        while queues and len(selected) < MAX_CANDIDATES:
+            remaining = []
+            for queue in queues:
+                entry = next(queue, None)
+                if entry is None:
+                    continue
+                selected.append(entry)
+                remaining.append(queue)
+                if len(selected) >= MAX_CANDIDATES:
+                    break
+            queues = remaining
+        return selected
+
+    @staticmethod
+    def _render(entries):
+        lines, exercise_map = [], {}
+        for idx, entry in enumerate(entries, start=1):
+            exercise_map[idx] = {'id': entry.id, 'name': entry.name, 'description': entry.description}
+            lines.append(f"{idx}. {entry.line}")
+        return Candidates("\n".join(lines), exercise_map, len(entries))
+
+    # ---------- Loading ----------
+
+    @classmethod
+    def _get_state(cls):
+        state = cls._state
+        now = time.time()
+        if state is not None and now - cls._checked_at < VERSION_CHECK_SECONDS:
+            return state
+
+        with cls._lock:
+            version = cls._remote_version()
+            if cls._state is None or version != cls._version:
+                cls._state = cls._load()
+                cls._version = version
+            cls._checked_at = now
+            return cls._state
+
+    @classmethod
+    def _remote_version(cls):
+        try:
+            return cache.get(VERSION_KEY)
+        except Exception:
+            return cls._version
+
+    @classmethod
+    def _load(cls):
+        rows = db.session.query(
+            ExerciseLibrary.id, ExerciseLibrary.name, ExerciseLibrary.description,
+            ExerciseLibrary.category, ExerciseLibrary.difficulty_level,
+            ExerciseLibrary.equipment_needed, ExerciseLibrary.muscle_groups
+        ).filter(ExerciseLibrary.is_active == True).order_by(ExerciseLibrary.name).all()
+
+        entries = []
+        by_category, by_difficulty, by_equipment = {}, {}, {}
+        for row in rows:
+            equipment = frozenset(str(item).lower() for item in (row.equipment_needed or []))
+            muscles = row.muscle_groups or []
+            entry = Entry(
+                row.id, row.name, row.description, row.category, row.difficulty_level, equipment,
+                muscles[0] if muscles else '', f"{row.name} (Nível: {row.difficulty_level}, Categoria: {row.category})"
+            )
+            entries.append(entry)
+            by_category.setdefault(entry.category, []).append(entry)
+            by_difficulty.setdefault(entry.difficulty_level, []).append(entry)
+            for item in equipment:
+                by_equipment.setdefault(item, set()).add(entry.id)
+
+        logger.info(f"Exercise catalog loaded: {len(entries)} exercises")
+        return {
+            'entries': entries,
+            'by_category': by_category,
+            'by_difficulty': by_difficulty,
+            'by_equipment': by_equipment,
+            'candidates': {}
+        }
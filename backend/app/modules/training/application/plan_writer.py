@@ -0,0 +1,109 @@
+"""
+Workout plan persistence
+
+Writes a plan with its days and exercises in a fixed number of round trips,
+whatever the plan size: UUIDs are assigned client-side, so days and
+exercises do not need a flush to learn their parent ids.
+
+    UPDATE workout_plans (deactivate current)   1 statement
+    INSERT workout_plans                         1 row
+    INSERT workout_days                          bulk, 1 round trip
+    INSERT exercises                             bulk, 1 round trip
+
+Used by AI generation (onboarding, admin regenerate) and manual creation.
+After the commit the coach 'workouts' context is dropped and the dashboard
+refreshed, so every caller sees the new plan.
+"""
+import uuid
+
+from sqlalchemy import insert
+
+from app.shared.extensions import db
+from app.modules.training.domain.models import WorkoutPlan, WorkoutDay, Exercise
+
+
+class WorkoutPlanWriter:
+
+    @staticmethod
+    def write(user_id, name, description='', days=(), generated_by_ai=False, activate=True,
+              start_date=None, end_date=None, commit=True):
+        """
+        Create a workout plan
+
+        Args:
+            days: [{day_of_week, name, muscle_groups, exercises: [
+                      {name, exercise_library_id, description, sets, reps,
+                       rest_seconds, weight_kg, notes}]}]
+                  in display order
+            activate: make this the active plan (deactivates the others)
+            commit: commit the transaction (False to let the caller do it,
+                    then call after_write)
+
+        Returns:
+            WorkoutPlan
+        """
+        if activate:
+            WorkoutPlan.query.filter_by(user_id=user_id, is_active=True).update(
+                {'is_active': False}, synchronize_session=False
+            )
+
+        plan = WorkoutPlan(
+            id=uuid.uuid4(),
+            user_id=user_id,
+            name=name[:255],
+            description=description,
+            generated_by_ai=generated_by_ai,
+            is_active=activate,
+            start_date=start_date,
+            end_date=end_date
+        )
+        db.session.add(plan)
+
+        day_rows, exercise_rows = [], []
+        for day_idx, day in enumerate(days):
+            day_id = uuid.uuid4()
+            day_rows.append({
+                'id': day_id,
+                'workout_plan_id': plan.id,
+                'user_id': user_id,
+                'day_of_week': day.get('day_of_week'),
+                'name': day.get('name'),
+                'muscle_groups': day.get('muscle_groups') or [],
+                'order': day_idx + 1
+            })
+            for ex_idx, exercise in enumerate(day.get('exercises') or []):
+                exercise_rows.append({
+                    'id': uuid.uuid4(),
+                    'workout_day_id': day_id,
+                    'user_id': user_id,
+                    'name': (exercise.get('name') or 'Exercício')[:255],
+                    'exercise_library_id': exercise.get('exercise_library_id'),
+                    'description': exercise.get('description'),
+                    'sets': exercise.get('sets'),
+                    'reps': str(exercise['reps'])[:50] if exercise.get('reps') is not None else None,
+                    'rest_seconds': exercise.get('rest_seconds'),
+                    'weight_kg': exercise.get('weight_kg'),
+                    'order': ex_idx + 1,
+                    'notes': exercise.get('notes')
+                })
+
+        # Parent rows first (FKs), then one multi-row INSERT per table
+        db.session.flush()
+        if day_rows:
+            db.session.execute(insert(WorkoutDay), day_rows)
+        if exercise_rows:
+            db.session.execute(insert(Exercise), exercise_rows)
+
+        if commit:
+            db.session.commit()
+            WorkoutPlanWriter.after_write(user_id)
+        return plan
+
+    @staticmethod
+    def after_write(user_id):
+        """Drop derived views of the user's plans (after the commit)"""
+        from app.modules.coach.application.coach_context_service import CoachContextService
+        from app.modules.analytics.application.dashboard_service import DashboardService
+
+        CoachContextService.invalidate(user_id, 'workouts')
+        DashboardService.refresh(user_id)
@@ -5,6 +5,9 @@ from app.shared.extensions import db
 
 class WorkoutPlan(db.Model):
     __tablename__ = 'workout_plans'
+    __table_args__ = (
+        db.Index('ix_workout_plans_created_id', 'created_at', 'id'),
+    )
 
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=False)
@@ -24,6 +27,9 @@ class WorkoutPlan(db.Model):
 
 class WorkoutDay(db.Model):
     __tablename__ = 'workout_days'
+    __table_args__ = (
+        db.Index('ix_workout_days_plan', 'workout_plan_id'),
+    )
 
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     workout_plan_id = db.Column(UUID(as_uuid=True), db.ForeignKey('workout_plans.id'), nullable=False)
@@ -58,6 +64,10 @@ class Exercise(db.Model):
 
 class WorkoutSession(db.Model):
     __tablename__ = 'workout_sessions'
+    __table_args__ = (
+        db.Index('ix_workout_sessions_user_started', 'user_id', 'started_at'),
+        db.Index('ix_workout_sessions_user_status_completed', 'user_id', 'status', 'completed_at'),
+    )
 
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=False)
@@ -77,6 +87,10 @@ class WorkoutSession(db.Model):
 
 class ExerciseLog(db.Model):
     __tablename__ = 'exercise_logs'
+    __table_args__ = (
+        db.Index('ix_exercise_logs_user_created', 'user_id', 'created_at'),
+        db.Index('ix_exercise_logs_session_exercise', 'workout_session_id', 'exercise_id'),
+    )
 
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     workout_session_id = db.Column(UUID(as_uuid=True), db.ForeignKey('workout_sessions.id'), nullable=False)
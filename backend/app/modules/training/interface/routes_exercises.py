@@ -1,9 +1,14 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.shared.extensions import db
+from sqlalchemy import func, distinct
+from app.shared.extensions import db, events
+from app.shared.events import WORKOUT_FINISHED
 from app.modules.training.domain.models import WorkoutSession, ExerciseLog, Exercise, WorkoutDay, WorkoutPlan
 from datetime import datetime, timedelta
 from app.shared.utils.timezone import now_cuiaba
+from app.shared.utils.pagination import paginate, page_args, page_meta, InvalidCursor
+from app.modules.coach.application.coach_context_service import CoachContextService
+from app.modules.analytics.application.dashboard_service import DashboardService
 
 exercises_bp = Blueprint('exercises', __name__)
 
@@ -186,13 +191,15 @@ def finish_session(session_id):
         session.calories_burned = round(minutes * 5, 1)
     
     db.session.commit()
+    CoachContextService.invalidate(user_id, 'workouts')
+    DashboardService.refresh(user_id, 'consistency', 'workout_volume')
     
-    # Gamification: Update Workout Streak
-    try:
-        from app.modules.gamification.application.service import GamificationService
-        GamificationService.handle_activity(user_id, 'workout_finish')
-    except Exception as e:
-        print(f"Gamification error: {e}")
+    # Gamification runs on the queue
+    events.publish(WORKOUT_FINISHED, {
+        "user_id": str(user_id),
+        "session_id": str(session.id),
+        "day": session.completed_at.date().isoformat()
+    }, key=user_id)
 
     return jsonify({
         "msg": "Session finished", 
@@ -208,40 +215,88 @@ def get_history():
     ---
     tags:
       - Exercises
+    parameters:
+      - in: query
+        name: days
+        type: integer
+      - in: query
+        name: limit
+        type: integer
+        default: 50
+      - in: query
+        name: cursor
+        type: string
+        description: next_cursor from the previous page
+      - in: query
+        name: total
+        type: string
+        enum: [exact, estimate]
     responses:
       200:
-        description: List of completed sessions
+        description: Completed sessions (newest first) with set count and volume
+      400:
+        description: Invalid cursor
     """
     user_id = get_jwt_identity()
     
     # Filters
     days = request.args.get('days', type=int)
-    limit = request.args.get('limit', default=50, type=int)
+    cursor, limit, total = page_args(default_limit=50)
     
-    query = WorkoutSession.query.filter_by(user_id=user_id, status='completed')
+    # Sessions + workout name in one query (no per-session WorkoutDay lookup)
+    query = db.session.query(
+        WorkoutSession.id, WorkoutSession.started_at, WorkoutSession.completed_at,
+        WorkoutSession.total_duration_seconds, WorkoutSession.calories_burned,
+        WorkoutDay.name.label('workout_name')
+    ).outerjoin(WorkoutDay, WorkoutDay.id == WorkoutSession.workout_day_id)\
+        .filter(
+            WorkoutSession.user_id == user_id,
+            WorkoutSession.status == 'completed',
+            WorkoutSession.completed_at.isnot(None)
+        )
     
     if days:
         cutoff_date = now_cuiaba() - timedelta(days=days)
         query = query.filter(WorkoutSession.completed_at >= cutoff_date)
-        
-    sessions = query.order_by(WorkoutSession.completed_at.desc())\
-        .limit(limit).all()
-        
+    
+    try:
+        page = paginate(
+            query, (WorkoutSession.completed_at, WorkoutSession.id),
+            cursor=cursor, limit=limit, max_limit=200, total=total
+        )
+    except InvalidCursor:
+        return jsonify({"msg": "Invalid cursor"}), 400
+    
+    # Set count / reps / volume of the whole page in a single aggregate
+    stats = {}
+    session_ids = [row.id for row in page['items']]
+    if session_ids:
+        rows = db.session.query(
+            ExerciseLog.workout_session_id,
+            func.count(ExerciseLog.id).label('sets'),
+            func.count(distinct(ExerciseLog.exercise_id)).label('exercises'),
+            func.coalesce(func.sum(ExerciseLog.reps_done), 0).label('reps'),
+            func.coalesce(func.sum(ExerciseLog.reps_done * ExerciseLog.weight_used_kg), 0).label('volume')
+        ).filter(
+            ExerciseLog.workout_session_id.in_(session_ids),
+            ExerciseLog.completed == True
+        ).group_by(ExerciseLog.workout_session_id).all()
+        stats = {row.workout_session_id: row for row in rows}
+    
     result = []
-    for s in sessions:
-        # Get workout day name if available
-        day_name = "Unknown Workout"
-        day = WorkoutDay.query.get(s.workout_day_id)
-        if day:
-            day_name = day.name
-            
+    for s in page['items']:
+        session_stats = stats.get(s.id)
         result.append({
             "id": s.id,
             "started_at": s.started_at.isoformat(),
             "completed_at": s.completed_at.isoformat() if s.completed_at else None,
             "duration_seconds": s.total_duration_seconds,
-            "workout_name": day_name,
-            "calories": s.calories_burned
+            "workout_name": s.workout_name or "Unknown Workout",
+            "calories": s.calories_burned,
+            "exercise_count": session_stats.exercises if session_stats else 0,
+            "set_count": session_stats.sets if session_stats else 0,
+            "total_reps": int(session_stats.reps) if session_stats else 0,
+            "volume_kg": round(float(session_stats.volume), 1) if session_stats else 0
         })
         
-    return jsonify(result), 200
+    return jsonify({"sessions": result, **page_meta(page)}), 200
@@ -3,6 +3,9 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.shared.extensions import db
 from app.modules.training.domain.models import WorkoutPlan, WorkoutDay, Exercise
+from app.modules.training.application.plan_writer import WorkoutPlanWriter
+from app.modules.coach.application.coach_context_service import CoachContextService
+from app.shared.utils.pagination import paginate, page_args, page_meta, InvalidCursor
 from sqlalchemy.orm import joinedload
 from datetime import datetime
 
@@ -12,30 +15,59 @@ workouts_bp = Blueprint('workouts', __name__)
 @jwt_required()
 def get_workouts():
     """
-    Get all workout plans
+    Get workout plans (newest first, cursor paginated)
     ---
     tags:
       - Workouts
+    parameters:
+      - in: query
+        name: is_active
+        type: boolean
+      - in: query
+        name: limit
+        type: integer
+        default: 50
+      - in: query
+        name: cursor
+        type: string
+        description: next_cursor from the previous page
     responses:
       200:
-        description: List of workout plans
+        description: Workout plans page
         schema:
-          type: array
-          items:
-            type: object
-            properties:
-              id:
-                type: string
-              name:
-                type: string
-              is_active:
-                type: boolean
+          type: object
+          properties:
+            plans:
+              type: array
+              items:
+                type: object
+                properties:
+                  id:
+                    type: string
+                  name:
+                    type: string
+                  is_active:
+                    type: boolean
+            next_cursor:
+              type: string
+      400:
+        description: Invalid cursor
     """
     user_id = uuid.UUID(get_jwt_identity())
-    plans = WorkoutPlan.query.filter_by(user_id=user_id).order_by(WorkoutPlan.created_at.desc()).all()
+    cursor, limit, total = page_args(default_limit=50)
+    is_active = request.args.get('is_active')
+    
+    query = WorkoutPlan.query.filter_by(user_id=user_id)
+    if is_active is not None:
+        query = query.filter_by(is_active=(is_active == 'true'))
+    
+    try:
+        page = paginate(query, (WorkoutPlan.created_at, WorkoutPlan.id), cursor=cursor, limit=limit, total=total)
+    except InvalidCursor:
+        return jsonify({"msg": "Invalid cursor"}), 400
     
     result = []
-    for p in plans:
+    for p in page['items']:
         result.append({
             "id": p.id,
             "name": p.name,
@@ -45,7 +77,7 @@ def get_workouts():
             "created_at": p.created_at.isoformat()
         })
         
-    return jsonify(result), 200
+    return jsonify({"plans": result, **page_meta(page)}), 200
 
 @workouts_bp.route('/<uuid:plan_id>', methods=['GET'])
 @jwt_required()
@@ -126,6 +158,14 @@ def create_workout():
               type: string
             description:
               type: string
+            is_active:
+              type: boolean
+              description: Activate the new plan (default false)
+            days:
+              type: array
+              description: "Optional: [{day_of_week, name, muscle_groups, exercises: [{name, exercise_library_id, sets, reps, rest_seconds, weight_kg, notes}]}]"
+              items:
+                type: object
     responses:
       201:
         description: Plan created
@@ -133,24 +173,88 @@ def create_workout():
         description: Invalid data
     """
     user_id = uuid.UUID(get_jwt_identity())
-    data = request.get_json()
+    data = request.get_json(silent=True)
     
-    if not data or not data.get('name'):
+    if not isinstance(data, dict) or not data.get('name'):
         return jsonify({"msg": "Name is required"}), 400
+    
+    if not isinstance(data['name'], str) or not isinstance(data.get('description') or '', str):
+        return jsonify({"msg": "name and description must be strings"}), 400
+    
+    days = data.get('days') or []
+    error = _validate_days(days)
+    if error:
+        return jsonify({"msg": error}), 400
         
-    new_plan = WorkoutPlan(
-        user_id=user_id,
+    new_plan = WorkoutPlanWriter.write(
+        user_id,
         name=data['name'],
         description=data.get('description', ''),
+        days=days,
         generated_by_ai=False,
-        is_active=False
+        activate=bool(data.get('is_active', False))
     )
     
-    db.session.add(new_plan)
-    db.session.commit()
-    
     return jsonify({"msg": "Plan created", "id": new_plan.id}), 201
 
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _validate_days(days):
+    """
+    Check the `days` payload against the column types (before the INSERT
+    turns a bad value into a DataError); converts exercise_library_id to UUID.
+
+    Returns:
+        error message, or None if valid
+    """
+    if not isinstance(days, list) or not all(isinstance(day, dict) for day in days):
+        return "days must be a list of objects"
+    
+    library_ids = set()
+    for day in days:
+        if not isinstance(day.get('day_of_week') or '', str) or len(day.get('day_of_week') or '') > 20:
+            return "day_of_week must be a string of up to 20 characters"
+        if not isinstance(day.get('name') or '', str) or len(day.get('name') or '') > 255:
+            return "Day name must be a string of up to 255 characters"
+        muscle_groups = day.get('muscle_groups') or []
+        if not isinstance(muscle_groups, list) or not all(isinstance(m, str) for m in muscle_groups):
+            return "muscle_groups must be a list of strings"
+        
+        exercises = day.get('exercises') or []
+        if not isinstance(exercises, list) or not all(isinstance(ex, dict) for ex in exercises):
+            return "exercises must be a list of objects"
+        for exercise in exercises:
+            for field in ('name', 'description', 'notes'):
+                if not isinstance(exercise.get(field) or '', str):
+                    return f"Exercise {field} must be a string"
+            for field in ('sets', 'rest_seconds'):
+                value = exercise.get(field)
+                if value is not None and not (_is_int(value) and 0 <= value <= 100000):
+                    return f"Exercise {field} must be a non-negative integer"
+            if exercise.get('weight_kg') is not None and not (_is_number(exercise['weight_kg']) and exercise['weight_kg'] >= 0):
+                return "Exercise weight_kg must be a non-negative number"
+            if exercise.get('reps') is not None and not (isinstance(exercise['reps'], str) or _is_int(exercise['reps'])):
+                return "Exercise reps must be a string or an integer"
+            if exercise.get('exercise_library_id'):
+                try:
+                    exercise['exercise_library_id'] = uuid.UUID(str(exercise['exercise_library_id']))
+                except ValueError:
+                    return "Invalid exercise_library_id"
+                library_ids.add(exercise['exercise_library_id'])
+    
+    if library_ids:
+        from app.modules.training.domain.exercise_library import ExerciseLibrary
+        found = db.session.query(ExerciseLibrary.id).filter(ExerciseLibrary.id.in_(library_ids)).count()
+        if found != len(library_ids):
+            return "Unknown exercise_library_id"
+    return None
+
 @workouts_bp.route('/<uuid:plan_id>/activate', methods=['PUT'])
 @jwt_required()
 def activate_workout(plan_id):
@@ -181,5 +285,6 @@ def activate_workout(plan_id):
     
     plan.is_active = True
     db.session.commit()
+    CoachContextService.invalidate(user_id, 'workouts')
     
     return jsonify({"msg": "Plan activated"}), 200
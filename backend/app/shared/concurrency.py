@@ -0,0 +1,84 @@
+"""
+Serving-mode helpers (sync vs gevent workers)
+
+Under gunicorn's gevent worker (gunicorn.conf.py, the default) the standard
+library is monkey-patched, so requests/redis/sleep yield to other greenlets.
+Two pieces are not covered by monkey-patching and are wired here:
+
+- psycopg2 is a C extension: without a wait callback every query blocks the
+  whole worker. `make_psycopg_green()` installs the callback (same approach
+  as psycogreen) so queries yield while waiting on the socket;
+- the SQLAlchemy pool must match how many requests a worker runs at once,
+  see `engine_options()`.
+"""
+import os
+
+
+def gevent_active():
+    """True when the process runs on gevent with a patched socket module"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+
+def _gevent_wait_callback(conn, timeout=None):
+    import psycopg2
+    from psycopg2 import extensions
+    from gevent.socket import wait_read, wait_write
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
+
+
+def make_psycopg_green():
+    """Make psycopg2 cooperative (idempotent; call after gevent patching)"""
+    from psycopg2 import extensions
+
+    if extensions.get_wait_callback() is not _gevent_wait_callback:
+        extensions.set_wait_callback(_gevent_wait_callback)
+
+
+def worker_concurrency():
+    """
+    Requests a single worker process can run at once
+
+    gevent: GUNICORN_WORKER_CONNECTIONS; sync/gthread: GUNICORN_THREADS.
+    Background task queue threads also hold connections.
+    """
+    if gevent_active():
+        requests = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+    else:
+        requests = int(os.environ.get('GUNICORN_THREADS', 1))
+    return requests + int(os.environ.get('TASK_QUEUE_WORKERS', 2))
+
+
+def engine_options():
+    """
+    SQLAlchemy engine options sized to the worker concurrency
+
+    The pool keeps up to DB_POOL_SIZE (default 10) connections and overflows
+    up to DB_MAX_OVERFLOW (default 10), never far past the worker concurrency.
+    Requests beyond that wait DB_POOL_TIMEOUT seconds for a connection, which
+    is cheap because long calls (Gemini) release their connection first.
+    """
+    concurrency = worker_concurrency()
+    pool_size = min(int(os.environ.get('DB_POOL_SIZE', 10)), concurrency)
+    # A few spare connections for helper threads (e.g. parallel context loading)
+    max_overflow = min(int(os.environ.get('DB_MAX_OVERFLOW', 10)), max(concurrency - pool_size, 0) + 5)
+    return {
+        'pool_pre_ping': True,
+        'pool_recycle': 300,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10))
+    }
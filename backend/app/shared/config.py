@@ -30,6 +30,13 @@ class Config:
         CACHE_REDIS_DB = 0
     CACHE_DEFAULT_TIMEOUT = 300
 
+    # Background Task Queue (Redis when available, in-process otherwise)
+    TASK_QUEUE_WORKERS = int(os.environ.get('TASK_QUEUE_WORKERS', 2))  # threads per process, 0 = dedicated worker only
+    TASK_QUEUE_MAX_RETRIES = int(os.environ.get('TASK_QUEUE_MAX_RETRIES', 3))
+    TASK_QUEUE_BACKOFF_SECONDS = float(os.environ.get('TASK_QUEUE_BACKOFF_SECONDS', 2))
+    TASK_QUEUE_BACKOFF_MAX_SECONDS = float(os.environ.get('TASK_QUEUE_BACKOFF_MAX_SECONDS', 60))
+    TASK_QUEUE_VISIBILITY_TIMEOUT = int(os.environ.get('TASK_QUEUE_VISIBILITY_TIMEOUT', 300))
+
 class DevelopmentConfig(Config):
     DEBUG = True
 
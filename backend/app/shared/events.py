@@ -0,0 +1,85 @@
+"""
+Domain events dispatched through the task queue
+
+Write paths publish an event after their commit and return; each subscriber
+runs as its own queue job, so a failing subscriber is retried (and
+dead-lettered) on its own without re-running the others. Jobs are
+partitioned by the event key (normally the user id), keeping one user's
+side effects in order.
+
+Per subscriber, events.<event>.<subscriber>.{processed,failed} counters and
+an events.<event>.<subscriber>.lag_ms histogram (publish -> handled) are
+recorded; events.<event>.published counts the publishes.
+"""
+import time
+import logging
+
+from app.shared.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Event names
+MEAL_LOGGED = 'meal.logged'
+WATER_LOGGED = 'water.logged'
+WORKOUT_FINISHED = 'workout.finished'
+
+
+class EventBus:
+    """
+    Usage:
+        @events.subscribe(MEAL_LOGGED)
+        def award_meal_xp(event): ...
+
+        events.publish(MEAL_LOGGED, {"user_id": ..., "meal_id": ...}, key=user_id)
+    """
+
+    def __init__(self, queue):
+        self._queue = queue
+        self._subscribers = {}
+
+    def subscribe(self, event_name, name=None):
+        """Register a subscriber; it receives the event payload dict"""
+        def decorator(fn):
+            subscriber = name or fn.__name__
+            task_name = f"events.{event_name}.{subscriber}"
+            prefix = task_name
+
+            def run(payload):
+                published_at = payload.pop('_published_at', None)
+                if published_at:
+                    metrics.observe(f"{prefix}.lag_ms", (time.time() - published_at) * 1000)
+                try:
+                    fn(payload)
+                except Exception:
+                    metrics.incr(f"{prefix}.failed")
+                    raise
+                metrics.incr(f"{prefix}.processed")
+
+            self._queue.task(task_name)(run)
+            self._subscribers.setdefault(event_name, []).append(task_name)
+            return fn
+        return decorator
+
+    def publish(self, event_name, payload, key=None):
+        """
+        Enqueue one job per subscriber of the event
+
+        Call after the commit that produced the event. Enqueue failures are
+        logged, never raised: the write already succeeded.
+
+        Returns:
+            number of subscriber jobs enqueued
+        """
+        metrics.incr(f"events.{event_name}.published")
+        enqueued = 0
+        for task_name in self._subscribers.get(event_name, []):
+            try:
+                self._queue.enqueue(task_name, {**payload, "_published_at": time.time()}, key=key)
+                enqueued += 1
+            except Exception as e:
+                metrics.incr(f"{task_name}.enqueue_failed")
+                logger.error(f"Failed to enqueue '{task_name}': {e}")
+        return enqueued
+
+    def subscribers(self, event_name):
+        return list(self._subscribers.get(event_name, []))
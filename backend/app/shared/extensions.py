@@ -5,6 +5,8 @@ from flasgger import Swagger
 from flask_caching import Cache
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from app.shared.task_queue import TaskQueue
+from app.shared.events import EventBus
 
 db = SQLAlchemy()
 migrate = Migrate()
@@ -15,3 +17,5 @@ limiter = Limiter(
     key_func=get_remote_address,
     default_limits=["2000 per day", "500 per hour"]
 )
+task_queue = TaskQueue()
+events = EventBus(task_queue)
@@ -0,0 +1,242 @@
+"""
+Outbound HTTP layer for third-party integrations
+
+One `HttpClient` per integration (evolution, brevo, webpush, fcm), created
+once per process by `get_client()`:
+
+- pooled keep-alive connections per host (requests.Session + HTTPAdapter);
+- connect/read timeouts on every call, so a slow provider can no longer
+  hold a worker until gunicorn's timeout;
+- a circuit breaker: after N consecutive failures calls fail fast with
+  CircuitOpenError for a cool-down, then one trial call is let through;
+- a retry budget: retries (idempotent calls only) are capped at a fraction
+  of recent traffic, so retries cannot amplify an outage;
+- metrics per integration: http.<name>.latency_ms and
+  http.<name>.{ok,error,client_error,retry,short_circuited}.
+
+SDK-based integrations (Brevo, firebase) that own their transport go
+through `client.call(fn, ...)` to get the breaker and metrics.
+"""
+import os
+import time
+import random
+import logging
+import threading
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.shared.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'))
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised without calling the provider while its circuit is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open (one trial) -> closed"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half_open'
+            return 'open'
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                # Trial failed or threshold reached: (re)open
+                self._opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """Allows retries up to `ratio` of the requests seen in the last `window` seconds (plus a floor)"""
+
+    def __init__(self, ratio=0.1, min_per_window=3, window=10):
+        self.ratio = ratio
+        self.min_per_window = min_per_window
+        self.window = window
+        self._requests = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, events, now):
+        while events and now - events[0] > self.window:
+            events.popleft()
+
+    def record_request(self):
+        with self._lock:
+            now = time.monotonic()
+            self._requests.append(now)
+            self._trim(self._requests, now)
+
+    def try_spend(self):
+        with self._lock:
+            now = time.monotonic()
+            self._trim(self._requests, now)
+            self._trim(self._retries, now)
+            allowed = self.min_per_window + self.ratio * len(self._requests)
+            if len(self._retries) >= allowed:
+                return False
+            self._retries.append(now)
+            return True
+
+
+class HttpClient:
+
+    def __init__(self, name, connect_timeout=5, read_timeout=30, pool_maxsize=10,
+                 max_retries=2, backoff_seconds=0.2, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.budget = RetryBudget()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method, url, retry=None, **kwargs):
+        """
+        requests-compatible call with timeout, breaker, retries and metrics
+
+        Args:
+            retry: retry transient failures (default: only idempotent methods)
+
+        Raises:
+            CircuitOpenError, requests.RequestException
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        if retry is None:
+            retry = method.upper() in IDEMPOTENT_METHODS
+
+        def send():
+            response = self.session.request(method, url, **kwargs)
+            if response.status_code >= 500:
+                # Provider-side failure: counts for the breaker and may be retried
+                response.raise_for_status()
+            return response
+
+        return self._run(send, retry)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def call(self, fn, *args, retry=False, is_failure=None, **kwargs):
+        """
+        Breaker and metrics around an SDK call that has its own transport
+
+        Args:
+            is_failure: predicate on the raised exception; False means a
+                client-side error (e.g. 4xx) that must not trip the breaker
+        """
+        return self._run(lambda: fn(*args, **kwargs), retry, is_failure)
+
+    def _run(self, send, retry, is_failure=None):
+        prefix = f"http.{self.name}"
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                metrics.incr(f"{prefix}.short_circuited")
+                raise CircuitOpenError(f"{self.name}: circuit open")
+
+            self.budget.record_request()
+            start = time.perf_counter()
+            try:
+                result = send()
+            except Exception as e:
+                metrics.observe(f"{prefix}.latency_ms", (time.perf_counter() - start) * 1000)
+                if is_failure is not None and not is_failure(e):
+                    metrics.incr(f"{prefix}.client_error")
+                    self.breaker.record_success()
+                    raise
+
+                metrics.incr(f"{prefix}.error")
+                self.breaker.record_failure()
+
+                if retry and attempt < self.max_retries and self._transient(e) and self.budget.try_spend():
+                    attempt += 1
+                    metrics.incr(f"{prefix}.retry")
+                    # Exponential backoff with jitter
+                    time.sleep(self.backoff_seconds * (2 ** (attempt - 1)) * (0.5 + random.random()))
+                    continue
+                raise
+
+            metrics.observe(f"{prefix}.latency_ms", (time.perf_counter() - start) * 1000)
+            metrics.incr(f"{prefix}.ok")
+            self.breaker.record_success()
+            return result
+
+    @staticmethod
+    def _transient(error):
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+        response = getattr(error, 'response', None)
+        return response is not None and response.status_code >= 500
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name, **options):
+    """
+    Process-wide client for an integration
+
+    Options (first call wins) can be overridden by env vars
+    HTTP_<NAME>_CONNECT_TIMEOUT, HTTP_<NAME>_READ_TIMEOUT and HTTP_<NAME>_POOL_SIZE.
+    """
+    client = _clients.get(name)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        if name not in _clients:
+            env = f"HTTP_{name.upper()}_"
+            if os.environ.get(env + 'CONNECT_TIMEOUT'):
+                options['connect_timeout'] = float(os.environ[env + 'CONNECT_TIMEOUT'])
+            if os.environ.get(env + 'READ_TIMEOUT'):
+                options['read_timeout'] = float(os.environ[env + 'READ_TIMEOUT'])
+            if os.environ.get(env + 'POOL_SIZE'):
+                options['pool_maxsize'] = int(os.environ[env + 'POOL_SIZE'])
+            _clients[name] = HttpClient(name, **options)
+            metrics.register_gauge(f"http.{name}.circuit_open", lambda c=_clients[name]: int(c.breaker.state != 'closed'))
+        return _clients[name]
@@ -11,8 +11,9 @@ from app.modules.training.domain.exercise_library import ExerciseLibrary
 
 # Nutrition
 from app.modules.nutrition.domain.models import Meal
-from app.modules.nutrition.domain.diet import DietPreference, DietPlan
+from app.modules.nutrition.domain.diet import DietPreference, DietPlan, DietPlanJob
 from app.modules.nutrition.domain.hydration import HydrationLog, HydrationGoal
+from app.modules.nutrition.domain.daily_totals import DailyNutritionTotal
 
 # Analytics
 from app.modules.analytics.domain.body_metrics import BodyMetric
@@ -0,0 +1,77 @@
+"""
+Shared Redis connection helper
+
+Resolves the Redis URL the same way for every consumer (rate limiter, cache,
+background queues) and falls back to None when Redis is not configured or
+not reachable, so callers can switch to their in-memory implementation.
+"""
+import os
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_resolved = False
+_lock = threading.Lock()
+
+
+def resolve_redis_url():
+    """
+    Build the Redis URL from the environment
+
+    Returns:
+        str or None: REDIS_URL (Railway format) or a URL built from
+        REDIS_HOST, REDIS_PORT and REDIS_PASSWORD
+    """
+    redis_url = os.environ.get('REDIS_URL')
+    if redis_url:
+        return redis_url
+
+    redis_host = os.environ.get('REDIS_HOST')
+    if not redis_host:
+        return None
+
+    redis_port = os.environ.get('REDIS_PORT', 6379)
+    redis_password = os.environ.get('REDIS_PASSWORD')
+
+    if redis_password:
+        return f"redis://:{redis_password}@{redis_host}:{redis_port}"
+    return f"redis://{redis_host}:{redis_port}"
+
+
+def get_redis():
+    """
+    Return the process-wide Redis client
+
+    The connection is checked once per process; if Redis is missing or down
+    at that point None is returned and callers keep using their local
+    fallback for the lifetime of the worker.
+    """
+    global _client, _resolved
+
+    if _resolved:
+        return _client
+
+    with _lock:
+        if _resolved:
+            return _client
+
+        url = resolve_redis_url()
+        if url:
+            try:
+                import redis
+                client = redis.Redis.from_url(
+                    url,
+                    socket_timeout=5,
+                    socket_connect_timeout=5,
+                    health_check_interval=30
+                )
+                client.ping()
+                _client = client
+            except Exception as e:
+                logger.warning(f"Redis unavailable, using in-memory fallback: {e}")
+                _client = None
+
+        _resolved = True
+        return _client
@@ -0,0 +1,400 @@
+"""
+Background task queue with per-key ordering
+
+Jobs are grouped by a partition key (e.g. the WhatsApp phone number). Jobs
+sharing a key run strictly in order, one at a time; different keys run in
+parallel on the worker pool. Failed jobs are retried in place with
+exponential backoff (so later jobs of the same key wait) and moved to a
+dead-letter list when retries are exhausted.
+
+Redis is used when configured, making the queue durable and shared between
+gunicorn workers. Without Redis an in-process backend with the same
+semantics is used.
+"""
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import deque
+
+from app.shared.redis_client import get_redis
+from app.shared.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryQueueBackend:
+    """Process-local backend (development / deployments without Redis)"""
+
+    def __init__(self):
+        self._partitions = {}  # {key: deque([raw_job, ...])}
+        self._ready = deque()  # keys with pending jobs and no active consumer
+        self._dead = deque(maxlen=1000)
+        self._cond = threading.Condition()
+
+    def push(self, key, raw):
+        with self._cond:
+            partition = self._partitions.setdefault(key, deque())
+            partition.append(raw)
+            # First job of an idle key makes the key claimable
+            if len(partition) == 1:
+                self._ready.append(key)
+                self._cond.notify()
+
+    def claim(self, timeout):
+        with self._cond:
+            if not self._ready:
+                self._cond.wait(timeout)
+            if not self._ready:
+                return None
+            return self._ready.popleft()
+
+    def peek(self, key):
+        with self._cond:
+            partition = self._partitions.get(key)
+            return partition[0] if partition else None
+
+    def touch(self, key):
+        pass
+
+    def release(self, key):
+        with self._cond:
+            self._ready.append(key)
+            self._cond.notify()
+
+    def complete(self, key):
+        with self._cond:
+            partition = self._partitions.get(key)
+            if partition:
+                partition.popleft()
+            if partition:
+                self._ready.append(key)
+                self._cond.notify()
+            else:
+                self._partitions.pop(key, None)
+
+    def dead_letter(self, raw):
+        self._dead.append(raw)
+
+    def depth(self):
+        with self._cond:
+            return sum(len(p) for p in self._partitions.values())
+
+    def requeue_stale(self, visibility_timeout):
+        # Worker threads cannot die without releasing their key in-process
+        return 0
+
+
+class RedisQueueBackend:
+    """
+    Durable Redis backend
+
+    Keys:
+        {prefix}:p:{key}  list of jobs for a partition key
+        {prefix}:ready    list of claimable partition keys
+        {prefix}:inflight hash {key: claimed_at} used to recover crashed workers
+        {prefix}:depth    total pending jobs
+        {prefix}:dead     dead-letter list (capped)
+    """
+
+    # Push the job and, if the partition was idle, make it claimable (atomic)
+    PUSH_SCRIPT = """
+    local n = redis.call('RPUSH', KEYS[1], ARGV[1])
+    redis.call('INCR', KEYS[3])
+    if n == 1 then redis.call('RPUSH', KEYS[2], ARGV[2]) end
+    return n
+    """
+
+    # Pop a claimable key and record the claim in one step, so a crash can
+    # never leave a key out of both the ready list and the inflight hash
+    CLAIM_SCRIPT = """
+    local key = redis.call('LPOP', KEYS[1])
+    if key then redis.call('HSET', KEYS[2], key, ARGV[1]) end
+    return key
+    """
+
+    # Give a claimed key back without touching its jobs (atomic)
+    RELEASE_SCRIPT = """
+    if redis.call('HDEL', KEYS[2], ARGV[1]) == 1 then redis.call('RPUSH', KEYS[1], ARGV[1]) end
+    return 1
+    """
+
+    # Drop the finished job, release the key and re-queue it if more jobs wait (atomic)
+    COMPLETE_SCRIPT = """
+    if redis.call('LPOP', KEYS[1]) then redis.call('DECR', KEYS[3]) end
+    redis.call('HDEL', KEYS[4], ARGV[1])
+    if redis.call('LLEN', KEYS[1]) > 0 then redis.call('RPUSH', KEYS[2], ARGV[1]) end
+    return 1
+    """
+
+    def __init__(self, client, prefix):
+        self.client = client
+        self.prefix = prefix
+        self.ready_key = f"{prefix}:ready"
+        self.inflight_key = f"{prefix}:inflight"
+        self.depth_key = f"{prefix}:depth"
+        self.dead_key = f"{prefix}:dead"
+        self._push = client.register_script(self.PUSH_SCRIPT)
+        self._complete = client.register_script(self.COMPLETE_SCRIPT)
+        self._claim = client.register_script(self.CLAIM_SCRIPT)
+        self._release = client.register_script(self.RELEASE_SCRIPT)
+
+    def _partition_key(self, key):
+        return f"{self.prefix}:p:{key}"
+
+    def push(self, key, raw):
+        self._push(keys=[self._partition_key(key), self.ready_key, self.depth_key], args=[raw, key])
+
+    def claim(self, timeout):
+        # Scripts cannot block like BLPOP: poll with a short, growing pause
+        deadline = time.time() + timeout
+        pause = 0.05
+        while True:
+            key = self._claim(keys=[self.ready_key, self.inflight_key], args=[time.time()])
+            if key:
+                return key.decode() if isinstance(key, bytes) else key
+            if time.time() >= deadline:
+                return None
+            time.sleep(pause)
+            pause = min(pause * 2, 0.5)
+
+    def peek(self, key):
+        raw = self.client.lindex(self._partition_key(key), 0)
+        return raw.decode() if isinstance(raw, bytes) else raw
+
+    def touch(self, key):
+        """Refresh the claim so long retries are not mistaken for a crash"""
+        self.client.hset(self.inflight_key, key, time.time())
+
+    def release(self, key):
+        self._release(keys=[self.ready_key, self.inflight_key], args=[key])
+
+    def complete(self, key):
+        self._complete(
+            keys=[self._partition_key(key), self.ready_key, self.depth_key, self.inflight_key],
+            args=[key]
+        )
+
+    def dead_letter(self, raw):
+        pipe = self.client.pipeline()
+        pipe.lpush(self.dead_key, raw)
+        pipe.ltrim(self.dead_key, 0, 999)
+        pipe.execute()
+
+    def depth(self):
+        return int(self.client.get(self.depth_key) or 0)
+
+    def requeue_stale(self, visibility_timeout):
+        """Release keys held by workers that died mid-job"""
+        cutoff = time.time() - visibility_timeout
+        requeued = 0
+        for key, claimed_at in self.client.hgetall(self.inflight_key).items():
+            if float(claimed_at) < cutoff:
+                # HDEL returns 0 if another worker already recovered it
+                if self.client.hdel(self.inflight_key, key):
+                    self.client.rpush(self.ready_key, key)
+                    requeued += 1
+        return requeued
+
+
+class TaskQueue:
+    """
+    Flask extension wrapping a queue backend and its worker pool
+
+    Usage:
+        @task_queue.task('whatsapp.process_webhook')
+        def handler(payload): ...
+
+        task_queue.enqueue('whatsapp.process_webhook', data, key=phone)
+    """
+
+    def __init__(self, name='default', app=None):
+        self.name = name
+        self._handlers = {}
+        self._backend = None
+        self._app = None
+        self._threads = []
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._app = app
+        self.num_workers = app.config.get('TASK_QUEUE_WORKERS', 2)
+        self.max_retries = app.config.get('TASK_QUEUE_MAX_RETRIES', 3)
+        self.backoff_seconds = app.config.get('TASK_QUEUE_BACKOFF_SECONDS', 2)
+        self.backoff_max_seconds = app.config.get('TASK_QUEUE_BACKOFF_MAX_SECONDS', 60)
+        self.visibility_timeout = app.config.get('TASK_QUEUE_VISIBILITY_TIMEOUT', 300)
+
+        app.extensions['task_queue'] = self
+        metrics.register_gauge(f"task_queue.{self.name}.depth", self.depth)
+
+        # Workers start with the first request so CLI commands (db upgrade, seed)
+        # never spawn consumer threads
+        if self.num_workers:
+            app.before_request(self._ensure_started)
+
+    # ---------- Producer API ----------
+
+    def task(self, name):
+        """Register a handler for a task name"""
+        def decorator(fn):
+            self._handlers[name] = fn
+            return fn
+        return decorator
+
+    def enqueue(self, task_name, payload, key=None):
+        """
+        Add a job to the queue
+
+        Args:
+            task_name: Registered task name
+            payload: JSON-serialisable job data
+            key: Partition key; jobs with the same key run in order.
+                 Defaults to the job id (no ordering constraint).
+
+        Returns:
+            job_id
+        """
+        job_id = str(uuid.uuid4())
+        key = str(key) if key else job_id
+        raw = json.dumps({
+            "id": job_id,
+            "task": task_name,
+            "key": key,
+            "payload": payload,
+            "enqueued_at": time.time()
+        })
+        self._get_backend().push(key, raw)
+        metrics.incr(f"task_queue.{self.name}.enqueued")
+        return job_id
+
+    def depth(self):
+        return self._get_backend().depth()
+
+    # ---------- Workers ----------
+
+    def _get_backend(self):
+        if self._backend is None:
+            client = get_redis()
+            if client is not None:
+                self._backend = RedisQueueBackend(client, prefix=f"fitgen:queue:{self.name}")
+            else:
+                self._backend = InMemoryQueueBackend()
+        return self._backend
+
+    def _ensure_started(self):
+        if not self._started:
+            self.start()
+
+    def start(self, num_workers=None):
+        """Start daemon worker threads in this process"""
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+            count = num_workers or self.num_workers
+            for idx in range(count):
+                thread = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"task-queue-{self.name}-{idx}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            logger.info(f"Task queue '{self.name}' started {count} workers")
+
+    def run_forever(self, num_workers=None):
+        """Blocking entrypoint for dedicated worker processes (flask task-worker)"""
+        self.start(num_workers)
+        try:
+            while not self._stop.is_set():
+                self._stop.wait(1)
+        except KeyboardInterrupt:
+            self._stop.set()
+
+    def _worker_loop(self):
+        backend = self._get_backend()
+        last_reap = 0
+
+        while not self._stop.is_set():
+            try:
+                now = time.time()
+                if now - last_reap > self.visibility_timeout / 2:
+                    last_reap = now
+                    requeued = backend.requeue_stale(self.visibility_timeout)
+                    if requeued:
+                        logger.warning(f"Task queue '{self.name}' recovered {requeued} stale keys")
+
+                key = backend.claim(timeout=1)
+                if key is None:
+                    continue
+
+                # Only a job that ran (or was dead-lettered) is removed; on any
+                # other error the key is handed back with its job intact
+                try:
+                    raw = backend.peek(key)
+                    if raw:
+                        self._run_job(backend, key, raw)
+                except Exception:
+                    try:
+                        backend.release(key)
+                    except Exception:
+                        pass  # requeue_stale() recovers it after the visibility timeout
+                    raise
+                backend.complete(key)
+
+            except Exception as e:
+                logger.error(f"Task queue '{self.name}' worker error: {e}")
+                time.sleep(1)
+
+    def _run_job(self, backend, key, raw):
+        prefix = f"task_queue.{self.name}"
+        try:
+            job = json.loads(raw)
+        except ValueError:
+            logger.error(f"Malformed job on key '{key}', dead-lettered")
+            backend.dead_letter(raw)
+            metrics.incr(f"{prefix}.dead_lettered")
+            return
+
+        task_name = job.get('task')
+        handler = self._handlers.get(task_name)
+
+        if handler is None:
+            logger.error(f"No handler registered for task '{task_name}'")
+            backend.dead_letter(raw)
+            metrics.incr(f"{prefix}.dead_lettered")
+            return
+
+        started = time.time()
+        metrics.observe(f"{prefix}.{task_name}.wait_ms", (started - job['enqueued_at']) * 1000)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                with self._app.app_context():
+                    with metrics.timer(f"{prefix}.{task_name}.run_ms"):
+                        handler(job['payload'])
+                metrics.incr(f"{prefix}.processed")
+                break
+            except Exception as e:
+                metrics.incr(f"{prefix}.failed")
+                if attempt > self.max_retries:
+                    logger.error(f"Task '{task_name}' ({job['id']}) dead-lettered after {attempt} attempts: {e}")
+                    backend.dead_letter(raw)
+                    metrics.incr(f"{prefix}.dead_lettered")
+                    break
+
+                delay = min(self.backoff_seconds * (2 ** (attempt - 1)), self.backoff_max_seconds)
+                logger.warning(f"Task '{task_name}' ({job['id']}) failed (attempt {attempt}), retrying in {delay}s: {e}")
+                metrics.incr(f"{prefix}.retried")
+                time.sleep(delay)
+                backend.touch(key)
+
+        metrics.observe(f"{prefix}.{task_name}.latency_ms", (time.time() - job['enqueued_at']) * 1000)
@@ -1,35 +1,200 @@
 """
 Pagination utility
+
+Every list endpoint pages by cursor (keyset): the next page starts after
+the sort values of the last row returned, so there is no OFFSET to scan
+past and rows inserted meanwhile do not shift pages. Listings order by
+(created_at, id) unless a natural key fits better (e.g. name, id).
+
+The cursor is opaque to clients: they send back the `next_cursor` they
+received. Totals are optional and only computed on the first page:
+
+    total='exact'     COUNT(*)
+    total='estimate'  planner row estimate (EXPLAIN), exact below
+                      EXACT_COUNT_BELOW rows where counting is cheap
 """
+import json
+import uuid
+import base64
+import logging
+from datetime import datetime, date
+
+from flask import request, jsonify, abort, make_response
+from sqlalchemy import tuple_, func
+
+logger = logging.getLogger(__name__)
+
+TOTAL_MODES = ('exact', 'estimate')
+# Estimates below this are replaced by an exact count
+EXACT_COUNT_BELOW = 10000
+
+
+class InvalidCursor(ValueError):
+    """Malformed cursor, or a cursor from a different listing"""
+
+
+def _dump_value(value):
+    if isinstance(value, datetime):
+        return ['dt', value.isoformat()]
+    if isinstance(value, date):
+        return ['d', value.isoformat()]
+    if isinstance(value, uuid.UUID):
+        return ['u', str(value)]
+    return ['v', value]
 
-def paginate(query, page=1, per_page=20, max_per_page=100):
+
+def _load_value(item):
+    tag, value = item
+    if tag == 'dt':
+        return datetime.fromisoformat(value)
+    if tag == 'd':
+        return date.fromisoformat(value)
+    if tag == 'u':
+        return uuid.UUID(value)
+    if tag == 'v':
+        return value
+    raise InvalidCursor(f"Unknown cursor value tag: {tag}")
+
+
+def encode_cursor(values):
+    """Tuple of sort values -> opaque url-safe string"""
+    payload = json.dumps([_dump_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Inverse of encode_cursor; raises InvalidCursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        items = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = tuple(_load_value(item) for item in items)
+    except InvalidCursor:
+        raise
+    except Exception as e:
+        raise InvalidCursor(f"Malformed cursor: {e}")
+    if len(values) != size:
+        raise InvalidCursor("Cursor does not match this listing")
+    return values
+
+
+def page_args(default_limit=20, default_total=None):
     """
-    Paginate SQLAlchemy query
-    
+    (cursor, limit, total) from the query string
+
+    `limit` also accepts the old `per_page` name; `total` is 'exact',
+    'estimate' or anything else for no total. The old offset `page`
+    parameter is rejected with 400 instead of silently returning page 1.
+    """
+    if 'page' in request.args:
+        abort(make_response(jsonify({
+            "msg": "The 'page' parameter is no longer supported; pass the previous page's next_cursor as 'cursor'"
+        }), 400))
+    limit = request.args.get('limit', type=int) or request.args.get('per_page', default_limit, type=int)
+    total = request.args.get('total', default_total)
+    return request.args.get('cursor') or None, limit, total if total in TOTAL_MODES else None
+
+
+def count(query, mode='exact'):
+    """
+    Row count of a query
+
+    'estimate' reads the planner's row estimate, which costs one EXPLAIN
+    instead of a scan. It falls back to COUNT(*) when the estimate is small
+    (cheap to count, and estimates are least accurate for selective filters)
+    or when EXPLAIN is not available.
+    """
+    query = query.order_by(None)
+    if mode == 'estimate':
+        estimate = _planner_estimate(query)
+        if estimate is not None and estimate >= EXACT_COUNT_BELOW:
+            return estimate, True
+    return query.session.query(func.count()).select_from(query.subquery()).scalar(), False
+
+
+def _planner_estimate(query):
+    try:
+        # SAVEPOINT: a failed EXPLAIN must not abort the caller's transaction
+        with query.session.begin_nested():
+            connection = query.session.connection()
+            # Expanding IN parameters rendered as one bind per value
+            compiled = query.statement.compile(
+                dialect=connection.dialect, compile_kwargs={"render_postcompile": True}
+            )
+            # Straight to the driver: bind processors do not run, adapt UUIDs here
+            params = {name: str(value) if isinstance(value, uuid.UUID) else value
+                      for name, value in compiled.params.items()}
+            plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception as e:
+        logger.warning(f"Row estimate failed, counting instead: {e}")
+        return None
+
+
+def paginate(query, order_by, cursor=None, limit=20, max_limit=100, descending=True, key=None, total=None):
+    """
+    Paginate a query by keyset (seek) instead of OFFSET
+
     Args:
-        query: SQLAlchemy query object
-        page: Page number (1-indexed)
-        per_page: Items per page
-        max_per_page: Maximum items per page
-        
+        query: SQLAlchemy query (entities or labeled columns)
+        order_by: sort columns; the last one must be unique (usually id)
+                  and none of them NULL
+        cursor: `next_cursor` from the previous page, or None
+        limit: Items per page
+        max_limit: Maximum items per page
+        descending: newest first
+        key: row -> tuple of sort values (default: attributes named after
+             the columns)
+        total: None, 'exact' or 'estimate'; only computed without cursor
+
     Returns:
-        dict: Pagination data with items and metadata
+        dict: items, next_cursor (None on the last page), has_more, limit,
+              total and total_is_estimate (None when not computed)
+
+    Raises:
+        InvalidCursor
     """
-    # Limit per_page to max_per_page
-    per_page = min(per_page, max_per_page)
-    
-    paginated = query.paginate(
-        page=page,
-        per_page=per_page,
-        error_out=False
-    )
-    
+    limit = max(1, min(limit or 1, max_limit))
+    columns = tuple(order_by)
+    if key is None:
+        key = lambda row: tuple(getattr(row, column.key) for column in columns)
+
+    total_count, estimated = None, None
+    if total in TOTAL_MODES and not cursor:
+        total_count, estimated = count(query, total)
+
+    if cursor:
+        values = decode_cursor(cursor, len(columns))
+        if descending:
+            query = query.filter(tuple_(*columns) < tuple_(*values))
+        else:
+            query = query.filter(tuple_(*columns) > tuple_(*values))
+
+    ordering = [column.desc() if descending else column.asc() for column in columns]
+    rows = query.order_by(*ordering).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    items = rows[:limit]
     return {
-        'items': [item for item in paginated.items],
-        'total': paginated.total,
-        'page': page,
-        'pages': paginated.pages,
-        'per_page': per_page,
-        'has_next': paginated.has_next,
-        'has_prev': paginated.has_prev
+        'items': items,
+        'next_cursor': encode_cursor(key(items[-1])) if has_more else None,
+        'has_more': has_more,
+        'limit': limit,
+        'total': total_count,
+        'total_is_estimate': estimated
+    }
+
+
+def page_meta(page):
+    """Pagination fields of a list response (next to the items)"""
+    meta = {
+        'next_cursor': page['next_cursor'],
+        'has_more': page['has_more'],
+        'limit': page['limit']
     }
+    if page['total'] is not None:
+        meta['total'] = page['total']
+        meta['total_is_estimate'] = page['total_is_estimate']
+        meta['pages'] = -(-page['total'] // page['limit'])
+    return meta
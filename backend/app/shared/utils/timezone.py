@@ -17,3 +17,19 @@ def to_cuiaba(dt):
 def get_today_cuiaba():
     """Retorna a data de hoje em BRT"""
     return now_cuiaba().date()
+
+def day_range(start_date, end_date=None):
+    """
+    Limites [início, fim) em datetime para filtrar colunas DateTime por dia
+
+    Use `col >= start, col < end` em vez de `func.date(col)`, que impede o uso
+    de índices em (user_id, col).
+
+    Args:
+        start_date: primeiro dia (inclusivo)
+        end_date: último dia (inclusivo); padrão = start_date
+    """
+    end_date = end_date or start_date
+    start = datetime.combine(start_date, datetime.min.time())
+    end = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+    return start, end
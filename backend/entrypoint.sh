@@ -34,12 +34,4 @@ echo "Binding to 0.0.0.0:${PORT:-5000}"
 echo "========================================="
 
 # Start Gunicorn
-exec gunicorn \
-    --bind 0.0.0.0:${PORT:-5000} \
-    --workers 2 \
-    --timeout 120 \
-    --access-logfile - \
-    --error-logfile - \
-    --log-level info \
-    wsgi:app
-
+exec gunicorn -c gunicorn.conf.py wsgi:app
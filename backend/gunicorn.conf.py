@@ -0,0 +1,26 @@
+"""
+Gunicorn settings
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+gevent workers (default) run up to GUNICORN_WORKER_CONNECTIONS requests per
+process, so slow Gemini/Evolution calls no longer take a whole worker.
+GUNICORN_WORKER_CLASS=sync keeps the one-request-per-worker mode.
+The SQLAlchemy pool is sized from the same variables
+(app/shared/concurrency.py).
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = os.environ.get('GUNICORN_ERROR_LOG', '-')
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
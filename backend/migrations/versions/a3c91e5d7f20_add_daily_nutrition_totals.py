@@ -0,0 +1,62 @@
+"""add daily nutrition totals
+
+Revision ID: a3c91e5d7f20
+Revises: 661fb4bce03a
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c91e5d7f20'
+down_revision = '661fb4bce03a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_nutrition_totals',
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('calories', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('protein_g', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('carbs_g', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('fat_g', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('meal_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('water_ml', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('hydration_log_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+
+    # Backfill from existing meals and hydration logs (same as `flask rebuild-daily-totals`)
+    op.execute("""
+        INSERT INTO daily_nutrition_totals
+            (user_id, day, calories, protein_g, carbs_g, fat_g, meal_count, water_ml, hydration_log_count, updated_at)
+        SELECT user_id, day, SUM(calories), SUM(protein_g), SUM(carbs_g), SUM(fat_g),
+               SUM(meal_count), SUM(water_ml), SUM(hydration_log_count), now()
+        FROM (
+            SELECT user_id, DATE(consumed_at) AS day,
+                   COALESCE(SUM(calories), 0) AS calories, COALESCE(SUM(protein_g), 0) AS protein_g,
+                   COALESCE(SUM(carbs_g), 0) AS carbs_g, COALESCE(SUM(fat_g), 0) AS fat_g,
+                   COUNT(id) AS meal_count, 0 AS water_ml, 0 AS hydration_log_count
+            FROM meals
+            WHERE consumed_at IS NOT NULL
+            GROUP BY user_id, DATE(consumed_at)
+            UNION ALL
+            SELECT user_id, DATE(logged_at), 0, 0, 0, 0, 0,
+                   COALESCE(SUM(amount_ml), 0), COUNT(id)
+            FROM hydration_logs
+            WHERE logged_at IS NOT NULL
+            GROUP BY user_id, DATE(logged_at)
+        ) AS per_day
+        GROUP BY user_id, day
+    """)
+
+
+def downgrade():
+    op.drop_table('daily_nutrition_totals')
@@ -0,0 +1,47 @@
+"""add user/time-range indexes
+
+Revision ID: b7e42d19c6a5
+Revises: a3c91e5d7f20
+Create Date: 2026-10-18 14:05:12.774310
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e42d19c6a5'
+down_revision = 'a3c91e5d7f20'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns/expressions)
+INDEXES = [
+    ('ix_meals_user_consumed', 'meals', 'user_id, consumed_at'),
+    ('ix_hydration_logs_user_logged', 'hydration_logs', 'user_id, logged_at'),
+    ('ix_body_metrics_user_recorded', 'body_metrics', 'user_id, recorded_at'),
+    ('ix_workout_sessions_user_started', 'workout_sessions', 'user_id, started_at'),
+    ('ix_workout_sessions_user_status_completed', 'workout_sessions', 'user_id, status, completed_at'),
+    ('ix_exercise_logs_user_created', 'exercise_logs', 'user_id, created_at'),
+    ('ix_exercise_logs_session_exercise', 'exercise_logs', 'workout_session_id, exercise_id'),
+    # Pode já existir em bancos criados antes do sync de models
+    ('idx_chat_messages_user_date', 'chat_messages', 'user_id, created_at DESC'),
+    # Expressões: agrupamento por dia local no rebuild dos totais diários
+    ('ix_meals_user_day', 'meals', 'user_id, (consumed_at::date)'),
+    ('ix_hydration_logs_user_day', 'hydration_logs', 'user_id, (logged_at::date)'),
+]
+
+
+def upgrade():
+    # CONCURRENTLY não roda dentro de transação; evita travar escritas em produção
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})')
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            if name == 'idx_chat_messages_user_date':
+                continue
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
@@ -0,0 +1,49 @@
+"""add diet plan jobs
+
+Revision ID: c4f8e2a91d37
+Revises: b7e42d19c6a5
+Create Date: 2026-10-18 18:40:27.519364
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f8e2a91d37'
+down_revision = 'b7e42d19c6a5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('diet_plan_jobs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('kind', sa.String(length=10), nullable=False),
+        sa.Column('day', sa.String(length=20), nullable=True),
+        sa.Column('request_key', sa.String(length=40), nullable=False),
+        sa.Column('preference_hash', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('plan_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['plan_id'], ['diet_plans.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # Um job em andamento por usuário e pedido: duplicatas se juntam a ele
+    op.create_index('ux_diet_plan_jobs_inflight', 'diet_plan_jobs', ['user_id', 'request_key'],
+                    unique=True, postgresql_where=sa.text("status IN ('pending', 'running')"))
+    op.create_index('ix_diet_plan_jobs_user_created', 'diet_plan_jobs', ['user_id', 'created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_diet_plan_jobs_user_created', table_name='diet_plan_jobs')
+    op.drop_index('ux_diet_plan_jobs_inflight', table_name='diet_plan_jobs')
+    op.drop_table('diet_plan_jobs')
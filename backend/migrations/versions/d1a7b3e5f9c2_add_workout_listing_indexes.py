@@ -0,0 +1,36 @@
+"""add workout listing indexes
+
+Revision ID: d1a7b3e5f9c2
+Revises: c4f8e2a91d37
+Create Date: 2026-10-18 19:22:41.106583
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1a7b3e5f9c2'
+down_revision = 'c4f8e2a91d37'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns)
+INDEXES = [
+    # Paginação por cursor da listagem de planos (admin)
+    ('ix_workout_plans_created_id', 'workout_plans', 'created_at, id'),
+    # Contagem de dias por plano
+    ('ix_workout_days_plan', 'workout_days', 'workout_plan_id'),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})')
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
@@ -0,0 +1,35 @@
+"""add cursor pagination indexes
+
+Revision ID: e5c8d2f4a7b1
+Revises: d1a7b3e5f9c2
+Create Date: 2026-10-18 20:03:15.482907
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5c8d2f4a7b1'
+down_revision = 'd1a7b3e5f9c2'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns) — ordenação (created_at, id) das listagens paginadas por cursor
+INDEXES = [
+    ('ix_users_created_id', 'users', 'created_at, id'),
+    ('ix_notifications_created_id', 'notifications', 'created_at, id'),
+    ('ix_feedback_user_created', 'feedback', 'user_id, created_at'),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})')
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
@@ -0,0 +1,29 @@
+"""add activity counters to user_streaks
+
+Revision ID: f2b6d9a1c3e8
+Revises: e5c8d2f4a7b1
+Create Date: 2026-10-18 21:40:12.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b6d9a1c3e8'
+down_revision = 'e5c8d2f4a7b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # NULL = ainda não inicializado; o primeiro evento conta uma vez e grava
+    with op.batch_alter_table('user_streaks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('workout_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('meal_count', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('user_streaks', schema=None) as batch_op:
+        batch_op.drop_column('meal_count')
+        batch_op.drop_column('workout_count')
@@ -0,0 +1,135 @@
+"""
+Benchmark: nutrition history aggregation (Python loop vs SQL date_trunc)
+
+Creates a throwaway user with N meals spread over the last two years,
+rebuilds the user's daily totals, times the old "load every Meal and sum
+in Python" approach against NutritionHistoryService.aggregate for each
+period, then deletes the data.
+
+Usage (from backend/, with DATABASE_URL pointing to a non-production DB):
+    python scripts/benchmark_nutrition_history.py --meals 12000 --runs 5
+"""
+import argparse
+import random
+import statistics
+import sys
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app import create_app
+from app.shared.extensions import db
+from app.modules.identity.domain.models import User
+from app.modules.nutrition.domain.models import Meal
+from app.modules.nutrition.domain.daily_totals import DailyNutritionTotal
+from app.modules.nutrition.application.daily_totals_service import DailyTotalsService
+from app.modules.nutrition.application.history_service import NutritionHistoryService, PERIOD_UNITS
+
+
+def python_aggregate(user_id, start_date, end_date, period):
+    """Previous implementation: load rows and group in Python"""
+    meals = Meal.query.filter(
+        Meal.user_id == user_id,
+        Meal.consumed_at >= datetime.combine(start_date, datetime.min.time()),
+        Meal.consumed_at <= datetime.combine(end_date, datetime.max.time())
+    ).order_by(Meal.consumed_at).all()
+
+    aggregated = {}
+    for meal in meals:
+        meal_date = meal.consumed_at.date()
+        if period == 'dia':
+            key = meal_date.isoformat()
+        elif period == 'semana':
+            key = (meal_date - timedelta(days=meal_date.weekday())).isoformat()
+        elif period == 'mes':
+            key = f"{meal_date.year}-{meal_date.month:02d}-01"
+        else:
+            key = f"{meal_date.year}-01-01"
+
+        entry = aggregated.setdefault(key, {'calories': 0, 'protein': 0, 'carbs': 0, 'fats': 0, 'meal_count': 0})
+        entry['calories'] += meal.calories or 0
+        entry['protein'] += meal.protein_g or 0
+        entry['carbs'] += meal.carbs_g or 0
+        entry['fats'] += meal.fat_g or 0
+        entry['meal_count'] += 1
+
+    return aggregated
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def seed(user_id, count):
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "name": "Benchmark meal",
+            "calories": random.uniform(100, 900),
+            "protein_g": random.uniform(5, 60),
+            "carbs_g": random.uniform(5, 120),
+            "fat_g": random.uniform(1, 40),
+            "consumed_at": now - timedelta(minutes=random.randint(0, 2 * 365 * 24 * 60)),
+            "created_at": now
+        }
+        for _ in range(count)
+    ]
+    db.session.execute(Meal.__table__.insert(), rows)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--meals', type=int, default=12000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        user = User(
+            email=f"bench-{uuid.uuid4().hex[:8]}@fitgen.local",
+            password_hash="!",
+            name="Benchmark"
+        )
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+        try:
+            print(f"Seeding {args.meals} meals...")
+            seed(user_id, args.meals)
+            DailyTotalsService.rebuild(user_id)
+
+            end_date = datetime.utcnow().date()
+            start_date = end_date - timedelta(days=2 * 365)
+
+            print(f"\n{'period':<8} {'python (ms)':>12} {'sql (ms)':>10} {'speedup':>8}")
+            for period, unit in PERIOD_UNITS.items():
+                py_ms = timed(lambda: python_aggregate(user_id, start_date, end_date, period), args.runs)
+                sql_ms = timed(lambda: NutritionHistoryService.aggregate(user_id, start_date, end_date, unit), args.runs)
+                print(f"{period:<8} {py_ms:>12.1f} {sql_ms:>10.1f} {py_ms / sql_ms:>7.1f}x")
+        finally:
+            db.session.rollback()
+            Meal.query.filter_by(user_id=user_id).delete()
+            DailyNutritionTotal.query.filter_by(user_id=user_id).delete()
+            User.query.filter_by(id=user_id).delete()
+            db.session.commit()
+            print("\nBenchmark data removed.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Load test: requests/sec of the coach chat with stubbed Gemini latency
+
+Fires concurrent POST /api/chat (and optionally GET /health alongside it)
+against a running server and reports throughput and latency percentiles.
+Start the server with the fake Gemini backend so only the serving mode is
+measured, e.g. comparing sync and gevent workers:
+
+    GEMINI_BACKEND=fake GEMINI_FAKE_LATENCY_MS=2000 GEMINI_MAX_CONCURRENCY=100 \\
+        GUNICORN_WORKER_CLASS=sync gunicorn -c gunicorn.conf.py wsgi:app
+    GEMINI_BACKEND=fake GEMINI_FAKE_LATENCY_MS=2000 GEMINI_MAX_CONCURRENCY=100 \\
+        gunicorn -c gunicorn.conf.py wsgi:app
+
+Usage (from backend/; the user must exist in the target DB):
+    python scripts/load_test.py --email user@example.com --password secret \\
+        --concurrency 50 --duration 30 --with-health
+
+With 2 sync workers and 2s of Gemini latency the chat tops out near
+1 req/s and /health queues behind it; gevent workers scale with
+--concurrency until GEMINI_MAX_CONCURRENCY or the DB pool is the limit.
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def login(base_url, email, password):
+    response = requests.post(f"{base_url}/api/auth/login", json={"email": email, "password": password}, timeout=30)
+    response.raise_for_status()
+    return response.json()['access_token']
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Results:
+    def __init__(self):
+        self.latencies = {}  # {endpoint: [ms]}
+        self.errors = {}  # {endpoint: count}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, elapsed_ms, ok):
+        with self._lock:
+            if ok:
+                self.latencies.setdefault(endpoint, []).append(elapsed_ms)
+            else:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self, elapsed_s):
+        print(f"\n{'endpoint':<10} {'ok':>7} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for endpoint in sorted(set(self.latencies) | set(self.errors)):
+            values = self.latencies.get(endpoint, [])
+            print(
+                f"{endpoint:<10} {len(values):>7} {self.errors.get(endpoint, 0):>7} "
+                f"{len(values) / elapsed_s:>8.2f} {percentile(values, 50):>9.0f} "
+                f"{percentile(values, 95):>9.0f} {percentile(values, 99):>9.0f}"
+            )
+        chat = self.latencies.get('chat', [])
+        if chat:
+            print(f"\nchat mean: {statistics.mean(chat):.0f} ms over {elapsed_s:.1f}s")
+
+
+def run_client(base_url, endpoint, token, deadline, results):
+    session = requests.Session()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            if endpoint == 'chat':
+                response = session.post(
+                    f"{base_url}/api/chat",
+                    json={"message": "Quantas calorias tem uma banana?"},
+                    headers=headers, timeout=120
+                )
+            else:
+                response = session.get(f"{base_url}/health", timeout=30)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        results.record(endpoint, (time.perf_counter() - start) * 1000, ok)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coach chat load test")
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--token', help='JWT access token (or use --email/--password)')
+    parser.add_argument('--email')
+    parser.add_argument('--password')
+    parser.add_argument('--concurrency', type=int, default=20, help='concurrent chat clients')
+    parser.add_argument('--duration', type=float, default=30, help='seconds')
+    parser.add_argument('--with-health', action='store_true', help='also run GET /health clients')
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip('/')
+    token = args.token
+    if not token:
+        if not (args.email and args.password):
+            parser.error('--token or --email/--password is required')
+        token = login(base_url, args.email, args.password)
+
+    clients = [('chat', args.concurrency)]
+    if args.with_health:
+        clients.append(('health', max(1, args.concurrency // 4)))
+
+    results = Results()
+    total = sum(count for _, count in clients)
+    print(f"Running {total} clients against {base_url} for {args.duration:.0f}s ...")
+
+    start = time.monotonic()
+    deadline = start + args.duration
+    with ThreadPoolExecutor(max_workers=total) as pool:
+        for endpoint, count in clients:
+            for _ in range(count):
+                pool.submit(run_client, base_url, endpoint, token, deadline, results)
+
+    results.report(time.monotonic() - start)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
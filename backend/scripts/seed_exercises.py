@@ -1,5 +1,6 @@
 from app import create_app, db
-from app.models.exercise_library import ExerciseLibrary
+from app.modules.training.domain.exercise_library import ExerciseLibrary
+from app.modules.training.application.exercise_catalog import ExerciseCatalog
 
 app = create_app()
 
@@ -1209,6 +1210,7 @@ def seed():
                 print(f"⊘ Skipped: {ex_data['name']} (Already exists)")
         
         db.session.commit()
+        ExerciseCatalog.invalidate()
         
         print("=" * 60)
         print(f"Done!")
@@ -0,0 +1,74 @@
+"""
+Tests for the local food table (parsing, matching, portions)
+
+Uses the shipped taco_foods.csv, so expected foods and grams follow it.
+
+Usage (from backend/):
+    pytest scripts/test_food_table.py -v
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.modules.nutrition.application.food_table import FoodTable
+
+
+@pytest.fixture(scope='module')
+def table():
+    return FoodTable.load()
+
+
+def items(table, description):
+    result = table.estimate(description)
+    return result and [(item['food'], item['grams']) for item in result['items']]
+
+
+@pytest.mark.parametrize('description, expected', [
+    ('3 bananas', [('Banana prata', 258)]),
+    ('2 ovos', [('Ovo cozido', 100)]),
+    ('pães franceses', [('Pão francês', 50)]),
+    ('batatas fritas', [('Batata frita', 100)]),
+])
+def test_plurals_match_the_singular_name(table, description, expected):
+    assert items(table, description) == expected
+
+
+@pytest.mark.parametrize('description', ['frango frito', 'arroz frito'])
+def test_one_shared_word_is_not_a_match(table, description):
+    assert table.estimate(description) is None
+
+
+def test_multi_word_items_still_match_full_names(table):
+    assert items(table, 'peito de frango') == [('Peito de frango grelhado', 120)]
+    assert items(table, 'feijao preto') == [('Feijão preto cozido', 140)]
+
+
+def test_can_size_depends_on_the_food(table):
+    assert items(table, '1 lata de atum') == [('Atum em conserva', 120)]
+    assert items(table, '2 latas de cerveja') == [('Cerveja', 700)]
+    # No can size for this food: let the caller fall back to Gemini
+    assert table.estimate('1 lata de feijao') is None
+
+
+@pytest.mark.parametrize('description', ['arroz 150', 'arroz 150g', 'arroz 150 g'])
+def test_trailing_amount_in_grams(table, description):
+    assert items(table, description) == [('Arroz branco cozido', 150)]
+
+
+def test_trailing_small_amount_counts_units(table):
+    assert items(table, 'banana 2') == [('Banana prata', 172)]
+
+
+def test_several_items(table):
+    assert items(table, '200g de frango, arroz e feijão') == [
+        ('Peito de frango grelhado', 200),
+        ('Arroz branco cozido', 150),
+        ('Feijão carioca cozido', 140),
+    ]
+
+
+def test_prefix_search_accepts_plurals(table):
+    assert [food['name'] for food in table.search_prefix('ovos')] == ['Ovo cozido', 'Ovo frito']
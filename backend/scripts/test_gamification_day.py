@@ -0,0 +1,82 @@
+"""
+Tests for crediting gamification events on the day they happened
+
+Jobs can run after midnight (queue lag, retries): streaks and the
+leaderboard's last-activity index must follow the event's 'day', not the
+day the job runs. The streak row is an in-memory object; handle_activity
+is replaced where the test only checks what the subscribers pass on.
+
+Usage (from backend/):
+    pytest scripts/test_gamification_day.py -v
+"""
+import os
+import sys
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.modules.gamification.application import service, leaderboard
+from app.modules.gamification.application.service import GamificationService
+from app.modules.gamification.application.leaderboard import (
+    LeaderboardService, InMemoryLeaderboardBackend, use_backend
+)
+
+EVENT_DAY = date(2026, 3, 11)
+JOB_DAY = EVENT_DAY + timedelta(days=1)
+
+
+def streak_row(last_date, current):
+    return SimpleNamespace(last_workout_date=last_date, current_workout_streak=current,
+                           longest_workout_streak=current)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(service, 'get_today_cuiaba', lambda: JOB_DAY)
+    monkeypatch.setattr(GamificationService, 'handle_activity',
+                        staticmethod(lambda user_id, activity, **kwargs: recorded.append((activity, kwargs))))
+    return recorded
+
+
+def test_late_job_keeps_the_streak_of_the_event_day():
+    # Trained on the 10th; the job for the 11th only runs on the 12th
+    row = streak_row(EVENT_DAY - timedelta(days=1), 4)
+    assert GamificationService.advance_streak(row, 'workout', EVENT_DAY) == (5, True)
+    assert row.last_workout_date == EVENT_DAY
+
+    # Running it with the job day would have broken the streak
+    row = streak_row(EVENT_DAY - timedelta(days=1), 4)
+    assert GamificationService.advance_streak(row, 'workout', JOB_DAY) == (1, True)
+
+
+def test_older_event_does_not_rewind_the_streak():
+    row = streak_row(JOB_DAY, 6)
+    assert GamificationService.advance_streak(row, 'workout', EVENT_DAY) == (6, False)
+    assert row.last_workout_date == JOB_DAY
+
+
+def test_subscribers_pass_the_event_day(calls):
+    service.on_meal_logged({'user_id': 'u', 'day': EVENT_DAY.isoformat()})
+    service.on_workout_finished({'user_id': 'u', 'day': EVENT_DAY.isoformat()})
+    assert calls == [('meal_log', {'day': EVENT_DAY}), ('workout_finish', {'day': EVENT_DAY})]
+
+
+def test_events_without_day_use_today(calls):
+    service.on_workout_finished({'user_id': 'u'})
+    assert calls == [('workout_finish', {'day': JOB_DAY})]
+
+
+def test_leaderboard_last_activity_uses_the_event_day(monkeypatch):
+    use_backend(InMemoryLeaderboardBackend())
+    monkeypatch.setattr(leaderboard, 'get_today_cuiaba', lambda: JOB_DAY + timedelta(days=1))
+    monkeypatch.setattr(LeaderboardService, '_active_members', staticmethod(lambda members: set(members)))
+    try:
+        LeaderboardService.record('a', streaks={'workout_streak': 3}, day=EVENT_DAY)
+        # Two days after the event: lapsed, even though the job ran a day later
+        assert LeaderboardService.top('workout_streak') == []
+    finally:
+        use_backend(None)
@@ -0,0 +1,168 @@
+"""
+Tests for the outbound HTTP layer (app/shared/http_client.py)
+
+Runs against a local stub server started in-process, so no integration is
+contacted. Covers timeouts, retries (idempotent only), the retry budget and
+the circuit breaker.
+
+Usage (from backend/):
+    pytest scripts/test_http_client.py -v
+"""
+import os
+import sys
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.shared.http_client import HttpClient, CircuitOpenError
+from app.shared.utils.metrics import metrics
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    /ok       200
+    /slow     200 after 0.5s
+    /fail     500
+    /flaky    500 for the first `flaky_failures` hits, then 200
+    """
+    hits = {}
+    flaky_failures = 1
+
+    def _respond(self):
+        path = self.path.split('?')[0]
+        count = StubHandler.hits[path] = StubHandler.hits.get(path, 0) + 1
+
+        if path == '/slow':
+            time.sleep(0.5)
+        status = 200
+        if path == '/fail' or (path == '/flaky' and count <= StubHandler.flaky_failures):
+            status = 500
+
+        body = b'{"ok": true}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _respond
+    do_POST = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def stub_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def reset_stub():
+    StubHandler.hits = {}
+    StubHandler.flaky_failures = 1
+
+
+def make_client(**options):
+    options.setdefault('backoff_seconds', 0)
+    return HttpClient('stub', **options)
+
+
+def test_success_records_latency(stub_url):
+    client = make_client()
+
+    response = client.get(f"{stub_url}/ok")
+
+    assert response.status_code == 200
+    assert metrics.snapshot()['histograms']['http.stub.latency_ms']['count'] >= 1
+
+
+def test_read_timeout_is_enforced(stub_url):
+    client = make_client(read_timeout=0.1, max_retries=0)
+
+    start = time.perf_counter()
+    with pytest.raises(requests.Timeout):
+        client.get(f"{stub_url}/slow")
+
+    assert time.perf_counter() - start < 0.4
+
+
+def test_idempotent_call_is_retried(stub_url):
+    client = make_client()
+
+    response = client.get(f"{stub_url}/flaky")
+
+    assert response.status_code == 200
+    assert StubHandler.hits['/flaky'] == 2
+
+
+def test_post_is_not_retried_by_default(stub_url):
+    client = make_client()
+
+    with pytest.raises(requests.HTTPError):
+        client.post(f"{stub_url}/flaky")
+
+    assert StubHandler.hits['/flaky'] == 1
+
+
+def test_retry_budget_caps_retries(stub_url):
+    client = make_client(max_retries=5, failure_threshold=100)
+    client.budget.min_per_window = 2
+    client.budget.ratio = 0
+
+    with pytest.raises(requests.HTTPError):
+        client.get(f"{stub_url}/fail")
+
+    # 1 attempt + 2 budgeted retries
+    assert StubHandler.hits['/fail'] == 3
+
+
+def test_circuit_opens_and_fails_fast(stub_url):
+    client = make_client(max_retries=0, failure_threshold=3, reset_timeout=60)
+
+    for _ in range(3):
+        with pytest.raises(requests.HTTPError):
+            client.get(f"{stub_url}/fail")
+
+    with pytest.raises(CircuitOpenError):
+        client.get(f"{stub_url}/fail")
+
+    assert StubHandler.hits['/fail'] == 3
+    assert client.breaker.state == 'open'
+
+
+def test_circuit_half_open_trial_closes_on_success(stub_url):
+    client = make_client(max_retries=0, failure_threshold=1, reset_timeout=0.1)
+
+    with pytest.raises(requests.HTTPError):
+        client.get(f"{stub_url}/fail")
+    assert client.breaker.state == 'open'
+
+    time.sleep(0.15)
+    assert client.get(f"{stub_url}/ok").status_code == 200
+    assert client.breaker.state == 'closed'
+
+
+def test_client_errors_do_not_trip_the_breaker(stub_url):
+    client = make_client(failure_threshold=1)
+
+    def sdk_call():
+        raise ValueError("400 bad request")
+
+    with pytest.raises(ValueError):
+        client.call(sdk_call, is_failure=lambda e: False)
+
+    assert client.breaker.state == 'closed'
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
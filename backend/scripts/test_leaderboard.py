@@ -0,0 +1,103 @@
+"""
+Tests for the sorted-set leaderboards
+
+Runs LeaderboardService on the in-memory backend; the active-user lookup
+(Postgres) is replaced by a fixed set of ids and "today" is pinned.
+
+Usage (from backend/):
+    pytest scripts/test_leaderboard.py -v
+"""
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.modules.gamification.application import leaderboard
+from app.modules.gamification.application.leaderboard import (
+    LeaderboardService, InMemoryLeaderboardBackend, use_backend
+)
+
+TODAY = date(2026, 3, 11)
+
+
+@pytest.fixture
+def board(monkeypatch):
+    backend = InMemoryLeaderboardBackend()
+    use_backend(backend)
+    active = set()
+    today = {'value': TODAY}
+    monkeypatch.setattr(LeaderboardService, '_active_members',
+                        staticmethod(lambda members: {m for m in members if m in active}))
+    monkeypatch.setattr(leaderboard, 'get_today_cuiaba', lambda: today['value'])
+    yield backend, active, today
+    use_backend(None)
+
+
+def test_top_is_ordered_and_ranked(board):
+    _, active, _ = board
+    active.update({'a', 'b', 'c'})
+    LeaderboardService.record('a', xp=10)
+    LeaderboardService.record('b', xp=30)
+    LeaderboardService.record('c', xp=20)
+
+    top = LeaderboardService.top('xp', 'all', 10)
+    assert [(e['rank'], e['user_id'], e['score']) for e in top] == [(1, 'b', 30), (2, 'c', 20), (3, 'a', 10)]
+    assert LeaderboardService.rank('a', 'xp') == {'rank': 3, 'score': 10}
+
+
+def test_inactive_users_are_filtered_before_slicing(board):
+    backend, active, _ = board
+    for idx in range(30):
+        LeaderboardService.record(f"u{idx:02d}", xp=100 - idx)
+    # The 25 best are gone (deleted or deactivated outside the app)
+    active.update(f"u{idx:02d}" for idx in range(25, 30))
+
+    top = LeaderboardService.top('xp', 'all', 3)
+    assert [e['user_id'] for e in top] == ['u25', 'u26', 'u27']
+    assert [e['rank'] for e in top] == [1, 2, 3]
+    # Stale members were dropped from the board, so ranks agree with top()
+    assert LeaderboardService.rank('u25', 'xp')['rank'] == 1
+
+
+def test_remove_user_clears_every_board(board):
+    _, active, _ = board
+    active.update({'a', 'b'})
+    LeaderboardService.record('a', xp=50, streaks={'workout_streak': 4})
+    LeaderboardService.record('b', xp=10, streaks={'workout_streak': 2})
+
+    LeaderboardService.remove_user('a')
+
+    for metric in ('xp', 'workout_streak'):
+        for period in ('all', 'week'):
+            assert LeaderboardService.rank('a', metric, period) is None
+            assert [e['user_id'] for e in LeaderboardService.top(metric, period)] == ['b']
+
+
+def test_all_time_streaks_decay(board):
+    _, active, today = board
+    active.update({'a', 'b'})
+    LeaderboardService.record('a', streaks={'workout_streak': 7})
+    today['value'] = TODAY + timedelta(days=1)
+    LeaderboardService.record('b', streaks={'workout_streak': 3})
+
+    # 'a' logged yesterday: the streak is still alive
+    assert [e['user_id'] for e in LeaderboardService.top('workout_streak')] == ['a', 'b']
+
+    # Two days without a workout: 'a' lapsed, 'b' did not
+    today['value'] = TODAY + timedelta(days=2)
+    assert [e['user_id'] for e in LeaderboardService.top('workout_streak')] == ['b']
+    assert LeaderboardService.rank('a', 'workout_streak') is None
+    # The weekly board keeps the best streak of the week
+    assert LeaderboardService.rank('a', 'workout_streak', 'week')['score'] == 7
+
+
+def test_record_without_streaks_only_touches_xp(board):
+    backend, active, _ = board
+    active.add('a')
+    LeaderboardService.record('a', xp=5, streaks=None)
+    assert LeaderboardService.top('xp') == [{'rank': 1, 'user_id': 'a', 'score': 5}]
+    assert LeaderboardService.top('workout_streak') == []
+    assert LeaderboardService.top('nutrition_streak') == []
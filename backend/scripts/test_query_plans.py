@@ -0,0 +1,207 @@
+"""
+Query-plan regression suite for the user/time-range access paths
+
+Seeds a local Postgres with a few hundred users' worth of meals, hydration
+logs, body metrics, workout sessions, exercise logs and chat messages and
+runs ANALYZE. Each hot path is then driven through the real route or service
+code. The SELECTs it sends are captured as compiled, with their parameters,
+and EXPLAINed, so the test fails when a code change moves a query off its
+index. No SQL is copied by hand.
+
+The schema must be migrated first (flask db upgrade). Skipped unless
+QUERY_PLAN_DATABASE_URL is set — never point it at production.
+
+Usage (from backend/):
+    QUERY_PLAN_DATABASE_URL=postgresql://localhost/fitgen_test pytest scripts/test_query_plans.py -v
+"""
+import os
+import re
+import sys
+import uuid
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATABASE_URL = os.environ.get('QUERY_PLAN_DATABASE_URL')
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="QUERY_PLAN_DATABASE_URL not set")
+
+USERS = 200
+ROWS_PER_USER = 60
+
+
+@pytest.fixture(scope='module')
+def app():
+    os.environ['DATABASE_URL'] = DATABASE_URL
+    os.environ.setdefault('TASK_QUEUE_WORKERS', '0')
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture(scope='module')
+def seeded_user(app):
+    """Seeds USERS users and returns one of them; removes everything afterwards"""
+    from app.shared.extensions import db
+    from app.modules.identity.domain.models import User
+    from app.modules.nutrition.domain.models import Meal
+    from app.modules.nutrition.domain.hydration import HydrationLog
+    from app.modules.nutrition.domain.daily_totals import DailyNutritionTotal
+    from app.modules.analytics.domain.body_metrics import BodyMetric
+    from app.modules.training.domain.models import WorkoutPlan, WorkoutDay, Exercise, WorkoutSession, ExerciseLog
+    from app.modules.coach.domain.chat_message import ChatMessage
+
+    now = datetime.utcnow()
+    user_ids = [uuid.uuid4() for _ in range(USERS)]
+
+    def when():
+        return now - timedelta(minutes=random.randint(0, 180 * 24 * 60))
+
+    rows = {table: [] for table in ('users', 'plans', 'days', 'exercises', 'meals', 'water', 'metrics', 'sessions', 'logs', 'chat')}
+    for user_id in user_ids:
+        plan_id, day_id, exercise_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        rows['users'].append({"id": user_id, "email": f"plan-{user_id.hex[:12]}@fitgen.local", "password_hash": "!", "name": "Plan", "created_at": now})
+        rows['plans'].append({"id": plan_id, "user_id": user_id, "name": "Plan", "is_active": True, "created_at": now})
+        rows['days'].append({"id": day_id, "workout_plan_id": plan_id, "user_id": user_id, "name": "A", "order": 0})
+        rows['exercises'].append({"id": exercise_id, "workout_day_id": day_id, "user_id": user_id, "name": "Supino", "order": 0})
+
+        for _ in range(ROWS_PER_USER):
+            rows['meals'].append({"id": uuid.uuid4(), "user_id": user_id, "name": "Plan meal", "calories": 500, "consumed_at": when(), "created_at": now})
+            rows['water'].append({"id": uuid.uuid4(), "user_id": user_id, "amount_ml": 250, "logged_at": when(), "created_at": now})
+            rows['chat'].append({"id": str(uuid.uuid4()), "user_id": str(user_id), "role": "user", "content": "oi", "created_at": when()})
+
+        for _ in range(ROWS_PER_USER // 3):
+            session_id, started = uuid.uuid4(), when()
+            rows['metrics'].append({"id": uuid.uuid4(), "user_id": user_id, "weight_kg": 80, "recorded_at": when()})
+            rows['sessions'].append({"id": session_id, "user_id": user_id, "workout_day_id": day_id, "status": "completed", "started_at": started, "completed_at": started + timedelta(hours=1)})
+            rows['logs'] += [
+                {"id": uuid.uuid4(), "workout_session_id": session_id, "exercise_id": exercise_id, "user_id": user_id, "set_number": n, "reps_done": 10, "weight_used_kg": 40, "created_at": started}
+                for n in range(1, 4)
+            ]
+
+    order = [
+        (User, 'users'), (WorkoutPlan, 'plans'), (WorkoutDay, 'days'), (Exercise, 'exercises'),
+        (Meal, 'meals'), (HydrationLog, 'water'), (BodyMetric, 'metrics'),
+        (WorkoutSession, 'sessions'), (ExerciseLog, 'logs'), (ChatMessage, 'chat'),
+    ]
+    for model, key in order:
+        db.session.execute(model.__table__.insert(), rows[key])
+    db.session.commit()
+
+    from app.modules.nutrition.application.daily_totals_service import DailyTotalsService
+    for user_id in user_ids:
+        DailyTotalsService.rebuild(user_id)
+
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.exec_driver_sql('ANALYZE')
+
+    yield user_ids[0]
+
+    db.session.rollback()
+    str_ids = [str(user_id) for user_id in user_ids]
+    db.session.execute(ChatMessage.__table__.delete().where(ChatMessage.user_id.in_(str_ids)))
+    db.session.execute(DailyNutritionTotal.__table__.delete().where(DailyNutritionTotal.user_id.in_(user_ids)))
+    for model, _ in reversed(order[1:-1]):
+        db.session.execute(model.__table__.delete().where(model.__table__.c.user_id.in_(user_ids)))
+    db.session.execute(User.__table__.delete().where(User.id.in_(user_ids)))
+    db.session.commit()
+
+
+def _get(app, user_id, path):
+    from flask_jwt_extended import create_access_token
+    token = create_access_token(identity=str(user_id))
+    response = app.test_client().get(path, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, f"{path}: {response.status_code} {response.get_data(as_text=True)}"
+
+
+def _coach_context(app, user_id):
+    from app.shared.utils.timezone import get_today_cuiaba
+    from app.modules.coach.application.coach_context_service import CoachContextService
+    CoachContextService._load_sections(user_id, ('metrics', 'workouts', 'nutrition'), get_today_cuiaba())
+
+
+def _dashboard(app, user_id):
+    from app.modules.analytics.application.dashboard_service import DashboardService
+    DashboardService.build(user_id)
+
+
+# name -> (tables that must not be seq-scanned, call into the app's own code)
+HOT_PATHS = {
+    'nutrition_daily': (('meals', 'daily_nutrition_totals'),
+                        lambda app, user_id: _get(app, user_id, '/api/nutrition/daily')),
+    'hydration_daily': (('daily_nutrition_totals',),
+                        lambda app, user_id: _get(app, user_id, '/api/hydration/daily')),
+    'coach_context': (('body_metrics', 'workout_sessions', 'daily_nutrition_totals'), _coach_context),
+    'dashboard': (('workout_sessions', 'exercise_logs', 'daily_nutrition_totals'), _dashboard),
+    'workout_history': (('workout_sessions',),
+                        lambda app, user_id: _get(app, user_id, '/api/exercises/history?days=7')),
+    'chat_history': (('chat_messages',),
+                     lambda app, user_id: _get(app, user_id, '/api/chat/history')),
+}
+
+
+@contextmanager
+def captured_selects():
+    """SELECTs sent to the driver while the block runs: [(sql, parameters)]"""
+    from sqlalchemy import event
+    from app.shared.extensions import db
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def touches(statement, table):
+    return re.search(rf'\b(FROM|JOIN)\s+{table}\b', statement, re.IGNORECASE) is not None
+
+
+def explain(statement, parameters):
+    """Plan of a captured statement (parameters already adapted for the driver)"""
+    from app.shared.extensions import db
+    with db.engine.connect() as conn:
+        return conn.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()[0]['Plan']
+
+
+def seq_scanned_tables(plan):
+    found = set()
+    if plan.get('Node Type') == 'Seq Scan':
+        found.add(plan.get('Relation Name'))
+    for child in plan.get('Plans', []):
+        found |= seq_scanned_tables(child)
+    return found
+
+
+@pytest.mark.parametrize('name', sorted(HOT_PATHS))
+def test_hot_path_uses_indexes(app, seeded_user, name):
+    from app.shared.extensions import cache, db
+
+    tables, call = HOT_PATHS[name]
+    # Cached sections/documents would skip the queries under test
+    cache.clear()
+    with captured_selects() as statements:
+        call(app, seeded_user)
+    db.session.rollback()
+
+    for table in tables:
+        relevant = [(sql, params) for sql, params in statements if touches(sql, table)]
+        assert relevant, f"{name}: no query on {table}; update HOT_PATHS"
+        for sql, params in relevant:
+            plan = explain(sql, params)
+            assert table not in seq_scanned_tables(plan), f"{name}: sequential scan on {table}\n{sql}\n{plan}"
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
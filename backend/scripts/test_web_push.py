@@ -0,0 +1,113 @@
+"""
+Tests for Web Push delivery and dead-subscription pruning
+
+Sends real (encrypted, VAPID-signed) pushes with pywebpush to a local stub
+push service, so no browser vendor is contacted.
+
+Usage (from backend/):
+    pytest scripts/test_web_push.py -v
+"""
+import os
+import sys
+import base64
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.shared import http_client
+from app.modules.communication.application.web_push_service import WebPushService
+from app.modules.communication.application.push_delivery import PushDeliveryService
+
+
+class PushServiceStub(BaseHTTPRequestHandler):
+    """
+    /ok/...    201 Created
+    /gone/...  410 Gone (subscription expired)
+    /404/...   404 Not Found (unknown subscription)
+    /fail/...  500
+    """
+    STATUS = {'ok': 201, 'gone': 410, '404': 404, 'fail': 500}
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        status = self.STATUS.get(self.path.strip('/').split('/')[0], 500)
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def _b64(raw):
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+@pytest.fixture(scope='module')
+def base_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PushServiceStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def vapid_key(monkeypatch):
+    key = ec.generate_private_key(ec.SECP256R1())
+    monkeypatch.delenv('VAPID_PRIVATE_KEY_FILE', raising=False)
+    monkeypatch.setenv('VAPID_PRIVATE_KEY', _b64(key.private_numbers().private_value.to_bytes(32, 'big')))
+    # Fresh client per test: the 500 case must not open the breaker for the others
+    http_client._clients.pop('webpush', None)
+
+
+def subscription(base_url, path):
+    browser_key = ec.generate_private_key(ec.SECP256R1()).public_key().public_bytes(
+        serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+    )
+    return {
+        "endpoint": f"{base_url}/{path}/sub",
+        "keys": {"p256dh": _b64(browser_key), "auth": _b64(os.urandom(16))}
+    }
+
+
+def test_delivered_subscription_is_kept(base_url):
+    result = WebPushService.send_notification(subscription(base_url, 'ok'), "Título", "Mensagem")
+    assert result['success'] is True
+
+
+@pytest.mark.parametrize('path', ['gone', '404'])
+def test_expired_subscription_is_marked_for_deletion(base_url, path):
+    result = WebPushService.send_notification(subscription(base_url, path), "Título", "Mensagem")
+    assert result['success'] is False
+    assert result['should_delete'] is True
+
+
+def test_provider_error_keeps_subscription(base_url):
+    result = WebPushService.send_notification(subscription(base_url, 'fail'), "Título", "Mensagem")
+    assert result['success'] is False
+    assert not result.get('should_delete')
+
+
+def test_410_device_is_pruned(base_url):
+    def device(device_id, path):
+        sub = subscription(base_url, path)
+        return SimpleNamespace(
+            id=device_id,
+            subscription_endpoint=sub['endpoint'],
+            subscription_p256dh=sub['keys']['p256dh'],
+            subscription_auth=sub['keys']['auth']
+        )
+
+    summary, dead = PushDeliveryService._send_web(
+        [device('alive', 'ok'), device('expired', 'gone')], "Título", "Mensagem", {}
+    )
+
+    assert dead == ['expired']
+    assert summary == {"sent": 1, "failed": 1, "pruned": 1}
@@ -5,4 +5,4 @@ cd /var/www/fitgen/backend
 export $(grep -v '^#' .env | xargs)
 
 # Start gunicorn
-venv/bin/gunicorn --bind 0.0.0.0:5000 --workers 2 --access-logfile logs/access.log --error-logfile logs/error.log wsgi:app
+venv/bin/gunicorn -c gunicorn.conf.py --access-logfile logs/access.log --error-logfile logs/error.log wsgi:app
@@ -4,6 +4,7 @@ import { useEffect, useState } from "react";
 import { useRouter } from "next/navigation";
 import Link from "next/link";
 import { fetchAPI } from "@/lib/api";
+import { useCursorPages } from "@/hooks/useCursorPages";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from "@/components/ui/table";
 import { Button } from "@/components/ui/button";
@@ -27,27 +28,36 @@ export default function AuditLogsPage() {
     const router = useRouter();
     const [logs, setLogs] = useState<AuditLog[]>([]);
     const [loading, setLoading] = useState(true);
-    const [page, setPage] = useState(1);
+    const pages = useCursorPages();
+    const page = pages.page;
     const [totalPages, setTotalPages] = useState(1);
 
     // Filters
     const [actionFilter, setActionFilter] = useState("");
     const [resourceFilter, setResourceFilter] = useState("");
 
+    // Filters change the listing: back to the first page
+    useEffect(() => {
+        pages.reset();
+    }, [actionFilter, resourceFilter]);
+
     useEffect(() => {
         loadLogs();
-    }, [page, actionFilter, resourceFilter]);
+    }, [pages.cursor, actionFilter, resourceFilter]);
 
     async function loadLogs() {
         setLoading(true);
         try {
-            let url = `/admin/audit-logs?page=${page}&per_page=20`;
+            let url = `/admin/audit-logs?per_page=20`;
+            if (pages.cursor) url += `&cursor=${encodeURIComponent(pages.cursor)}`;
             if (actionFilter) url += `&action=${actionFilter}`;
             if (resourceFilter) url += `&resource_type=${resourceFilter}`;
 
             const data = await fetchAPI(url);
             setLogs(data.logs);
-            setTotalPages(data.pages);
+            pages.setNextCursor(data.next_cursor);
+            // total is only counted on the first page
+            if (data.pages != null) setTotalPages(data.pages);
         } catch (error) {
             console.error("Failed to load audit logs", error);
         } finally {
@@ -182,16 +192,16 @@ export default function AuditLogsPage() {
                         <Button
                             variant="outline"
                             size="sm"
-                            onClick={() => setPage(p => Math.max(1, p - 1))}
-                            disabled={page === 1 || loading}
+                            onClick={pages.prev}
+                            disabled={!pages.hasPrev || loading}
                         >
                             Anterior
                         </Button>
                         <Button
                             variant="outline"
                             size="sm"
-                            onClick={() => setPage(p => Math.min(totalPages, p + 1))}
-                            disabled={page === totalPages || loading}
+                            onClick={pages.next}
+                            disabled={!pages.hasNext || loading}
                         >
                             Próximo
                         </Button>
@@ -2,6 +2,7 @@
 
 import { useEffect, useState } from "react";
 import { fetchAPI } from "@/lib/api";
+import { useCursorPages } from "@/hooks/useCursorPages";
 import { formatDateBRT } from "@/lib/date";
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
@@ -17,7 +18,8 @@ export default function AdminNotificationsPage() {
     const [sending, setSending] = useState(false);
 
     // Pagination
-    const [currentPage, setCurrentPage] = useState(1);
+    const pages = useCursorPages();
+    const currentPage = pages.page;
     const [totalPages, setTotalPages] = useState(1);
     const [total, setTotal] = useState(0);
     const perPage = 20;
@@ -26,14 +28,18 @@ export default function AdminNotificationsPage() {
     const [title, setTitle] = useState("");
     const [message, setMessage] = useState("");
 
-    const loadNotifications = async (page = 1) => {
+    const loadNotifications = async () => {
         setLoading(true);
         try {
-            const data = await fetchAPI(`/admin/notifications?page=${page}&per_page=${perPage}`);
+            const cursorParam = pages.cursor ? `&cursor=${encodeURIComponent(pages.cursor)}` : "";
+            const data = await fetchAPI(`/admin/notifications?per_page=${perPage}${cursorParam}`);
             setNotifications(data.items);
-            setTotalPages(data.pages);
-            setTotal(data.total);
-            setCurrentPage(page);
+            pages.setNextCursor(data.next_cursor);
+            // total is only counted on the first page
+            if (data.total != null) {
+                setTotalPages(data.pages);
+                setTotal(data.total);
+            }
         } catch (error) {
             console.error(error);
         } finally {
@@ -42,14 +48,14 @@ export default function AdminNotificationsPage() {
     };
 
     useEffect(() => {
-        loadNotifications(1);
-    }, []);
+        loadNotifications();
+    }, [pages.cursor]);
 
     const handleBroadcast = async (e: React.FormEvent) => {
         e.preventDefault();
         setSending(true);
         try {
-            await fetchAPI("/admin/notifications/broadcast", {
+            const { broadcast_id } = await fetchAPI("/admin/notifications/broadcast", {
                 method: "POST",
                 body: JSON.stringify({
                     title,
@@ -57,10 +63,13 @@ export default function AdminNotificationsPage() {
                     type: "system"
                 })
             });
-            toast.success("Notificação enviada para todos os usuários!");
+            // O envio roda em segundo plano; o progresso fica em GET /admin/notifications/broadcast/<id>
+            toast.success(`Notificação enfileirada para todos os usuários. Acompanhe o envio em /admin/notifications/broadcast/${broadcast_id}`);
             setTitle("");
             setMessage("");
-            loadNotifications(1); // Refresh list and go to first page
+            // Refresh list and go to first page
+            if (pages.hasPrev) pages.reset();
+            else loadNotifications();
         } catch (error) {
             toast.error("Erro ao enviar notificação.");
         } finally {
@@ -68,17 +77,9 @@ export default function AdminNotificationsPage() {
         }
     };
 
-    const handlePreviousPage = () => {
-        if (currentPage > 1) {
-            loadNotifications(currentPage - 1);
-        }
-    };
+    const handlePreviousPage = () => pages.prev();
 
-    const handleNextPage = () => {
-        if (currentPage < totalPages) {
-            loadNotifications(currentPage + 1);
-        }
-    };
+    const handleNextPage = () => pages.next();
 
     return (
         <div className="space-y-6 animate-fade-in-up">
@@ -199,7 +200,7 @@ export default function AdminNotificationsPage() {
                                         variant="outline"
                                         size="sm"
                                         onClick={handlePreviousPage}
-                                        disabled={currentPage === 1}
+                                        disabled={!pages.hasPrev}
                                         className="bg-background/50 border-white/10"
                                     >
                                         <ChevronLeft className="h-4 w-4 mr-1" />
@@ -209,7 +210,7 @@ export default function AdminNotificationsPage() {
                                         variant="outline"
                                         size="sm"
                                         onClick={handleNextPage}
-                                        disabled={currentPage === totalPages}
+                                        disabled={!pages.hasNext}
                                         className="bg-background/50 border-white/10"
                                     >
                                         Próxima
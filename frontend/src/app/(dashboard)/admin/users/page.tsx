@@ -4,6 +4,7 @@ import { useEffect, useState } from "react";
 import Link from "next/link";
 import { formatDateOnlyBRT } from "@/lib/date";
 import { fetchAPI } from "@/lib/api";
+import { useCursorPages } from "@/hooks/useCursorPages";
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
@@ -25,15 +26,14 @@ interface User {
 interface Pagination {
     total: number;
     pages: number;
-    current_page: number;
-    per_page: number;
+    total_is_estimate: boolean;
 }
 
 export default function UsersPage() {
     const [users, setUsers] = useState<User[]>([]);
     const [loading, setLoading] = useState(true);
     const [pagination, setPagination] = useState<Pagination | null>(null);
-    const [page, setPage] = useState(1);
+    const pages = useCursorPages();
     const [search, setSearch] = useState("");
     const [roleFilter, setRoleFilter] = useState("all");
     const [statusFilter, setStatusFilter] = useState("all");
@@ -44,18 +44,24 @@ export default function UsersPage() {
     const [lastLoginAfter, setLastLoginAfter] = useState("");
     const [lastLoginBefore, setLastLoginBefore] = useState("");
 
+    // Filters change the listing: back to the first page
+    useEffect(() => {
+        pages.reset();
+    }, [search, roleFilter, statusFilter, createdAfter, createdBefore, lastLoginAfter, lastLoginBefore]);
+
     // Debounce search and filters
     useEffect(() => {
         const timer = setTimeout(() => {
             loadUsers();
         }, 500);
         return () => clearTimeout(timer);
-    }, [search, page, roleFilter, statusFilter, createdAfter, createdBefore, lastLoginAfter, lastLoginBefore]);
+    }, [search, pages.cursor, roleFilter, statusFilter, createdAfter, createdBefore, lastLoginAfter, lastLoginBefore]);
 
     async function loadUsers() {
         setLoading(true);
         try {
-            let url = `/admin/users?page=${page}&per_page=10`;
+            let url = `/admin/users?per_page=10`;
+            if (pages.cursor) url += `&cursor=${encodeURIComponent(pages.cursor)}`;
             if (search) url += `&search=${search}`;
             if (roleFilter !== "all") url += `&role=${roleFilter}`;
             if (statusFilter !== "all") url += `&status=${statusFilter}`;
@@ -66,12 +72,15 @@ export default function UsersPage() {
 
             const data = await fetchAPI(url);
             setUsers(data.users);
-            setPagination({
-                total: data.total,
-                pages: data.pages,
-                current_page: data.current_page,
-                per_page: data.per_page
-            });
+            pages.setNextCursor(data.next_cursor);
+            // total is only counted on the first page
+            if (data.total != null) {
+                setPagination({
+                    total: data.total,
+                    pages: data.pages,
+                    total_is_estimate: data.total_is_estimate
+                });
+            }
         } catch (e) {
             console.error("Failed to load users", e);
         } finally {
@@ -300,14 +309,14 @@ export default function UsersPage() {
             {pagination && pagination.pages > 1 && (
                 <div className="flex items-center justify-between animate-fade-in-up delay-300">
                     <p className="text-sm text-muted-foreground">
-                        Página {pagination.current_page} de {pagination.pages}
+                        Página {pages.page} de {pagination.total_is_estimate ? "~" : ""}{pagination.pages}
                     </p>
                     <div className="flex gap-2">
                         <Button
                             variant="outline"
                             size="sm"
-                            onClick={() => setPage(p => Math.max(1, p - 1))}
-                            disabled={page === 1 || loading}
+                            onClick={pages.prev}
+                            disabled={!pages.hasPrev || loading}
                             className="bg-background/50 border-white/10 hover:bg-primary/10"
                         >
                             <ChevronLeft className="h-4 w-4 mr-2" /> Anterior
@@ -315,8 +324,8 @@ export default function UsersPage() {
                         <Button
                             variant="outline"
                             size="sm"
-                            onClick={() => setPage(p => Math.min(pagination.pages, p + 1))}
-                            disabled={page === pagination.pages || loading}
+                            onClick={pages.next}
+                            disabled={!pages.hasNext || loading}
                             className="bg-background/50 border-white/10 hover:bg-primary/10"
                         >
                             Próximo <ChevronRight className="h-4 w-4 ml-2" />
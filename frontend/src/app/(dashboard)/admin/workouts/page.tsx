@@ -2,6 +2,7 @@
 
 import { useEffect, useState } from "react";
 import { fetchAPI } from "@/lib/api";
+import { useCursorPages } from "@/hooks/useCursorPages";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
@@ -74,7 +75,8 @@ export default function AdminWorkoutsPage() {
     const [workouts, setWorkouts] = useState<WorkoutPlan[]>([]);
     const [loading, setLoading] = useState(true);
     const [searchTerm, setSearchTerm] = useState("");
-    const [currentPage, setCurrentPage] = useState(1);
+    const pages = useCursorPages();
+    const currentPage = pages.page;
     const [totalPages, setTotalPages] = useState(1);
     const [totalWorkouts, setTotalWorkouts] = useState(0);
 
@@ -90,15 +92,20 @@ export default function AdminWorkoutsPage() {
 
     useEffect(() => {
         loadWorkouts();
-    }, [currentPage, searchTerm]);
+    }, [pages.cursor, searchTerm]);
 
     async function loadWorkouts() {
         setLoading(true);
         try {
-            const data = await fetchAPI(`/admin/workouts?page=${currentPage}&per_page=10`);
+            const cursorParam = pages.cursor ? `&cursor=${encodeURIComponent(pages.cursor)}` : "";
+            const data = await fetchAPI(`/admin/workouts?per_page=10${cursorParam}`);
             setWorkouts(data.workouts || []);
-            setTotalPages(data.pages || 1);
-            setTotalWorkouts(data.total || 0);
+            pages.setNextCursor(data.next_cursor);
+            // total is only counted on the first page
+            if (data.total != null) {
+                setTotalPages(data.pages || 1);
+                setTotalWorkouts(data.total);
+            }
         } catch (e) {
             toast.error("Erro ao carregar treinos");
         } finally {
@@ -276,8 +283,8 @@ export default function AdminWorkoutsPage() {
                             <Button
                                 variant="outline"
                                 size="sm"
-                                disabled={currentPage === 1}
-                                onClick={() => setCurrentPage(currentPage - 1)}
+                                disabled={!pages.hasPrev}
+                                onClick={pages.prev}
                             >
                                 Anterior
                             </Button>
@@ -287,8 +294,8 @@ export default function AdminWorkoutsPage() {
                             <Button
                                 variant="outline"
                                 size="sm"
-                                disabled={currentPage === totalPages}
-                                onClick={() => setCurrentPage(currentPage + 1)}
+                                disabled={!pages.hasNext}
+                                onClick={pages.next}
                             >
                                 Próxima
                             </Button>
@@ -44,7 +44,7 @@ export default function CoachPage() {
     const loadHistory = async () => {
         try {
             const data = await fetchAPI("/chat/history?limit=50");
-            setMessages(data);
+            setMessages(data.messages);
         } catch (error) {
             console.error(error);
         } finally {
@@ -5,7 +5,7 @@ import { Card, CardContent, CardHeader, CardTitle, CardDescription } from "@/com
 import { Button } from "@/components/ui/button";
 import { Badge } from "@/components/ui/badge";
 import { Progress } from "@/components/ui/progress";
-import { fetchAPI } from "@/lib/api";
+import { fetchAPI, runDietJob } from "@/lib/api";
 import { Loader2, RefreshCw, ShoppingCart, Utensils, ArrowLeft } from "lucide-react";
 import { useRouter } from "next/navigation";
 
@@ -140,8 +140,7 @@ export default function DietPlanPage() {
         if (refreshingDay) return;
         setRefreshingDay(day);
         try {
-            const res = await fetchAPI("/diet/regenerate-day", {
-                method: "POST",
+            const res = await runDietJob("/diet/regenerate-day", {
                 body: JSON.stringify({ day })
             });
 
@@ -155,7 +154,7 @@ export default function DietPlanPage() {
                     day.toLowerCase().normalize("NFD").replace(/[\u0300-\u036f]/g, "")
                 ) || day.toLowerCase();
 
-                if (res.day_plan) {
+                if (res?.day_plan) {
                     updatedPlan.weekly_plan[dayKey] = res.day_plan;
                     setPlan(updatedPlan);
                 }
@@ -23,22 +23,29 @@ export default function NotificationsPage() {
     const router = useRouter();
     const [notifications, setNotifications] = useState<Notification[]>([]);
     const [loading, setLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
+
+    const markVisibleAsRead = (items: Notification[]) => {
+        items.forEach((n: Notification) => {
+            if (!n.is_read) {
+                fetchAPI(`/notifications/${n.id}/read`, { method: "POST" });
+            }
+        });
+    };
 
     const loadNotifications = async () => {
         setLoading(true);
         try {
             const data = await fetchAPI("/notifications/");
-            setNotifications(data);
+            setNotifications(data.notifications);
+            setNextCursor(data.next_cursor);
 
             // Mark all as read when opening this page? 
             // Or maybe just leave them until manually acted upon?
             // Let's mark them as read one by one or maybe backend should have a 'mark all read'.
             // For now, let's just mark visible ones as read in background
-            data.forEach((n: Notification) => {
-                if (!n.is_read) {
-                    fetchAPI(`/notifications/${n.id}/read`, { method: "POST" });
-                }
-            });
+            markVisibleAsRead(data.notifications);
 
         } catch (error) {
             console.error(error);
@@ -47,6 +54,21 @@ export default function NotificationsPage() {
         }
     };
 
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const data = await fetchAPI(`/notifications/?cursor=${encodeURIComponent(nextCursor)}`);
+            setNotifications(prev => [...prev, ...data.notifications]);
+            setNextCursor(data.next_cursor);
+            markVisibleAsRead(data.notifications);
+        } catch (error) {
+            console.error(error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     useEffect(() => {
         loadNotifications();
     }, []);
@@ -128,6 +150,14 @@ export default function NotificationsPage() {
                         </Card>
                     ))
                 )}
+
+                {!loading && nextCursor && (
+                    <div className="flex justify-center">
+                        <Button variant="ghost" onClick={loadMore} disabled={loadingMore}>
+                            {loadingMore ? "Carregando..." : "Carregar mais"}
+                        </Button>
+                    </div>
+                )}
             </div>
 
             <div className="flex justify-center pt-8">
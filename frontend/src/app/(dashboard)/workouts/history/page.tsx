@@ -16,6 +16,8 @@ interface WorkoutSession {
     duration_seconds: number;
     workout_name: string;
     calories: number;
+    set_count: number;
+    volume_kg: number;
 }
 
 export default function HistoryPage() {
@@ -33,7 +35,7 @@ export default function HistoryPage() {
                     url += `&days=${filterDay}`;
                 }
                 const data = await fetchAPI(url);
-                setHistory(data || []);
+                setHistory(data?.sessions || []);
             } catch (e) {
                 console.error(e);
             } finally {
@@ -139,6 +141,12 @@ export default function HistoryPage() {
                                             <Flame className="h-3 w-3 mr-1 text-orange-400" />
                                             {session.calories} kcal
                                         </span>
+                                        {session.set_count > 0 && (
+                                            <span className="flex items-center">
+                                                <Dumbbell className="h-3 w-3 mr-1 text-primary" />
+                                                {session.set_count} séries · {Math.round(session.volume_kg)} kg
+                                            </span>
+                                        )}
                                     </div>
                                 </div>
                             </div>
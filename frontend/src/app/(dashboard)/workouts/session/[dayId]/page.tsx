@@ -42,9 +42,9 @@ export default function WorkoutSessionPage() {
     useEffect(() => {
         async function loadDay() {
             try {
-                // We fetch all plans to find the active one and then the specific day
-                const plans = await fetchAPI("/workouts");
-                const active = plans.find((p: any) => p.is_active);
+                // We fetch the active plan and then the specific day
+                const { plans } = await fetchAPI("/workouts?is_active=true&limit=1");
+                const active = plans[0];
                 if (active) {
                     const fullPlan = await fetchAPI(`/workouts/${active.id}`);
                     const day = fullPlan.days.find((d: any) => d.id === params.dayId);
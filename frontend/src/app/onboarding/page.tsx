@@ -8,7 +8,7 @@ import { Input } from "@/components/ui/input";
 import { Label } from "@/components/ui/label";
 import { Textarea } from "@/components/ui/textarea";
 import { Loader2, ArrowRight, ArrowLeft, Check } from "lucide-react";
-import { fetchAPI } from "@/lib/api";
+import { fetchAPI, runDietJob } from "@/lib/api";
 import { AILoading } from "@/components/ui/ai-loading";
 import { cn, getErrorMessage } from "@/lib/utils";
 import { toast } from "sonner";
@@ -253,7 +253,7 @@ export default function OnboardingPage() {
             await fetchAPI("/onboarding/generate-workout", { method: "POST" });
 
             setLoadingMessage("Montando dieta personalizada...");
-            await fetchAPI("/diet/generate", { method: "POST" });
+            await runDietJob("/diet/generate");
 
             sessionStorage.removeItem(STORAGE_KEY);
             toast.success("Tudo pronto!");
@@ -9,7 +9,7 @@ import { RadioGroup, RadioGroupItem } from "@/components/ui/radio-group";
 import { Checkbox } from "@/components/ui/checkbox";
 import { Textarea } from "@/components/ui/textarea";
 import { Progress } from "@/components/ui/progress";
-import { fetchAPI } from "@/lib/api";
+import { fetchAPI, runDietJob } from "@/lib/api";
 import { Loader2, ChevronLeft, ChevronRight } from "lucide-react";
 
 interface DietOnboardingModalProps {
@@ -78,10 +78,8 @@ export function DietOnboardingModal({ open, onClose, onComplete }: DietOnboardin
                 })
             });
 
-            // Generate diet plan
-            await fetchAPI("/diet/generate", {
-                method: "POST"
-            });
+            // Generate diet plan (a new one, not the cached plan for these preferences)
+            await runDietJob("/diet/generate", { body: JSON.stringify({ force: true }) });
 
             // Success haptic
             const { hapticSuccess } = await import('@/lib/haptics');
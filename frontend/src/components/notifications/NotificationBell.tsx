@@ -25,11 +25,11 @@ export function NotificationBell() {
 
     const loadNotifications = async (isFirstLoad = false) => {
         try {
-            const data: Notification[] = await fetchAPI("/notifications/");
+            // Latest notification + unread count, without the full list
+            const page = await fetchAPI("/notifications/?limit=1");
+            const data: Notification[] = page.notifications;
 
-            // Calculate unread
-            const unread = data.filter(n => !n.is_read).length;
-            setUnreadCount(unread);
+            setUnreadCount(page.unread_count ?? 0);
 
             // Check for new notification (top of list)
             if (data.length > 0) {
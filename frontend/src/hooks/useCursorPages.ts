@@ -0,0 +1,39 @@
+import { useCallback, useState } from "react";
+
+/**
+ * Page navigation over cursor-paginated endpoints.
+ *
+ * The API returns `next_cursor` for the page after the current one; the
+ * cursors of the pages already visited are kept so "Anterior" works too.
+ */
+export function useCursorPages() {
+    const [cursors, setCursors] = useState<string[]>([""]);
+    const [page, setPage] = useState(1);
+
+    const cursor = cursors[page - 1] || "";
+    const hasNext = !!cursors[page];
+
+    const setNextCursor = useCallback((next: string | null | undefined) => {
+        setCursors((prev) => {
+            const updated = prev.slice(0, page);
+            if (next) updated.push(next);
+            return updated;
+        });
+    }, [page]);
+
+    const reset = useCallback(() => {
+        setCursors([""]);
+        setPage(1);
+    }, []);
+
+    return {
+        page,
+        cursor,
+        hasNext,
+        hasPrev: page > 1,
+        next: () => hasNext && setPage(page + 1),
+        prev: () => page > 1 && setPage(page - 1),
+        setNextCursor,
+        reset,
+    };
+}
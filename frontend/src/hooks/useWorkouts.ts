@@ -2,10 +2,21 @@ import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
 import { fetchAPI } from "@/lib/api";
 import type { WorkoutPlan } from "@/types/api";
 
+// /workouts is cursor-paginated: follow next_cursor so every plan is listed
 export function useWorkouts() {
     return useQuery<WorkoutPlan[]>({
         queryKey: ["workouts"],
-        queryFn: () => fetchAPI("/workouts"),
+        queryFn: async () => {
+            const plans: WorkoutPlan[] = [];
+            let cursor: string | null = null;
+            do {
+                const url: string = cursor ? `/workouts?cursor=${encodeURIComponent(cursor)}` : "/workouts";
+                const data = await fetchAPI(url);
+                plans.push(...data.plans);
+                cursor = data.has_more ? data.next_cursor : null;
+            } while (cursor);
+            return plans;
+        },
     });
 }
 
@@ -18,8 +29,11 @@ export function useWorkoutDetails(id: string) {
 }
 
 export function useActiveWorkoutPlan() {
-    const { data: plans } = useWorkouts();
-    const activePlan = plans?.find((p) => p.is_active);
+    const { data: activePlans } = useQuery<WorkoutPlan[]>({
+        queryKey: ["workouts", "active"],
+        queryFn: async () => (await fetchAPI("/workouts?is_active=true&limit=1")).plans,
+    });
+    const activePlan = activePlans?.[0];
 
     return useQuery<WorkoutPlan>({
         queryKey: ["workout-details", activePlan?.id],
@@ -31,7 +45,7 @@ export function useActiveWorkoutPlan() {
 export function useExerciseHistory() {
     return useQuery({
         queryKey: ["exercise-history"],
-        queryFn: () => fetchAPI("/exercises/history"),
+        queryFn: async () => (await fetchAPI("/exercises/history")).sessions,
     });
 }
 
@@ -87,3 +87,30 @@ export const fetchAPI = async (endpoint: string, options: FetchOptions = {}) =>
 
     return data;
 };
+
+interface JobPollOptions {
+    intervalMs?: number;
+    timeoutMs?: number;
+}
+
+/**
+ * Start a background diet job (POST) and poll /diet/jobs/<id> until it finishes.
+ * Resolves with the job result; throws if the job fails or takes too long.
+ */
+export const runDietJob = async (endpoint: string, options: FetchOptions = {}, { intervalMs = 2000, timeoutMs = 300000 }: JobPollOptions = {}) => {
+    let job = await fetchAPI(endpoint, { method: "POST", ...options });
+    const deadline = Date.now() + timeoutMs;
+
+    while (job && (job.status === "pending" || job.status === "running")) {
+        if (Date.now() > deadline) {
+            throw new Error("Tempo esgotado ao gerar a dieta. Tente novamente.");
+        }
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+        job = await fetchAPI(`/diet/jobs/${job.job_id}`);
+    }
+
+    if (job?.status === "failed") {
+        throw new Error(job.error || "Falha ao gerar a dieta");
+    }
+    return job?.result;
+};